@@ -16,6 +16,9 @@ Text2SQL API Server
 API 端点:
     GET  /health                 - 健康检查
     POST /api/agent/query        - 统一 Agent Runtime 查询
+    POST /api/agent/query/stream - Agent 节点进度与分析内容 SSE 流式输出
+    POST /api/agent/batch        - 批量 Agent 查询（有界并发，NDJSON 按完成顺序流式返回）
+    DELETE /api/agent/cache      - 失效 Agent 答案缓存与 SQL 结果缓存（导入新数据后调用）
     POST /api/query              - Text2SQL 查询（兼容旧入口）
     POST /api/query/llm          - LLM 模式生成 SQL
     POST /api/search             - 网络搜索
@@ -23,14 +26,17 @@ API 端点:
     POST /api/export/word        - Word 导出
     POST /api/report             - 报告生成
 """
+import asyncio
 import json
 import logging
+import time
 from pathlib import Path
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import os
@@ -52,7 +58,10 @@ except ImportError:
 import sys
 sys.path.insert(0, str(Path(__file__).parent))
 from src.utils.config import get_kiro_config, get_database_config
-from src.agent.factory import build_agent_runtime
+from src.agent.factory import build_agent_runtime, result_store_from_mapping
+from src.agent.metrics import METRICS
+from src.agent.schema_catalog import load_catalog
+from src.utils.fast_json import dumps, fast_json_response, parse_fields, select_fields
 from openai import OpenAI
 import pymysql
 
@@ -119,6 +128,12 @@ class AgentQueryRequest(BaseModel):
     question: str = Field(..., description="自然语言问题")
     scenario: str = Field(default="data_insight", description="场景标识")
     password: Optional[str] = Field(default=None, description="简单访问口令")
+    timeout_seconds: Optional[float] = Field(
+        default=None, gt=0, le=600, description="本次查询的时间预算（秒），默认取 AGENT_DEADLINE_SECONDS"
+    )
+    result_format: Literal["rows", "columns"] = Field(
+        default="rows", description="rows 返回逐行字典；columns 返回列式 table（列名只出现一次，体积更小）"
+    )
 
 
 class AgentQueryResponse(BaseModel):
@@ -136,7 +151,29 @@ class AgentQueryResponse(BaseModel):
     chart: Optional[dict] = None
     error: Optional[str] = None
     safety: Optional[dict] = None
+    truncated: Optional[dict] = None
     trace: List[dict] = Field(default_factory=list)
+    result_id: Optional[str] = Field(default=None, description="结果句柄，可用于分页读取和导出/报告")
+    table: Optional[dict] = Field(default=None, description="result_format=columns 时的列式结果")
+
+
+class AgentBatchItem(BaseModel):
+    """批量查询中的单个问题"""
+    question: str = Field(..., description="自然语言问题")
+    scenario: str = Field(default="data_insight", description="场景标识")
+
+
+class AgentBatchRequest(BaseModel):
+    """批量 Agent 查询请求"""
+    items: List[AgentBatchItem] = Field(..., min_length=1, max_length=100, description="问题列表（最多 100 个）")
+    concurrency: Optional[int] = Field(
+        default=None, ge=1, le=16, description="同时执行的问题数，默认取 AGENT_BATCH_CONCURRENCY"
+    )
+    password: Optional[str] = Field(default=None, description="简单访问口令")
+    timeout_seconds: Optional[float] = Field(
+        default=None, gt=0, le=600, description="每个问题的时间预算（秒），默认取 AGENT_DEADLINE_SECONDS"
+    )
+    result_format: Literal["rows", "columns"] = Field(default="rows", description="同 /api/agent/query")
 
 
 class QueryResponse(BaseModel):
@@ -162,8 +199,9 @@ class SearchResponse(BaseModel):
     count: int = 0
 
 class ExportRequest(BaseModel):
-    """导出请求"""
-    question: str
+    """导出请求（question 与 result_id 二选一；带 result_id 时直接导出已查询的结果）"""
+    question: Optional[str] = None
+    result_id: Optional[str] = Field(default=None, description="/api/agent/query 返回的结果句柄")
     format: str = Field(default="excel", description="格式：excel/word")
     filename: Optional[str] = None
 
@@ -175,8 +213,9 @@ class ExportResponse(BaseModel):
     message: str
 
 class ReportRequest(BaseModel):
-    """报告生成请求"""
-    question: str
+    """报告生成请求（question 与 result_id 二选一）"""
+    question: Optional[str] = None
+    result_id: Optional[str] = Field(default=None, description="/api/agent/query 返回的结果句柄")
     template: str = Field(default="default", description="模板：default/investment/due_diligence")
     include_chart: bool = Field(default=True, description="是否包含图表")
 
@@ -207,6 +246,7 @@ class TrainResponse(BaseModel):
 _vanna_initialized = False
 _llm_client = None
 _agent_runtime = None
+_result_store = None
 
 def init_vanna():
     """初始化 Vanna AI"""
@@ -291,6 +331,21 @@ def get_agent_runtime():
     return _agent_runtime
 
 
+def get_result_store():
+    """进程内结果句柄存储（内存 LRU + 可选磁盘溢出，按 RESULT_STORE_* 配置）。"""
+    global _result_store
+    if _result_store is None:
+        _result_store = result_store_from_mapping()
+    return _result_store
+
+
+def get_stored_result(result_id: str):
+    result = get_result_store().get(result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="结果不存在或已过期，请重新查询")
+    return result
+
+
 def verify_app_password(request: Request, password: Optional[str] = None) -> None:
     expected = os.environ.get("APP_PASSWORD")
     if not expected:
@@ -325,16 +380,15 @@ def get_db_config_with_fallback(scenario: str) -> dict:
 
 
 def load_schema_for_scenario(scenario: str) -> str:
-    """加载场景对应的Schema文档"""
+    """加载场景对应的Schema文档（解析结果按文件 mtime 缓存，修改后自动重新加载）"""
     try:
         if scenario in ["investment", "due_diligence"]:
             schema_file = SCHEMA_FILES["scenario_4_5"]
         else:
             schema_file = SCHEMA_FILES["scenario_1_3"]
-        
+
         if schema_file.exists():
-            with open(schema_file, 'r', encoding='utf-8') as f:
-                return f.read()
+            return load_catalog(schema_file).text
         else:
             logger.warning(f"Schema文件不存在: {schema_file}")
             return ""
@@ -350,9 +404,8 @@ def load_sql_examples(scenario: str, limit: int = 5) -> str:
             logger.warning(f"示例文件不存在: {EXAMPLES_FILE}")
             return ""
         
-        with open(EXAMPLES_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
+        catalog = load_catalog(EXAMPLES_FILE)
+
         # 根据场景提取对应的示例
         scenario_map = {
             "data_insight": "场景1：数据洞察",
@@ -361,23 +414,15 @@ def load_sql_examples(scenario: str, limit: int = 5) -> str:
             "investment": "场景4：招商清单",
             "due_diligence": "场景5：企业尽调"
         }
-        
+
         scenario_title = scenario_map.get(scenario, "场景1：数据洞察")
-        
-        # 简单提取：找到场景标题后的内容
-        if scenario_title in content:
-            start = content.find(scenario_title)
-            # 找到下一个场景标题或文件结尾
-            next_scenario = content.find("## 场景", start + len(scenario_title))
-            if next_scenario == -1:
-                next_scenario = content.find("## 通用规则", start)
-            if next_scenario == -1:
-                next_scenario = len(content)
-            
-            examples = content[start:next_scenario]
+
+        section = catalog.section(scenario_title)
+        if section is not None:
+            examples = f"{section.title}\n\n{section.body}"
             # 限制示例数量（每个示例约100-200行）
             return examples[:3000]  # 限制长度
-        
+
         return ""
     except Exception as e:
         logger.error(f"加载SQL示例失败: {e}")
@@ -535,22 +580,220 @@ async def root(request: Request):
 @app.get("/health")
 async def health(request: Request):
     """健康检查"""
-    return {
+    payload = {
         "status": "ok",
         "vanna": _vanna_initialized,
         "llm": _llm_client is not None,
         "agent": _agent_runtime is not None,
     }
+    sql_executor = getattr(_agent_runtime, "sql_executor", None)
+    pool_stats = getattr(sql_executor, "stats", None)
+    if callable(pool_stats):
+        payload["db_pool"] = pool_stats()
+    sql_cache_stats = getattr(sql_executor, "cache_stats", None)
+    if callable(sql_cache_stats):
+        payload["sql_cache"] = sql_cache_stats()
+    mirror_stats = getattr(sql_executor, "mirror_stats", None)
+    if callable(mirror_stats):
+        payload["analytic_mirror"] = mirror_stats()
+    rollup_stats = getattr(sql_executor, "rollup_stats", None)
+    if callable(rollup_stats):
+        payload["rollups"] = rollup_stats()
+    answer_cache = getattr(_agent_runtime, "answer_cache", None)
+    if answer_cache is not None:
+        payload["answer_cache"] = answer_cache.stats()
+    single_flight = getattr(_agent_runtime, "single_flight", None)
+    if single_flight is not None:
+        payload["single_flight"] = single_flight.stats()
+    if _result_store is not None:
+        payload["result_store"] = _result_store.stats()
+    return payload
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus 指标：各节点耗时直方图、LLM token、缓存命中、模板命中和 SQL 重试计数。"""
+    registry = getattr(_agent_runtime, "metrics", None) or METRICS
+    return PlainTextResponse(
+        registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 @app.post("/api/agent/query", response_model=AgentQueryResponse)
 @limiter.limit("60/minute")
-async def agent_query(request: Request, query_request: AgentQueryRequest):
-    """统一 Agent Runtime 查询入口。"""
+async def agent_query(
+    request: Request, query_request: AgentQueryRequest, fields: Optional[str] = None
+):
+    """统一 Agent Runtime 查询入口。
+
+    响应直接用 orjson 序列化（不逐行走 Pydantic 校验），按 Accept-Encoding 压缩；
+    ``fields=rows,analysis`` 只返回指定字段（``success``/``error`` 总是保留）。
+    """
     verify_app_password(request, query_request.password)
+    selected = parse_fields(fields, AgentQueryResponse.model_fields)
     runtime = get_agent_runtime()
-    result = runtime.query(query_request.question, scenario=query_request.scenario)
-    return AgentQueryResponse(**result.to_dict())
+    result = await _cancel_on_disconnect(
+        request,
+        runtime.aquery(
+            query_request.question,
+            scenario=query_request.scenario,
+            deadline=query_request.timeout_seconds,
+        ),
+    )
+    payload = result.to_dict(columnar=query_request.result_format == "columns")
+    if result.success:
+        payload["result_id"] = get_result_store().put(result)
+    return fast_json_response(
+        select_fields(payload, selected),
+        accept_encoding=request.headers.get("accept-encoding"),
+    )
+
+
+async def _cancel_on_disconnect(request: Request, coro, poll_seconds: float = 0.5):
+    """等待 Agent 查询完成；客户端提前断开时取消任务。
+
+    取消会触发查询 deadline 的回调，对正在执行的 SQL 发送 ``KILL QUERY``，
+    避免断开的请求继续占用 MySQL 线程和 API worker。
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("客户端已断开，取消 Agent 查询")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="客户端已断开连接")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@app.get("/api/agent/results/{result_id}")
+@limiter.limit("120/minute")
+async def get_agent_result(
+    request: Request,
+    result_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    password: Optional[str] = None,
+):
+    """按 result_id 分页读取已完成查询的结果行，不重新生成 SQL 也不访问数据库。"""
+    verify_app_password(request, password)
+    result = get_stored_result(result_id)
+    return fast_json_response(
+        {
+            "result_id": result_id,
+            "question": result.question,
+            "columns": result.columns,
+            "row_count": result.row_count,
+            "offset": offset,
+            "limit": limit,
+            "rows": result.rows[offset:offset + limit],
+            "truncated": result.truncated,
+        },
+        accept_encoding=request.headers.get("accept-encoding"),
+    )
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    """按 Server-Sent Events 格式编码单个事件，与普通响应共用 ``dumps`` 编码规则。"""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@app.post("/api/agent/query/stream")
+@limiter.limit("60/minute")
+async def agent_query_stream(request: Request, query_request: AgentQueryRequest):
+    """流式 Agent 查询：每个节点完成即推送，SQL/结果行先到，分析内容逐 token 推送。"""
+    verify_app_password(request, query_request.password)
+    runtime = get_agent_runtime()
+
+    async def event_stream():
+        try:
+            # 客户端断开时 StreamingResponse 会关闭生成器，astream 随之取消查询并 KILL QUERY。
+            async for item in runtime.astream(
+                query_request.question,
+                scenario=query_request.scenario,
+                deadline=query_request.timeout_seconds,
+            ):
+                yield format_sse(item["event"], item["data"])
+        except Exception as e:
+            logger.error(f"流式查询失败：{e}", exc_info=True)
+            yield format_sse("error", {"error": str(e)})
+        yield format_sse("done", {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/agent/batch")
+@limiter.limit("10/minute")
+async def agent_batch(request: Request, batch_request: AgentBatchRequest):
+    """批量 Agent 查询：有界并发执行，每完成一个问题输出一行 NDJSON。
+
+    所有问题共享同一个 Runtime 的答案缓存、SQL 缓存、single-flight 和连接池；
+    单个问题失败只体现在该行的 ``success=false``，不影响其余问题。
+    每行带 ``index``（请求中的位置），最后一行为 ``{"done": true, ...}`` 汇总。
+    """
+    verify_app_password(request, batch_request.password)
+    runtime = get_agent_runtime()
+    columnar = batch_request.result_format == "columns"
+    store = get_result_store()
+
+    async def lines():
+        started = time.perf_counter()
+        succeeded = 0
+        # 客户端断开时 StreamingResponse 关闭生成器，abatch 取消未完成的问题。
+        async for index, result in runtime.abatch(
+            [(item.question, item.scenario) for item in batch_request.items],
+            concurrency=batch_request.concurrency,
+            deadline=batch_request.timeout_seconds,
+        ):
+            payload = {"index": index, **result.to_dict(columnar=columnar)}
+            if result.success:
+                succeeded += 1
+                payload["result_id"] = store.put(result)
+            yield dumps(payload) + b"\n"
+        total = len(batch_request.items)
+        yield dumps({
+            "done": True,
+            "total": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }) + b"\n"
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/agent/cache")
+@limiter.limit("30/minute")
+async def invalidate_agent_cache(
+    request: Request,
+    question: Optional[str] = None,
+    scenario: str = "data_insight",
+    password: Optional[str] = None,
+):
+    """失效缓存：带 question 时只删除该问题的答案，否则清空答案缓存和 SQL 结果缓存。"""
+    verify_app_password(request, password)
+    runtime = get_agent_runtime()
+    if question:
+        removed = runtime.invalidate_answer(question, scenario=scenario)
+        return {"status": "ok", "scope": "question", "removed": removed}
+    runtime.clear_answer_cache()
+    clear_sql_cache = getattr(runtime.sql_executor, "clear", None)
+    if callable(clear_sql_cache):
+        clear_sql_cache()
+    return {"status": "ok", "scope": "all"}
 
 
 @app.post("/api/query", response_model=QueryResponse)
@@ -738,6 +981,36 @@ async def search(request: Request, search_request: SearchRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _query_or_stored(
+    request: Request,
+    question: Optional[str],
+    result_id: Optional[str],
+    generate_chart: bool = False,
+) -> QueryResponse:
+    """导出/报告的数据来源：带 result_id 时复用已有结果（不调用 LLM、不访问数据库），否则重新查询。"""
+    if result_id:
+        result = get_stored_result(result_id)
+        data = list(result.rows)
+        chart = None
+        if generate_chart and data:
+            try:
+                chart = generate_ascii_chart(data, result.columns)
+            except Exception as e:
+                logger.warning(f"图表生成失败：{e}")
+        return QueryResponse(
+            question=result.question,
+            sql=result.safe_sql or result.sql or "",
+            data=data,
+            columns=result.columns,
+            row_count=result.row_count,
+            chart=chart,
+            mode="result_id",
+        )
+    if not question:
+        raise HTTPException(status_code=400, detail="question 和 result_id 至少提供一个")
+    return await query(request, QueryRequest(question=question, generate_chart=generate_chart))
+
+
 @app.post("/api/export/excel", response_model=ExportResponse)
 @limiter.limit("30/minute")
 async def export_excel(request: Request, export_request: ExportRequest):
@@ -753,9 +1026,8 @@ async def export_excel(request: Request, export_request: ExportRequest):
     try:
         from scripts.export_excel import export_to_excel
 
-        # 生成查询
-        query_request = QueryRequest(question=export_request.question)
-        response = await query(request, query_request)
+        # 生成查询（带 result_id 时直接复用已有结果）
+        response = await _query_or_stored(request, export_request.question, export_request.result_id)
 
         if response.error:
             raise HTTPException(status_code=400, detail=response.error)
@@ -770,6 +1042,8 @@ async def export_excel(request: Request, export_request: ExportRequest):
             filepath=filepath,
             message=f"Excel 导出成功：{filepath}"
         )
+    except HTTPException:
+        raise
     except ImportError:
         raise HTTPException(status_code=501, detail="Excel 导出模块未安装")
     except Exception as e:
@@ -792,16 +1066,15 @@ async def export_word(request: Request, export_request: ExportRequest):
     try:
         from scripts.export_word import export_to_word
 
-        # 生成查询
-        query_request = QueryRequest(question=export_request.question)
-        response = await query(request, query_request)
+        # 生成查询（带 result_id 时直接复用已有结果）
+        response = await _query_or_stored(request, export_request.question, export_request.result_id)
 
         if response.error:
             raise HTTPException(status_code=400, detail=response.error)
 
         # 导出 Word
         filename = export_request.filename or f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        filepath = export_to_word(response.data, export_request.question, filename)
+        filepath = export_to_word(response.data, response.question, filename)
 
         return ExportResponse(
             status="success",
@@ -809,6 +1082,8 @@ async def export_word(request: Request, export_request: ExportRequest):
             filepath=filepath,
             message=f"Word 导出成功：{filepath}"
         )
+    except HTTPException:
+        raise
     except ImportError:
         raise HTTPException(status_code=501, detail="Word 导出模块未安装")
     except Exception as e:
@@ -829,18 +1104,17 @@ async def generate_report(request: Request, report_request: ReportRequest):
         ReportResponse (status, title, content, filepath)
     """
     try:
-        # 生成查询
-        query_request = QueryRequest(
-            question=report_request.question,
-            generate_chart=report_request.include_chart
+        # 生成查询（带 result_id 时直接复用已有结果）
+        query_response = await _query_or_stored(
+            request, report_request.question, report_request.result_id,
+            generate_chart=report_request.include_chart,
         )
-        query_response = await query(request, query_request)
 
         if query_response.error:
             raise HTTPException(status_code=400, detail=query_response.error)
 
         # 生成报告内容
-        title = report_request.question
+        title = query_response.question
         content = f"""# {title}
 
 ## 查询结果
@@ -874,6 +1148,8 @@ async def generate_report(request: Request, report_request: ReportRequest):
             content=content,
             filepath=filepath
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"报告生成失败：{e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -136,7 +136,11 @@ class Text2SQLPipeline:
         """执行SQL查询"""
         if self._last_result and sql in {self._last_result.sql, self._last_result.safe_sql}:
             columns = self._last_result.columns
-            rows = [tuple(row.get(col) for col in columns) for row in self._last_result.rows]
+            table = self._last_result.table
+            if table is not None:
+                rows = list(table.iter_tuples())
+            else:
+                rows = [tuple(row.get(col) for col in columns) for row in self._last_result.rows]
             return columns, rows
 
         runtime = self._get_runtime()
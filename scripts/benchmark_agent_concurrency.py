@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+
+BENCH_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class SlowFakeLLM:
+    """Fake provider whose calls take a fixed wall-clock latency."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def _answer(self, messages: list[dict[str, str]]) -> str:
+        prompt = messages[-1]["content"]
+        if "只返回一条MySQL SELECT语句" in prompt or "只返回修复后的SQL" in prompt:
+            return BENCH_SQL
+        return "### 核心发现\n\n当前返回结果显示存续企业占多数。"
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500) -> str:
+        time.sleep(self.latency)
+        return self._answer(messages)
+
+    async def acomplete(self, messages, *, temperature=0.1, max_tokens=1500) -> str:
+        await asyncio.sleep(self.latency)
+        return self._answer(messages)
+
+
+class SlowFakeExecutor:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        time.sleep(self.latency)
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续（在营、开业、在册）", "cnt": 17477}],
+            "row_count": 1,
+        }
+
+
+async def run_blocking(runtime: AgentRuntime, requests: int) -> float:
+    """Old endpoint behaviour: an ``async def`` handler calling ``query()``."""
+
+    async def handler() -> None:
+        runtime.query("统计企业经营状态分布")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(requests)))
+    return time.perf_counter() - started
+
+
+async def run_async(runtime: AgentRuntime, requests: int) -> float:
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(runtime.aquery("统计企业经营状态分布") for _ in range(requests))
+    )
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compare blocking query() and aquery() under concurrent load."
+    )
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--sql-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=SlowFakeLLM(args.llm_latency),
+        sql_executor=SlowFakeExecutor(args.sql_latency),
+    )
+
+    blocking = asyncio.run(run_blocking(runtime, args.requests))
+    concurrent = asyncio.run(run_async(runtime, args.requests))
+
+    print(f"workflow backend : {runtime.workflow_backend}")
+    print(f"requests         : {args.requests}")
+    print(
+        f"blocking query() : {blocking:.2f}s  "
+        f"({args.requests / blocking:.1f} req/s)"
+    )
+    print(
+        f"async aquery()   : {concurrent:.2f}s  "
+        f"({args.requests / concurrent:.1f} req/s)"
+    )
+    print(f"speedup          : {blocking / concurrent:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agent.profiles import get_database_profile
+from src.agent.sqlite_executor import SQLiteExecutor
+from src.agent.synthetic import DEFAULT_SYNTHETIC_PATH
+from src.utils.sargable import SargableRewriter
+
+# Filters as LLMs tend to write them: the indexed date column wrapped in a
+# function, so the database scans every row.
+BENCH_SQL = {
+    "bids in a year": (
+        "SELECT COUNT(*) AS bid_count FROM `招投标` WHERE YEAR(`publish_time`) = 2021"
+    ),
+    "bids in a month": (
+        "SELECT `area_code`, COUNT(*) AS bid_count FROM `招投标` "
+        "WHERE DATE_FORMAT(`publish_time`, '%Y-%m') = '2022-03' "
+        "GROUP BY `area_code` ORDER BY bid_count DESC, `area_code` LIMIT 10"
+    ),
+    "founded 2015-2017": (
+        "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` "
+        "WHERE YEAR(`start_date`) BETWEEN 2015 AND 2017 GROUP BY `status`"
+    ),
+    "founded on a day": (
+        "SELECT `eid`, `name` FROM `企业基本信息` "
+        "WHERE DATE(`start_date`) = '2016-05-18' ORDER BY `eid` LIMIT 100"
+    ),
+    "bids since 2023": (
+        "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count FROM `招投标` "
+        "WHERE YEAR(`publish_time`) >= 2023 GROUP BY YEAR(`publish_time`)"
+    ),
+}
+
+
+def timed(executor: SQLiteExecutor, sql: str, repeats: int) -> tuple[float, list]:
+    rows: list = []
+    durations = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = list(executor(sql)["rows"])
+        durations.append(time.perf_counter() - started)
+    return statistics.median(durations) * 1000, rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time LLM-style date filters before and after the sargability "
+            "rewrite on the synthetic znjz SQLite database."
+        )
+    )
+    parser.add_argument(
+        "--database",
+        default=DEFAULT_SYNTHETIC_PATH,
+        help="Synthetic SQLite file (scripts/generate_synthetic_znjz.py).",
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    executor = SQLiteExecutor(args.database)
+    rewriter = SargableRewriter(
+        get_database_profile("znjz").catalog().temporal_columns()
+    )
+    print(f"{'query':<20} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name, sql in BENCH_SQL.items():
+        rewritten, modifications, _ = rewriter.rewrite_sql(sql)
+        if not modifications:
+            print(f"{name:<20} not rewritten")
+            continue
+        before, expected = timed(executor, sql, args.repeats)
+        after, rows = timed(executor, rewritten, args.repeats)
+        if sorted(map(repr, rows)) != sorted(map(repr, expected)):
+            print(f"{name:<20} results differ after rewrite: {rewritten}")
+            return 1
+        print(f"{name:<20} {before:>10.1f} {after:>10.1f} {before / after:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
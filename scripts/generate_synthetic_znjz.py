@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agent.synthetic import DEFAULT_SYNTHETIC_PATH, generate_znjz
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Generate a synthetic znjz SQLite database (tables, compatibility "
+            "views, realistic row counts) from schema/znjz_text2sql_schema.md."
+        )
+    )
+    parser.add_argument(
+        "--output", default=DEFAULT_SYNTHETIC_PATH, help="SQLite file to write."
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Row count multiplier; 1.0 is ~17.5k enterprises and ~590k bids.",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = generate_znjz(args.output, scale=args.scale, seed=args.seed)
+    for table, rows in counts.items():
+        print(f"{table}: {rows:,}")
+    print(f"{Path(args.output).resolve()} ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agent.factory import db_config_from_mapping
+from src.agent.mirror import (
+    DEFAULT_MIRROR_PATH,
+    export_mirror,
+    mysql_source,
+    sqlite_source,
+)
+from src.agent.profiles import get_database_profile
+
+
+def refresh(output: str, source: str, batch_size: int) -> None:
+    connect = (
+        mysql_source(db_config_from_mapping())
+        if source == "mysql"
+        else sqlite_source(source)
+    )
+    started = time.perf_counter()
+    counts = export_mirror(
+        connect,
+        output,
+        get_database_profile("znjz").catalog(),
+        batch_size=batch_size,
+    )
+    for table, rows in counts.items():
+        print(f"{table}: {rows:,}")
+    print(f"{Path(output).resolve()} ({time.perf_counter() - started:.1f}s)")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Export the znjz base tables into the DuckDB analytic mirror used "
+            "when ANALYTIC_MIRROR_ENABLED=true."
+        )
+    )
+    parser.add_argument(
+        "--output", default=DEFAULT_MIRROR_PATH, help="DuckDB file to write."
+    )
+    parser.add_argument(
+        "--source",
+        default="mysql",
+        help=(
+            "'mysql' reads DB_*_SCENARIO_1_3 from the environment; anything "
+            "else is a SQLite file such as the synthetic znjz."
+        ),
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        help="Seconds between refreshes; 0 exports once and exits.",
+    )
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+
+    while True:
+        refresh(args.output, args.source, args.batch_size)
+        if args.interval <= 0:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from src.agent.factory import db_config_from_mapping
+from src.agent.mirror import mysql_source, sqlite_source
+from src.agent.rollups import DEFAULT_ROLLUP_PATH, build_rollups
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuild the znjz rollup tables used when ROLLUP_ENABLED=true. "
+            "Run after every data import."
+        )
+    )
+    parser.add_argument(
+        "--output", default=DEFAULT_ROLLUP_PATH, help="SQLite file to write."
+    )
+    parser.add_argument(
+        "--source",
+        default="mysql",
+        help=(
+            "'mysql' reads DB_*_SCENARIO_1_3 from the environment; anything "
+            "else is a SQLite file such as the synthetic znjz."
+        ),
+    )
+    args = parser.parse_args(argv)
+
+    connect = (
+        mysql_source(db_config_from_mapping())
+        if args.source == "mysql"
+        else sqlite_source(args.source)
+    )
+    started = time.perf_counter()
+    counts = build_rollups(connect, args.output)
+    for name, rows in counts.items():
+        print(f"{name}: {rows:,}")
+    print(f"{Path(args.output).resolve()} ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
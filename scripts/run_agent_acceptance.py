@@ -2,15 +2,29 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import platform
 import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
 from decimal import Decimal
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any
 
+import sqlparse
+from sqlparse.sql import Identifier, IdentifierList
+
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from src.agent.factory import build_agent_runtime
+from src.agent.llm import LLMSettings, OpenAICompatibleProvider
+from src.agent.replay import ReplayProvider, parse_latency
+from src.agent.runtime import AgentResult, AgentRuntime
+from src.agent.schema_index import estimate_tokens
+from src.agent.sqlite_executor import SQLiteExecutor
 
 STANDARD_QUESTIONS = [
     ("01_经营状态", "统计企业经营状态分布", "data_insight"),
@@ -25,6 +39,60 @@ STANDARD_QUESTIONS = [
     ("10_企业详情", "查询一家企业的基本信息、融资、投资和招投标情况", "due_diligence"),
 ]
 
+# SQL the offline fake LLM answers with, keyed by question.
+OFFLINE_SQL = {
+    "统计企业经营状态分布": (
+        "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` "
+        "GROUP BY `status` ORDER BY cnt DESC LIMIT 100"
+    ),
+    "按行业统计企业数量 Top 10": (
+        "SELECT `industry_code`, COUNT(*) AS enterprise_count FROM `企业行业代码` "
+        "WHERE `industry_code` IS NOT NULL GROUP BY `industry_code` "
+        "ORDER BY enterprise_count DESC LIMIT 10"
+    ),
+    "统计各融资轮次的企业数量和融资金额": (
+        "SELECT `round`, COUNT(DISTINCT `eid`) AS enterprise_count, "
+        "SUM(`amount`) AS total_amount FROM `融资数据` GROUP BY `round` "
+        "ORDER BY enterprise_count DESC LIMIT 100"
+    ),
+    "按年份统计招投标数量": (
+        "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count FROM `招投标` "
+        "WHERE `publish_time` IS NOT NULL GROUP BY YEAR(`publish_time`) "
+        "ORDER BY year DESC LIMIT 100"
+    ),
+    "统计商标资质的申请年份分布": (
+        "SELECT `year`, COUNT(*) AS qualification_count FROM `标签数据` "
+        "GROUP BY `year` ORDER BY `year` DESC LIMIT 100"
+    ),
+    "统计企业地区分布 Top 20": (
+        "SELECT `district_code`, COUNT(DISTINCT `eid`) AS enterprise_count "
+        "FROM `企业基本信息` GROUP BY `district_code` "
+        "ORDER BY enterprise_count DESC LIMIT 20"
+    ),
+    "按成立年份统计企业数量趋势": (
+        "SELECT YEAR(`start_date`) AS year, COUNT(DISTINCT `eid`) AS enterprise_count "
+        "FROM `企业基本信息` WHERE `start_date` IS NOT NULL "
+        "GROUP BY YEAR(`start_date`) ORDER BY year LIMIT 100"
+    ),
+    "统计对外投资数量最多的企业 Top 10": (
+        "SELECT `eid`, `name`, COUNT(*) AS invest_count FROM `投资数据` "
+        "GROUP BY `eid`, `name` ORDER BY invest_count DESC LIMIT 10"
+    ),
+    "按注册资本区间统计企业数量": (
+        "SELECT CASE WHEN `regist_capi_new` < 100 THEN '100万以下' "
+        "WHEN `regist_capi_new` < 1000 THEN '100-1000万' ELSE '1000万以上' END "
+        "AS capital_range, COUNT(DISTINCT `eid`) AS enterprise_count "
+        "FROM `企业基本信息` GROUP BY capital_range "
+        "ORDER BY enterprise_count DESC LIMIT 100"
+    ),
+    "查询一家企业的基本信息、融资、投资和招投标情况": (
+        "SELECT b.`eid`, b.`name`, b.`status`, b.`regist_capi_new` "
+        "FROM `企业基本信息` b LIMIT 1"
+    ),
+}
+OFFLINE_ANALYSIS = "### 核心发现\n\n当前返回结果显示头部类别占比较高，分布集中。"
+PERCENTILES = (50, 95, 99)
+
 
 def json_default(value: Any) -> Any:
     if isinstance(value, Decimal):
@@ -39,9 +107,313 @@ def write_text(path: Path, content: str) -> None:
     path.write_text(content, encoding="utf-8")
 
 
-def main() -> int:
+class FakeChatClient:
+    """OpenAI-compatible client answering from ``OFFLINE_SQL`` after a delay.
+
+    Usage is estimated from the prompt, so token accounting, the completion
+    cache and trace ``llm`` entries behave as with a real provider.
+    """
+
+    def __init__(self, latency: float = 0.0, **_: Any) -> None:
+        self.latency = latency
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, *, messages, **_: Any) -> Any:
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        if "只返回一条MySQL SELECT语句" in prompt or "只返回修复后的SQL" in prompt:
+            text = next(
+                (sql for question, sql in OFFLINE_SQL.items() if question in prompt),
+                OFFLINE_SQL["统计企业经营状态分布"],
+            )
+        else:
+            text = OFFLINE_ANALYSIS
+        usage = SimpleNamespace(
+            prompt_tokens=sum(estimate_tokens(m["content"]) for m in messages),
+            completion_tokens=estimate_tokens(text),
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text))],
+            usage=usage,
+        )
+
+
+class StandInExecutor:
+    """Local database stand-in: synthetic rows shaped like the SELECT list."""
+
+    def __init__(self, latency: float = 0.0, rows: int = 10) -> None:
+        self.latency = latency
+        self.rows = rows
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        time.sleep(self.latency)
+        columns = select_columns(sql)
+        rows = [
+            {
+                column: f"{column}_{index}" if position == 0 else (index + 1) * 10
+                for position, column in enumerate(columns)
+            }
+            for index in range(self.rows)
+        ]
+        return {"columns": columns, "rows": rows, "row_count": len(rows)}
+
+
+def select_columns(sql: str) -> list[str]:
+    statement = sqlparse.parse(sql)[0]
+    for token in statement.tokens:
+        if isinstance(token, IdentifierList):
+            items = list(token.get_identifiers())
+            break
+        if isinstance(token, Identifier):
+            items = [token]
+            break
+    else:
+        return ["value"]
+    return [
+        (item.get_alias() or item.get_real_name() or str(item)).strip("`")
+        for item in items
+    ]
+
+
+def build_offline_runtime(
+    *,
+    llm_latency: float,
+    sql_latency: float,
+    answer_cache: bool,
+    cassette: str | None = None,
+    replay_mode: str = "replay",
+    replay_latency: float | str | None = "recorded",
+    database: str | None = None,
+) -> AgentRuntime:
+    """Fake LLM and database stand-in; with ``cassette`` the LLM replays it.
+
+    ``database`` runs the SQL on a local SQLite file (see
+    ``scripts/generate_synthetic_znjz.py``) instead of the stand-in.
+    """
+    source = {
+        **os.environ,
+        "ANSWER_CACHE_ENABLED": "true" if answer_cache else "false",
+        "ANSWER_CACHE_SQLITE_PATH": "",
+    }
+    provider = OpenAICompatibleProvider(
+        settings=LLMSettings(
+            provider="volcengine_ark",
+            base_url="offline://fake",
+            api_key="offline",
+            model="offline-fake",
+        ),
+        client_factory=lambda **kwargs: FakeChatClient(llm_latency),
+    )
+    if cassette:
+        provider = ReplayProvider(
+            cassette,
+            mode=replay_mode,
+            live=None if replay_mode == "replay" else provider,
+            latency=replay_latency,
+        )
+    executor = SQLiteExecutor(database) if database else StandInExecutor(sql_latency)
+    return build_agent_runtime(source, llm=provider, sql_executor=executor)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile (numpy's default method)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+    summary = {f"p{pct}": round(percentile(values, pct), 3) for pct in PERCENTILES}
+    summary["mean"] = round(sum(values) / len(values), 3) if values else 0.0
+    summary["count"] = len(values)
+    return summary
+
+
+def run_benchmark(
+    runtime: AgentRuntime,
+    questions: list[tuple[str, str, str]],
+    *,
+    workers: int = 1,
+    repeats: int = 1,
+) -> tuple[list[dict[str, Any]], float]:
+    """Run every question ``repeats`` times on ``workers`` threads.
+
+    Returns one record per run (question name, wall latency, result) in
+    submission order, and the total wall time.
+    """
+    jobs = [
+        (repeat, name, question, scenario)
+        for repeat in range(repeats)
+        for name, question, scenario in questions
+    ]
+
+    def run(job: tuple[int, str, str, str]) -> dict[str, Any]:
+        repeat, name, question, scenario = job
+        started = time.perf_counter()
+        try:
+            result = runtime.query(question, scenario=scenario)
+        except Exception as exc:
+            result = AgentResult(
+                question=question,
+                scenario=scenario,
+                success=False,
+                error=f"{type(exc).__name__}: {exc}",
+            )
+        return {
+            "repeat": repeat,
+            "name": name,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "result": result,
+        }
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        records = list(pool.map(run, jobs))
+    return records, time.perf_counter() - started
+
+
+def summarize(
+    records: list[dict[str, Any]], wall_seconds: float, config: dict[str, Any]
+) -> dict[str, Any]:
+    """Machine-readable benchmark summary; also the baseline file format."""
+    node_latencies: dict[str, list[float]] = defaultdict(list)
+    per_question: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    tokens = {"prompt": 0, "completion": 0, "saved": 0}
+    cache: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    retries = 0
+    coalesced = 0
+    templates = 0
+    for record in records:
+        per_question[record["name"]].append(record)
+        for entry in record["result"].trace:
+            node = entry.get("node", "unknown")
+            if "duration_ms" in entry:
+                node_latencies[node].append(entry["duration_ms"])
+            if node == "answer_cache":
+                cache["answer"][entry.get("status", "unknown")] += 1
+            elif node == "single_flight":
+                coalesced += 1
+            elif node == "repair_sql":
+                retries += 1
+            elif node == "classify_intent" and entry.get("template") == "hit":
+                templates += 1
+            elif node == "execute_sql" and "cache" in entry:
+                cache["sql"][entry["cache"]] += 1
+            llm = entry.get("llm") or {}
+            if "cache" in llm:
+                cache["llm"][llm["cache"]] += 1
+            if "replay" in llm:
+                cache["replay"][llm["replay"]] += 1
+            tokens["prompt"] += llm.get("prompt_tokens", 0)
+            tokens["completion"] += llm.get("completion_tokens", 0)
+            tokens["saved"] += llm.get("saved_tokens", 0)
+
+    total = len(records)
+    succeeded = sum(record["result"].success for record in records)
+    return {
+        "version": 1,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "summary": {
+            "queries": total,
+            "succeeded": succeeded,
+            "failed": total - succeeded,
+            "success_rate": round(succeeded / total, 4) if total else 0.0,
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_qps": round(total / wall_seconds, 3) if wall_seconds else 0.0,
+        },
+        "latency_ms": {
+            "total": latency_summary([r["latency_ms"] for r in records]),
+            "nodes": {
+                node: latency_summary(values)
+                for node, values in sorted(node_latencies.items())
+            },
+        },
+        "tokens": {
+            **tokens,
+            "per_query": (
+                round((tokens["prompt"] + tokens["completion"]) / total, 1)
+                if total
+                else 0.0
+            ),
+        },
+        "retries": retries,
+        "coalesced": coalesced,
+        "template_hits": templates,
+        "cache": {kind: dict(counts) for kind, counts in sorted(cache.items())},
+        "questions": {
+            name: {
+                "success_rate": round(
+                    sum(r["result"].success for r in runs) / len(runs), 4
+                ),
+                "latency_ms": latency_summary([r["latency_ms"] for r in runs]),
+            }
+            for name, runs in per_question.items()
+        },
+    }
+
+
+def compare_to_baseline(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    threshold: float = 0.2,
+    min_delta_ms: float = 5.0,
+) -> list[str]:
+    """Describe regressions beyond ``threshold`` (fraction) against a baseline.
+
+    Latency percentiles (end-to-end and per node) also need to grow by at
+    least ``min_delta_ms`` so sub-millisecond jitter on fast nodes is ignored.
+    """
+    regressions = []
+
+    def check_latency(label: str, now: dict[str, Any], before: dict[str, Any]):
+        for pct in PERCENTILES:
+            key = f"p{pct}"
+            old, new = before.get(key), now.get(key)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + threshold) and new - old >= min_delta_ms:
+                regressions.append(
+                    f"{label} {key}: {old:.1f}ms -> {new:.1f}ms "
+                    f"(+{(new - old) / old * 100 if old else float('inf'):.0f}%)"
+                )
+
+    check_latency(
+        "total", current["latency_ms"]["total"], baseline["latency_ms"]["total"]
+    )
+    for node, before in baseline["latency_ms"]["nodes"].items():
+        now = current["latency_ms"]["nodes"].get(node)
+        if now is not None:
+            check_latency(f"node {node}", now, before)
+
+    old_rate = baseline["summary"]["success_rate"]
+    new_rate = current["summary"]["success_rate"]
+    if new_rate < old_rate:
+        regressions.append(f"success_rate: {old_rate:.2%} -> {new_rate:.2%}")
+
+    old_tokens = baseline["tokens"]["per_query"]
+    new_tokens = current["tokens"]["per_query"]
+    if old_tokens and new_tokens > old_tokens * (1 + threshold):
+        regressions.append(f"tokens per query: {old_tokens} -> {new_tokens}")
+
+    old_retries = baseline.get("retries", 0)
+    if current.get("retries", 0) > old_retries * (1 + threshold) + 1:
+        regressions.append(f"retries: {old_retries} -> {current['retries']}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
     parser = argparse.ArgumentParser(
-        description="Run znjz AgentRuntime acceptance questions."
+        description=(
+            "Run znjz AgentRuntime acceptance questions as a benchmark: "
+            "N workers, repeats, latency percentiles and baseline comparison."
+        )
     )
     parser.add_argument(
         "--output-dir",
@@ -51,14 +423,135 @@ def main() -> int:
     parser.add_argument(
         "--limit", type=int, default=None, help="Only run the first N questions."
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        "--concurrency",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Questions run at once. Default: AGENT_BATCH_CONCURRENCY (4).",
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=1, help="Run every question N times."
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Fake LLM and local database stand-in; no API key or MySQL needed.",
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=0.05,
+        help="Offline fake LLM latency per call (s).",
+    )
+    parser.add_argument(
+        "--sql-latency",
+        type=float,
+        default=0.01,
+        help="Offline database stand-in latency per query (s).",
+    )
+    parser.add_argument(
+        "--database",
+        default=None,
+        help=(
+            "Offline only: run SQL on this SQLite file "
+            "(scripts/generate_synthetic_znjz.py) instead of the stand-in."
+        ),
+    )
+    parser.add_argument(
+        "--no-answer-cache",
+        action="store_true",
+        help="Offline only: disable the answer cache so repeats run the pipeline.",
+    )
+    parser.add_argument(
+        "--cassette",
+        default=None,
+        help="LLM record/replay cassette (JSON Lines). Offline: replay it.",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="With --cassette: record missing completions from the live LLM.",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        default="recorded",
+        help="Replayed call latency: recorded, sampled, none or seconds.",
+    )
+    parser.add_argument(
+        "--baseline", default=None, help="Previous benchmark.json to compare with."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed regression as a fraction (0.2 = 20%%).",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=5.0,
+        help="Ignore latency regressions smaller than this many milliseconds.",
+    )
+    args = parser.parse_args(argv)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_dir = Path(args.output_dir or f"output/agent_acceptance_{timestamp}")
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    runtime = build_agent_runtime(profile_name="znjz", scenario_key="scenario_1_3")
+    replay_mode = "auto" if args.record else "replay"
+    if args.offline:
+        runtime = build_offline_runtime(
+            llm_latency=args.llm_latency,
+            sql_latency=args.sql_latency,
+            answer_cache=not args.no_answer_cache,
+            cassette=args.cassette,
+            replay_mode=replay_mode,
+            replay_latency=parse_latency(args.replay_latency),
+            database=args.database,
+        )
+    else:
+        source = None
+        if args.cassette:
+            source = {
+                **os.environ,
+                "LLM_REPLAY_CASSETTE": args.cassette,
+                "LLM_REPLAY_MODE": replay_mode,
+                "LLM_REPLAY_LATENCY": args.replay_latency,
+            }
+        runtime = build_agent_runtime(
+            source, profile_name="znjz", scenario_key="scenario_1_3"
+        )
     selected = STANDARD_QUESTIONS[: args.limit] if args.limit else STANDARD_QUESTIONS
+    workers = args.workers or runtime.batch_concurrency
+
+    records, wall_seconds = run_benchmark(
+        runtime, selected, workers=workers, repeats=args.repeats
+    )
+    config = {
+        "workers": workers,
+        "repeats": args.repeats,
+        "questions": len(selected),
+        "offline": args.offline,
+        "workflow_backend": runtime.workflow_backend,
+    }
+    if args.cassette:
+        config.update(cassette=Path(args.cassette).name, replay_mode=replay_mode)
+    if args.offline:
+        config.update(
+            llm_latency=args.llm_latency,
+            sql_latency=args.sql_latency,
+            answer_cache=not args.no_answer_cache,
+        )
+        if args.database:
+            config.update(database=Path(args.database).name)
+            config.pop("sql_latency")
+    summary = summarize(records, wall_seconds, config)
+    write_text(
+        output_dir / "benchmark.json",
+        json.dumps(summary, ensure_ascii=False, indent=2),
+    )
 
     index_lines = [
         "# Text2SQL Agent znjz 验收记录",
@@ -66,13 +559,17 @@ def main() -> int:
         f"- 生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
         f"- Workflow backend：{runtime.workflow_backend}",
         f"- 问题数量：{len(selected)}",
+        f"- 并发数：{workers}，每题重复：{args.repeats}",
+        f"- 离线模式：{'是' if args.offline else '否'}",
+        f"- 总耗时：{wall_seconds:.2f}s，吞吐：{summary['summary']['throughput_qps']} 次/秒",
         "",
-        "| 序号 | 问题 | 场景 | 状态 | 行数 | 产物 |",
-        "|---|---|---|---|---:|---|",
+        "| 序号 | 问题 | 场景 | 状态 | 行数 | p50 (ms) | p95 (ms) | 产物 |",
+        "|---|---|---|---|---:|---:|---:|---|",
     ]
 
+    first_runs = {r["name"]: r["result"] for r in records if r["repeat"] == 0}
     for name, question, scenario in selected:
-        result = runtime.query(question, scenario=scenario)
+        result = first_runs[name]
         payload = result.to_dict()
         payload_path = output_dir / f"{name}.json"
         report_path = output_dir / f"{name}.md"
@@ -88,14 +585,35 @@ def main() -> int:
         write_text(report_path, report)
 
         status = "success" if result.success else "failed"
+        latency = summary["questions"][name]["latency_ms"]
         index_lines.append(
             f"| {name} | {question} | {scenario} | {status} | {result.row_count} | "
+            f"{latency['p50']:.1f} | {latency['p95']:.1f} | "
             f"[JSON]({payload_path.name}) / [报告]({report_path.name}) |"
         )
 
+    exit_code = 0
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(
+            summary,
+            baseline,
+            threshold=args.threshold,
+            min_delta_ms=args.min_delta_ms,
+        )
+        index_lines += ["", f"## 与基线对比（阈值 {args.threshold:.0%}）", ""]
+        if baseline.get("config") != summary["config"]:
+            index_lines.append(
+                f"- 注意：基线配置不同（{json.dumps(baseline.get('config'), ensure_ascii=False)}）"
+            )
+        index_lines += [f"- 回归：{item}" for item in regressions] or ["- 无回归"]
+        for item in regressions:
+            print(f"REGRESSION {item}", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
     write_text(output_dir / "index.md", "\n".join(index_lines) + "\n")
     print(output_dir.resolve())
-    return 0
+    return exit_code
 
 
 if __name__ == "__main__":
@@ -2,11 +2,12 @@
 
 from .llm import LLMSettings, VolcengineArkProvider
 from .profiles import DatabaseProfile, get_database_profile
-from .runtime import AgentResult, AgentRuntime
+from .runtime import AgentResult, AgentRuntime, AgentTrace
 
 __all__ = [
     "AgentResult",
     "AgentRuntime",
+    "AgentTrace",
     "DatabaseProfile",
     "LLMSettings",
     "VolcengineArkProvider",
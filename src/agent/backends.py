@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Callable
+
+from .executors import FetchSettings, PooledMySQLExecutor, PoolSettings
+from .sqlite_executor import SQLiteExecutor
+
+DEFAULT_BACKEND = "mysql"
+
+# builder(db_config, source) -> SQL executor; ``source`` holds the settings
+# (``None`` reads the environment), ``db_config`` says where the data lives.
+BackendBuilder = Callable[[Mapping[str, Any], Mapping[str, Any] | None], Any]
+
+_BACKENDS: dict[str, BackendBuilder] = {}
+
+
+def register_backend(name: str, builder: BackendBuilder) -> None:
+    """Make ``builder`` available as ``db_config["backend"] == name``."""
+    _BACKENDS[name.strip().lower()] = builder
+
+
+def backend_names() -> tuple[str, ...]:
+    return tuple(sorted(_BACKENDS))
+
+
+def build_sql_executor(
+    db_config: Mapping[str, Any], source: Mapping[str, Any] | None = None
+) -> Any:
+    """Executor for ``db_config["backend"]`` (MySQL when absent)."""
+    name = str(db_config.get("backend") or DEFAULT_BACKEND).strip().lower()
+    builder = _BACKENDS.get(name)
+    if builder is None:
+        raise ValueError(
+            f"Unsupported SQL backend: {name} (available: {', '.join(backend_names())})"
+        )
+    return builder(db_config, source)
+
+
+def _mysql(
+    db_config: Mapping[str, Any], source: Mapping[str, Any] | None
+) -> PooledMySQLExecutor:
+    return PooledMySQLExecutor(
+        db_config,
+        settings=PoolSettings.from_mapping(source),
+        fetch=FetchSettings.from_mapping(source),
+    )
+
+
+def _sqlite(
+    db_config: Mapping[str, Any], source: Mapping[str, Any] | None
+) -> SQLiteExecutor:
+    return SQLiteExecutor(db_config["path"], fetch=FetchSettings.from_mapping(source))
+
+
+register_backend("mysql", _mysql)
+register_backend("sqlite", _sqlite)
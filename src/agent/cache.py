@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import dataclasses
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Protocol
+
+if TYPE_CHECKING:
+    from .runtime import AgentResult
+
+_CJK_SPACING = re.compile(r"\s*([\u3400-\u9fff])\s*")
+_WHITESPACE = re.compile(r"\s+")
+# Punctuation that is part of a number: 5.5, 2020-2022, 30%.
+_NUMBER_PUNCTUATION = re.compile(r"(?<=\d)[.\-](?=\d)|(?<=\d)%")
+
+
+def normalize_question(question: str) -> str:
+    """Fold width, case, punctuation and spacing so equivalent asks share a key.
+
+    Decimal points, ranges and percent signs inside numbers are kept, so
+    "增长5.5%" and "增长55" stay different questions.
+    """
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    kept = {match.start() for match in _NUMBER_PUNCTUATION.finditer(text)}
+    text = "".join(
+        " " if i not in kept and unicodedata.category(ch).startswith("P") else ch
+        for i, ch in enumerate(text)
+    )
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _CJK_SPACING.sub(r"\1", text)
+
+
+def answer_cache_key(question: str, scenario: str, profile: str) -> str:
+    return f"{profile}|{scenario}|{normalize_question(question)}"
+
+
+class AnswerCache(Protocol):
+    def get(self, key: str) -> AgentResult | None: ...
+
+    def set(self, key: str, result: AgentResult) -> None: ...
+
+    def invalidate(self, key: str) -> bool: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> dict[str, Any]: ...
+
+
+class MemoryAnswerCache:
+    """In-process LRU with per-entry TTL."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 256,
+        ttl_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, AgentResult]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> AgentResult | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] <= self._clock():
+                if item is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return item[1]
+
+    def set(self, key: str, result: AgentResult) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "tier": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+class SQLiteAnswerCache:
+    """On-disk tier that survives restarts and is shared by local workers."""
+
+    def __init__(self, path: str | Path, *, ttl_seconds: float = 3600.0) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, payload BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> AgentResult | None:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, expires_at FROM answers WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= time.time():
+                if row is not None:
+                    conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                self._misses += 1
+                return None
+            self._hits += 1
+            return pickle.loads(row[0])
+
+    def set(self, key: str, result: AgentResult) -> None:
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO answers (key, payload, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, payload, time.time() + self.ttl_seconds),
+            )
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock, self._connect() as conn:
+            return (
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,)).rowcount > 0
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM answers")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        return {
+            "tier": "sqlite",
+            "path": str(self.path),
+            "entries": entries,
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+class TieredAnswerCache:
+    """Look up tiers in order and backfill faster tiers on a slower-tier hit."""
+
+    def __init__(self, *tiers: AnswerCache) -> None:
+        if not tiers:
+            raise ValueError("TieredAnswerCache needs at least one tier")
+        self.tiers = tiers
+
+    def get(self, key: str) -> AgentResult | None:
+        for index, tier in enumerate(self.tiers):
+            result = tier.get(key)
+            if result is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, result)
+                return result
+        return None
+
+    def set(self, key: str, result: AgentResult) -> None:
+        for tier in self.tiers:
+            tier.set(key, result)
+
+    def invalidate(self, key: str) -> bool:
+        removed = [tier.invalidate(key) for tier in self.tiers]
+        return any(removed)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {"tiers": [tier.stats() for tier in self.tiers]}
+
+
+def cached_copy(result: AgentResult, entry: dict[str, Any]) -> AgentResult:
+    """Hand out a cached answer with its own trace, sharing the immutable rows."""
+    return dataclasses.replace(result, trace=[entry])
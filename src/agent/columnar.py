@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Iterator, Mapping
+
+# Typed columns hold 64-bit values so NumPy and Arrow can wrap the buffer.
+_ARRAY_TYPECODES = {"int": "q", "float": "d"}
+_NUMPY_DTYPES = {"int": "int64", "float": "float64"}
+
+
+def normalize_value(value: Any) -> Any:
+    """Convert driver types to JSON-friendly Python values.
+
+    ``Decimal`` becomes ``float``, dates and times become ISO strings and
+    bytes are decoded as UTF-8, so serialization never needs a ``default``.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", "replace")
+    return value
+
+
+def _pack(values: list[Any]) -> tuple[str, Any]:
+    values = [normalize_value(value) for value in values]
+    kinds = {type(value) for value in values}
+    try:
+        if kinds == {int}:
+            return "int", array("q", values)
+        if kinds and kinds <= {int, float}:
+            return "float", array("d", values)
+    except OverflowError:
+        pass
+    # Strings, NULLs and mixed types stay a plain list.
+    return "object", values
+
+
+class RowsView(Sequence):
+    """Read-only ``list[dict]`` view over a ``QueryResult``.
+
+    Row dicts are built on access, so code written against ``rows`` keeps
+    working without the table holding a dict per row.
+    """
+
+    def __init__(self, table: QueryResult) -> None:
+        self.table = table
+
+    def __len__(self) -> int:
+        return self.table.row_count
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self.table.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("row index out of range")
+        return self.table.row(index)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        columns = self.table.columns
+        for values in self.table.iter_tuples():
+            yield dict(zip(columns, values))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, RowsView):
+            other = list(other)
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"RowsView({self.table.row_count} rows)"
+
+
+class QueryResult:
+    """Columnar SQL result: names once, one array per column.
+
+    Numeric columns without NULLs are stored as ``array('q')`` / ``array('d')``
+    and exposed to pandas and Arrow without copying the buffer.
+    """
+
+    def __init__(
+        self, columns: list[str], data: list[Any], dtypes: list[str], row_count: int
+    ) -> None:
+        self.columns = columns
+        self.data = data
+        self.dtypes = dtypes
+        self.row_count = row_count
+
+    @classmethod
+    def from_rows(cls, columns: list[str], rows: Sequence[Any]) -> QueryResult:
+        """Build from row dicts or row tuples, normalizing each column once."""
+        if isinstance(rows, RowsView):
+            return rows.table
+        columns = list(columns)
+        if rows and isinstance(rows[0], Mapping):
+            values = [[row.get(col) for row in rows] for col in columns]
+        else:
+            values = [list(col) for col in zip(*rows)] or [[] for _ in columns]
+        packed = [_pack(col) for col in values]
+        return cls(
+            columns,
+            [data for _, data in packed],
+            [dtype for dtype, _ in packed],
+            len(rows),
+        )
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def rows(self) -> RowsView:
+        return RowsView(self)
+
+    def column(self, name: str) -> Any:
+        return self.data[self.columns.index(name)]
+
+    def dtype(self, name: str) -> str:
+        return self.dtypes[self.columns.index(name)]
+
+    def row(self, index: int) -> dict[str, Any]:
+        return {col: data[index] for col, data in zip(self.columns, self.data)}
+
+    def iter_tuples(self) -> Iterator[tuple[Any, ...]]:
+        if not self.data:
+            return iter([()] * self.row_count)
+        return zip(*self.data)
+
+    def numeric_columns(self, sample: int = 20) -> list[str]:
+        """Typed numeric columns, plus object columns with a number up front."""
+        numeric = []
+        for col, dtype, data in zip(self.columns, self.dtypes, self.data):
+            if dtype in _ARRAY_TYPECODES or any(
+                isinstance(value, (int, float)) and not isinstance(value, bool)
+                for value in data[:sample]
+            ):
+                numeric.append(col)
+        return numeric
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON payload: ``{"columns", "dtypes", "data": [column values]}``."""
+        return {
+            "columns": list(self.columns),
+            "dtypes": list(self.dtypes),
+            "data": [
+                data.tolist() if isinstance(data, array) else list(data)
+                for data in self.data
+            ],
+            "row_count": self.row_count,
+        }
+
+    def to_pandas(self) -> Any:
+        import numpy as np
+        import pandas as pd
+
+        frame = {}
+        for col, dtype, data in zip(self.columns, self.dtypes, self.data):
+            if dtype in _NUMPY_DTYPES:
+                values = np.frombuffer(data, dtype=_NUMPY_DTYPES[dtype])
+                values.flags.writeable = False  # shares memory with the table
+                frame[col] = values
+            else:
+                frame[col] = pd.Series(data, dtype=object)
+        return pd.DataFrame(frame, columns=self.columns, copy=False)
+
+    def to_arrow(self) -> Any:
+        import pyarrow as pa
+
+        arrays = []
+        for dtype, data in zip(self.dtypes, self.data):
+            if dtype in _ARRAY_TYPECODES:
+                arrow_type = pa.int64() if dtype == "int" else pa.float64()
+                arrays.append(
+                    pa.Array.from_buffers(
+                        arrow_type, len(data), [None, pa.py_buffer(data)]
+                    )
+                )
+            else:
+                arrays.append(pa.array(data))
+        return pa.Table.from_arrays(arrays, names=list(self.columns))
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request ran out of time budget or was cancelled by the client."""
+
+
+class Deadline:
+    """Time budget for one agent request.
+
+    ``seconds=None`` never expires but can still be cancelled, which runs the
+    registered callbacks (e.g. ``KILL QUERY`` for the statement in flight).
+    """
+
+    def __init__(
+        self,
+        seconds: float | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.seconds = seconds
+        self._clock = clock
+        self.started_at = clock()
+        self.expires_at = math.inf if seconds is None else self.started_at + seconds
+        self.cancelled = False
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def bounded(self) -> bool:
+        return self.seconds is not None
+
+    def remaining(self) -> float:
+        if self.cancelled:
+            return 0.0
+        return max(self.expires_at - self._clock(), 0.0)
+
+    def remaining_ms(self) -> int:
+        return int(self.remaining() * 1000)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self, stage: str) -> None:
+        if self.cancelled:
+            raise DeadlineExceeded(f"{stage}: request cancelled")
+        if self.expired():
+            raise DeadlineExceeded(f"{stage}: deadline of {self.seconds}s exceeded")
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Register ``callback`` for ``cancel``; returns an unregister function."""
+        with self._lock:
+            key = self._next_id
+            self._next_id += 1
+            self._callbacks[key] = callback
+
+        def unregister() -> None:
+            with self._lock:
+                self._callbacks.pop(key, None)
+
+        return unregister
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+
+_CURRENT: ContextVar[Deadline | None] = ContextVar("agent_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline | None) -> Iterator[Deadline | None]:
+    """Make ``deadline`` visible to executors called in this context."""
+    token = _CURRENT.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT.reset(token)
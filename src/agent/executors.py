@@ -0,0 +1,472 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Mapping
+
+import pymysql
+import pymysql.cursors
+
+from .columnar import QueryResult
+from .deadline import DeadlineExceeded, current_deadline
+
+CONNECT_KEYS = {"host", "port", "user", "password", "database", "charset"}
+
+
+def connect_params(db_config: Mapping[str, Any]) -> dict[str, Any]:
+    params = {
+        key: value
+        for key, value in db_config.items()
+        if key in CONNECT_KEYS and value is not None
+    }
+    params.setdefault("charset", "utf8mb4")
+    # Pooled connections are reused for hours; without autocommit each one
+    # would keep the REPEATABLE READ snapshot of its first SELECT.
+    params["autocommit"] = True
+    return params
+
+
+# Server-side statement timeout (3024), KILL QUERY (1317) and lost connection
+# after a client read timeout (2013).
+TIMEOUT_ERRNOS = {3024, 1317, 2013}
+# The client read timeout trails MAX_EXECUTION_TIME so the server gets to
+# abort the statement first and the connection usually stays reusable.
+READ_TIMEOUT_GRACE_SECONDS = 1.0
+
+_SELECT_HEAD = re.compile(r"^(\s*SELECT)\b", re.IGNORECASE)
+
+
+def with_max_execution_time(sql: str, milliseconds: int) -> str:
+    """Add a ``MAX_EXECUTION_TIME`` optimizer hint to a top-level SELECT.
+
+    ``WITH ... SELECT`` and statements that already carry the hint are returned
+    unchanged; the client read timeout still bounds them.
+    """
+    if "MAX_EXECUTION_TIME" in sql.upper():
+        return sql
+    return _SELECT_HEAD.sub(
+        rf"\1 /*+ MAX_EXECUTION_TIME({max(int(milliseconds), 1)}) */", sql, count=1
+    )
+
+
+def _row_bytes(values: Any) -> int:
+    total = 0
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, (bytes, bytearray)):
+            total += len(value)
+        elif isinstance(value, str):
+            total += len(value.encode("utf-8"))
+        else:
+            total += len(str(value))
+    return total
+
+
+def estimate_result_bytes(rows: Any) -> int:
+    """Approximate fetched size: UTF-8 length of each non-null value's text."""
+    return sum(
+        _row_bytes(row.values() if isinstance(row, Mapping) else row)
+        for row in rows or ()
+    )
+
+
+@dataclass(frozen=True)
+class FetchSettings:
+    """How result rows are read: unbuffered streaming and the row/byte budget."""
+
+    streaming: bool = True
+    max_rows: int = 1000
+    max_bytes: int = 8 * 1024 * 1024
+    batch_size: int = 200
+
+    @classmethod
+    def from_mapping(cls, source: Mapping[str, Any] | None = None) -> "FetchSettings":
+        data = source or os.environ
+        defaults = cls()
+        streaming = str(data.get("SQL_FETCH_STREAMING") or "true").strip().lower()
+        return cls(
+            streaming=streaming not in {"0", "false", "no", "off"},
+            max_rows=int(data.get("SQL_FETCH_MAX_ROWS") or defaults.max_rows),
+            max_bytes=int(data.get("SQL_FETCH_MAX_BYTES") or defaults.max_bytes),
+            batch_size=int(data.get("SQL_FETCH_BATCH_SIZE") or defaults.batch_size),
+        )
+
+
+def fetch_rows(
+    cursor: Any, settings: FetchSettings
+) -> tuple[list[tuple[Any, ...]], int, dict[str, Any] | None]:
+    """Read rows in batches until the result ends or the budget runs out.
+
+    Returns ``(rows, bytes, truncated)`` where ``truncated`` names the
+    exhausted budget, or is ``None``. One row past ``max_rows`` is read to tell
+    a full result from a cut one.
+    """
+    rows: list[tuple[Any, ...]] = []
+    total = 0
+    while True:
+        batch = cursor.fetchmany(settings.batch_size)
+        if not batch:
+            return rows, total, None
+        for row in batch:
+            if len(rows) >= settings.max_rows:
+                return rows, total, {"reason": "rows", "max_rows": settings.max_rows}
+            size = _row_bytes(row)
+            if total + size > settings.max_bytes:
+                return (
+                    rows,
+                    total,
+                    {"reason": "bytes", "max_bytes": settings.max_bytes},
+                )
+            total += size
+            rows.append(row)
+
+
+def read_result(
+    cursor: Any, settings: FetchSettings, columns: list[str] | None = None
+) -> dict[str, Any]:
+    """Executor result dict for a cursor that has just executed a query.
+
+    ``columns`` overrides the names reported by ``cursor.description``.
+    """
+    columns = columns or [desc[0] for desc in cursor.description or []]
+    rows, size, truncated = fetch_rows(cursor, settings)
+    # Row tuples are transposed into columns once; ``rows`` is a lazy view.
+    table = QueryResult.from_rows(columns, rows)
+    result = {
+        "columns": columns,
+        "rows": table.rows,
+        "row_count": len(table),
+        "bytes": size,
+        "table": table,
+    }
+    if truncated is not None:
+        result["truncated"] = truncated
+    return result
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    max_size: int = 8
+    checkout_timeout: float = 10.0
+    max_idle_seconds: float = 300.0
+    max_lifetime_seconds: float = 3600.0
+    ping_on_checkout: bool = True
+
+    @classmethod
+    def from_mapping(cls, source: Mapping[str, Any] | None = None) -> "PoolSettings":
+        data = source or os.environ
+        defaults = cls()
+        return cls(
+            max_size=int(data.get("DB_POOL_MAX_SIZE") or defaults.max_size),
+            checkout_timeout=float(
+                data.get("DB_POOL_CHECKOUT_TIMEOUT") or defaults.checkout_timeout
+            ),
+            max_idle_seconds=float(
+                data.get("DB_POOL_MAX_IDLE_SECONDS") or defaults.max_idle_seconds
+            ),
+            max_lifetime_seconds=float(
+                data.get("DB_POOL_MAX_LIFETIME_SECONDS")
+                or defaults.max_lifetime_seconds
+            ),
+        )
+
+
+class PoolTimeoutError(TimeoutError):
+    """Raised when no pooled connection frees up within the checkout timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: Any, now: float) -> None:
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class MySQLConnectionPool:
+    """Bounded, thread-safe pymysql connection pool.
+
+    Idle connections are reused LIFO, pinged on checkout, and closed once they
+    exceed ``max_idle_seconds`` idle or ``max_lifetime_seconds`` since connect.
+    """
+
+    def __init__(
+        self,
+        db_config: Mapping[str, Any],
+        *,
+        settings: PoolSettings | None = None,
+        connect_factory: Callable[..., Any] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.settings = settings or PoolSettings()
+        self._params = connect_params(db_config)
+        self._connect = connect_factory or pymysql.connect
+        self._clock = clock
+        self._idle: deque[_PooledConnection] = deque()
+        self._cond = threading.Condition()
+        self._size = 0
+        self._closed = False
+        self._counters = {
+            "created": 0,
+            "reused": 0,
+            "waits": 0,
+            "ping_failures": 0,
+            "evicted_idle": 0,
+            "evicted_lifetime": 0,
+            "discarded": 0,
+            "killed": 0,
+        }
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        pooled = self._checkout()
+        try:
+            yield pooled.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self._discard(pooled)
+            raise
+        except BaseException:
+            self._checkin(pooled)
+            raise
+        else:
+            self._checkin(pooled)
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "max_size": self.settings.max_size,
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                **self._counters,
+            }
+
+    def kill_query(self, thread_id: int) -> None:
+        """Abort the statement running on ``thread_id``.
+
+        Uses a side connection outside the pool so it works even when every
+        pooled connection is busy.
+        """
+        conn = self._connect(**self._params)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"KILL QUERY {int(thread_id)}")
+        finally:
+            self._close_quietly(conn)
+        with self._cond:
+            self._counters["killed"] += 1
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled.conn)
+
+    def _checkout(self) -> _PooledConnection:
+        deadline = self._clock() + self.settings.checkout_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                expired = self._evict_expired_locked()
+                pooled = self._idle.pop() if self._idle else None
+                reserve = pooled is None and self._size < self.settings.max_size
+                if reserve:
+                    self._size += 1
+                elif pooled is None:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f"no MySQL connection available within "
+                            f"{self.settings.checkout_timeout:.1f}s"
+                        )
+                    self._counters["waits"] += 1
+                    self._cond.wait(remaining)
+            for conn in expired:
+                self._close_quietly(conn)
+            if reserve:
+                return self._open_reserved()
+            if pooled is None:
+                continue
+            if self._healthy(pooled):
+                with self._cond:
+                    self._counters["reused"] += 1
+                return pooled
+            self._discard(pooled)
+
+    def _open_reserved(self) -> _PooledConnection:
+        try:
+            conn = self._connect(**self._params)
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._counters["created"] += 1
+        return _PooledConnection(conn, self._clock())
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        if not self.settings.ping_on_checkout:
+            return True
+        try:
+            pooled.conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self._counters["ping_failures"] += 1
+            return False
+
+    def _checkin(self, pooled: _PooledConnection) -> None:
+        now = self._clock()
+        if now - pooled.created_at >= self.settings.max_lifetime_seconds:
+            with self._cond:
+                self._counters["evicted_lifetime"] += 1
+            self._release_slot(pooled)
+            return
+        pooled.last_used = now
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                close_now = True
+            else:
+                self._idle.append(pooled)
+                close_now = False
+            self._cond.notify()
+        if close_now:
+            self._close_quietly(pooled.conn)
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        with self._cond:
+            self._counters["discarded"] += 1
+        self._release_slot(pooled)
+
+    def _release_slot(self, pooled: _PooledConnection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_quietly(pooled.conn)
+
+    def _evict_expired_locked(self) -> list[Any]:
+        now = self._clock()
+        kept: deque[_PooledConnection] = deque()
+        expired: list[Any] = []
+        for pooled in self._idle:
+            if now - pooled.created_at >= self.settings.max_lifetime_seconds:
+                self._counters["evicted_lifetime"] += 1
+                expired.append(pooled.conn)
+            elif now - pooled.last_used >= self.settings.max_idle_seconds:
+                self._counters["evicted_idle"] += 1
+                expired.append(pooled.conn)
+            else:
+                kept.append(pooled)
+        self._idle = kept
+        self._size -= len(expired)
+        return expired
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class PooledMySQLExecutor:
+    """SQL executor for ``AgentRuntime`` backed by ``MySQLConnectionPool``."""
+
+    def __init__(
+        self,
+        db_config: Mapping[str, Any],
+        *,
+        settings: PoolSettings | None = None,
+        connect_factory: Callable[..., Any] | None = None,
+        fetch: FetchSettings | None = None,
+    ) -> None:
+        self.pool = MySQLConnectionPool(
+            db_config, settings=settings, connect_factory=connect_factory
+        )
+        self.fetch = fetch or FetchSettings()
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        deadline = current_deadline()
+        if deadline is None:
+            with self.pool.connection() as conn:
+                return self._fetch(conn, sql)
+
+        deadline.check("execute_sql")
+        thread_id: int | None = None
+        try:
+            with self.pool.connection() as conn:
+                thread_id = conn.thread_id()
+                unregister = deadline.on_cancel(lambda: self.pool.kill_query(thread_id))
+                previous_timeout = getattr(conn, "_read_timeout", None)
+                if deadline.bounded:
+                    sql = with_max_execution_time(sql, deadline.remaining_ms())
+                    # pymysql applies _read_timeout before reading each packet.
+                    conn._read_timeout = (
+                        deadline.remaining() + READ_TIMEOUT_GRACE_SECONDS
+                    )
+                try:
+                    result = self._fetch(conn, sql)
+                finally:
+                    unregister()
+                    conn._read_timeout = previous_timeout
+        except pymysql.err.OperationalError as exc:
+            if deadline.expired() or (exc.args and exc.args[0] in TIMEOUT_ERRNOS):
+                if thread_id is not None and not deadline.cancelled:
+                    self._kill_quietly(thread_id)
+                raise DeadlineExceeded(f"execute_sql: {exc}") from exc
+            raise
+        return result
+
+    def _fetch(self, conn: Any, sql: str) -> dict[str, Any]:
+        # SSCursor streams rows off the socket instead of buffering the whole
+        # result; closing it early drains the rest, which LIMIT keeps small.
+        cursor = (
+            conn.cursor(pymysql.cursors.SSCursor)
+            if self.fetch.streaming
+            else conn.cursor()
+        )
+        with cursor:
+            cursor.execute(sql)
+            return read_result(cursor, self.fetch)
+
+    def _kill_quietly(self, thread_id: int) -> None:
+        try:
+            self.pool.kill_query(thread_id)
+        except Exception:
+            pass
+
+    def explain(self, sql: str) -> Any:
+        """``EXPLAIN FORMAT=JSON`` plan for ``sql`` as parsed JSON."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"EXPLAIN FORMAT=JSON {sql}")
+                row = cursor.fetchone()
+        return json.loads(row[0])
+
+    async def aexecute(self, sql: str) -> dict[str, Any]:
+        # pymysql is blocking; the pool bounds how many worker threads hold a
+        # connection at once, so the event loop only awaits the handoff.
+        return await asyncio.to_thread(self, sql)
+
+    def stats(self) -> dict[str, Any]:
+        return self.pool.stats()
+
+    def close(self) -> None:
+        self.pool.close()
@@ -2,11 +2,32 @@ from __future__ import annotations
 
 import os
 from collections.abc import Mapping
-from typing import Any
+from typing import Any, Callable
 
+from src.utils.sargable import SargableRewriter
+from src.utils.sql_columns import ColumnValidator
+from src.utils.sql_cost import CostThresholds, ExplainCostGuard
+
+from .backends import DEFAULT_BACKEND, build_sql_executor
+from .cache import (
+    AnswerCache,
+    MemoryAnswerCache,
+    SQLiteAnswerCache,
+    TieredAnswerCache,
+)
+from .executors import FetchSettings, PooledMySQLExecutor
 from .llm import DeepSeekProvider, LLMSettings, VolcengineArkProvider
-from .profiles import get_database_profile
+from .llm_cache import CompletionCache, DiskCompletionCache, MemoryCompletionCache
+from .mirror import AnalyticMirror, MirrorRoutingExecutor, MirrorSettings
+from .profiles import DatabaseProfile, get_database_profile
+from .replay import ReplayProvider, parse_latency
+from .result_store import ResultStore
+from .rollups import RollupRoutingExecutor, RollupSettings, RollupStore, rollups_for
 from .runtime import AgentRuntime, SQLExecutor
+from .singleflight import SingleFlight
+from .sql_cache import CachingSQLExecutor, MySQLDataVersionProbe, SQLCacheSettings
+from .synthetic import DEFAULT_SYNTHETIC_PATH
+from .templates import DEFAULT_MIN_CONFIDENCE, TemplateMatcher, template_matcher_for
 
 
 def _get_value(source: Mapping[str, Any] | None, key: str, default: Any = "") -> Any:
@@ -15,6 +36,172 @@ def _get_value(source: Mapping[str, Any] | None, key: str, default: Any = "") ->
     return os.environ.get(key, default)
 
 
+def _is_enabled(value: Any) -> bool:
+    return str(value).strip().lower() not in {"", "0", "false", "no", "off"}
+
+
+def answer_cache_from_mapping(
+    source: Mapping[str, Any] | None = None,
+) -> AnswerCache | None:
+    if not _is_enabled(_get_value(source, "ANSWER_CACHE_ENABLED", "true")):
+        return None
+    ttl_seconds = float(_get_value(source, "ANSWER_CACHE_TTL_SECONDS", 600))
+    memory = MemoryAnswerCache(
+        max_entries=int(_get_value(source, "ANSWER_CACHE_MAX_ENTRIES", 256)),
+        ttl_seconds=ttl_seconds,
+    )
+    sqlite_path = str(_get_value(source, "ANSWER_CACHE_SQLITE_PATH", "") or "")
+    if not sqlite_path:
+        return memory
+    return TieredAnswerCache(
+        memory, SQLiteAnswerCache(sqlite_path, ttl_seconds=ttl_seconds)
+    )
+
+
+def result_store_from_mapping(
+    source: Mapping[str, Any] | None = None,
+) -> ResultStore:
+    return ResultStore(
+        max_entries=int(_get_value(source, "RESULT_STORE_MAX_ENTRIES", 64)),
+        ttl_seconds=float(_get_value(source, "RESULT_STORE_TTL_SECONDS", 1800)),
+        spill_dir=str(_get_value(source, "RESULT_STORE_SPILL_DIR", "") or "") or None,
+        max_disk_entries=int(_get_value(source, "RESULT_STORE_MAX_DISK_ENTRIES", 512)),
+    )
+
+
+def completion_cache_from_mapping(
+    source: Mapping[str, Any] | None = None,
+) -> CompletionCache | None:
+    if not _is_enabled(_get_value(source, "LLM_CACHE_ENABLED", "false")):
+        return None
+    max_entries = int(_get_value(source, "LLM_CACHE_MAX_ENTRIES", 512))
+    ttl_seconds = float(_get_value(source, "LLM_CACHE_TTL_SECONDS", 86400))
+    backend = str(_get_value(source, "LLM_CACHE_BACKEND", "memory")).lower()
+    if backend == "disk":
+        return DiskCompletionCache(
+            _get_value(
+                source, "LLM_CACHE_PATH", "output/cache/llm_completions.sqlite3"
+            ),
+            max_entries=max_entries,
+            ttl_seconds=ttl_seconds,
+        )
+    if backend != "memory":
+        raise ValueError(f"Unsupported LLM_CACHE_BACKEND: {backend}")
+    return MemoryCompletionCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+
+def replay_provider_from_mapping(
+    source: Mapping[str, Any] | None = None,
+    live_factory: Callable[[], Any] | None = None,
+) -> ReplayProvider | None:
+    """Wrap the LLM in a record/replay cassette when ``LLM_REPLAY_CASSETTE`` is set.
+
+    Replay mode never builds the live provider, so no API key is needed.
+    """
+    path = str(_get_value(source, "LLM_REPLAY_CASSETTE", "") or "")
+    if not path:
+        return None
+    mode = str(_get_value(source, "LLM_REPLAY_MODE", "replay")).lower()
+    return ReplayProvider(
+        path,
+        mode=mode,
+        live=None if mode == "replay" or live_factory is None else live_factory(),
+        latency=parse_latency(_get_value(source, "LLM_REPLAY_LATENCY", "recorded")),
+        latency_scale=float(_get_value(source, "LLM_REPLAY_LATENCY_SCALE", 1.0)),
+        seed=int(_get_value(source, "LLM_REPLAY_SEED", 0)),
+    )
+
+
+def template_matcher_from_mapping(
+    profile_name: str,
+    source: Mapping[str, Any] | None = None,
+) -> TemplateMatcher | None:
+    if not _is_enabled(_get_value(source, "TEMPLATE_FAST_PATH_ENABLED", "true")):
+        return None
+    return template_matcher_for(
+        profile_name,
+        min_confidence=float(
+            _get_value(source, "TEMPLATE_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE)
+        ),
+    )
+
+
+def sql_cache_from_mapping(
+    executor: PooledMySQLExecutor,
+    base_tables: tuple[str, ...],
+    source: Mapping[str, Any] | None = None,
+) -> SQLExecutor:
+    settings = SQLCacheSettings.from_mapping(source)
+    if not settings.enabled:
+        return executor
+    probe = MySQLDataVersionProbe(
+        executor.pool, base_tables, method=settings.probe_method
+    )
+    return CachingSQLExecutor(executor, version_probe=probe, settings=settings)
+
+
+def cost_guard_from_mapping(
+    executor: PooledMySQLExecutor,
+    source: Mapping[str, Any] | None = None,
+) -> ExplainCostGuard | None:
+    if not _is_enabled(_get_value(source, "SQL_COST_GUARD_ENABLED", "true")):
+        return None
+    return ExplainCostGuard(
+        executor.explain, thresholds=CostThresholds.from_mapping(source)
+    )
+
+
+def analytic_mirror_from_mapping(
+    executor: SQLExecutor,
+    source: Mapping[str, Any] | None = None,
+) -> SQLExecutor:
+    settings = MirrorSettings.from_mapping(source)
+    if not settings.enabled:
+        return executor
+    mirror = AnalyticMirror(settings.path, fetch=FetchSettings.from_mapping(source))
+    return MirrorRoutingExecutor(
+        executor, mirror, max_age_seconds=settings.max_age_seconds
+    )
+
+
+def rollups_from_mapping(
+    executor: SQLExecutor,
+    profile_name: str,
+    source: Mapping[str, Any] | None = None,
+) -> SQLExecutor:
+    settings = RollupSettings.from_mapping(source)
+    rollups = rollups_for(profile_name)
+    if not settings.enabled or not rollups:
+        return executor
+    store = RollupStore(settings.path, fetch=FetchSettings.from_mapping(source))
+    return RollupRoutingExecutor(
+        executor, store, rollups, max_age_seconds=settings.max_age_seconds
+    )
+
+
+def sargable_rewriter_from_mapping(
+    profile: DatabaseProfile,
+    source: Mapping[str, Any] | None = None,
+) -> SargableRewriter | None:
+    if not _is_enabled(_get_value(source, "SQL_SARGABLE_REWRITE_ENABLED", "true")):
+        return None
+    return SargableRewriter(profile.catalog().temporal_columns())
+
+
+def column_validator_from_mapping(
+    profile: DatabaseProfile,
+    source: Mapping[str, Any] | None = None,
+) -> ColumnValidator | None:
+    if not _is_enabled(_get_value(source, "SQL_COLUMN_VALIDATION_ENABLED", "true")):
+        return None
+    catalog = profile.catalog()
+    return ColumnValidator(
+        {table: catalog.columns(table) for table in profile.allowed_tables},
+        aliases=profile.column_aliases,
+        hints=profile.column_hints,
+    )
+
+
 def db_config_from_mapping(
     source: Mapping[str, Any] | None = None,
     *,
@@ -36,6 +223,21 @@ def db_config_from_mapping(
     }
 
 
+def sql_backend_from_mapping(
+    source: Mapping[str, Any] | None = None,
+    *,
+    scenario_key: str = "scenario_1_3",
+) -> dict[str, Any]:
+    backend = str(_get_value(source, "SQL_BACKEND", DEFAULT_BACKEND)).strip().lower()
+    if backend == "sqlite":
+        path = _get_value(source, "SQL_SQLITE_PATH", DEFAULT_SYNTHETIC_PATH)
+        return {"backend": backend, "path": str(path)}
+    return {
+        "backend": backend or DEFAULT_BACKEND,
+        **db_config_from_mapping(source, scenario_key=scenario_key),
+    }
+
+
 def build_agent_runtime(
     source: Mapping[str, Any] | None = None,
     *,
@@ -49,10 +251,45 @@ def build_agent_runtime(
     provider_cls = (
         DeepSeekProvider if settings.provider == "deepseek" else VolcengineArkProvider
     )
-    provider = llm or provider_cls(settings=settings)
+
+    def live_provider() -> Any:
+        return provider_cls(
+            settings=settings, completion_cache=completion_cache_from_mapping(source)
+        )
+
+    provider = llm or replay_provider_from_mapping(source, live_provider)
+    if provider is None:
+        provider = live_provider()
+    executor = sql_executor
+    cost_guard = None
+    if executor is None:
+        executor = build_sql_executor(
+            sql_backend_from_mapping(source, scenario_key=scenario_key), source
+        )
+        # The SQL cache and the cost guard rely on MySQL metadata and EXPLAIN.
+        if isinstance(executor, PooledMySQLExecutor):
+            cost_guard = cost_guard_from_mapping(executor, source)
+            executor = sql_cache_from_mapping(executor, profile.base_tables, source)
+        executor = analytic_mirror_from_mapping(executor, source)
+        executor = rollups_from_mapping(executor, profile.name, source)
     return AgentRuntime(
         profile=profile,
         llm=provider,
-        sql_executor=sql_executor,
-        db_config=db_config_from_mapping(source, scenario_key=scenario_key),
+        sql_executor=executor,
+        answer_cache=answer_cache_from_mapping(source),
+        schema_token_budget=int(_get_value(source, "SCHEMA_TOKEN_BUDGET", 4000)),
+        templates=template_matcher_from_mapping(profile.name, source),
+        cost_guard=cost_guard,
+        sargable=sargable_rewriter_from_mapping(profile, source),
+        column_validator=column_validator_from_mapping(profile, source),
+        # 0 disables the per-request deadline.
+        deadline_seconds=float(_get_value(source, "AGENT_DEADLINE_SECONDS", 60))
+        or None,
+        analyze_min_seconds=float(_get_value(source, "AGENT_ANALYZE_MIN_SECONDS", 5)),
+        single_flight=(
+            SingleFlight()
+            if _is_enabled(_get_value(source, "AGENT_SINGLE_FLIGHT_ENABLED", "true"))
+            else None
+        ),
+        batch_concurrency=int(_get_value(source, "AGENT_BATCH_CONCURRENCY", 4)),
     )
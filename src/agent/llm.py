@@ -1,14 +1,34 @@
 from __future__ import annotations
 
 import os
+import time
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Callable, Mapping, Sequence
+from typing import Any, AsyncIterator, Callable, Mapping, Sequence
+
+from .llm_cache import CompletionCache, completion_cache_key
 
 DEFAULT_VOLCENGINE_BASE_URL = "https://ark.cn-beijing.volces.com/api/coding/v3"
 DEFAULT_VOLCENGINE_MODEL = "glm-5.2"
 DEFAULT_DEEPSEEK_BASE_URL = "https://api.deepseek.com"
 DEFAULT_DEEPSEEK_MODEL = "deepseek-v4-flash"
 
+_COMPLETION_INFO: ContextVar[dict[str, Any] | None] = ContextVar(
+    "llm_completion_info", default=None
+)
+
+
+def take_completion_info() -> dict[str, Any] | None:
+    """Return and clear what the last ``complete`` call in this context reported."""
+    info = _COMPLETION_INFO.get()
+    _COMPLETION_INFO.set(None)
+    return info
+
+
+def set_completion_info(info: dict[str, Any] | None) -> None:
+    """Report usage for the current ``complete`` call (read by the runtime trace)."""
+    _COMPLETION_INFO.set(info)
+
 
 @dataclass(frozen=True)
 class LLMSettings:
@@ -56,8 +76,11 @@ class OpenAICompatibleProvider:
         self,
         settings: LLMSettings | None = None,
         client_factory: Callable[..., Any] | None = None,
+        async_client_factory: Callable[..., Any] | None = None,
+        completion_cache: CompletionCache | None = None,
     ) -> None:
         self.settings = settings or LLMSettings.from_mapping()
+        self.completion_cache = completion_cache
         if not self.settings.api_key:
             raise ValueError(f"{self.missing_key_name} is required")
 
@@ -69,6 +92,22 @@ class OpenAICompatibleProvider:
             base_url=self.settings.base_url,
             api_key=self.settings.api_key,
         )
+        self._async_client_factory = async_client_factory
+        self._async_client: Any | None = None
+
+    @property
+    def async_client(self) -> Any:
+        if self._async_client is None:
+            factory = self._async_client_factory
+            if factory is None:
+                from openai import AsyncOpenAI
+
+                factory = AsyncOpenAI
+            self._async_client = factory(
+                base_url=self.settings.base_url,
+                api_key=self.settings.api_key,
+            )
+        return self._async_client
 
     def complete(
         self,
@@ -76,16 +115,124 @@ class OpenAICompatibleProvider:
         *,
         temperature: float | None = None,
         max_tokens: int = 1500,
+        bypass_cache: bool = False,
     ) -> str:
-        response = self.client.chat.completions.create(
-            model=self.settings.model,
-            messages=list(messages),
-            temperature=(
+        request = self._request(messages, temperature, max_tokens)
+        key = None if bypass_cache else self._cache_key(request)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(**request)
+        return self._record_response(response, started, key)
+
+    async def acomplete(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        temperature: float | None = None,
+        max_tokens: int = 1500,
+        bypass_cache: bool = False,
+    ) -> str:
+        request = self._request(messages, temperature, max_tokens)
+        key = None if bypass_cache else self._cache_key(request)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        response = await self.async_client.chat.completions.create(**request)
+        return self._record_response(response, started, key)
+
+    async def astream(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        temperature: float | None = None,
+        max_tokens: int = 1500,
+    ) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        stream = await self.async_client.chat.completions.create(
+            **self._request(messages, temperature, max_tokens),
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        usage = None
+        async for chunk in stream:
+            # With include_usage the last chunk has no choices and carries usage.
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            text = getattr(chunk.choices[0].delta, "content", None)
+            if text:
+                yield text
+        _COMPLETION_INFO.set(
+            {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        )
+
+    def _cache_key(self, request: dict[str, Any]) -> str | None:
+        if self.completion_cache is None:
+            return None
+        return completion_cache_key(request)
+
+    def _cache_get(self, key: str | None) -> str | None:
+        if key is None:
+            return None
+        cached = self.completion_cache.get(key)
+        if cached is None:
+            return None
+        _COMPLETION_INFO.set(
+            {
+                "cache": "hit",
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "saved_tokens": cached["prompt_tokens"] + cached["completion_tokens"],
+                "saved_latency_ms": cached["latency_ms"],
+            }
+        )
+        return cached["text"]
+
+    def _record_response(self, response: Any, started: float, key: str | None) -> str:
+        latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        text = (response.choices[0].message.content or "").strip()
+        usage = getattr(response, "usage", None)
+        info: dict[str, Any] = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "latency_ms": latency_ms,
+        }
+        if self.completion_cache is not None:
+            info["cache"] = "miss" if key else "bypass"
+        if key:
+            self.completion_cache.set(
+                key,
+                {
+                    "text": text,
+                    "prompt_tokens": info["prompt_tokens"],
+                    "completion_tokens": info["completion_tokens"],
+                    "latency_ms": latency_ms,
+                },
+            )
+        _COMPLETION_INFO.set(info)
+        return text
+
+    def _request(
+        self,
+        messages: Sequence[dict[str, str]],
+        temperature: float | None,
+        max_tokens: int,
+    ) -> dict[str, Any]:
+        return {
+            "model": self.settings.model,
+            "messages": list(messages),
+            "temperature": (
                 self.settings.temperature if temperature is None else temperature
             ),
-            max_tokens=max_tokens,
-        )
-        return (response.choices[0].message.content or "").strip()
+            "max_tokens": max_tokens,
+        }
 
 
 class VolcengineArkProvider(OpenAICompatibleProvider):
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Iterable
+
+LabelSet = tuple[tuple[str, str], ...]
+
+# Seconds; spans fast local nodes up to slow LLM calls.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels(labels: dict[str, Any]) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[tuple[str, str]]) -> str:
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        running = 0
+        points = []
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            points.append((bound, running))
+        points.append((float("inf"), self.total))
+        return points
+
+
+class MetricsRegistry:
+    """Process-local counters and histograms derived from agent traces."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[LabelSet, float]] = {}
+        self._histograms: dict[str, dict[LabelSet, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_labels(labels), 0.0)
+
+    def histogram(self, name: str, **labels: Any) -> dict[str, Any]:
+        """Count, sum and cumulative bucket counts for one histogram series."""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_labels(labels))
+            if histogram is None:
+                return {"count": 0, "sum": 0.0, "buckets": []}
+            return {
+                "count": histogram.total,
+                "sum": histogram.sum,
+                "buckets": histogram.cumulative(),
+            }
+
+    def snapshot(self) -> dict[str, list[dict[str, Any]]]:
+        with self._lock:
+            return {
+                name: [
+                    {"labels": dict(labels), "value": value}
+                    for labels, value in sorted(series.items())
+                ]
+                for name, series in sorted(self._counters.items())
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(
+                        f"{name}{_format_labels(labels)} {_format_number(value)}"
+                    )
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series.items()):
+                    for bound, count in histogram.cumulative():
+                        bucket_labels = (*labels, ("le", _format_number(bound)))
+                        lines.append(
+                            f"{name}_bucket{_format_labels(bucket_labels)} {count}"
+                        )
+                    suffix = _format_labels(labels)
+                    lines.append(f"{name}_sum{suffix} {_format_number(histogram.sum)}")
+                    lines.append(f"{name}_count{suffix} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+    def observe_trace(self, trace: Iterable[dict[str, Any]]) -> None:
+        started: float | None = None
+        ended: float | None = None
+        for entry in trace:
+            node = entry.get("node", "unknown")
+            if "duration_ms" in entry:
+                self.observe(
+                    "agent_node_duration_seconds",
+                    entry["duration_ms"] / 1000,
+                    node=node,
+                )
+                if started is None:
+                    started = entry["started_at"]
+                ended = entry["ended_at"]
+            if node == "answer_cache":
+                self.inc(
+                    "agent_cache_requests_total",
+                    cache="answer",
+                    result=entry.get("status", "unknown"),
+                )
+            elif node == "single_flight":
+                self.inc("agent_coalesced_requests_total")
+            elif node == "classify_intent" and "template" in entry:
+                self.inc("agent_template_requests_total", result=entry["template"])
+            elif node == "execute_sql":
+                if "cache" in entry:
+                    self.inc(
+                        "agent_cache_requests_total", cache="sql", result=entry["cache"]
+                    )
+                if "mirror" in entry:
+                    self.inc(
+                        "agent_mirror_routes_total",
+                        route=entry["mirror"]["route"],
+                        reason=entry["mirror"]["reason"],
+                    )
+                if "rollup" in entry:
+                    self.inc(
+                        "agent_rollup_routes_total",
+                        route=entry["rollup"]["route"],
+                        reason=entry["rollup"]["reason"],
+                    )
+                if entry.get("status") == "ok":
+                    self.inc("agent_sql_rows_total", entry.get("row_count", 0))
+                    self.inc("agent_sql_bytes_total", entry.get("bytes", 0))
+                elif entry.get("status") == "error":
+                    self.inc("agent_sql_errors_total")
+            elif node == "repair_sql":
+                self.inc("agent_retries_total", node="repair_sql")
+            llm = entry.get("llm") or {}
+            if "cache" in llm:
+                self.inc("agent_cache_requests_total", cache="llm", result=llm["cache"])
+            if "replay" in llm:
+                self.inc("agent_llm_replay_total", result=llm["replay"])
+            if llm.get("saved_tokens"):
+                self.inc("agent_llm_saved_tokens_total", llm["saved_tokens"])
+            for kind in ("prompt", "completion"):
+                if llm.get(f"{kind}_tokens"):
+                    self.inc(
+                        "agent_llm_tokens_total",
+                        llm[f"{kind}_tokens"],
+                        node=node,
+                        type=kind,
+                    )
+        if started is not None and ended is not None:
+            self.observe("agent_query_duration_seconds", ended - started)
+
+
+METRICS = MetricsRegistry()
@@ -0,0 +1,473 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+import pandas as pd
+import pymysql
+import pymysql.cursors
+import sqlparse
+from sqlparse.sql import Identifier, IdentifierList
+from sqlparse.tokens import DML, Keyword, Wildcard
+
+from .deadline import DeadlineExceeded, current_deadline
+from .executors import FetchSettings, connect_params, read_result
+from .schema_catalog import ColumnSpec, SchemaCatalog
+from .sqlite_executor import register_mysql_functions
+from .synthetic import sqlite_type, view_sql
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - optional dependency
+    duckdb = None
+
+DEFAULT_MIRROR_PATH = "output/mirror/znjz.duckdb"
+META_TABLE = "_mirror_meta"
+
+# Functions that mean the same thing in MySQL and DuckDB. Anything else keeps
+# the query on MySQL: DATE_SUB, DATE_FORMAT, LENGTH (bytes vs characters),
+# CONCAT (NULL in MySQL when any argument is NULL, skipped by DuckDB), ...
+MIRROR_FUNCTIONS = frozenset(
+    "COUNT SUM AVG MIN MAX YEAR MONTH DAY QUARTER ROUND ABS FLOOR CEIL "
+    "COALESCE IFNULL NULLIF IF CAST LOWER UPPER".split()
+)
+_NOT_FUNCTIONS = frozenset(
+    "IN EXISTS AS FROM JOIN ON AND OR NOT WHERE SELECT OVER VALUES USING ANY "
+    "ALL WITH WHEN THEN ELSE CASE BY HAVING UNION DISTINCT LIMIT".split()
+)
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_CALL = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*\(")
+_AGGREGATE = re.compile(r"\bGROUP\s+BY\b|\b(?:COUNT|SUM|AVG|MIN|MAX)\s*\(", re.I)
+_LIKE_BEFORE = re.compile(r"\bLIKE\s*$", re.I)
+_DUCKDB_TOKENS = re.compile(
+    r"(?P<literal>'(?:[^'\\]|\\.|'')*')"
+    r"|`(?P<ident>[^`]*)`"
+    r"|\b(?P<like>NOT\s+LIKE|LIKE)\b"
+    r"|\bLIMIT\s+(?P<offset>\d+)\s*,\s*(?P<count>\d+)",
+    re.IGNORECASE,
+)
+
+
+def to_duckdb(sql: str) -> str:
+    """Rewrite MySQL syntax DuckDB cannot parse or reads differently.
+
+    Backticks become double quotes, ``LIMIT offset, count`` becomes ``LIMIT
+    count OFFSET offset`` and ``LIKE`` becomes ``ILIKE`` (MySQL's default
+    collation compares case-insensitively). String literals are left alone.
+    """
+
+    def swap(match: re.Match[str]) -> str:
+        if match.group("literal") is not None:
+            return match.group("literal")
+        if match.group("ident") is not None:
+            return f'"{match.group("ident")}"'
+        if match.group("like") is not None:
+            return "NOT ILIKE" if match.group("like").upper() != "LIKE" else "ILIKE"
+        return f"LIMIT {match.group('count')} OFFSET {match.group('offset')}"
+
+    return _DUCKDB_TOKENS.sub(swap, sql)
+
+
+def dialect_issue(sql: str) -> str | None:
+    """Why ``sql`` may not mean the same on DuckDB, or ``None``.
+
+    Only allow-listed functions pass; string literals with ASCII letters are
+    compared case-insensitively by MySQL, so they pass only after ``LIKE``
+    (translated to ``ILIKE``); backslash escapes differ between the two.
+    """
+    for match in _LITERAL.finditer(sql):
+        literal = match.group(0)
+        if "\\" in literal:
+            return "backslash escape"
+        if re.search(r"[A-Za-z]", literal) and not _LIKE_BEFORE.search(
+            sql[: match.start()]
+        ):
+            return f"case-sensitive literal {literal}"
+    names = {name.upper() for name in _CALL.findall(_LITERAL.sub("''", sql))}
+    unknown = sorted(names - _NOT_FUNCTIONS - MIRROR_FUNCTIONS)
+    return f"function {unknown[0]}" if unknown else None
+
+
+def select_labels(sql: str) -> list[str] | None:
+    """Column names MySQL gives the top-level SELECT list.
+
+    DuckDB names unaliased expressions differently (``count_star()`` for
+    ``COUNT(*)``), so mirror results are relabelled with these. ``None`` when
+    the list contains ``*``.
+    """
+    statement = sqlparse.parse(sql)[0]
+    tokens = iter(statement.tokens)
+    for token in tokens:
+        if token.ttype is DML and token.normalized == "SELECT":
+            break
+    for token in tokens:
+        if token.is_whitespace or token.ttype is Keyword:
+            continue
+        items = (
+            list(token.get_identifiers())
+            if isinstance(token, IdentifierList)
+            else [token]
+        )
+        labels = []
+        for item in items:
+            text = str(item).strip()
+            if item.ttype is Wildcard or text.endswith("*") and "(" not in text:
+                return None
+            alias = item.get_alias() if hasattr(item, "get_alias") else None
+            if alias:
+                labels.append(alias.strip("`"))
+            elif isinstance(item, Identifier) and re.fullmatch(r"[`\w.]+", text):
+                labels.append(item.get_real_name().strip("`"))
+            else:
+                labels.append(text)
+        return labels
+    return None
+
+
+def is_aggregate(sql: str) -> bool:
+    return _AGGREGATE.search(_LITERAL.sub("''", sql)) is not None
+
+
+def duckdb_type(column: ColumnSpec) -> str:
+    mysql_type = column.fields.get("MySQL Type", "").strip("`").lower()
+    if mysql_type.startswith(("datetime", "timestamp")):
+        return "TIMESTAMP"
+    if mysql_type.startswith("date"):
+        return "DATE"
+    return {"INTEGER": "BIGINT", "REAL": "DOUBLE", "BLOB": "BLOB"}.get(
+        sqlite_type(column), "VARCHAR"
+    )
+
+
+def mysql_source(db_config: Mapping[str, Any]) -> Callable[[], Any]:
+    """Connection factory streaming rows off MySQL for ``export_mirror``."""
+    return lambda: pymysql.connect(
+        **connect_params(db_config), cursorclass=pymysql.cursors.SSCursor
+    )
+
+
+def sqlite_source(path: str | Path) -> Callable[[], Any]:
+    """Connection factory for a local SQLite copy such as the synthetic znjz."""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"SQLite database not found: {path}")
+
+    def connect() -> sqlite3.Connection:
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        register_mysql_functions(conn)
+        return conn
+
+    return connect
+
+
+def _require_duckdb() -> None:
+    if duckdb is None:
+        raise RuntimeError("The analytic mirror needs duckdb: pip install -r requirements_mirror.txt")
+
+
+def export_mirror(
+    connect: Callable[[], Any],
+    path: str | Path,
+    catalog: SchemaCatalog,
+    *,
+    batch_size: int = 50_000,
+    clock: Callable[[], float] = time.time,
+) -> dict[str, int]:
+    """Bulk-copy every base table in ``catalog`` into a DuckDB file.
+
+    ``connect`` returns a DB-API connection to read from. Column types follow
+    the catalog; values that do not cast (e.g. zero dates) become NULL. The
+    compatibility views are recreated on top, and the export time is stored
+    for freshness checks. The file is swapped in atomically when complete.
+    """
+    _require_duckdb()
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".partial")
+    partial.unlink(missing_ok=True)
+    exported_at = clock()
+    counts: dict[str, int] = {}
+    source = connect()
+    mirror = duckdb.connect(str(partial))
+    try:
+        for section in catalog.tables.values():
+            if section.is_view:
+                continue
+            names = section.column_names()
+            mirror.execute(
+                f'CREATE TABLE "{section.name}" ('
+                + ", ".join(f'"{c.name}" {duckdb_type(c)}' for c in section.columns)
+                + ")"
+            )
+            casts = ", ".join(
+                f'TRY_CAST(batch."{c.name}" AS {duckdb_type(c)})'
+                for c in section.columns
+            )
+            cursor = source.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(f'`{name}`' for name in names)} "
+                f"FROM `{section.name}`"
+            )
+            counts[section.name] = 0
+            while rows := cursor.fetchmany(batch_size):
+                batch = pd.DataFrame.from_records(
+                    [
+                        [float(v) if isinstance(v, Decimal) else v for v in row]
+                        for row in rows
+                    ],
+                    columns=names,
+                )
+                mirror.register("batch", batch)
+                mirror.execute(
+                    f'INSERT INTO "{section.name}" SELECT {casts} FROM batch'
+                )
+                mirror.unregister("batch")
+                counts[section.name] += len(rows)
+            cursor.close()
+        for view in catalog.views.values():
+            mirror.execute(to_duckdb(view_sql(view, catalog)))
+        mirror.execute(
+            f"CREATE TABLE {META_TABLE} AS SELECT ? AS exported_at, ? AS tables",
+            [exported_at, json.dumps(counts, ensure_ascii=False)],
+        )
+    finally:
+        mirror.close()
+        source.close()
+    os.replace(partial, target)
+    return counts
+
+
+@dataclass(frozen=True)
+class MirrorSettings:
+    enabled: bool = False
+    path: str = DEFAULT_MIRROR_PATH
+    max_age_seconds: float = 24 * 3600.0
+
+    @classmethod
+    def from_mapping(cls, source: Mapping[str, Any] | None = None) -> "MirrorSettings":
+        data = source or os.environ
+        defaults = cls()
+        enabled = str(data.get("ANALYTIC_MIRROR_ENABLED") or "false").strip().lower()
+        return cls(
+            enabled=enabled not in {"0", "false", "no", "off"},
+            path=str(data.get("ANALYTIC_MIRROR_PATH") or defaults.path),
+            max_age_seconds=float(
+                data.get("ANALYTIC_MIRROR_MAX_AGE_SECONDS") or defaults.max_age_seconds
+            ),
+        )
+
+
+class AnalyticMirror:
+    """Read-only handle on a mirror file written by ``export_mirror``.
+
+    The file is reopened when a refresh replaces it. ``dialect_check`` results
+    are remembered per SQL string until then.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        fetch: FetchSettings | None = None,
+        clock: Callable[[], float] = time.time,
+        max_checks: int = 256,
+    ) -> None:
+        _require_duckdb()
+        self.path = Path(path)
+        self.fetch = fetch or FetchSettings()
+        self._clock = clock
+        self._max_checks = max_checks
+        self._lock = threading.Lock()
+        self._conn: Any = None
+        self._mtime: float | None = None
+        self._exported_at: float | None = None
+        self._checks: OrderedDict[str, str | None] = OrderedDict()
+
+    def age_seconds(self) -> float | None:
+        """Seconds since the export, or ``None`` when there is no mirror."""
+        if self._open() is None or self._exported_at is None:
+            return None
+        return max(self._clock() - self._exported_at, 0.0)
+
+    def dialect_check(self, sql: str) -> str | None:
+        """``dialect_issue``, then whether DuckDB can plan the translation."""
+        with self._lock:
+            if sql in self._checks:
+                self._checks.move_to_end(sql)
+                return self._checks[sql]
+        issue = dialect_issue(sql)
+        conn = self._open()
+        if issue is None and conn is not None:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(f"EXPLAIN {to_duckdb(sql)}")
+            except duckdb.Error as exc:
+                issue = str(exc).splitlines()[0]
+            finally:
+                cursor.close()
+        with self._lock:
+            self._checks[sql] = issue
+            while len(self._checks) > self._max_checks:
+                self._checks.popitem(last=False)
+        return issue
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        conn = self._open()
+        if conn is None:
+            raise FileNotFoundError(f"Analytic mirror not found: {self.path}")
+        deadline = current_deadline()
+        cursor = conn.cursor()
+        timer = None
+        unregister = None
+        if deadline is not None:
+            deadline.check("execute_sql")
+            unregister = deadline.on_cancel(cursor.interrupt)
+            if deadline.bounded:
+                timer = threading.Timer(deadline.remaining(), cursor.interrupt)
+                timer.daemon = True
+                timer.start()
+        try:
+            cursor.execute(to_duckdb(sql))
+            labels = select_labels(sql)
+            if labels is not None and len(labels) != len(cursor.description):
+                labels = None
+            return read_result(cursor, self.fetch, labels)
+        except duckdb.Error as exc:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(f"execute_sql: {exc}") from exc
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if unregister is not None:
+                unregister()
+            cursor.close()
+
+    def _open(self) -> Any:
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._conn is None or mtime != self._mtime:
+                # Queries still running on the old file keep their connection.
+                # MySQL sorts NULL as the smallest value; DuckDB puts it last.
+                self._conn = duckdb.connect(
+                    str(self.path),
+                    read_only=True,
+                    config={"default_null_order": "nulls_first_on_asc_last_on_desc"},
+                )
+                self._mtime = mtime
+                row = self._conn.execute(
+                    f"SELECT exported_at FROM {META_TABLE}"
+                ).fetchone()
+                self._exported_at = row[0] if row else None
+                self._checks.clear()
+            return self._conn
+
+
+class MirrorRoutingExecutor:
+    """Send fresh, mirror-compatible aggregate SQL to the analytic mirror.
+
+    Everything else, and any mirror failure other than running out of time,
+    goes to ``executor`` (MySQL). Each result carries the decision under
+    ``"mirror"`` so the trace shows the route, the reason and the mirror age.
+    Other attributes (``cache_stats``, ``explain``) pass through to
+    ``executor``.
+    """
+
+    def __init__(
+        self,
+        executor: Callable[[str], dict[str, Any]],
+        mirror: AnalyticMirror,
+        *,
+        max_age_seconds: float = MirrorSettings.max_age_seconds,
+    ) -> None:
+        self.executor = executor
+        self.mirror = mirror
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._counters = {"mirror": 0, "mysql": 0, "fallbacks": 0}
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "executor":
+            raise AttributeError(name)
+        return getattr(self.executor, name)
+
+    def route(self, sql: str) -> dict[str, Any]:
+        if not is_aggregate(sql):
+            return {"route": "mysql", "reason": "not_aggregate"}
+        age = self.mirror.age_seconds()
+        if age is None:
+            return {"route": "mysql", "reason": "missing"}
+        decision: dict[str, Any] = {"age_seconds": round(age, 1)}
+        if age > self.max_age_seconds:
+            return {"route": "mysql", "reason": "stale", **decision}
+        issue = self.mirror.dialect_check(sql)
+        if issue is not None:
+            return {"route": "mysql", "reason": "dialect", "detail": issue, **decision}
+        return {"route": "mirror", "reason": "fresh", **decision}
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        decision = self.route(sql)
+        if decision["route"] == "mirror":
+            try:
+                result = self.mirror(sql)
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                decision = {
+                    **decision,
+                    "route": "mysql",
+                    "reason": "error",
+                    "detail": f"{type(exc).__name__}: {exc}",
+                }
+                self._count("fallbacks")
+            else:
+                self._count("mirror")
+                return {**result, "mirror": decision}
+        self._count("mysql")
+        return {**self.executor(sql), "mirror": decision}
+
+    async def aexecute(self, sql: str) -> dict[str, Any]:
+        return await asyncio.to_thread(self, sql)
+
+    def bypasses_database(self, sql: str) -> str | None:
+        """``"mirror"`` when ``sql`` routes to the mirror, else ask ``executor``."""
+        if self.route(sql)["route"] == "mirror":
+            return "mirror"
+        inner = getattr(self.executor, "bypasses_database", None)
+        return inner(sql) if callable(inner) else None
+
+    def stats(self) -> dict[str, Any]:
+        inner = getattr(self.executor, "stats", None)
+        return inner() if callable(inner) else {}
+
+    def mirror_stats(self) -> dict[str, Any]:
+        age = self.mirror.age_seconds()
+        with self._lock:
+            return {
+                "path": str(self.mirror.path),
+                "age_seconds": None if age is None else round(age, 1),
+                "max_age_seconds": self.max_age_seconds,
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        close = getattr(self.executor, "close", None)
+        if callable(close):
+            close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from .schema_catalog import SchemaCatalog, load_catalog
+
 REPO_ROOT = Path(__file__).resolve().parents[2]
 SCHEMA_DIR = REPO_ROOT / "schema"
 
@@ -15,9 +18,21 @@ class DatabaseProfile:
     allowed_tables: tuple[str, ...]
     compatibility_views: tuple[str, ...]
     sql_guidance: str
+    # Column names the LLM tends to invent -> real columns, in order of preference.
+    column_aliases: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+    # Invented names without a same-meaning column -> columns to suggest in repair.
+    column_hints: Mapping[str, tuple[str, ...]] = field(default_factory=dict)
+
+    @property
+    def base_tables(self) -> tuple[str, ...]:
+        views = set(self.compatibility_views)
+        return tuple(table for table in self.allowed_tables if table not in views)
+
+    def catalog(self) -> SchemaCatalog:
+        return load_catalog(self.schema_path)
 
     def load_schema(self) -> str:
-        return self.schema_path.read_text(encoding="utf-8")
+        return self.catalog().text
 
 
 ZNJZ_ALLOWED_TABLES = (
@@ -42,6 +57,28 @@ ZNJZ_COMPATIBILITY_VIEWS = (
     "标签数据",
 )
 
+# Deterministic fixes for the names listed under "容易写错的字段名" below. Only
+# renames that keep the meaning: a name column never becomes a code column.
+ZNJZ_COLUMN_ALIASES = {
+    "company_name": ("name", "ename"),
+    "enterprise_name": ("name", "ename"),
+    "finance_round": ("round",),
+    "round_name": ("round",),
+}
+
+# Names that have no equivalent column; repair_sql gets the code column as a
+# hint, since `city = '深圳市'` cannot simply become `district_code = '深圳市'`.
+ZNJZ_COLUMN_HINTS = {
+    "industry_name": ("industry_code",),
+    "industry": ("industry_code",),
+    "行业名称": ("industry_code",),
+    "province": ("district_code", "area_code"),
+    "city": ("district_code", "area_code"),
+    "city_name": ("district_code", "area_code"),
+    "area_name": ("district_code", "area_code"),
+    "district": ("district_code", "area_code"),
+}
+
 ZNJZ_SQL_GUIDANCE = """## znjz 专用 SQL 编写指南
 
 ### 白名单对象
@@ -111,4 +148,6 @@ def get_database_profile(name: str = "znjz") -> DatabaseProfile:
         allowed_tables=ZNJZ_ALLOWED_TABLES,
         compatibility_views=ZNJZ_COMPATIBILITY_VIEWS,
         sql_guidance=ZNJZ_SQL_GUIDANCE,
+        column_aliases=ZNJZ_COLUMN_ALIASES,
+        column_hints=ZNJZ_COLUMN_HINTS,
     )
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Sequence
+
+from .llm import set_completion_info, take_completion_info
+
+REPLAY_MODES = ("replay", "record", "auto")
+
+
+def parse_latency(value: Any) -> float | str | None:
+    """``"recorded"``/``"sampled"`` stay as-is, ``""``/``none``/``0`` mean no delay."""
+    text = str(value if value is not None else "").strip().lower()
+    if text in {"", "none", "0"}:
+        return None
+    if text in {"recorded", "sampled"}:
+        return text
+    return float(text)
+
+
+class CassetteMiss(LookupError):
+    """Replay mode got a prompt that was never recorded."""
+
+
+def prompt_key(
+    messages: Sequence[dict[str, str]], temperature: float | None, max_tokens: int
+) -> str:
+    """Hash messages, temperature and max_tokens.
+
+    The model is left out on purpose: a cassette recorded against one
+    endpoint replays against any other.
+    """
+    payload = {
+        "messages": list(messages),
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded completions in a JSON Lines file, one record per line.
+
+    Records are appended as they arrive; when a key appears twice the later
+    record wins on load.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[str, Any]] = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        record = json.loads(line)
+                        self._records[record["key"]] = record
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        return self._records.get(key)
+
+    def add(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            self._records[record["key"]] = record
+
+    def latencies_ms(self) -> list[float]:
+        return [
+            record["latency_ms"]
+            for record in self._records.values()
+            if record.get("latency_ms") is not None
+        ]
+
+
+class ReplayProvider:
+    """LLM provider that records live completions and replays them offline.
+
+    ``mode``: ``replay`` only serves the cassette and raises ``CassetteMiss``
+    on unknown prompts; ``record`` always calls ``live`` and appends; ``auto``
+    replays what it has and records the rest.
+
+    ``latency`` models how long a replayed call takes: ``None`` returns
+    immediately, a number sleeps that many seconds, ``"recorded"`` sleeps the
+    entry's own recorded latency and ``"sampled"`` draws from all recorded
+    latencies (seeded, so runs are reproducible). ``latency_scale`` multiplies
+    recorded or sampled latencies.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette | str | Path,
+        *,
+        mode: str = "replay",
+        live: Any | None = None,
+        latency: float | str | None = "recorded",
+        latency_scale: float = 1.0,
+        seed: int = 0,
+    ) -> None:
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Unsupported replay mode: {mode}")
+        if mode != "replay" and live is None:
+            raise ValueError(f"Replay mode {mode!r} needs a live provider")
+        if isinstance(latency, str) and latency not in {"recorded", "sampled"}:
+            raise ValueError(f"Unsupported replay latency: {latency}")
+        self.cassette = (
+            cassette if isinstance(cassette, Cassette) else Cassette(cassette)
+        )
+        self.mode = mode
+        self.live = live
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "recorded": 0}
+
+    @property
+    def settings(self) -> Any:
+        return getattr(self.live, "settings", None)
+
+    def complete(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        temperature: float | None = None,
+        max_tokens: int = 1500,
+    ) -> str:
+        key = prompt_key(messages, temperature, max_tokens)
+        record = self._lookup(key, messages)
+        if record is not None:
+            time.sleep(self._delay(record))
+            return self._replayed(record)
+        started = time.perf_counter()
+        text = self.live.complete(
+            messages, temperature=temperature, max_tokens=max_tokens
+        )
+        return self._record(key, messages, text, started)
+
+    async def acomplete(
+        self,
+        messages: Sequence[dict[str, str]],
+        *,
+        temperature: float | None = None,
+        max_tokens: int = 1500,
+    ) -> str:
+        key = prompt_key(messages, temperature, max_tokens)
+        record = self._lookup(key, messages)
+        if record is not None:
+            await asyncio.sleep(self._delay(record))
+            return self._replayed(record)
+        started = time.perf_counter()
+        acomplete = getattr(self.live, "acomplete", None)
+        if acomplete is not None:
+            text = await acomplete(
+                messages, temperature=temperature, max_tokens=max_tokens
+            )
+        else:
+            text = await asyncio.to_thread(
+                self.live.complete,
+                messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        return self._record(key, messages, text, started)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": str(self.cassette.path),
+                "entries": len(self.cassette),
+                **self._counters,
+            }
+
+    def _lookup(
+        self, key: str, messages: Sequence[dict[str, str]]
+    ) -> dict[str, Any] | None:
+        record = None if self.mode == "record" else self.cassette.get(key)
+        with self._lock:
+            self._counters["hits" if record is not None else "misses"] += 1
+        if record is None and self.mode == "replay":
+            preview = (messages[-1]["content"] if messages else "")[:80]
+            raise CassetteMiss(
+                f"No recorded completion in {self.cassette.path} for: {preview!r}"
+            )
+        return record
+
+    def _delay(self, record: dict[str, Any]) -> float:
+        if self.latency is None:
+            return 0.0
+        if not isinstance(self.latency, str):
+            return float(self.latency)
+        if self.latency == "recorded":
+            latency_ms = record.get("latency_ms") or 0.0
+        else:
+            pool = self.cassette.latencies_ms() or [0.0]
+            with self._lock:
+                latency_ms = self._random.choice(pool)
+        return latency_ms / 1000 * self.latency_scale
+
+    def _replayed(self, record: dict[str, Any]) -> str:
+        set_completion_info(
+            {
+                "replay": "hit",
+                "prompt_tokens": record.get("prompt_tokens", 0),
+                "completion_tokens": record.get("completion_tokens", 0),
+                "latency_ms": record.get("latency_ms", 0.0),
+            }
+        )
+        return record["text"]
+
+    def _record(
+        self,
+        key: str,
+        messages: Sequence[dict[str, str]],
+        text: str,
+        started: float,
+    ) -> str:
+        info = take_completion_info() or {}
+        latency_ms = info.get("latency_ms")
+        if latency_ms is None:
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.cassette.add(
+            {
+                "key": key,
+                "model": getattr(self.settings, "model", None),
+                "prompt": (messages[-1]["content"] if messages else "")[:200],
+                "text": text,
+                "prompt_tokens": info.get("prompt_tokens", 0),
+                "completion_tokens": info.get("completion_tokens", 0),
+                "latency_ms": latency_ms,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+            }
+        )
+        with self._lock:
+            self._counters["recorded"] += 1
+        set_completion_info({**info, "replay": "recorded"})
+        return text
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import os
+import pickle
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from .runtime import AgentResult
+
+_RESULT_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class ResultStore:
+    """Short-lived ``result_id`` handles to finished agent results.
+
+    The newest ``max_entries`` results stay in memory. Older ones are pickled
+    to ``spill_dir`` when it is set (shared by workers on the same host) and
+    dropped otherwise. Every entry expires ``ttl_seconds`` after it was put;
+    spilled files use their mtime, so the clock must be wall time.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 64,
+        ttl_seconds: float = 1800.0,
+        spill_dir: str | Path | None = None,
+        max_disk_entries: int = 512,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, AgentResult]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "spilled": 0, "expired": 0}
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+
+    def put(self, result: AgentResult) -> str:
+        result_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._lock:
+            self._entries[result_id] = (now + self.ttl_seconds, result)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+        for evicted_id, (expires_at, evicted_result) in evicted:
+            if self.spill_dir is not None and expires_at > now:
+                self._spill(evicted_id, expires_at, evicted_result)
+        return result_id
+
+    def get(self, result_id: str) -> AgentResult | None:
+        if not _RESULT_ID.fullmatch(result_id or ""):
+            return None
+        now = self._clock()
+        with self._lock:
+            item = self._entries.get(result_id)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(result_id)
+                    self._counters["hits"] += 1
+                    return item[1]
+                del self._entries[result_id]
+                self._counters["expired"] += 1
+        result = self._load(result_id, now)
+        with self._lock:
+            self._counters["hits" if result is not None else "misses"] += 1
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        for path in self._spilled():
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self._counters,
+            }
+        if self.spill_dir is not None:
+            stats["disk_entries"] = len(self._spilled())
+        return stats
+
+    def _path(self, result_id: str) -> Path:
+        return self.spill_dir / f"{result_id}.pkl"
+
+    def _spilled(self) -> list[Path]:
+        if self.spill_dir is None:
+            return []
+        return list(self.spill_dir.glob("*.pkl"))
+
+    def _spill(self, result_id: str, expires_at: float, result: AgentResult) -> None:
+        path = self._path(result_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        # mtime records when the entry was put, so TTL carries over to disk.
+        put_at = expires_at - self.ttl_seconds
+        os.utime(tmp, (put_at, put_at))
+        os.replace(tmp, path)
+        with self._lock:
+            self._counters["spilled"] += 1
+        self._prune()
+
+    def _prune(self) -> None:
+        now = self._clock()
+        files = []
+        for path in self._spilled():
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:  # removed by another worker
+                continue
+        files.sort()
+        keep = []
+        for mtime, path in files:
+            if mtime + self.ttl_seconds <= now:
+                path.unlink(missing_ok=True)
+            else:
+                keep.append(path)
+        for path in keep[: max(len(keep) - self.max_disk_entries, 0)]:
+            path.unlink(missing_ok=True)
+
+    def _load(self, result_id: str, now: float) -> AgentResult | None:
+        if self.spill_dir is None:
+            return None
+        path = self._path(result_id)
+        try:
+            if path.stat().st_mtime + self.ttl_seconds <= now:
+                path.unlink(missing_ok=True)
+                return None
+            return pickle.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,668 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+from .columnar import QueryResult
+from .deadline import DeadlineExceeded
+from .executors import FetchSettings
+from .mirror import select_labels
+from .sql_cache import canonical_sql
+from .sqlite_executor import SQLiteExecutor
+
+DEFAULT_ROLLUP_PATH = "output/rollups/znjz.sqlite3"
+META_TABLE = "_rollup_meta"
+
+
+@dataclass(frozen=True)
+class Dimension:
+    """A GROUP BY key of a rollup.
+
+    ``expr`` is the ``canonical_sql`` spelling in base-table SQL. ``source``
+    is set for ``YEAR(col)`` keys: range predicates on ``col`` that fall on
+    year boundaries are answered from the year column.
+    """
+
+    column: str
+    expr: str
+    type: str = "TEXT"
+    source: str | None = None
+
+
+@dataclass(frozen=True)
+class Measure:
+    """An aggregate stored per group.
+
+    ``exprs`` are the spellings it answers, the first one is materialized.
+    ``combine`` re-aggregates stored values over coarser groups; ``None``
+    (``COUNT(DISTINCT ...)``) only answers at the rollup's own grain.
+    ``scale`` stores a DECIMAL aggregate as an integer count of
+    ``10 ** -scale`` units, so SQLite sums it exactly and reads give back the
+    ``Decimal`` MySQL would return.
+    """
+
+    column: str
+    exprs: tuple[str, ...]
+    combine: str | None = "SUM({})"
+    type: str = "INTEGER"
+    scale: int | None = None
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    source: str
+    dimensions: tuple[Dimension, ...]
+    measures: tuple[Measure, ...]
+
+    def build_sql(self) -> str:
+        keys = ", ".join(dim.expr for dim in self.dimensions)
+        items = [f"{dim.expr} AS `{dim.column}`" for dim in self.dimensions] + [
+            f"{measure.exprs[0]} AS `{measure.column}`" for measure in self.measures
+        ]
+        return f"SELECT {', '.join(items)} FROM `{self.source}` GROUP BY {keys}"
+
+
+# A count over no rows is 0, not NULL.
+_COUNT = "COALESCE(SUM({}), 0)"
+_ROWS = Measure("row_count", ("COUNT(*)", "COUNT(1)"), _COUNT)
+_DISTINCT_EID = Measure("enterprise_count", ("COUNT(DISTINCT `eid`)",), None)
+
+# The hot aggregates behind the standard questions and templates.
+ZNJZ_ROLLUPS = (
+    Rollup(
+        "rollup_enterprise",
+        "企业基本信息",
+        (
+            Dimension("status", "`status`"),
+            Dimension("district_code", "`district_code`"),
+            Dimension("start_year", "YEAR(`start_date`)", "INTEGER", "start_date"),
+        ),
+        # ``eid`` is unique in this table, so distinct counts add up.
+        (
+            _ROWS,
+            Measure(
+                "enterprise_count", ("COUNT(DISTINCT `eid`)", "COUNT(`eid`)"), _COUNT
+            ),
+        ),
+    ),
+    Rollup(
+        "rollup_industry",
+        "企业行业代码",
+        (Dimension("industry_code", "`industry_code`"),),
+        (_ROWS, _DISTINCT_EID),
+    ),
+    Rollup(
+        "rollup_finance_round",
+        "融资数据",
+        (Dimension("round", "`round`"),),
+        (
+            _ROWS,
+            _DISTINCT_EID,
+            # ``amount`` is DECIMAL(20,2).
+            Measure("total_amount", ("SUM(`amount`)",), "SUM({})", scale=2),
+        ),
+    ),
+    Rollup(
+        "rollup_bid_year",
+        "招投标",
+        (Dimension("year", "YEAR(`publish_time`)", "INTEGER", "publish_time"),),
+        (_ROWS, _DISTINCT_EID),
+    ),
+    Rollup(
+        "rollup_qualification_year",
+        "标签数据",
+        (Dimension("year", "`year`", "REAL"),),
+        (_ROWS, _DISTINCT_EID),
+    ),
+)
+
+
+def rollups_for(profile_name: str) -> tuple[Rollup, ...]:
+    return ZNJZ_ROLLUPS if profile_name == "znjz" else ()
+
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_VALUE = r"(?:\x00\d+\x00|-?\d+(?:\.\d+)?)"
+_QUERY = re.compile(
+    r"SELECT (?P<select>.+?) FROM `(?P<table>[^`]+)`(?: (?:AS )?(?P<alias>`[^`]+`))?"
+    r"(?: WHERE (?P<where>.+?))?(?: GROUP BY (?P<group>.+?))?"
+    r"(?: ORDER BY (?P<order>.+?))?(?: (?P<limit>LIMIT \d+(?:, \d+| OFFSET \d+)?))?"
+)
+_ALIASED = re.compile(r"(?P<expr>.+?[`)])(?: AS)? (?P<alias>`[^`]+`|[A-Z_][A-Z0-9_]*)")
+_IS_NULL = re.compile(r"(?P<lhs>.+?) IS (?P<op>NOT NULL|NULL)")
+_COMPARE = re.compile(rf"(?P<lhs>.+?) (?P<op>=|<>|!=|<=|>=|<|>) (?P<value>{_VALUE})")
+_IN = re.compile(
+    rf"(?P<lhs>.+?) (?P<op>NOT IN|IN)\((?P<values>{_VALUE}(?:, {_VALUE})*)\)"
+)
+_LIKE = re.compile(r"(?P<lhs>.+?) (?P<op>NOT LIKE|LIKE) (?P<value>\x00\d+\x00)")
+_YEAR_START = re.compile(r"'(\d{4})-01-01(?: 00:00:00)?'")
+_KEYWORD_PAREN = re.compile(r"\b(WHERE|AND|OR|NOT)\(")
+_ORDER = re.compile(r"(?P<item>.+?)(?P<direction> ASC| DESC)?")
+
+
+def _split(text: str, separator: str) -> list[str]:
+    """Split on ``separator`` outside parentheses."""
+    parts, depth, start, index = [], 0, 0, 0
+    while index < len(text):
+        char = text[index]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, index):
+            parts.append(text[start:index])
+            index += len(separator)
+            start = index
+            continue
+        index += 1
+    parts.append(text[start:])
+    return parts
+
+
+def _conjuncts(text: str) -> list[str]:
+    """``(a AND b)`` as ``[a, b]``; the sargable rewrite wraps ranges this way."""
+    depth = 0
+    for index, char in enumerate(text):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth == 0:
+            break
+    if text.startswith("(") and index == len(text) - 1:
+        return [
+            part for inner in _split(text[1:-1], " AND ") for part in _conjuncts(inner)
+        ]
+    return [text]
+
+
+def _unquote(name: str) -> str:
+    return name.strip("`").lower()
+
+
+@dataclass
+class RollupPlan:
+    rollup: Rollup
+    sql: str
+    # Output column -> ``Measure.scale`` of the scaled integer it holds.
+    scales: dict[str, int] = field(default_factory=dict)
+
+
+class _Rewriter:
+    """Rewrite one parsed query against one rollup, or fail with ``None``."""
+
+    def __init__(self, rollup: Rollup, literals: list[str]) -> None:
+        self.rollup = rollup
+        self.literals = literals
+        self.dims = {dim.expr: dim for dim in rollup.dimensions}
+        self.sources = {
+            f"`{dim.source}`": dim for dim in rollup.dimensions if dim.source
+        }
+        self.measures = {
+            expr: measure for measure in rollup.measures for expr in measure.exprs
+        }
+        self.grouped: set[str] = set()
+        self.exact_only = False
+
+    def column(self, dim: Dimension) -> str:
+        return f"`{self.rollup.name}`.`{dim.column}`"
+
+    def expression(self, expr: str) -> tuple[str, Dimension | None] | None:
+        if expr in self.dims:
+            return self.column(self.dims[expr]), self.dims[expr]
+        measure = self.measures.get(expr)
+        if measure is None:
+            return None
+        if measure.combine is None:
+            self.exact_only = True
+        # One stored row per group at the rollup's own grain.
+        combine = measure.combine or "MAX({})"
+        return combine.format(f"`{self.rollup.name}`.`{measure.column}`"), None
+
+    def condition(self, text: str) -> str | None:
+        if match := _IS_NULL.fullmatch(text):
+            dim = self.dims.get(match["lhs"]) or self.sources.get(match["lhs"])
+            return f"{self.column(dim)} IS {match['op']}" if dim else None
+        if match := _COMPARE.fullmatch(text):
+            value, op = match["value"], match["op"]
+            if match["lhs"] in self.dims:
+                return f"{self.column(self.dims[match['lhs']])} {op} {value}"
+            dim = self.sources.get(match["lhs"])
+            year = self._year_start(value)
+            # Only whole years: col >= 'Y-01-01' and col < 'Y-01-01'.
+            if dim is None or year is None or op not in {">=", "<"}:
+                return None
+            return f"{self.column(dim)} {op} {year}"
+        for pattern in (_IN, _LIKE):
+            match = pattern.fullmatch(text)
+            if match and match["lhs"] in self.dims:
+                dim = self.dims[match["lhs"]]
+                if pattern is _IN:
+                    return f"{self.column(dim)} {match['op']} ({match['values']})"
+                return f"{self.column(dim)} {match['op']} {match['value']}"
+        return None
+
+    def _year_start(self, value: str) -> int | None:
+        placeholder = _PLACEHOLDER.fullmatch(value)
+        if placeholder is None:
+            return None
+        match = _YEAR_START.fullmatch(self.literals[int(placeholder.group(1))])
+        return int(match.group(1)) if match else None
+
+
+def plan_rollup(sql: str, rollups: tuple[Rollup, ...]) -> RollupPlan | None:
+    """Rewrite single-table aggregate SQL to read a rollup table.
+
+    Covered: SELECT of rollup keys and stored aggregates, AND-ed filters on
+    the keys (``IS [NOT] NULL``, comparisons, ``IN``, ``LIKE``, whole-year
+    ranges on the date behind a ``YEAR()`` key), GROUP BY a subset of the
+    keys, ORDER BY and LIMIT. Distinct counts need GROUP BY all keys. Anything
+    else (joins, HAVING, other columns, OR) returns ``None``.
+    """
+    labels = select_labels(sql)
+    literals: list[str] = []
+
+    def mask(match: re.Match[str]) -> str:
+        literals.append(match.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    text = _LITERAL.sub(mask, canonical_sql(sql))
+    # canonical_sql writes no space before "(": ``WHERE(a) AND(b)``.
+    text = _KEYWORD_PAREN.sub(r"\1 (", text)
+    if "\\" in "".join(literals):
+        return None
+    query = _QUERY.fullmatch(text)
+    if query is None:
+        return None
+    for rollup in rollups:
+        if rollup.source != query["table"]:
+            continue
+        rewritten = _rewrite(query, rollup, literals, labels)
+        if rewritten is not None:
+            sql, scales = rewritten
+            return RollupPlan(
+                rollup,
+                _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], sql),
+                scales,
+            )
+    return None
+
+
+def _rewrite(
+    query: re.Match[str],
+    rollup: Rollup,
+    literals: list[str],
+    labels: list[str] | None,
+) -> tuple[str, dict[str, int]] | None:
+    rewriter = _Rewriter(rollup, literals)
+    qualifiers = [f"`{query['table']}`."]
+    if query["alias"]:
+        qualifiers.append(f"{query['alias']}.")
+
+    def clause(name: str, separator: str) -> list[str]:
+        text = query[name] or ""
+        for qualifier in qualifiers:
+            text = text.replace(qualifier, "")
+        return _split(text, separator) if text else []
+
+    items = clause("select", ", ")
+    if labels is None or len(labels) != len(items):
+        return None
+    exprs, aliases, select, selected_dims = [], {}, [], []
+    scales: dict[str, int] = {}
+    for item, label in zip(items, labels):
+        match = _ALIASED.fullmatch(item)
+        expr = match["expr"] if match else item
+        if match:
+            aliases[_unquote(match["alias"])] = label
+        mapped = rewriter.expression(expr)
+        if mapped is None:
+            return None
+        if mapped[1] is not None:
+            selected_dims.append(mapped[1])
+        measure = rewriter.measures.get(expr)
+        if measure is not None and measure.scale is not None:
+            scales[label] = measure.scale
+        exprs.append(expr)
+        select.append(f"{mapped[0]} AS `{label.replace('`', '``')}`")
+
+    where = [part for text in clause("where", " AND ") for part in _conjuncts(text)]
+    if any(" OR " in part for part in where):
+        return None
+    conditions = [rewriter.condition(part) for part in where]
+    if None in conditions:
+        return None
+
+    groups = []
+    for part in clause("group", ", "):
+        # MySQL resolves GROUP BY names against the table before aliases; a
+        # YEAR() key aliased to its own date column groups by the date.
+        if part.isdigit() and 0 < int(part) <= len(exprs):
+            part = exprs[int(part) - 1]
+        elif part not in rewriter.dims and part not in rewriter.sources:
+            part = next(
+                (e for e, m in zip(exprs, items) if _aliased(m) == _unquote(part)),
+                part,
+            )
+        dim = rewriter.dims.get(part)
+        if dim is None:
+            return None
+        rewriter.grouped.add(dim.column)
+        groups.append(rewriter.column(dim))
+    if any(dim.column not in rewriter.grouped for dim in selected_dims):
+        return None
+
+    orders = []
+    for part in clause("order", ", "):
+        match = _ORDER.fullmatch(part)
+        item, direction = match["item"], match["direction"] or ""
+        if item.isdigit():
+            target = item
+        elif _unquote(item) in aliases:
+            target = f"`{aliases[_unquote(item)]}`"
+        else:
+            mapped = rewriter.expression(item)
+            if mapped is None:
+                return None
+            target = mapped[0]
+        orders.append(f"{target}{direction}")
+
+    if rewriter.exact_only and rewriter.grouped != {
+        dim.column for dim in rollup.dimensions
+    }:
+        return None
+    sql = f"SELECT {', '.join(select)} FROM `{rollup.name}`"
+    if conditions:
+        sql += f" WHERE {' AND '.join(conditions)}"
+    if groups:
+        sql += f" GROUP BY {', '.join(groups)}"
+    if orders:
+        sql += f" ORDER BY {', '.join(orders)}"
+    if query["limit"]:
+        sql += f" {query['limit']}"
+    return sql, scales
+
+
+def _aliased(item: str) -> str | None:
+    match = _ALIASED.fullmatch(item)
+    return _unquote(match["alias"]) if match else None
+
+
+def build_rollups(
+    connect: Callable[[], Any],
+    path: str | Path,
+    rollups: tuple[Rollup, ...] = ZNJZ_ROLLUPS,
+    *,
+    clock: Callable[[], float] = time.time,
+) -> dict[str, int]:
+    """Materialize ``rollups`` from the base tables into a SQLite file.
+
+    Run after every import. ``connect`` returns a DB-API connection to the
+    base tables (``mirror.mysql_source`` / ``mirror.sqlite_source``). Text
+    keys compare case-insensitively like MySQL's default collation. The file
+    is swapped in atomically when complete.
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".partial")
+    partial.unlink(missing_ok=True)
+    built_at = clock()
+    counts: dict[str, int] = {}
+    source = connect()
+    store = sqlite3.connect(partial)
+    try:
+        for rollup in rollups:
+            columns = [
+                f"`{dim.column}` {dim.type}"
+                + (" COLLATE NOCASE" if dim.type == "TEXT" else "")
+                for dim in rollup.dimensions
+            ] + [f"`{measure.column}` {measure.type}" for measure in rollup.measures]
+            store.execute(f"CREATE TABLE `{rollup.name}` ({', '.join(columns)})")
+            cursor = source.cursor()
+            cursor.execute(rollup.build_sql())
+            scales = [None] * len(rollup.dimensions) + [
+                measure.scale for measure in rollup.measures
+            ]
+            rows = [
+                tuple(_stored(v, scale) for v, scale in zip(row, scales))
+                for row in cursor.fetchall()
+            ]
+            cursor.close()
+            store.executemany(
+                f"INSERT INTO `{rollup.name}` VALUES "
+                f"({', '.join('?' * len(columns))})",
+                rows,
+            )
+            counts[rollup.name] = len(rows)
+        store.execute(f"CREATE TABLE {META_TABLE} (built_at REAL, rollups TEXT)")
+        store.execute(
+            f"INSERT INTO {META_TABLE} VALUES (?, ?)", (built_at, json.dumps(counts))
+        )
+        store.commit()
+    finally:
+        store.close()
+        source.close()
+    os.replace(partial, target)
+    return counts
+
+
+def _stored(value: Any, scale: int | None) -> Any:
+    if value is None:
+        return None
+    if scale is not None:
+        # str() first: a float source (SQLite) must not carry binary noise.
+        exact = value if isinstance(value, Decimal) else Decimal(str(value))
+        return int(exact.scaleb(scale))
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _unscale(result: dict[str, Any], scales: dict[str, int]) -> dict[str, Any]:
+    """Turn scaled integer columns back into exact ``Decimal`` values."""
+    table = result["table"]
+    factors = [scales.get(column) for column in table.columns]
+    rows = [
+        tuple(
+            value if scale is None or value is None else Decimal(value).scaleb(-scale)
+            for value, scale in zip(values, factors)
+        )
+        for values in table.iter_tuples()
+    ]
+    table = QueryResult.from_rows(table.columns, rows)
+    return {**result, "rows": table.rows, "table": table}
+
+
+@dataclass(frozen=True)
+class RollupSettings:
+    enabled: bool = False
+    path: str = DEFAULT_ROLLUP_PATH
+    max_age_seconds: float = 24 * 3600.0
+
+    @classmethod
+    def from_mapping(cls, source: Mapping[str, Any] | None = None) -> "RollupSettings":
+        data = source or os.environ
+        defaults = cls()
+        enabled = str(data.get("ROLLUP_ENABLED") or "false").strip().lower()
+        return cls(
+            enabled=enabled not in {"0", "false", "no", "off"},
+            path=str(data.get("ROLLUP_PATH") or defaults.path),
+            max_age_seconds=float(
+                data.get("ROLLUP_MAX_AGE_SECONDS") or defaults.max_age_seconds
+            ),
+        )
+
+
+class RollupStore:
+    """Read-only handle on a file written by ``build_rollups``.
+
+    A rebuilt file is picked up on the next query.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        fetch: FetchSettings | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = Path(path)
+        self.fetch = fetch or FetchSettings()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._executor: SQLiteExecutor | None = None
+        self._mtime: float | None = None
+        self._built_at: float | None = None
+        self._names: frozenset[str] = frozenset()
+
+    def age_seconds(self) -> float | None:
+        """Seconds since the build, or ``None`` when there is no store."""
+        if self._open() is None or self._built_at is None:
+            return None
+        return max(self._clock() - self._built_at, 0.0)
+
+    def has(self, name: str) -> bool:
+        return self._open() is not None and name in self._names
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        executor = self._open()
+        if executor is None:
+            raise FileNotFoundError(f"Rollup store not found: {self.path}")
+        return executor(sql)
+
+    def _open(self) -> SQLiteExecutor | None:
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            if self._executor is None or mtime != self._mtime:
+                # Queries still running on the old file keep their connection.
+                self._executor = SQLiteExecutor(self.path, fetch=self.fetch)
+                self._mtime = mtime
+                meta = self._executor(f"SELECT built_at, rollups FROM {META_TABLE}")
+                row = meta["rows"][0] if meta["rows"] else {}
+                self._built_at = row.get("built_at")
+                self._names = frozenset(json.loads(row.get("rollups") or "{}"))
+            return self._executor
+
+
+class RollupRoutingExecutor:
+    """Answer aggregate SQL covered by a rollup from the rollup store.
+
+    ``plan_rollup`` decides coverage; uncovered SQL, a missing or stale store
+    and store errors other than running out of time go to ``executor``. Each
+    result carries the decision under ``"rollup"``. Other attributes pass
+    through to ``executor``.
+    """
+
+    def __init__(
+        self,
+        executor: Callable[[str], dict[str, Any]],
+        store: RollupStore,
+        rollups: tuple[Rollup, ...] = ZNJZ_ROLLUPS,
+        *,
+        max_age_seconds: float = RollupSettings.max_age_seconds,
+        max_plans: int = 256,
+    ) -> None:
+        self.executor = executor
+        self.store = store
+        self.rollups = rollups
+        self.max_age_seconds = max_age_seconds
+        self._max_plans = max_plans
+        self._lock = threading.Lock()
+        self._plans: OrderedDict[str, RollupPlan | None] = OrderedDict()
+        self._counters = {"rollup": 0, "base": 0, "fallbacks": 0}
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "executor":
+            raise AttributeError(name)
+        return getattr(self.executor, name)
+
+    def plan(self, sql: str) -> RollupPlan | None:
+        with self._lock:
+            if sql in self._plans:
+                self._plans.move_to_end(sql)
+                return self._plans[sql]
+        plan = plan_rollup(sql, self.rollups)
+        with self._lock:
+            self._plans[sql] = plan
+            while len(self._plans) > self._max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def route(self, sql: str) -> tuple[dict[str, Any], RollupPlan | None]:
+        plan = self.plan(sql)
+        if plan is None:
+            return {"route": "base", "reason": "not_covered"}, None
+        decision: dict[str, Any] = {"rollup": plan.rollup.name}
+        age = self.store.age_seconds()
+        if age is None or not self.store.has(plan.rollup.name):
+            return {"route": "base", "reason": "missing", **decision}, None
+        decision["age_seconds"] = round(age, 1)
+        if age > self.max_age_seconds:
+            return {"route": "base", "reason": "stale", **decision}, None
+        return {"route": "rollup", "reason": "covered", **decision}, plan
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        decision, plan = self.route(sql)
+        if plan is not None:
+            try:
+                result = self.store(plan.sql)
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                decision = {
+                    **decision,
+                    "route": "base",
+                    "reason": "error",
+                    "detail": f"{type(exc).__name__}: {exc}",
+                }
+                self._count("fallbacks")
+            else:
+                self._count("rollup")
+                if plan.scales:
+                    result = _unscale(result, plan.scales)
+                return {**result, "rollup": decision}
+        self._count("base")
+        return {**self.executor(sql), "rollup": decision}
+
+    async def aexecute(self, sql: str) -> dict[str, Any]:
+        return await asyncio.to_thread(self, sql)
+
+    def bypasses_database(self, sql: str) -> str | None:
+        """``"rollup"`` when a fresh rollup covers ``sql``, else ask ``executor``."""
+        if self.route(sql)[1] is not None:
+            return "rollup"
+        inner = getattr(self.executor, "bypasses_database", None)
+        return inner(sql) if callable(inner) else None
+
+    def stats(self) -> dict[str, Any]:
+        inner = getattr(self.executor, "stats", None)
+        return inner() if callable(inner) else {}
+
+    def rollup_stats(self) -> dict[str, Any]:
+        age = self.store.age_seconds()
+        with self._lock:
+            return {
+                "path": str(self.store.path),
+                "age_seconds": None if age is None else round(age, 1),
+                "max_age_seconds": self.max_age_seconds,
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        close = getattr(self.executor, "close", None)
+        if callable(close):
+            close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
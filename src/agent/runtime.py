@@ -1,19 +1,71 @@
 from __future__ import annotations
 
+import asyncio
 import re
-from dataclasses import dataclass, field
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from decimal import Decimal
-from typing import Any, Callable, TypedDict
-
-import pymysql
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, TypedDict
 
 from src.utils.safe_sql import SafeSQLReport, enforce_safe_sql
-
-from .llm import VolcengineArkProvider
+from src.utils.sargable import SargableRewriter
+from src.utils.sql_columns import ColumnValidator
+from src.utils.sql_cost import ExplainCostGuard
+
+from .backends import build_sql_executor
+from .cache import AnswerCache, answer_cache_key, cached_copy
+from .columnar import QueryResult, RowsView
+from .deadline import Deadline, DeadlineExceeded, use_deadline
+from .executors import estimate_result_bytes
+from .llm import VolcengineArkProvider, take_completion_info
+from .metrics import METRICS, MetricsRegistry
 from .profiles import DatabaseProfile, get_database_profile
+from .schema_index import schema_index_for
+from .singleflight import SingleFlight
+from .templates import TemplateMatcher
 
 SQLExecutor = Callable[[str], dict[str, Any]]
+EventListener = Callable[[str, dict[str, Any]], None]
+
+
+class AgentTrace(list):
+    """Trace list that also reports every node entry to an optional listener.
+
+    Nodes run one after another and append their entry when they finish, so
+    each entry is stamped with monotonic ``started_at``/``ended_at`` seconds
+    spanning from the previous entry (or trace creation) to its own append.
+    With a bounded ``deadline`` entries also carry the ``remaining_ms`` budget.
+    """
+
+    def __init__(
+        self,
+        listener: EventListener | None = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        deadline: Deadline | None = None,
+    ) -> None:
+        super().__init__()
+        self.listener = listener
+        self.deadline = deadline
+        self._clock = clock
+        self.started_at = clock()
+        self._checkpoint = self.started_at
+
+    def append(self, entry: dict[str, Any]) -> None:
+        now = self._clock()
+        entry.setdefault("started_at", round(self._checkpoint, 6))
+        entry.setdefault("ended_at", round(now, 6))
+        entry.setdefault("duration_ms", round((now - self._checkpoint) * 1000, 3))
+        if self.deadline is not None and self.deadline.bounded:
+            entry.setdefault("remaining_ms", self.deadline.remaining_ms())
+        self._checkpoint = now
+        super().append(entry)
+        self.emit("node", entry)
+
+    def emit(self, event: str, data: dict[str, Any]) -> None:
+        if self.listener is not None:
+            self.listener(event, data)
 
 
 class AgentState(TypedDict, total=False):
@@ -27,6 +79,7 @@ class AgentState(TypedDict, total=False):
     safety: SafeSQLReport
     attempt: int
     execution_ok: bool
+    timed_out: bool
     last_error: str | None
 
 
@@ -38,16 +91,19 @@ class AgentResult:
     sql: str | None = None
     safe_sql: str | None = None
     columns: list[str] = field(default_factory=list)
-    rows: list[dict[str, Any]] = field(default_factory=list)
+    rows: list[dict[str, Any]] | RowsView = field(default_factory=list)
     row_count: int = 0
     analysis: str = ""
     report: str = ""
     chart: dict[str, Any] | None = None
     error: str | None = None
     safety: dict[str, Any] | None = None
+    truncated: dict[str, Any] | None = None
     trace: list[dict[str, Any]] = field(default_factory=list)
+    table: QueryResult | None = field(default=None, repr=False)
 
-    def to_dict(self) -> dict[str, Any]:
+    def to_dict(self, *, columnar: bool = False) -> dict[str, Any]:
+        """Plain payload; ``columnar`` sends ``table`` column arrays, not rows."""
         return {
             "question": self.question,
             "scenario": self.scenario,
@@ -55,14 +111,18 @@ class AgentResult:
             "sql": self.sql,
             "safe_sql": self.safe_sql,
             "columns": self.columns,
-            "rows": self.rows,
+            "rows": [] if columnar else list(self.rows),
             "row_count": self.row_count,
             "analysis": self.analysis,
             "report": self.report,
             "chart": self.chart,
             "error": self.error,
             "safety": self.safety,
+            "truncated": self.truncated,
             "trace": self.trace,
+            "table": (
+                self.table.to_dict() if columnar and self.table is not None else None
+            ),
         }
 
 
@@ -92,30 +152,316 @@ class AgentRuntime:
         db_config: dict[str, Any] | None = None,
         max_retries: int = 2,
         max_limit: int = 1000,
+        schema_token_budget: int = 4000,
+        answer_cache: AnswerCache | None = None,
+        metrics: MetricsRegistry | None = None,
+        templates: TemplateMatcher | None = None,
+        cost_guard: ExplainCostGuard | None = None,
+        sargable: SargableRewriter | None = None,
+        column_validator: ColumnValidator | None = None,
+        deadline_seconds: float | None = None,
+        analyze_min_seconds: float = 5.0,
+        single_flight: SingleFlight | None = None,
+        batch_concurrency: int = 4,
     ) -> None:
         self.profile = profile or get_database_profile("znjz")
         self.llm = llm or VolcengineArkProvider()
         self.sql_executor = sql_executor or self._build_sql_executor(db_config or {})
         self.max_retries = max_retries
         self.max_limit = max_limit
+        self.schema_token_budget = schema_token_budget
+        self.answer_cache = answer_cache
+        self.metrics = metrics or METRICS
+        self.templates = templates
+        self.cost_guard = cost_guard
+        self.sargable = sargable
+        self.column_validator = column_validator
+        self.deadline_seconds = deadline_seconds
+        self.analyze_min_seconds = analyze_min_seconds
+        self.single_flight = single_flight
+        self.batch_concurrency = batch_concurrency
         self.workflow_backend = "linear"
         self._graph = self._build_langgraph()
+        self._async_graph = self._build_langgraph(asynchronous=True)
 
-    def query(self, question: str, *, scenario: str = "data_insight") -> AgentResult:
-        if self._graph is not None:
-            return self._query_graph(question, scenario=scenario)
-        return self._query_linear(question, scenario=scenario)
+    def query(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        deadline: Deadline | float | None = None,
+    ) -> AgentResult:
+        """Run the agent; ``deadline`` (seconds or ``Deadline``) bounds SQL time.
+
+        With ``single_flight`` set, concurrent calls for the same question wait
+        for the one already running and share its result.
+        """
+        cached, entry = self._lookup_answer(question, scenario)
+        if cached is not None:
+            return self._finish_query(cached)
+
+        def run() -> AgentResult:
+            resolved = self._resolve_deadline(deadline)
+            if self._graph is not None:
+                result = self._query_graph(
+                    question, scenario=scenario, deadline=resolved
+                )
+            else:
+                result = self._query_linear(
+                    question, scenario=scenario, deadline=resolved
+                )
+            return self._finish_query(result, question, scenario, entry)
 
-    def _query_linear(
+        if self.single_flight is None:
+            return run()
+        result, shared = self.single_flight.do(
+            answer_cache_key(question, scenario, self.profile.name), run
+        )
+        return self._coalesced(result) if shared else result
+
+    async def aquery(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        listener: EventListener | None = None,
+        deadline: Deadline | float | None = None,
+    ) -> AgentResult:
+        """Async twin of ``query``: LLM and SQL calls never block the event loop.
+
+        Cancelling the task cancels the deadline, which kills the running SQL.
+        Streaming callers (``listener`` set) always run their own execution.
+        """
+        cached, entry = self._lookup_answer(question, scenario)
+        if listener is not None and entry is not None:
+            listener("node", entry)
+        if cached is not None:
+            return self._finish_query(cached)
+
+        async def run() -> AgentResult:
+            resolved = self._resolve_deadline(deadline)
+            try:
+                if self._async_graph is not None:
+                    result = await self._aquery_graph(
+                        question,
+                        scenario=scenario,
+                        listener=listener,
+                        deadline=resolved,
+                    )
+                else:
+                    result = await self._aquery_linear(
+                        question,
+                        scenario=scenario,
+                        listener=listener,
+                        deadline=resolved,
+                    )
+            except asyncio.CancelledError:
+                resolved.cancel()
+                raise
+            return self._finish_query(result, question, scenario, entry)
+
+        if self.single_flight is None or listener is not None:
+            return await run()
+        result, shared = await self.single_flight.ado(
+            answer_cache_key(question, scenario, self.profile.name), run
+        )
+        return self._coalesced(result) if shared else result
+
+    def _coalesced(self, result: AgentResult) -> AgentResult:
+        entry = {
+            "node": "single_flight",
+            "status": "coalesced",
+            "profile": self.profile.name,
+        }
+        return self._finish_query(cached_copy(result, entry))
+
+    def _resolve_deadline(self, deadline: Deadline | float | None) -> Deadline:
+        if isinstance(deadline, Deadline):
+            return deadline
+        return Deadline(self.deadline_seconds if deadline is None else deadline)
+
+    def invalidate_answer(
         self, question: str, *, scenario: str = "data_insight"
+    ) -> bool:
+        if self.answer_cache is None:
+            return False
+        return self.answer_cache.invalidate(
+            answer_cache_key(question, scenario, self.profile.name)
+        )
+
+    def clear_answer_cache(self) -> None:
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+
+    def _lookup_answer(
+        self, question: str, scenario: str
+    ) -> tuple[AgentResult | None, dict[str, Any] | None]:
+        if self.answer_cache is None:
+            return None, None
+        key = answer_cache_key(question, scenario, self.profile.name)
+        cached = self.answer_cache.get(key)
+        if cached is None:
+            return None, {"node": "answer_cache", "status": "miss"}
+        entry = {"node": "answer_cache", "status": "hit", "profile": self.profile.name}
+        return cached_copy(cached, entry), entry
+
+    def _finish_query(
+        self,
+        result: AgentResult,
+        question: str | None = None,
+        scenario: str | None = None,
+        cache_entry: dict[str, Any] | None = None,
     ) -> AgentResult:
-        trace: list[dict[str, Any]] = []
+        if cache_entry is not None and question is not None:
+            result.trace.insert(0, cache_entry)
+            if self.answer_cache is not None and self._cacheable(result):
+                self.answer_cache.set(
+                    answer_cache_key(question, scenario or "", self.profile.name),
+                    replace(result, trace=list(result.trace)),
+                )
+        self.metrics.observe_trace(result.trace)
+        return result
+
+    @staticmethod
+    def _cacheable(result: AgentResult) -> bool:
+        # A short deadline from one caller or a row-capped read must not be
+        # replayed to everyone asking the same question for the whole TTL.
+        return (
+            result.success
+            and not result.truncated
+            and not any(step.get("status") == "degraded" for step in result.trace)
+        )
+
+    def batch(
+        self,
+        items: Iterable[tuple[str, str]],
+        *,
+        concurrency: int | None = None,
+        deadline: float | None = None,
+    ) -> Iterator[tuple[int, AgentResult]]:
+        """Run ``(question, scenario)`` pairs on a thread pool.
+
+        Yields ``(index, result)`` in completion order. Items share this
+        runtime's caches and connection pool; an item that raises becomes a
+        failed ``AgentResult`` instead of ending the batch.
+        """
+        pool = ThreadPoolExecutor(
+            max_workers=concurrency or self.batch_concurrency,
+            thread_name_prefix="agent-batch",
+        )
+        try:
+            futures = {
+                pool.submit(
+                    self.query, question, scenario=scenario, deadline=deadline
+                ): (
+                    index,
+                    question,
+                    scenario,
+                )
+                for index, (question, scenario) in enumerate(items)
+            }
+            for future in as_completed(futures):
+                index, question, scenario = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    result = self._batch_failure(question, scenario, exc)
+                yield index, result
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def abatch(
+        self,
+        items: Iterable[tuple[str, str]],
+        *,
+        concurrency: int | None = None,
+        deadline: float | None = None,
+    ) -> AsyncIterator[tuple[int, AgentResult]]:
+        """Async twin of ``batch``: at most ``concurrency`` items run at once.
+
+        Closing the iterator early cancels unfinished items (and their SQL).
+        """
+        semaphore = asyncio.Semaphore(concurrency or self.batch_concurrency)
+
+        async def run(index: int, question: str, scenario: str):
+            async with semaphore:
+                try:
+                    result = await self.aquery(
+                        question, scenario=scenario, deadline=deadline
+                    )
+                except Exception as exc:
+                    result = self._batch_failure(question, scenario, exc)
+            return index, result
+
+        tasks = [
+            asyncio.create_task(run(index, question, scenario))
+            for index, (question, scenario) in enumerate(items)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _batch_failure(question: str, scenario: str, exc: Exception) -> AgentResult:
+        return AgentResult(
+            question=question,
+            scenario=scenario,
+            success=False,
+            error=f"{type(exc).__name__}: {exc}",
+            trace=[{"node": "batch", "status": "error", "error": str(exc)}],
+        )
+
+    async def astream(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        deadline: Deadline | float | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield node, SQL, rows and analysis-token events while ``aquery`` runs.
+
+        The last event is ``result`` with the full ``AgentResult`` payload.
+        Closing the iterator early cancels the underlying query.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+
+        def listener(event: str, data: dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(queue.put_nowait, {"event": event, "data": data})
+
+        task = asyncio.create_task(
+            self.aquery(
+                question, scenario=scenario, listener=listener, deadline=deadline
+            )
+        )
+        task.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(queue.put_nowait, None)
+        )
+        try:
+            while (item := await queue.get()) is not None:
+                yield item
+            yield {"event": "result", "data": task.result().to_dict()}
+        finally:
+            if not task.done():
+                task.cancel()
+
+    def _query_linear(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        deadline: Deadline | None = None,
+    ) -> AgentResult:
+        trace = AgentTrace(deadline=deadline)
         result = AgentResult(
             question=question, scenario=scenario, success=False, trace=trace
         )
 
         intent = self._classify_intent(question, scenario, trace)
-        schema = self._retrieve_schema(trace)
+        schema = self._retrieve_schema(question, trace)
         sql = self._generate_sql(question, scenario, schema, intent, trace)
         result.sql = sql
 
@@ -127,14 +473,19 @@ class AgentRuntime:
                 result.sql = sql
                 result.safe_sql = None
                 result.error = "; ".join(safety.errors) or "SQL安全校验未通过"
-                return result
+                if not safety.repairable or attempt >= self.max_retries:
+                    return result
+                last_error = result.error
+                sql = self._repair_sql(
+                    question, scenario, schema, sql, last_error, trace
+                )
+                result.sql = sql
+                continue
 
             result.safe_sql = safety.safe_sql
             try:
                 query_result = self._execute_sql(safety.safe_sql or sql, trace)
-                result.columns = list(query_result.get("columns") or [])
-                result.rows = [dict(row) for row in query_result.get("rows") or []]
-                result.row_count = int(query_result.get("row_count", len(result.rows)))
+                self._apply_query_result(result, query_result)
                 self._profile_result(result, trace)
                 self._decide_chart_search_compute(result, trace)
                 result.analysis = self._analyze(question, scenario, result, trace)
@@ -146,18 +497,11 @@ class AgentRuntime:
                 return result
             except Exception as exc:
                 last_error = str(exc)
-                trace.append(
-                    {
-                        "node": "execute_sql",
-                        "status": "error",
-                        "error": last_error,
-                        "attempt": attempt + 1,
-                    }
+                timed_out = self._timed_out(trace, exc)
+                self._record_execute_error(
+                    result, last_error, attempt + 1, trace, timed_out=timed_out
                 )
-                if attempt >= self.max_retries:
-                    result.error = (
-                        f"SQL执行失败，已重试{self.max_retries}次：{last_error}"
-                    )
+                if timed_out or attempt >= self.max_retries:
                     return result
                 sql = self._repair_sql(
                     question, scenario, schema, sql, last_error, trace
@@ -167,27 +511,121 @@ class AgentRuntime:
         result.error = last_error or "Agent执行失败"
         return result
 
-    def _query_graph(
-        self, question: str, *, scenario: str = "data_insight"
+    async def _aquery_linear(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        listener: EventListener | None = None,
+        deadline: Deadline | None = None,
     ) -> AgentResult:
-        trace: list[dict[str, Any]] = []
+        trace = AgentTrace(listener, deadline=deadline)
         result = AgentResult(
             question=question, scenario=scenario, success=False, trace=trace
         )
+
+        intent = self._classify_intent(question, scenario, trace)
+        schema = self._retrieve_schema(question, trace)
+        sql = await self._agenerate_sql(question, scenario, schema, intent, trace)
+        result.sql = sql
+
+        last_error: str | None = None
+        for attempt in range(self.max_retries + 1):
+            safety = await self._avalidate_sql(sql, trace)
+            result.safety = safety.to_dict()
+            if not safety.is_safe:
+                result.sql = sql
+                result.safe_sql = None
+                result.error = "; ".join(safety.errors) or "SQL安全校验未通过"
+                if not safety.repairable or attempt >= self.max_retries:
+                    return result
+                last_error = result.error
+                sql = await self._arepair_sql(
+                    question, scenario, schema, sql, last_error, trace
+                )
+                result.sql = sql
+                continue
+
+            result.safe_sql = safety.safe_sql
+            try:
+                query_result = await self._aexecute_sql(safety.safe_sql or sql, trace)
+                self._apply_query_result(result, query_result)
+                self._profile_result(result, trace)
+                self._decide_chart_search_compute(result, trace)
+                result.analysis = await self._aanalyze(
+                    question, scenario, result, trace
+                )
+                result.report = self._compose_report(result, trace)
+                self._reflect_quality(result, trace)
+                result.success = True
+                result.error = None
+                result.sql = sql
+                return result
+            except Exception as exc:
+                last_error = str(exc)
+                timed_out = self._timed_out(trace, exc)
+                self._record_execute_error(
+                    result, last_error, attempt + 1, trace, timed_out=timed_out
+                )
+                if timed_out or attempt >= self.max_retries:
+                    return result
+                sql = await self._arepair_sql(
+                    question, scenario, schema, sql, last_error, trace
+                )
+                result.sql = sql
+
+        result.error = last_error or "Agent执行失败"
+        return result
+
+    def _query_graph(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        deadline: Deadline | None = None,
+    ) -> AgentResult:
         state = self._graph.invoke(
-            {
-                "question": question,
-                "scenario": scenario,
-                "trace": trace,
-                "result": result,
-                "attempt": 0,
-                "last_error": None,
-                "execution_ok": False,
-            }
+            self._initial_state(question, scenario, deadline=deadline)
+        )
+        return state["result"]
+
+    async def _aquery_graph(
+        self,
+        question: str,
+        *,
+        scenario: str = "data_insight",
+        listener: EventListener | None = None,
+        deadline: Deadline | None = None,
+    ) -> AgentResult:
+        state = await self._async_graph.ainvoke(
+            self._initial_state(question, scenario, listener, deadline=deadline)
         )
         return state["result"]
 
-    def _build_langgraph(self) -> Any | None:
+    @staticmethod
+    def _initial_state(
+        question: str,
+        scenario: str,
+        listener: EventListener | None = None,
+        *,
+        deadline: Deadline | None = None,
+    ) -> AgentState:
+        trace = AgentTrace(listener, deadline=deadline)
+        result = AgentResult(
+            question=question, scenario=scenario, success=False, trace=trace
+        )
+        return {
+            "question": question,
+            "scenario": scenario,
+            "trace": trace,
+            "result": result,
+            "attempt": 0,
+            "last_error": None,
+            "execution_ok": False,
+            "timed_out": False,
+        }
+
+    def _build_langgraph(self, *, asynchronous: bool = False) -> Any | None:
         try:
             from langgraph.graph import END, StateGraph
         except Exception:
@@ -196,15 +634,29 @@ class AgentRuntime:
         graph = StateGraph(AgentState)
         graph.add_node("classify_intent", self._graph_classify_intent)
         graph.add_node("retrieve_schema", self._graph_retrieve_schema)
-        graph.add_node("generate_sql", self._graph_generate_sql)
-        graph.add_node("validate_sql", self._graph_validate_sql)
-        graph.add_node("execute_sql", self._graph_execute_sql)
-        graph.add_node("repair_sql", self._graph_repair_sql)
+        graph.add_node(
+            "generate_sql",
+            self._agraph_generate_sql if asynchronous else self._graph_generate_sql,
+        )
+        graph.add_node(
+            "validate_sql",
+            self._agraph_validate_sql if asynchronous else self._graph_validate_sql,
+        )
+        graph.add_node(
+            "execute_sql",
+            self._agraph_execute_sql if asynchronous else self._graph_execute_sql,
+        )
+        graph.add_node(
+            "repair_sql",
+            self._agraph_repair_sql if asynchronous else self._graph_repair_sql,
+        )
         graph.add_node("profile_result", self._graph_profile_result)
         graph.add_node(
             "decide_chart_search_compute", self._graph_decide_chart_search_compute
         )
-        graph.add_node("analyze", self._graph_analyze)
+        graph.add_node(
+            "analyze", self._agraph_analyze if asynchronous else self._graph_analyze
+        )
         graph.add_node("compose_report", self._graph_compose_report)
         graph.add_node("reflect_quality", self._graph_reflect_quality)
 
@@ -215,7 +667,7 @@ class AgentRuntime:
         graph.add_conditional_edges(
             "validate_sql",
             self._graph_after_validate,
-            {"execute": "execute_sql", "end": END},
+            {"execute": "execute_sql", "repair": "repair_sql", "end": END},
         )
         graph.add_conditional_edges(
             "execute_sql",
@@ -239,7 +691,7 @@ class AgentRuntime:
         return state
 
     def _graph_retrieve_schema(self, state: AgentState) -> AgentState:
-        state["schema"] = self._retrieve_schema(state["trace"])
+        state["schema"] = self._retrieve_schema(state["question"], state["trace"])
         return state
 
     def _graph_generate_sql(self, state: AgentState) -> AgentState:
@@ -254,20 +706,49 @@ class AgentRuntime:
         state["result"].sql = sql
         return state
 
+    async def _agraph_generate_sql(self, state: AgentState) -> AgentState:
+        sql = await self._agenerate_sql(
+            state["question"],
+            state["scenario"],
+            state["schema"],
+            state["intent"],
+            state["trace"],
+        )
+        state["sql"] = sql
+        state["result"].sql = sql
+        return state
+
     def _graph_validate_sql(self, state: AgentState) -> AgentState:
         safety = self._validate_sql(state["sql"], state["trace"])
+        return self._graph_validated(state, safety)
+
+    async def _agraph_validate_sql(self, state: AgentState) -> AgentState:
+        safety = await self._avalidate_sql(state["sql"], state["trace"])
+        return self._graph_validated(state, safety)
+
+    @staticmethod
+    def _graph_validated(state: AgentState, safety: SafeSQLReport) -> AgentState:
         state["safety"] = safety
         state["result"].safety = safety.to_dict()
         if not safety.is_safe:
             state["result"].sql = state["sql"]
             state["result"].safe_sql = None
             state["result"].error = "; ".join(safety.errors) or "SQL安全校验未通过"
+            if safety.repairable:
+                # A plan rejected for cost uses up an attempt like a failed run.
+                state["attempt"] = int(state.get("attempt", 0)) + 1
+                state["last_error"] = state["result"].error
         else:
             state["result"].safe_sql = safety.safe_sql
         return state
 
     def _graph_after_validate(self, state: AgentState) -> str:
-        return "execute" if state["safety"].is_safe else "end"
+        safety = state["safety"]
+        if safety.is_safe:
+            return "execute"
+        if safety.repairable and int(state.get("attempt", 0)) <= self.max_retries:
+            return "repair"
+        return "end"
 
     def _graph_execute_sql(self, state: AgentState) -> AgentState:
         state["attempt"] = int(state.get("attempt", 0)) + 1
@@ -275,35 +756,49 @@ class AgentRuntime:
             query_result = self._execute_sql(
                 state["safety"].safe_sql or state["sql"], state["trace"]
             )
-            result = state["result"]
-            result.columns = list(query_result.get("columns") or [])
-            result.rows = [dict(row) for row in query_result.get("rows") or []]
-            result.row_count = int(query_result.get("row_count", len(result.rows)))
-            result.sql = state["sql"]
-            result.error = None
-            state["execution_ok"] = True
-            state["last_error"] = None
         except Exception as exc:
-            last_error = str(exc)
-            state["execution_ok"] = False
-            state["last_error"] = last_error
-            state["trace"].append(
-                {
-                    "node": "execute_sql",
-                    "status": "error",
-                    "error": last_error,
-                    "attempt": state["attempt"],
-                }
+            return self._graph_execute_failed(state, exc)
+        return self._graph_execute_succeeded(state, query_result)
+
+    async def _agraph_execute_sql(self, state: AgentState) -> AgentState:
+        state["attempt"] = int(state.get("attempt", 0)) + 1
+        try:
+            query_result = await self._aexecute_sql(
+                state["safety"].safe_sql or state["sql"], state["trace"]
             )
-            if state["attempt"] > self.max_retries:
-                state["result"].error = (
-                    f"SQL执行失败，已重试{self.max_retries}次：{last_error}"
-                )
+        except Exception as exc:
+            return self._graph_execute_failed(state, exc)
+        return self._graph_execute_succeeded(state, query_result)
+
+    def _graph_execute_succeeded(
+        self, state: AgentState, query_result: dict[str, Any]
+    ) -> AgentState:
+        result = state["result"]
+        self._apply_query_result(result, query_result)
+        result.sql = state["sql"]
+        result.error = None
+        state["execution_ok"] = True
+        state["last_error"] = None
+        return state
+
+    def _graph_execute_failed(self, state: AgentState, exc: Exception) -> AgentState:
+        state["execution_ok"] = False
+        state["last_error"] = str(exc)
+        state["timed_out"] = self._timed_out(state["trace"], exc)
+        self._record_execute_error(
+            state["result"],
+            state["last_error"],
+            state["attempt"],
+            state["trace"],
+            timed_out=state["timed_out"],
+        )
         return state
 
     def _graph_after_execute(self, state: AgentState) -> str:
         if state.get("execution_ok"):
             return "profile"
+        if state.get("timed_out"):
+            return "end"
         return "repair" if int(state.get("attempt", 0)) <= self.max_retries else "end"
 
     def _graph_repair_sql(self, state: AgentState) -> AgentState:
@@ -319,6 +814,19 @@ class AgentRuntime:
         state["result"].sql = sql
         return state
 
+    async def _agraph_repair_sql(self, state: AgentState) -> AgentState:
+        sql = await self._arepair_sql(
+            state["question"],
+            state["scenario"],
+            state["schema"],
+            state["sql"],
+            state.get("last_error") or "",
+            state["trace"],
+        )
+        state["sql"] = sql
+        state["result"].sql = sql
+        return state
+
     def _graph_profile_result(self, state: AgentState) -> AgentState:
         self._profile_result(state["result"], state["trace"])
         return state
@@ -336,6 +844,15 @@ class AgentRuntime:
         )
         return state
 
+    async def _agraph_analyze(self, state: AgentState) -> AgentState:
+        state["result"].analysis = await self._aanalyze(
+            state["question"],
+            state["scenario"],
+            state["result"],
+            state["trace"],
+        )
+        return state
+
     def _graph_compose_report(self, state: AgentState) -> AgentState:
         state["result"].report = self._compose_report(state["result"], state["trace"])
         return state
@@ -349,16 +866,36 @@ class AgentRuntime:
     def _classify_intent(
         self, question: str, scenario: str, trace: list[dict[str, Any]]
     ) -> dict[str, Any]:
-        intent = {"scenario": scenario, "needs_report": True}
-        trace.append({"node": "classify_intent", "status": "ok", "intent": intent})
+        intent: dict[str, Any] = {"scenario": scenario, "needs_report": True}
+        entry: dict[str, Any] = {"node": "classify_intent", "status": "ok"}
+        if self.templates is not None:
+            match = self.templates.best(question, scenario)
+            hit = match is not None and (
+                match.confidence >= self.templates.min_confidence
+            )
+            if match is not None:
+                intent.update(match.to_dict())
+            if hit:
+                intent["template_sql"] = match.sql
+            entry["template"] = "hit" if hit else "miss"
+        entry["intent"] = {k: v for k, v in intent.items() if k != "template_sql"}
+        trace.append(entry)
         return intent
 
-    def _retrieve_schema(self, trace: list[dict[str, Any]]) -> str:
-        schema = self.profile.load_schema()
+    def _retrieve_schema(self, question: str, trace: list[dict[str, Any]]) -> str:
+        selection = schema_index_for(self.profile).retrieve(
+            question, token_budget=self.schema_token_budget
+        )
         trace.append(
-            {"node": "retrieve_schema", "status": "ok", "profile": self.profile.name}
+            {
+                "node": "retrieve_schema",
+                "status": "ok",
+                "profile": self.profile.name,
+                "tables": selection.tables,
+                "schema_tokens": selection.tokens,
+            }
         )
-        return schema
+        return selection.text
 
     def _generate_sql(
         self,
@@ -368,13 +905,34 @@ class AgentRuntime:
         intent: dict[str, Any],
         trace: list[dict[str, Any]],
     ) -> str:
-        prompt = f"""你是一个严谨的 MySQL Text2SQL 专家。
+        if intent.get("template_sql"):
+            return self._template_sql(intent, question, scenario, trace)
+        prompt = self._generate_sql_prompt(question, scenario, schema)
+        sql = self._complete(prompt, temperature=0.1, max_tokens=1500)
+        return self._finish_generate_sql(sql, question, scenario, trace)
+
+    async def _agenerate_sql(
+        self,
+        question: str,
+        scenario: str,
+        schema: str,
+        intent: dict[str, Any],
+        trace: list[dict[str, Any]],
+    ) -> str:
+        if intent.get("template_sql"):
+            return self._template_sql(intent, question, scenario, trace)
+        prompt = self._generate_sql_prompt(question, scenario, schema)
+        sql = await self._acomplete(prompt, temperature=0.1, max_tokens=1500)
+        return self._finish_generate_sql(sql, question, scenario, trace)
+
+    def _generate_sql_prompt(self, question: str, scenario: str, schema: str) -> str:
+        return f"""你是一个严谨的 MySQL Text2SQL 专家。
 
 ## 当前数据库专用指南
 {self.profile.sql_guidance}
 
 ## 数据库Schema和规则
-{schema[:12000]}
+{schema}
 
 ## 场景
 {scenario}
@@ -391,41 +949,201 @@ class AgentRuntime:
 6. 必须包含 LIMIT，除非是 COUNT/SUM 这类单行聚合。
 7. 输出前自检：所有字段必须存在于 Schema；所有表必须在白名单；不要把子查询别名当表；不要使用库中不存在的中文名称字段。
 """
-        sql = self.llm.complete(
-            [{"role": "user", "content": prompt}], temperature=0.1, max_tokens=1500
-        )
-        trace.append({"node": "generate_sql", "status": "ok"})
+
+    def _finish_generate_sql(
+        self, sql: str, question: str, scenario: str, trace: list[dict[str, Any]]
+    ) -> str:
+        trace.append(self._with_llm_info({"node": "generate_sql", "status": "ok"}))
         return self._apply_question_sql_constraints(
             self._strip_markdown(sql), question, scenario
         )
 
+    def _template_sql(
+        self,
+        intent: dict[str, Any],
+        question: str,
+        scenario: str,
+        trace: list[dict[str, Any]],
+    ) -> str:
+        trace.append(
+            {
+                "node": "generate_sql",
+                "status": "ok",
+                "source": "template",
+                "template": intent["template"],
+            }
+        )
+        return self._apply_question_sql_constraints(
+            intent["template_sql"], question, scenario
+        )
+
     def _validate_sql(self, sql: str, trace: list[dict[str, Any]]) -> SafeSQLReport:
+        report = self._enforce_safe_sql(sql)
+        if self.cost_guard is not None:
+            self._check_cost(report)
+        return self._record_validate(report, trace)
+
+    async def _avalidate_sql(
+        self, sql: str, trace: list[dict[str, Any]]
+    ) -> SafeSQLReport:
+        report = self._enforce_safe_sql(sql)
+        if self.cost_guard is not None:
+            await asyncio.to_thread(self._check_cost, report)
+        return self._record_validate(report, trace)
+
+    def _check_cost(self, report: SafeSQLReport) -> None:
+        # SQL answered by the result cache, a rollup or the analytic mirror
+        # never reaches MySQL, so its EXPLAIN round trip would be pure latency.
+        bypasses = getattr(self.sql_executor, "bypasses_database", None)
+        layer = (
+            bypasses(report.safe_sql) if report.is_safe and callable(bypasses) else None
+        )
+        if layer is not None:
+            report.cost = {"skipped": layer}
+            return
+        self.cost_guard.check(report)
+
+    def _enforce_safe_sql(self, sql: str) -> SafeSQLReport:
         report = enforce_safe_sql(
             sql,
             allowed_tables=self.profile.allowed_tables,
             max_limit=self.max_limit,
         )
-        trace.append(
-            {
-                "node": "validate_sql",
-                "status": "ok" if report.is_safe else "rejected",
-                "errors": list(report.errors),
-                "modifications": list(report.modifications),
-            }
-        )
+        if self.column_validator is not None:
+            self.column_validator.check(report)
+        if self.sargable is not None:
+            self.sargable.rewrite(report)
+        return report
+
+    @staticmethod
+    def _record_validate(
+        report: SafeSQLReport, trace: list[dict[str, Any]]
+    ) -> SafeSQLReport:
+        entry = {
+            "node": "validate_sql",
+            "status": "ok" if report.is_safe else "rejected",
+            "safe_sql": report.safe_sql,
+            "errors": list(report.errors),
+            "modifications": list(report.modifications),
+        }
+        if report.warnings:
+            entry["warnings"] = list(report.warnings)
+        if report.cost is not None:
+            entry["cost"] = report.cost
+        if report.repairable:
+            entry["repairable"] = True
+        trace.append(entry)
         return report
 
     def _execute_sql(self, sql: str, trace: list[dict[str, Any]]) -> dict[str, Any]:
-        result = self.sql_executor(sql)
-        trace.append(
+        deadline = getattr(trace, "deadline", None)
+        if deadline is not None:
+            deadline.check("execute_sql")
+        # The executor reads the deadline from a context variable so that
+        # plain ``Callable[[str], dict]`` executors keep their signature.
+        with use_deadline(deadline):
+            result = self.sql_executor(sql)
+        self._record_execute_ok(result, trace)
+        return result
+
+    async def _aexecute_sql(
+        self, sql: str, trace: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        deadline = getattr(trace, "deadline", None)
+        if deadline is not None:
+            deadline.check("execute_sql")
+        aexecute = getattr(self.sql_executor, "aexecute", None)
+        # asyncio.to_thread copies the context, so worker threads see it too.
+        with use_deadline(deadline):
+            if aexecute is not None:
+                result = await aexecute(sql)
+            else:
+                result = await asyncio.to_thread(self.sql_executor, sql)
+        self._record_execute_ok(result, trace)
+        self._emit(
+            trace,
+            "rows",
             {
-                "node": "execute_sql",
-                "status": "ok",
+                "columns": list(result.get("columns") or []),
+                "rows": list(result.get("rows") or []),
                 "row_count": result.get("row_count", 0),
-            }
+            },
         )
         return result
 
+    def _record_execute_ok(
+        self, result: dict[str, Any], trace: list[dict[str, Any]]
+    ) -> None:
+        entry = {
+            "node": "execute_sql",
+            "status": "ok",
+            "row_count": result.get("row_count", 0),
+        }
+        entry["bytes"] = (
+            result["bytes"]
+            if "bytes" in result
+            else estimate_result_bytes(result.get("rows"))
+        )
+        if result.get("truncated"):
+            entry["truncated"] = result["truncated"]
+        if "cache" in result:
+            entry["cache"] = result["cache"]
+        if "mirror" in result:
+            entry["mirror"] = result["mirror"]
+        if "rollup" in result:
+            entry["rollup"] = result["rollup"]
+        stats = getattr(self.sql_executor, "stats", None)
+        pool_stats = stats() if callable(stats) else None
+        if pool_stats:
+            entry["pool"] = pool_stats
+        trace.append(entry)
+
+    def _record_execute_error(
+        self,
+        result: AgentResult,
+        error: str,
+        attempt: int,
+        trace: list[dict[str, Any]],
+        *,
+        timed_out: bool = False,
+    ) -> None:
+        entry = {
+            "node": "execute_sql",
+            "status": "error",
+            "error": error,
+            "attempt": attempt,
+        }
+        if timed_out:
+            entry["timeout"] = True
+        trace.append(entry)
+        if timed_out:
+            result.error = f"查询超时，已停止执行：{error}"
+        elif attempt > self.max_retries:
+            result.error = f"SQL执行失败，已重试{self.max_retries}次：{error}"
+
+    @staticmethod
+    def _timed_out(trace: list[dict[str, Any]], exc: Exception | None = None) -> bool:
+        if isinstance(exc, DeadlineExceeded):
+            return True
+        deadline = getattr(trace, "deadline", None)
+        return deadline is not None and deadline.expired()
+
+    @staticmethod
+    def _apply_query_result(result: AgentResult, query_result: dict[str, Any]) -> None:
+        # The pooled executor already returns a columnar table (shared
+        # read-only with the SQL cache); other executors' rows are packed once.
+        table = query_result.get("table")
+        if not isinstance(table, QueryResult):
+            table = QueryResult.from_rows(
+                list(query_result.get("columns") or []),
+                query_result.get("rows") or [],
+            )
+        result.table = table
+        result.columns = list(table.columns)
+        result.rows = table.rows
+        result.row_count = int(query_result.get("row_count", len(table)))
+        result.truncated = query_result.get("truncated")
+
     def _repair_sql(
         self,
         question: str,
@@ -435,7 +1153,27 @@ class AgentRuntime:
         error: str,
         trace: list[dict[str, Any]],
     ) -> str:
-        prompt = f"""SQL执行失败，请根据错误和Schema修复。
+        prompt = self._repair_sql_prompt(question, scenario, schema, sql, error)
+        repaired = self._complete(prompt, temperature=0.1, max_tokens=1500)
+        return self._finish_repair_sql(repaired, question, scenario, error, trace)
+
+    async def _arepair_sql(
+        self,
+        question: str,
+        scenario: str,
+        schema: str,
+        sql: str,
+        error: str,
+        trace: list[dict[str, Any]],
+    ) -> str:
+        prompt = self._repair_sql_prompt(question, scenario, schema, sql, error)
+        repaired = await self._acomplete(prompt, temperature=0.1, max_tokens=1500)
+        return self._finish_repair_sql(repaired, question, scenario, error, trace)
+
+    def _repair_sql_prompt(
+        self, question: str, scenario: str, schema: str, sql: str, error: str
+    ) -> str:
+        return f"""SQL执行失败，请根据错误和Schema修复。
 
 ## 用户问题
 {question}
@@ -450,7 +1188,7 @@ class AgentRuntime:
 {error}
 
 ## Schema
-{schema[:12000]}
+{schema}
 
 ## 当前数据库专用指南
 {self.profile.sql_guidance}
@@ -460,13 +1198,22 @@ class AgentRuntime:
 2. 如果错误是 Unknown column，必须换成 Schema 中真实存在的字段。
 3. 如果错误是非白名单表，必须改用白名单表或兼容视图。
 4. 如果是企业详情类查询，优先使用企业主表 + 聚合子查询，避免多事实表直接 JOIN 放大行数。
+5. 如果错误是执行计划代价超限（扫描行数、无索引 JOIN、大结果排序），必须收窄过滤条件、先聚合再 JOIN 或减少排序的数据量。
 
 只返回修复后的SQL，不要解释，不要Markdown代码块。
 """
-        repaired = self.llm.complete(
-            [{"role": "user", "content": prompt}], temperature=0.1, max_tokens=1500
+
+    def _finish_repair_sql(
+        self,
+        repaired: str,
+        question: str,
+        scenario: str,
+        error: str,
+        trace: list[dict[str, Any]],
+    ) -> str:
+        trace.append(
+            self._with_llm_info({"node": "repair_sql", "status": "ok", "error": error})
         )
-        trace.append({"node": "repair_sql", "status": "ok", "error": error})
         return self._apply_question_sql_constraints(
             self._strip_markdown(repaired), question, scenario
         )
@@ -501,20 +1248,80 @@ class AgentRuntime:
         trace: list[dict[str, Any]],
     ) -> str:
         if result.row_count == 0:
-            analysis = (
-                "查询结果为空。请在报告中说明当前数据库没有返回对应数据，不要编造结论。"
-            )
-            trace.append({"node": "analyze", "status": "empty"})
-            return analysis
+            return self._empty_analysis(trace)
+        if self._analysis_budget_short(trace):
+            return self._degraded_analysis(result, trace)
+        prompt = self._analyze_prompt(question, scenario, result)
+        analysis = self._complete(prompt, temperature=0.2, max_tokens=1500)
+        return self._finish_analyze(analysis, result, trace)
+
+    async def _aanalyze(
+        self,
+        question: str,
+        scenario: str,
+        result: AgentResult,
+        trace: list[dict[str, Any]],
+    ) -> str:
+        if result.row_count == 0:
+            return self._empty_analysis(trace)
+        if self._analysis_budget_short(trace):
+            return self._degraded_analysis(result, trace)
+        prompt = self._analyze_prompt(question, scenario, result)
+        if getattr(trace, "listener", None) is not None and hasattr(
+            self.llm, "astream"
+        ):
+            analysis = await self._astream_analysis(prompt, trace)
+        else:
+            analysis = await self._acomplete(prompt, temperature=0.2, max_tokens=1500)
+        return self._finish_analyze(analysis, result, trace)
+
+    async def _astream_analysis(self, prompt: str, trace: list[dict[str, Any]]) -> str:
+        take_completion_info()
+        chunks: list[str] = []
+        async for token in self.llm.astream(
+            [{"role": "user", "content": prompt}], temperature=0.2, max_tokens=1500
+        ):
+            chunks.append(token)
+            self._emit(trace, "token", {"node": "analyze", "text": token})
+        return "".join(chunks)
 
+    @staticmethod
+    def _emit(trace: list[dict[str, Any]], event: str, data: dict[str, Any]) -> None:
+        emit = getattr(trace, "emit", None)
+        if emit is not None:
+            emit(event, data)
+
+    def _analysis_budget_short(self, trace: list[dict[str, Any]]) -> bool:
+        deadline = getattr(trace, "deadline", None)
+        return (
+            deadline is not None
+            and deadline.bounded
+            and deadline.remaining() < self.analyze_min_seconds
+        )
+
+    def _degraded_analysis(
+        self, result: AgentResult, trace: list[dict[str, Any]]
+    ) -> str:
+        # Not enough budget left for an LLM call; summarize the rows instead.
+        trace.append({"node": "analyze", "status": "degraded", "reason": "deadline"})
+        return self._fallback_analysis(result, "查询剩余时间不足，已跳过模型分析")
+
+    @staticmethod
+    def _empty_analysis(trace: list[dict[str, Any]]) -> str:
+        trace.append({"node": "analyze", "status": "empty"})
+        return "查询结果为空。请在报告中说明当前数据库没有返回对应数据，不要编造结论。"
+
+    @staticmethod
+    def _analyze_prompt(question: str, scenario: str, result: AgentResult) -> str:
         preview = result.rows[:10]
-        prompt = f"""你是地区产业发展分析专家。请基于真实查询结果生成简洁专业的数据解读。
+        truncated = "（已达到读取上限，结果被截断）" if result.truncated else ""
+        return f"""你是地区产业发展分析专家。请基于真实查询结果生成简洁专业的数据解读。
 
 问题：{question}
 场景：{scenario}
 SQL：{result.safe_sql}
 字段：{result.columns}
-行数：{result.row_count}
+行数：{result.row_count}{truncated}
 数据预览：{preview}
 
 要求：
@@ -522,16 +1329,49 @@ SQL：{result.safe_sql}
 2. 如果只看到预览数据，明确使用“当前返回结果显示”。
 3. 输出Markdown，包含“核心发现”和“分析局限性”。
 """
-        analysis = self.llm.complete(
-            [{"role": "user", "content": prompt}], temperature=0.2, max_tokens=1500
-        )
-        trace.append({"node": "analyze", "status": "ok"})
+
+    def _finish_analyze(
+        self, analysis: str, result: AgentResult, trace: list[dict[str, Any]]
+    ) -> str:
+        trace.append(self._with_llm_info({"node": "analyze", "status": "ok"}))
         analysis = analysis.strip()
         if not analysis:
             trace.append({"node": "analyze", "status": "fallback_empty_llm"})
             return self._fallback_analysis(result)
         return analysis
 
+    @staticmethod
+    def _with_llm_info(entry: dict[str, Any]) -> dict[str, Any]:
+        info = take_completion_info()
+        if info is not None:
+            entry["llm"] = info
+        return entry
+
+    def _complete(self, prompt: str, *, temperature: float, max_tokens: int) -> str:
+        take_completion_info()
+        return self.llm.complete(
+            [{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+    async def _acomplete(
+        self, prompt: str, *, temperature: float, max_tokens: int
+    ) -> str:
+        take_completion_info()
+        messages = [{"role": "user", "content": prompt}]
+        acomplete = getattr(self.llm, "acomplete", None)
+        if acomplete is not None:
+            return await acomplete(
+                messages, temperature=temperature, max_tokens=max_tokens
+            )
+        return await asyncio.to_thread(
+            self.llm.complete,
+            messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
     def _compose_report(self, result: AgentResult, trace: list[dict[str, Any]]) -> str:
         rows_md = self._rows_to_markdown(result.columns, result.rows[:20])
         report = f"""# Text2SQL 分析报告
@@ -610,7 +1450,9 @@ SQL：{result.safe_sql}
         return f"{clean} LIMIT {limit}"
 
     @staticmethod
-    def _fallback_analysis(result: AgentResult) -> str:
+    def _fallback_analysis(
+        result: AgentResult, reason: str = "模型分析返回为空"
+    ) -> str:
         preview = result.rows[:3]
         return f"""### 核心发现
 
@@ -620,7 +1462,7 @@ SQL：{result.safe_sql}
 
 ### 分析局限性
 
-模型分析返回为空，以上内容为系统基于 SQL 结果生成的兜底摘要；详细业务判断仍需结合完整结果、字段口径和外部背景进行复核。"""
+{reason}，以上内容为系统基于 SQL 结果生成的兜底摘要；详细业务判断仍需结合完整结果、字段口径和外部背景进行复核。"""
 
     @staticmethod
     def _rows_to_markdown(columns: list[str], rows: list[dict[str, Any]]) -> str:
@@ -639,13 +1481,8 @@ SQL：{result.safe_sql}
     def _infer_chart(result: AgentResult) -> dict[str, Any] | None:
         if result.row_count == 0 or len(result.columns) < 2:
             return None
-        numeric_cols = []
-        for col in result.columns:
-            if any(
-                isinstance(row.get(col), (int, float, Decimal))
-                for row in result.rows[:20]
-            ):
-                numeric_cols.append(col)
+        table = result.table or QueryResult.from_rows(result.columns, result.rows)
+        numeric_cols = table.numeric_columns()
         if not numeric_cols:
             return None
         x_col = next(
@@ -665,23 +1502,4 @@ SQL：{result.safe_sql}
 
     @staticmethod
     def _build_sql_executor(db_config: dict[str, Any]) -> SQLExecutor:
-        def execute(sql: str) -> dict[str, Any]:
-            conn_params = {
-                key: value
-                for key, value in db_config.items()
-                if key in {"host", "port", "user", "password", "database", "charset"}
-                and value is not None
-            }
-            conn_params.setdefault("charset", "utf8mb4")
-            conn = pymysql.connect(**conn_params)
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute(sql)
-                    raw_rows = cursor.fetchall()
-                    columns = [desc[0] for desc in cursor.description or []]
-                rows = [dict(zip(columns, row)) for row in raw_rows]
-                return {"columns": columns, "rows": rows, "row_count": len(rows)}
-            finally:
-                conn.close()
-
-        return execute
+        return build_sql_executor(db_config)
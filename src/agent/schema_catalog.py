@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+_BACKTICKED = re.compile(r"`([^`]+)`")
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    table: str
+    name: str
+    line: str
+    fields: dict[str, str]
+
+    @property
+    def role(self) -> str:
+        return self.fields.get("Role", "")
+
+    @property
+    def description(self) -> str:
+        return self.fields.get("Description", "")
+
+
+@dataclass
+class TableSection:
+    """One ``###`` table or view section with its column table."""
+
+    name: str
+    heading: str
+    kind: str
+    header_lines: list[str]
+    column_header: list[str]
+    columns: list[ColumnSpec] = field(default_factory=list)
+
+    @property
+    def is_view(self) -> bool:
+        return self.kind == "view"
+
+    @property
+    def description(self) -> str:
+        for line in self.header_lines:
+            if line.startswith("- 描述："):
+                return line.removeprefix("- 描述：").strip()
+        return ""
+
+    def column_names(self) -> list[str]:
+        return [column.name for column in self.columns]
+
+
+@dataclass(frozen=True)
+class TextSection:
+    heading: str
+    body: str
+
+    @property
+    def title(self) -> str:
+        return self.heading.lstrip("#").strip()
+
+    @property
+    def text(self) -> str:
+        return f"{self.heading}\n{self.body}".strip()
+
+    @property
+    def sql(self) -> str:
+        """SQL inside the first fenced ``sql`` block, if any."""
+        match = re.search(r"```sql\n(.*?)```", self.body, re.S)
+        return match.group(1).strip() if match else ""
+
+
+@dataclass
+class SchemaCatalog:
+    """Parsed schema markdown: tables, views, columns, rules and SQL templates."""
+
+    text: str
+    path: Path | None = None
+    version: tuple[int, int] | None = None
+    sections: list[TextSection] = field(default_factory=list)
+    tables: dict[str, TableSection] = field(default_factory=dict)
+    rules: list[TextSection] = field(default_factory=list)
+    templates: list[TextSection] = field(default_factory=list)
+    notes: list[TextSection] = field(default_factory=list)
+
+    @classmethod
+    def from_markdown(
+        cls,
+        text: str,
+        *,
+        path: Path | None = None,
+        version: tuple[int, int] | None = None,
+    ) -> "SchemaCatalog":
+        catalog = cls(text=text, path=path, version=version)
+        for heading, body in split_sections(text, "## "):
+            catalog.sections.append(TextSection(heading, body))
+            if "规则" in heading:
+                catalog.rules.append(TextSection(heading, body))
+                continue
+            kind = "view" if "视图" in heading else "table"
+            for sub_heading, sub_body in split_sections(body, "### "):
+                if "| Column |" in sub_body:
+                    table = _parse_table(sub_heading, sub_body, kind)
+                    catalog.tables[table.name] = table
+                elif "```sql" in sub_body:
+                    catalog.templates.append(TextSection(sub_heading, sub_body))
+                else:
+                    catalog.notes.extend(
+                        TextSection(heading, line)
+                        for line in sub_body.splitlines()
+                        if line.startswith("- ")
+                    )
+        return catalog
+
+    @property
+    def views(self) -> dict[str, TableSection]:
+        return {name: table for name, table in self.tables.items() if table.is_view}
+
+    def columns(self, table: str) -> list[str]:
+        section = self.tables.get(table)
+        return section.column_names() if section else []
+
+    def temporal_columns(self) -> set[str]:
+        """Column names typed DATE/DATETIME/TIMESTAMP in every table using them."""
+        temporal: set[str] = set()
+        other: set[str] = set()
+        for section in self.tables.values():
+            for column in section.columns:
+                mysql_type = column.fields.get("MySQL Type", "").strip("`").lower()
+                is_temporal = mysql_type.startswith(("date", "timestamp"))
+                (temporal if is_temporal else other).add(column.name)
+        return temporal - other
+
+    def section(self, title: str) -> TextSection | None:
+        """First ``##`` section whose heading contains ``title``."""
+        return next(
+            (section for section in self.sections if title in section.heading), None
+        )
+
+
+def split_sections(text: str, marker: str) -> list[tuple[str, str]]:
+    """Split markdown into (heading, body) pairs at lines starting with ``marker``.
+
+    Text before the first heading is returned with an empty heading.
+    """
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    for line in text.splitlines():
+        if line.startswith(marker):
+            sections.append((line.strip(), []))
+        else:
+            sections[-1][1].append(line)
+    return [
+        (heading, "\n".join(lines).strip())
+        for heading, lines in sections
+        if heading or any(line.strip() for line in lines)
+    ]
+
+
+def _parse_table(heading: str, body: str, kind: str) -> TableSection:
+    match = _BACKTICKED.search(heading)
+    name = match.group(1) if match else heading.lstrip("# ").strip()
+    rows = [line for line in body.splitlines() if line.startswith("|")]
+    table = TableSection(
+        name=name,
+        heading=heading,
+        kind=kind,
+        header_lines=[line for line in body.splitlines() if line.startswith("- ")],
+        column_header=rows[:2],
+    )
+    header = [cell.strip() for cell in rows[0].strip("|").split("|")] if rows else []
+    for line in rows[2:]:
+        cells = [cell.strip() for cell in line.strip("|").split("|")]
+        column = _BACKTICKED.search(cells[0])
+        if column is None:
+            continue
+        table.columns.append(
+            ColumnSpec(
+                table=name,
+                name=column.group(1),
+                line=line,
+                fields=dict(zip(header, cells)),
+            )
+        )
+    return table
+
+
+_CATALOGS: dict[Path, SchemaCatalog] = {}
+_LOCK = threading.Lock()
+
+
+def load_catalog(path: str | Path) -> SchemaCatalog:
+    """Parsed catalog for ``path``, re-read only when its mtime or size changes.
+
+    Editing the markdown is picked up on the next call, so the API does not
+    need a restart. A missing file raises ``FileNotFoundError``.
+    """
+    resolved = Path(path).resolve()
+    stat = os.stat(resolved)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _LOCK:
+        cached = _CATALOGS.get(resolved)
+        if cached is not None and cached.version == version:
+            return cached
+    catalog = SchemaCatalog.from_markdown(
+        resolved.read_text(encoding="utf-8"), path=resolved, version=version
+    )
+    with _LOCK:
+        _CATALOGS[resolved] = catalog
+    return catalog
+
+
+def clear_catalog_cache() -> None:
+    with _LOCK:
+        _CATALOGS.clear()
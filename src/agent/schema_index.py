@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from .profiles import DatabaseProfile
+from .schema_catalog import ColumnSpec, SchemaCatalog, TableSection, TextSection
+
+_CJK = re.compile(r"[\u3400-\u9fff]")
+_CJK_RUN = re.compile(r"[\u3400-\u9fff]+")
+_ASCII_WORD = re.compile(r"[a-z0-9_]+")
+
+MAX_TABLES = 4
+MAX_TEMPLATES = 2
+MAX_NOTES = 6
+# Tables and columns scoring below this share of the best match are left out.
+RELATIVE_TABLE_CUTOFF = 0.3
+RELATIVE_COLUMN_CUTOFF = 0.3
+# Wide tables repeat the columns of the tables they were joined from; those
+# copies count for less so the table that owns a column ranks first.
+INHERITED_COLUMN_WEIGHT = 0.3
+
+
+def tokenize(text: str) -> list[str]:
+    """ASCII words (and their ``_`` parts) plus CJK character bigrams."""
+    lowered = text.lower()
+    terms: list[str] = []
+    for word in _ASCII_WORD.findall(lowered):
+        terms.append(word)
+        parts = [part for part in word.split("_") if part]
+        if len(parts) > 1:
+            terms.extend(parts)
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            terms.append(run)
+        terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, four ASCII characters per token."""
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+@dataclass
+class ColumnChunk:
+    table: str
+    name: str
+    line: str
+    search_text: str
+    inherited: bool = False
+
+
+def _key_columns(table: TableSection) -> list[ColumnSpec]:
+    return [
+        column
+        for column in table.columns
+        if column.name in {"eid", "name"} or column.name.endswith("_eid")
+    ]
+
+
+@dataclass
+class SchemaSelection:
+    text: str
+    tables: list[str]
+    tokens: int
+
+
+class BM25:
+    def __init__(
+        self, documents: Iterable[str], *, k1: float = 1.2, b: float = 0.75
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(doc.values()) for doc in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.docs)) if self.docs else 0.0
+        frequencies: Counter[str] = Counter()
+        for doc in self.docs:
+            frequencies.update(doc.keys())
+        total = len(self.docs)
+        self.idf = {
+            term: math.log(1 + (total - count + 0.5) / (count + 0.5))
+            for term, count in frequencies.items()
+        }
+
+    def scores(self, query: str) -> list[float]:
+        terms = set(tokenize(query))
+        results = []
+        for doc, length in zip(self.docs, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+class SchemaIndex:
+    """Per-table and per-column chunks of a schema markdown knowledge base.
+
+    ``retrieve`` keeps the query rules, then fills a token budget with the
+    tables, columns, SQL templates and data notes that best match the question.
+    """
+
+    def __init__(self, catalog: SchemaCatalog) -> None:
+        self.catalog = catalog
+        self.pinned = catalog.rules
+        self.tables = list(catalog.tables.values())
+        self.templates = catalog.templates
+        self.notes = catalog.notes
+        self._columns: dict[str, list[ColumnChunk]] = {}
+        owned: set[str] = set()
+        for table in self.tables:
+            chunks = self._columns.setdefault(table.name, [])
+            for column in table.columns:
+                # Example values are noisy for matching; score on name, role
+                # and description.
+                chunk = ColumnChunk(
+                    table=table.name,
+                    name=column.name,
+                    line=column.line,
+                    search_text=" ".join(
+                        [column.name, column.role, column.description]
+                    ),
+                )
+                if not table.is_view:
+                    chunk.inherited = column.name in owned
+                    owned.add(column.name)
+                chunks.append(chunk)
+        self._all_columns = [
+            chunk for chunks in self._columns.values() for chunk in chunks
+        ]
+        self._table_bm25 = BM25(
+            " ".join([table.name, *table.header_lines]) for table in self.tables
+        )
+        self._column_bm25 = BM25(chunk.search_text for chunk in self._all_columns)
+        self._template_bm25 = BM25(chunk.text for chunk in self.templates)
+        self._note_bm25 = BM25(chunk.body for chunk in self.notes)
+
+    def retrieve(self, question: str, *, token_budget: int = 4000) -> SchemaSelection:
+        column_scores = dict(
+            zip(map(id, self._all_columns), self._column_bm25.scores(question))
+        )
+        ranked_tables = self._rank_tables(question, column_scores)
+
+        used = sum(estimate_tokens(chunk.text) for chunk in self.pinned)
+        chosen: dict[str, set[str]] = {}
+        top_score = ranked_tables[0][1] if ranked_tables else 0.0
+        for table, score in ranked_tables[:MAX_TABLES]:
+            if chosen and (score <= 0 or score < RELATIVE_TABLE_CUTOFF * top_score):
+                break
+            cost = estimate_tokens(
+                "\n".join(
+                    [
+                        table.heading,
+                        *table.header_lines,
+                        *table.column_header,
+                        *(column.line for column in _key_columns(table)),
+                    ]
+                )
+            )
+            if chosen and used + cost > token_budget:
+                continue
+            chosen[table.name] = {column.name for column in _key_columns(table)}
+            used += cost
+
+        candidates = sorted(
+            (
+                (column_scores[id(column)], column)
+                for column in self._all_columns
+                if column.table in chosen and column.name not in chosen[column.table]
+            ),
+            key=lambda item: -item[0],
+        )
+        floor = RELATIVE_COLUMN_CUTOFF * (candidates[0][0] if candidates else 0.0)
+        for score, column in candidates:
+            if score <= 0 or score < floor:
+                break
+            cost = estimate_tokens(column.line)
+            if used + cost <= token_budget:
+                chosen[column.table].add(column.name)
+                used += cost
+
+        # Compatibility views are compact and recommended, so show them whole;
+        # this keeps template columns like ``project_bid_money``.
+        complete = [table for table in self.tables if table.is_view]
+        for table in complete:
+            if table.name not in chosen:
+                continue
+            for column in table.columns:
+                cost = estimate_tokens(column.line)
+                if column.name not in chosen[table.name] and (
+                    used + cost <= token_budget
+                ):
+                    chosen[table.name].add(column.name)
+                    used += cost
+
+        templates = self._top_chunks(
+            self.templates, self._template_bm25.scores(question), MAX_TEMPLATES
+        )
+        notes = self._top_chunks(
+            self.notes, self._note_bm25.scores(question), MAX_NOTES
+        )
+        picked_templates, used = self._fit(templates, used, token_budget)
+        picked_notes, used = self._fit(notes, used, token_budget)
+
+        text = self._render(chosen, picked_templates, picked_notes)
+        return SchemaSelection(
+            text=text, tables=list(chosen), tokens=estimate_tokens(text)
+        )
+
+    def _rank_tables(
+        self, question: str, column_scores: dict[int, float]
+    ) -> list[tuple[TableSection, float]]:
+        header_scores = self._table_bm25.scores(question)
+        ranked = []
+        for table, header_score in zip(self.tables, header_scores):
+            best_columns = sorted(
+                (
+                    column_scores[id(column)]
+                    * (INHERITED_COLUMN_WEIGHT if column.inherited else 1.0)
+                    for column in self._columns[table.name]
+                ),
+                reverse=True,
+            )[:3]
+            score = header_score + 0.5 * sum(best_columns)
+            if table.name in question:
+                score += 2 * len(table.name)
+            ranked.append((table, score))
+        # Stable sort keeps document order (base tables before views) on ties.
+        return sorted(ranked, key=lambda item: -item[1])
+
+    @staticmethod
+    def _top_chunks(
+        chunks: list[TextSection], scores: list[float], limit: int
+    ) -> list[TextSection]:
+        ranked = sorted(zip(scores, range(len(chunks))), key=lambda item: -item[0])
+        return [chunks[index] for score, index in ranked[:limit] if score > 0]
+
+    @staticmethod
+    def _fit(
+        chunks: list[TextSection], used: int, budget: int
+    ) -> tuple[list[TextSection], int]:
+        picked = []
+        for chunk in chunks:
+            cost = estimate_tokens(chunk.text)
+            if used + cost <= budget:
+                picked.append(chunk)
+                used += cost
+        return picked, used
+
+    def _render(
+        self,
+        chosen: dict[str, set[str]],
+        templates: list[TextSection],
+        notes: list[TextSection],
+    ) -> str:
+        parts = [chunk.text for chunk in self.pinned]
+        if chosen:
+            parts.append("## 相关表与字段")
+            for table in self.tables:
+                if table.name not in chosen:
+                    continue
+                lines = [table.heading, "", *table.header_lines, ""]
+                lines.extend(table.column_header)
+                lines.extend(
+                    column.line
+                    for column in table.columns
+                    if column.name in chosen[table.name]
+                )
+                parts.append("\n".join(lines))
+        if templates:
+            parts.append("## 相关 SQL 模板")
+            parts.extend(chunk.text for chunk in self.templates if chunk in templates)
+        if notes:
+            parts.append("## 相关口径说明")
+            parts.append(
+                "\n".join(chunk.body for chunk in self.notes if chunk in notes)
+            )
+        return "\n\n".join(parts)
+
+
+_INDEXES: dict[Path, SchemaIndex] = {}
+_LOCK = threading.Lock()
+
+
+def schema_index_for(profile: DatabaseProfile) -> SchemaIndex:
+    """Index for the profile's schema, rebuilt only when the catalog reloads."""
+    catalog = profile.catalog()
+    key = catalog.path or Path(profile.schema_path)
+    with _LOCK:
+        index = _INDEXES.get(key)
+        if index is not None and index.catalog is catalog:
+            return index
+    index = SchemaIndex(catalog)
+    with _LOCK:
+        _INDEXES[key] = index
+    return index
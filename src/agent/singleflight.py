@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: T | None = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight wait and receive the leader's value or exception.
+    Nothing is kept once the call finishes, so this is not a cache. Sync
+    (thread) and async (event loop) callers are tracked separately.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call[Any]] = {}
+        self._futures: dict[str, asyncio.Future[Any]] = {}
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], T]) -> tuple[T, bool]:
+        """Return ``(value, shared)``; ``shared`` is True for waiting callers."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._counters["leaders" if leader else "coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+        try:
+            call.value = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Async twin of ``do``.
+
+        A waiter being cancelled never cancels the leader. If the leader is
+        cancelled (its client went away), waiters retry and one takes over.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                future = self._futures.get(key)
+                if future is None or future.get_loop() is not loop:
+                    own: asyncio.Future[T] = loop.create_future()
+                    if future is None:
+                        self._futures[key] = own
+                    self._counters["leaders"] += 1
+                    break
+                self._counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                with self._lock:
+                    self._counters["coalesced"] -= 1
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            own.cancel()
+            raise
+        except BaseException as exc:
+            own.set_exception(exc)
+            own.exception()  # retrieved: no "never retrieved" log without waiters
+            raise
+        else:
+            own.set_result(value)
+            return value, False
+        finally:
+            with self._lock:
+                if self._futures.get(key) is own:
+                    del self._futures[key]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._futures),
+                **self._counters,
+            }
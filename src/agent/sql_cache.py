@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Mapping, Sequence
+
+import pymysql
+import sqlparse
+from sqlparse.tokens import Comment, Keyword, Name, Operator, Punctuation
+
+from .executors import MySQLConnectionPool
+
+_TIGHT_PUNCTUATION = {"(", ")", ",", "."}
+# MySQL 5.7 has no information_schema_stats_expiry and no stats cache either.
+_UNKNOWN_SYSTEM_VARIABLE = 1193
+
+
+def canonical_sql(sql: str) -> str:
+    """Render SQL in one spelling so equivalent safe SQL shares a cache key.
+
+    Whitespace and comments are dropped, keywords and function names are
+    upper-cased, and plain identifiers are backtick-quoted. String literals
+    are kept verbatim.
+    """
+    statements = sqlparse.parse((sql or "").strip().rstrip(";"))
+    tokens = [
+        token
+        for statement in statements
+        for token in statement.flatten()
+        if token.ttype not in Comment
+    ]
+    parts: list[str] = []
+    pending_space = False
+    spaced_before = False
+    for index, token in enumerate(tokens):
+        if token.is_whitespace:
+            pending_space = True
+            continue
+        value = token.value
+        spaced = token.ttype in Operator
+        if token.ttype in Keyword or spaced:
+            value = " ".join(value.upper().split())
+        elif token.ttype in Name and not value.startswith("`"):
+            following = next(
+                (later for later in tokens[index + 1 :] if not later.is_whitespace),
+                None,
+            )
+            if following is not None and following.value == "(":
+                value = value.upper()
+            else:
+                value = f"`{value}`"
+        tight = token.ttype in Punctuation and value in _TIGHT_PUNCTUATION
+        wants_space = pending_space or spaced or spaced_before or parts[-1:] == [","]
+        if parts and wants_space and not tight and parts[-1] not in {"(", "."}:
+            parts.append(" ")
+        parts.append(value)
+        pending_space = False
+        spaced_before = spaced
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class SQLCacheSettings:
+    enabled: bool = True
+    max_entries: int = 128
+    ttl_seconds: float = 3600.0
+    probe_interval_seconds: float = 30.0
+    probe_method: str = "information_schema"
+
+    @classmethod
+    def from_mapping(
+        cls, source: Mapping[str, Any] | None = None
+    ) -> "SQLCacheSettings":
+        data = source or os.environ
+        defaults = cls()
+        enabled = str(data.get("SQL_CACHE_ENABLED") or "true").strip().lower()
+        return cls(
+            enabled=enabled not in {"0", "false", "no", "off"},
+            max_entries=int(data.get("SQL_CACHE_MAX_ENTRIES") or defaults.max_entries),
+            ttl_seconds=float(
+                data.get("SQL_CACHE_TTL_SECONDS") or defaults.ttl_seconds
+            ),
+            probe_interval_seconds=float(
+                data.get("SQL_CACHE_PROBE_INTERVAL_SECONDS")
+                or defaults.probe_interval_seconds
+            ),
+            probe_method=str(
+                data.get("SQL_CACHE_VERSION_PROBE") or defaults.probe_method
+            ),
+        )
+
+
+class MySQLDataVersionProbe:
+    """Cheap fingerprint of the base tables that changes when data is imported.
+
+    ``information_schema`` reads CREATE_TIME/UPDATE_TIME/TABLE_ROWS, which
+    covers both re-created tables and in-place loads. MySQL 8 caches those
+    columns for ``information_schema_stats_expiry`` (a day by default), so the
+    probe sets it to 0 for its session first. ``checksum`` runs
+    ``CHECKSUM TABLE`` and is exact but scans every row.
+    """
+
+    def __init__(
+        self,
+        pool: MySQLConnectionPool,
+        tables: Sequence[str],
+        *,
+        method: str = "information_schema",
+    ) -> None:
+        if method not in {"information_schema", "checksum"}:
+            raise ValueError(f"Unsupported data version probe: {method}")
+        self.pool = pool
+        self.tables = tuple(tables)
+        self.method = method
+        self._stats_expiry = True
+
+    def __call__(self) -> Hashable:
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                if self.method == "information_schema" and self._stats_expiry:
+                    try:
+                        cursor.execute(
+                            "SET SESSION information_schema_stats_expiry = 0"
+                        )
+                    except pymysql.err.MySQLError as exc:
+                        if not exc.args or exc.args[0] != _UNKNOWN_SYSTEM_VARIABLE:
+                            raise
+                        self._stats_expiry = False
+                if self.method == "checksum":
+                    quoted = ", ".join(f"`{table}`" for table in self.tables)
+                    cursor.execute(f"CHECKSUM TABLE {quoted}")
+                else:
+                    placeholders = ", ".join(["%s"] * len(self.tables))
+                    cursor.execute(
+                        "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME, TABLE_ROWS "
+                        "FROM information_schema.TABLES "
+                        "WHERE TABLE_SCHEMA = DATABASE() "
+                        f"AND TABLE_NAME IN ({placeholders})",
+                        self.tables,
+                    )
+                rows = cursor.fetchall()
+        return tuple(sorted(tuple(str(value) for value in row) for row in rows))
+
+
+class CachingSQLExecutor:
+    """Result cache in front of a SQL executor, keyed on ``canonical_sql``.
+
+    The data version probe runs at most once per ``probe_interval_seconds``,
+    and concurrent callers wait for that one probe instead of issuing their
+    own; when the fingerprint changes every cached result is dropped. If the
+    probe fails, queries bypass the cache rather than risk serving stale rows.
+    """
+
+    def __init__(
+        self,
+        executor: Callable[[str], dict[str, Any]],
+        *,
+        version_probe: Callable[[], Hashable] | None = None,
+        settings: SQLCacheSettings | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.executor = executor
+        self.version_probe = version_probe
+        self.settings = settings or SQLCacheSettings()
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._version: Hashable | None = None
+        self._probed_at: float | None = None
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "invalidations": 0,
+            "probe_errors": 0,
+        }
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        if not self._version_current():
+            self._count("bypassed")
+            return {**self.executor(sql), "cache": "bypass"}
+        key = canonical_sql(sql)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] > self._clock():
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return {**item[1], "cache": "hit"}
+            self._counters["misses"] += 1
+        result = self.executor(sql)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.settings.ttl_seconds, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.settings.max_entries:
+                self._entries.popitem(last=False)
+        return {**result, "cache": "miss"}
+
+    async def aexecute(self, sql: str) -> dict[str, Any]:
+        return await asyncio.to_thread(self, sql)
+
+    def bypasses_database(self, sql: str) -> str | None:
+        """``"cache"`` when an unexpired result for ``sql`` is cached."""
+        key = canonical_sql(sql)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] > self._clock():
+                return "cache"
+        inner = getattr(self.executor, "bypasses_database", None)
+        return inner(sql) if callable(inner) else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        inner = getattr(self.executor, "stats", None)
+        return inner() if callable(inner) else {}
+
+    def cache_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.settings.max_entries,
+                "data_version_probed": self._probed_at is not None,
+                **self._counters,
+            }
+
+    def close(self) -> None:
+        close = getattr(self.executor, "close", None)
+        if callable(close):
+            close()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _version_current(self) -> bool:
+        if self.version_probe is None:
+            return True
+        if self._probed_recently():
+            return True
+        with self._probe_lock:
+            if self._probed_recently():
+                return True
+            return self._probe()
+
+    def _probed_recently(self) -> bool:
+        with self._lock:
+            return (
+                self._probed_at is not None
+                and self._clock() - self._probed_at
+                < self.settings.probe_interval_seconds
+            )
+
+    def _probe(self) -> bool:
+        now = self._clock()
+        try:
+            version = self.version_probe()
+        except Exception:
+            with self._lock:
+                self._counters["probe_errors"] += 1
+                self._probed_at = None
+                self._entries.clear()
+            return False
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+                self._counters["invalidations"] += 1
+            self._version = version
+            self._probed_at = now
+        return True
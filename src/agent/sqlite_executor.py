@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import sqlite3
+import threading
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable
+
+from .deadline import DeadlineExceeded, current_deadline
+from .executors import FetchSettings, read_result
+
+# VM instructions between deadline checks while a statement runs.
+PROGRESS_STEPS = 10_000
+
+_INTERVAL = re.compile(
+    r"\bINTERVAL\s+(-?\d+)\s+(YEAR|QUARTER|MONTH|WEEK|DAY|HOUR|MINUTE|SECOND)\b",
+    re.IGNORECASE,
+)
+_FORMAT_SPEC = re.compile(r"%(.)")
+# MySQL DATE_FORMAT specifiers with a direct strftime equivalent.
+_STRFTIME = {
+    "Y": "%Y",
+    "y": "%y",
+    "m": "%m",
+    "d": "%d",
+    "H": "%H",
+    "h": "%I",
+    "I": "%I",
+    "i": "%M",
+    "s": "%S",
+    "S": "%S",
+    "f": "%f",
+    "p": "%p",
+    "M": "%B",
+    "b": "%b",
+    "W": "%A",
+    "a": "%a",
+    "j": "%j",
+    "T": "%H:%M:%S",
+}
+
+
+def to_sqlite(sql: str) -> str:
+    """Rewrite the MySQL syntax SQLite cannot parse.
+
+    Backticks, ``LIMIT offset, count`` and most functions already work (the
+    functions are registered on the connection); only ``INTERVAL n UNIT``
+    needs rewriting, into the extra arguments of ``DATE_ADD``/``DATE_SUB``.
+    """
+    return _INTERVAL.sub(lambda m: f"{m.group(1)}, '{m.group(2).upper()}'", sql)
+
+
+@lru_cache(maxsize=65536)
+def _parse(value: Any) -> datetime | None:
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return datetime.fromisoformat(text[:19] if len(text) > 10 else text[:10])
+    except ValueError:
+        return None
+
+
+def _date_part(attribute: str) -> Callable[[Any], int | None]:
+    def part(value: Any) -> int | None:
+        moment = _parse(value)
+        return None if moment is None else getattr(moment, attribute)
+
+    return part
+
+
+def _quarter(value: Any) -> int | None:
+    moment = _parse(value)
+    return None if moment is None else (moment.month - 1) // 3 + 1
+
+
+def _date_format(value: Any, fmt: str | None) -> str | None:
+    moment = _parse(value)
+    if moment is None or fmt is None:
+        return None
+
+    def spec(match: re.Match[str]) -> str:
+        code = match.group(1)
+        if code == "c":
+            return str(moment.month)
+        if code == "e":
+            return str(moment.day)
+        if code in _STRFTIME:
+            return moment.strftime(_STRFTIME[code])
+        return code
+
+    return _FORMAT_SPEC.sub(spec, fmt)
+
+
+def _str_to_date(value: Any, fmt: str | None) -> str | None:
+    if value is None or fmt is None:
+        return None
+    pattern = fmt.replace("%c", "%m").replace("%e", "%d").replace("%i", "%M")
+    try:
+        moment = datetime.strptime(str(value), pattern.replace("%s", "%S"))
+    except ValueError:
+        return None
+    has_time = any(code in fmt for code in ("%H", "%h", "%i", "%s", "%S", "%T"))
+    return _render(moment, has_time)
+
+
+def _render(moment: datetime, with_time: bool) -> str:
+    return moment.strftime("%Y-%m-%d %H:%M:%S" if with_time else "%Y-%m-%d")
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    month = moment.month - 1 + months
+    year = moment.year + month // 12
+    month = month % 12 + 1
+    return moment.replace(
+        year=year, month=month, day=min(moment.day, monthrange(year, month)[1])
+    )
+
+
+def _date_add(value: Any, amount: Any, unit: str | None) -> str | None:
+    moment = _parse(value)
+    if moment is None or amount is None or unit is None:
+        return None
+    amount = int(amount)
+    unit = unit.upper()
+    if unit in {"YEAR", "QUARTER", "MONTH"}:
+        months = {"YEAR": 12, "QUARTER": 3, "MONTH": 1}[unit]
+        shifted = _add_months(moment, amount * months)
+    else:
+        seconds = {"WEEK": 604800, "DAY": 86400, "HOUR": 3600, "MINUTE": 60}
+        shifted = moment + timedelta(seconds=amount * seconds.get(unit, 1))
+    with_time = len(str(value).strip()) > 10 or unit in {"HOUR", "MINUTE", "SECOND"}
+    return _render(shifted, with_time)
+
+
+def _date_sub(value: Any, amount: Any, unit: str | None) -> str | None:
+    return _date_add(value, None if amount is None else -int(amount), unit)
+
+
+def _datediff(left: Any, right: Any) -> int | None:
+    first, second = _parse(left), _parse(right)
+    if first is None or second is None:
+        return None
+    return (first.date() - second.date()).days
+
+
+def _concat(*values: Any) -> str | None:
+    if any(value is None for value in values):
+        return None
+    return "".join(str(value) for value in values)
+
+
+def _concat_ws(separator: Any, *values: Any) -> str | None:
+    if separator is None:
+        return None
+    return str(separator).join(str(value) for value in values if value is not None)
+
+
+def _locate(needle: Any, haystack: Any, start: Any = 1) -> int | None:
+    if needle is None or haystack is None:
+        return None
+    return str(haystack).find(str(needle), max(int(start), 1) - 1) + 1
+
+
+def _substring_index(value: Any, delimiter: Any, count: Any) -> str | None:
+    if value is None or delimiter is None or count is None:
+        return None
+    parts = str(value).split(str(delimiter))
+    count = int(count)
+    kept = parts[:count] if count >= 0 else parts[count:]
+    return str(delimiter).join(kept)
+
+
+def _regexp(pattern: Any, value: Any) -> int | None:
+    if pattern is None or value is None:
+        return None
+    return int(re.search(str(pattern), str(value), re.IGNORECASE) is not None)
+
+
+def _numeric(fn: Callable[[float], Any]) -> Callable[[Any], Any]:
+    def apply(value: Any) -> Any:
+        return None if value is None else fn(float(value))
+
+    return apply
+
+
+def _truncate(value: Any, digits: Any) -> float | None:
+    if value is None or digits is None:
+        return None
+    factor = 10 ** int(digits)
+    return math.trunc(float(value) * factor) / factor
+
+
+# (name, arity, function, deterministic); -1 means variadic.
+MYSQL_FUNCTIONS: tuple[tuple[str, int, Callable[..., Any], bool], ...] = (
+    ("YEAR", 1, _date_part("year"), True),
+    ("MONTH", 1, _date_part("month"), True),
+    ("DAY", 1, _date_part("day"), True),
+    ("DAYOFMONTH", 1, _date_part("day"), True),
+    ("HOUR", 1, _date_part("hour"), True),
+    ("QUARTER", 1, _quarter, True),
+    ("DATE_FORMAT", 2, _date_format, True),
+    ("STR_TO_DATE", 2, _str_to_date, True),
+    ("DATE_ADD", 3, _date_add, True),
+    ("DATE_SUB", 3, _date_sub, True),
+    ("DATEDIFF", 2, _datediff, True),
+    ("NOW", 0, lambda: _render(datetime.now(), True), False),
+    ("CURDATE", 0, lambda: date.today().isoformat(), False),
+    ("CONCAT", -1, _concat, True),
+    ("CONCAT_WS", -1, _concat_ws, True),
+    ("IF", 3, lambda cond, yes, no: yes if cond else no, True),
+    ("LEFT", 2, lambda s, n: None if s is None else str(s)[: int(n)], True),
+    (
+        "RIGHT",
+        2,
+        lambda s, n: None if s is None else (str(s)[-int(n) :] if int(n) else ""),
+        True,
+    ),
+    ("CHAR_LENGTH", 1, lambda s: None if s is None else len(str(s)), True),
+    ("LOCATE", 2, _locate, True),
+    ("LOCATE", 3, _locate, True),
+    ("SUBSTRING_INDEX", 3, _substring_index, True),
+    ("REGEXP", 2, _regexp, True),
+    ("FLOOR", 1, _numeric(math.floor), True),
+    ("CEIL", 1, _numeric(math.ceil), True),
+    ("CEILING", 1, _numeric(math.ceil), True),
+    ("LOG10", 1, _numeric(math.log10), True),
+    ("POW", 2, lambda x, y: None if x is None or y is None else x**y, True),
+    ("POWER", 2, lambda x, y: None if x is None or y is None else x**y, True),
+    ("TRUNCATE", 2, _truncate, True),
+)
+
+
+def register_mysql_functions(conn: sqlite3.Connection) -> None:
+    for name, arity, function, deterministic in MYSQL_FUNCTIONS:
+        conn.create_function(name, arity, function, deterministic=deterministic)
+
+
+class SQLiteExecutor:
+    """Read-only SQL executor over a local SQLite file.
+
+    A stand-in for the MySQL pool in benchmarks and tests: the agent's MySQL
+    SQL runs unchanged thanks to ``to_sqlite`` and the functions registered by
+    ``register_mysql_functions``. Each thread gets its own connection; the
+    request deadline is enforced with a progress handler and cancellation
+    interrupts the running statement.
+    """
+
+    def __init__(self, path: str | Path, *, fetch: FetchSettings | None = None) -> None:
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(
+                f"SQLite database not found: {self.path} "
+                "(generate one with scripts/generate_synthetic_znjz.py)"
+            )
+        self.fetch = fetch or FetchSettings()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+        self._queries = 0
+
+    def __call__(self, sql: str) -> dict[str, Any]:
+        deadline = current_deadline()
+        conn = self._connection()
+        with self._lock:
+            self._queries += 1
+        if deadline is None:
+            return self._fetch(conn, sql)
+
+        deadline.check("execute_sql")
+        unregister = deadline.on_cancel(conn.interrupt)
+        if deadline.bounded:
+            conn.set_progress_handler(lambda: int(deadline.expired()), PROGRESS_STEPS)
+        try:
+            return self._fetch(conn, sql)
+        except sqlite3.OperationalError as exc:
+            if deadline.expired():
+                raise DeadlineExceeded(f"execute_sql: {exc}") from exc
+            raise
+        finally:
+            unregister()
+            conn.set_progress_handler(None, 0)
+
+    def _fetch(self, conn: sqlite3.Connection, sql: str) -> dict[str, Any]:
+        cursor = conn.execute(to_sqlite(sql))
+        try:
+            return read_result(cursor, self.fetch)
+        finally:
+            cursor.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro",
+                uri=True,
+                check_same_thread=False,
+            )
+            register_mysql_functions(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    async def aexecute(self, sql: str) -> dict[str, Any]:
+        return await asyncio.to_thread(self, sql)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "connections": len(self._connections),
+                "queries": self._queries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,531 @@
+from __future__ import annotations
+
+import itertools
+import os
+import random
+import re
+import sqlite3
+import statistics
+import string
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from .profiles import get_database_profile
+from .schema_catalog import ColumnSpec, SchemaCatalog, TableSection
+
+DEFAULT_SYNTHETIC_PATH = "output/synthetic/znjz.sqlite3"
+
+_ROWS = re.compile(r"行数：([\d,]+)")
+_NON_NULL = re.compile(r"(\w+)非空=([\d,]+)")
+_VIEW_FILTER = re.compile(r"(\w+_id) 非空")
+_BACKTICKED = re.compile(r"`([^`]*)`")
+_DATE_TEXT = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_UUID_TEXT = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-")
+_CODE_TEXT = re.compile(r"^[0-9A-Z]+$")
+
+_CITIES = {
+    "4401": "广州市",
+    "4403": "深圳市",
+    "4404": "珠海市",
+    "4406": "佛山市",
+    "4407": "江门市",
+    "4408": "湛江市",
+    "4413": "惠州市",
+    "4419": "东莞市",
+    "4420": "中山市",
+}
+# Registration districts, weighted towards Guangzhou and Shenzhen as in znjz.
+_DISTRICTS = (
+    [(code, 3.0) for code in ("440103", "440104", "440105", "440106", "440111")]
+    + [(code, 3.0) for code in ("440112", "440113", "440114", "440115", "440118")]
+    + [(code, 3.0) for code in ("440303", "440304", "440305", "440306", "440307")]
+    + [(code, 2.0) for code in ("440308", "440309", "440310", "440604", "440606")]
+    + [(code, 2.5) for code in ("441900", "442000")]
+    + [(code, 1.0) for code in ("440402", "440703", "440803", "441302")]
+)
+_POOLS: dict[str, list[tuple[Any, float]]] = {
+    "status": [
+        ("存续（在营、开业、在册）", 80),
+        ("注销", 9),
+        ("吊销，未注销", 3),
+        ("迁出", 2),
+        ("在业", 2),
+        ("吊销，已注销", 1),
+        ("停业", 1),
+        ("撤销", 1),
+        ("清算", 0.5),
+        ("其他", 0.5),
+    ],
+    "econ_kind": [
+        ("有限责任公司（自然人投资或控股）", 55),
+        ("有限责任公司（自然人独资）", 15),
+        ("有限责任公司", 10),
+        ("有限责任公司（法人独资）", 6),
+        ("股份有限公司（非上市、自然人投资或控股）", 4),
+        ("有限责任公司（外商投资企业与内资合资）", 3),
+        ("有限责任公司（港澳台法人独资）", 3),
+        ("个人独资企业", 2),
+        ("有限合伙企业", 2),
+    ],
+    "currency_unit": [
+        ("CNY", 97),
+        ("USD", 1.5),
+        ("HKD", 1),
+        ("EUR", 0.3),
+        ("JPY", 0.2),
+    ],
+    "industry_code": [
+        (code, 1 / rank)
+        for rank, code in enumerate(
+            (
+                "I6510 I6513 I6531 I6520 I6511 M7320 I6540 C3914 F5179 L7212 "
+                "I6550 C3911 M7520 E4910 I6410 F5176 C3990 M7350 E5011 I6421 "
+                "C3824 L7251 F5191 M7491 C4090 I6432 E4999 C3871 F5271 M7480"
+            ).split(),
+            start=1,
+        )
+    ],
+    "round": [
+        ("天使轮", 18),
+        ("A轮", 16),
+        ("战略投资", 12),
+        ("股权投资", 10),
+        ("Pre-A轮", 9),
+        ("种子轮", 7),
+        ("B轮", 7),
+        ("A+轮", 5),
+        ("被收购", 4),
+        ("新三板", 3),
+        ("C轮", 2),
+        ("B+轮", 2),
+        ("Pre-B轮", 1.5),
+        ("定向增发", 1),
+        ("D轮", 0.8),
+        ("E轮及以后", 0.4),
+        ("并购", 0.3),
+        ("IPO", 0.3),
+    ],
+    "currency": [("CNY", 90), ("USD", 10)],
+    "ct_type": [(110001.0 + index, 1 / (index + 1)) for index in range(23)],
+    "ct_state": [("有效", 50), ("过期", 45), ("注销", 5)],
+}
+# Year ranges for dates; others fall in 2014-2025, skewed to recent years.
+_YEARS = {
+    "start_date": (1995, 2025),
+    "term_start": (1995, 2025),
+    "invest_start_date": (1995, 2025),
+    "term_end": (2030, 2060),
+    "should_con_date": (2025, 2060),
+    "ct_valid_end": (2022, 2030),
+}
+_COMPANY_COLUMNS = {"invest_name"}
+_NAME_SYLLABLES = "璟萌华太中伟恒通维尔聚惠敏高正想坤腾截明君胜至尚力勤前一顺万商智联创新源远宏图盛达嘉禾信达博雅汇丰永泰德鑫瑞祥天成云海启航"
+_NAME_TRADES = (
+    "科技",
+    "信息科技",
+    "智能科技",
+    "电子科技",
+    "软件技术",
+    "网络科技",
+    "数据科技",
+    "机电工程",
+    "自动化科技",
+    "电子商务",
+)
+_BID_BUYERS = ("人民医院", "第一中学", "交通运输局", "城市管理局", "供电局", "水务集团")
+_BID_BUYERS += ("大学", "街道办事处", "公安局", "建设工程公司")
+_BID_ITEMS = ("智慧工地", "信息化平台", "视频会议系统", "弱电工程", "服务器设备")
+_BID_ITEMS += ("数据中心运维", "软件开发", "网络安全", "智能停车", "安防监控")
+_BID_NOTICES = (
+    "采购项目",
+    "公开招标公告",
+    "中标结果公告",
+    "成交公告",
+    "竞争性磋商公告",
+)
+
+
+def _count(text: str) -> int:
+    return int(text.replace(",", ""))
+
+
+def sqlite_type(column: ColumnSpec) -> str:
+    """SQLite column type for the catalog's MySQL type."""
+    mysql_type = column.fields.get("MySQL Type", "").strip("`").lower()
+    if mysql_type.startswith(("bigint", "int", "mediumint", "smallint", "tinyint")):
+        return "INTEGER"
+    if mysql_type.startswith(("double", "float", "decimal")):
+        return "REAL"
+    if mysql_type.startswith(("binary", "varbinary", "blob")):
+        return "BLOB"
+    return "TEXT"
+
+
+def _examples(column: ColumnSpec) -> list[str]:
+    return _BACKTICKED.findall(column.fields.get("Example Values", ""))
+
+
+def _null_rate(column: ColumnSpec) -> float:
+    text = column.fields.get("Null Rate", "").strip().rstrip("%")
+    return float(text) / 100 if text else 0.0
+
+
+@dataclass(frozen=True)
+class TablePlan:
+    """Shape of one base table as read from the schema catalog.
+
+    Event tables are enterprises left-joined with events (financing rounds,
+    bids, ...): ``events`` rows carry ``event_key`` and belong to ``owners``
+    distinct enterprises, every other enterprise appears once with the event
+    columns empty.
+    """
+
+    section: TableSection
+    rows: int
+    event_key: str | None = None
+    events: int = 0
+    owners: int = 0
+
+    @property
+    def prefix(self) -> str:
+        return self.event_key.removesuffix("id") if self.event_key else ""
+
+    @property
+    def owner_column(self) -> str | None:
+        return f"{self.prefix}eid" if self.event_key else None
+
+
+def plan_tables(catalog: SchemaCatalog) -> list[TablePlan]:
+    plans = []
+    for section in catalog.tables.values():
+        if section.is_view:
+            continue
+        header = "\n".join(section.header_lines)
+        rows = _ROWS.search(header)
+        non_null = [
+            (key, _count(value))
+            for key, value in _NON_NULL.findall(header)
+            if key != "eid"
+        ]
+        if not non_null:
+            plans.append(TablePlan(section, _count(rows.group(1)) if rows else 0))
+            continue
+        event_key, events = non_null[0]
+        owner = next(
+            (
+                column
+                for column in section.columns
+                if column.name == f"{event_key.removesuffix('id')}eid"
+            ),
+            None,
+        )
+        distinct = owner.fields.get("Distinct", "") if owner else ""
+        plans.append(
+            TablePlan(
+                section,
+                _count(rows.group(1)) if rows else events,
+                event_key=event_key,
+                events=events,
+                owners=_count(distinct) if distinct else events,
+            )
+        )
+    return plans
+
+
+def view_sql(view: TableSection, catalog: SchemaCatalog) -> str:
+    """``CREATE VIEW`` for a compatibility view.
+
+    The source table and filter come from the view description ("仅保留 cf_id
+    非空…", "从 企业基本信息_行业代码 取…"); view columns map to the same
+    column, or the source's prefixed one (``eid``/``id`` prefer the prefixed
+    event columns, ``district`` finds ``ct_district``). ``binary(0)``
+    placeholders and unmatched columns are NULL.
+    """
+    bases = [section for section in catalog.tables.values() if not section.is_view]
+    match = _VIEW_FILTER.search(view.description)
+    if match:
+        key = match.group(1)
+        source = next(section for section in bases if key in section.column_names())
+        prefix = key.removesuffix("id")
+    else:
+        named = [section for section in bases if section.name in view.description]
+        source = max(named, key=lambda section: len(section.name))
+        prefix = ""
+    available = set(source.column_names())
+    select = []
+    for column in view.columns:
+        name = column.name
+        candidates = [prefix + name, name] if name in {"eid", "id"} else [name]
+        candidates.append(prefix + name)
+        found = next((c for c in candidates if c in available), None)
+        if found is None or sqlite_type(column) == "BLOB":
+            select.append(f"NULL AS `{name}`")
+        elif found == name:
+            select.append(f"`{name}`")
+        else:
+            select.append(f"`{found}` AS `{name}`")
+    where = f" WHERE `{match.group(1)}` IS NOT NULL" if match else ""
+    return (
+        f"CREATE VIEW `{view.name}` AS SELECT {', '.join(select)} "
+        f"FROM `{source.name}`{where}"
+    )
+
+
+class _Synthesizer:
+    def __init__(self, catalog: SchemaCatalog, *, scale: float, seed: int) -> None:
+        self.catalog = catalog
+        self.scale = scale
+        self.rng = random.Random(seed)
+        self.plans = plan_tables(catalog)
+        self.enterprise_columns: dict[str, ColumnSpec] = {}
+        for plan in self.plans:
+            if plan.event_key is None:
+                for column in plan.section.columns:
+                    if column.name != "import_id":
+                        self.enterprise_columns.setdefault(column.name, column)
+        enterprise_rows = max(
+            (plan.rows for plan in self.plans if plan.event_key is None), default=0
+        )
+        self.enterprises = self._enterprises(self._scaled(enterprise_rows))
+
+    def _scaled(self, count: int) -> int:
+        return max(1, round(count * self.scale)) if count else 0
+
+    def _enterprises(self, count: int) -> list[dict[str, Any]]:
+        makers = {
+            name: self._maker(column, _null_rate(column))
+            for name, column in self.enterprise_columns.items()
+        }
+        enterprises = []
+        for _ in range(count):
+            record = {name: make() for name, make in makers.items()}
+            if "name" in record:
+                record["name"] = self._company(record.get("district_code"))
+                if "format_name" in record:
+                    record["format_name"] = record["name"]
+            enterprises.append(record)
+        return enterprises
+
+    def rows(self, plan: TablePlan) -> Iterator[tuple[Any, ...]]:
+        names = [
+            column.name for column in plan.section.columns if column.name != "import_id"
+        ]
+        shared = [name for name in names if name in self.enterprise_columns]
+        event_columns = [
+            column
+            for column in plan.section.columns
+            if column.name not in self.enterprise_columns and column.name != "import_id"
+        ]
+        counts = self._event_counts(plan)
+        owned = {plan.owner_column, f"{plan.prefix}name", "ename"}
+        makers = {
+            column.name: self._maker(column, self._event_null_rate(plan, column))
+            for column in event_columns
+            if column.name not in owned
+        }
+        empty = {column.name: None for column in event_columns}
+        import_id = itertools.count(1)
+        for index, enterprise in enumerate(self.enterprises):
+            for _ in range(counts.get(index, 0 if plan.event_key else 1)):
+                values = {name: enterprise[name] for name in shared}
+                values.update({name: make() for name, make in makers.items()})
+                for name in owned & empty.keys():
+                    values[name] = (
+                        enterprise["eid"]
+                        if name == plan.owner_column
+                        else enterprise.get("name")
+                    )
+                yield (next(import_id), *(values[name] for name in names))
+            if plan.event_key and index not in counts:
+                values = {name: enterprise[name] for name in shared}
+                yield (
+                    next(import_id),
+                    *(values.get(name, empty.get(name)) for name in names),
+                )
+
+    def _event_counts(self, plan: TablePlan) -> dict[int, int]:
+        if plan.event_key is None:
+            return {}
+        events = self._scaled(plan.events)
+        owners = self.rng.sample(
+            range(len(self.enterprises)),
+            min(self._scaled(plan.owners), len(self.enterprises), events),
+        )
+        # Every owner has one event; the rest follow a Zipf-like skew, so a few
+        # enterprises own most bids as in the real data.
+        cumulative = list(
+            itertools.accumulate(1 / (rank + 1) for rank in range(len(owners)))
+        )
+        extra = Counter(
+            self.rng.choices(owners, cum_weights=cumulative, k=events - len(owners))
+        )
+        return {owner: 1 + extra[owner] for owner in owners}
+
+    def _event_null_rate(self, plan: TablePlan, column: ColumnSpec) -> float:
+        """Null rate among event rows; the catalog's rate counts every row."""
+        if column.name == plan.event_key or not plan.events:
+            return 0.0
+        nulls = _null_rate(column) * plan.rows - (plan.rows - plan.events)
+        return min(max(nulls / plan.events, 0.0), 1.0)
+
+    def _maker(self, column: ColumnSpec, null_rate: float) -> Callable[[], Any]:
+        make = self._value_maker(column)
+        if null_rate <= 0:
+            return make
+        if null_rate >= 1:
+            return lambda: None
+        chance = self.rng.random
+        return lambda: None if chance() < null_rate else make()
+
+    def _value_maker(self, column: ColumnSpec) -> Callable[[], Any]:
+        rng = self.rng
+        name = column.name
+        kind = sqlite_type(column)
+        examples = _examples(column)
+        if kind == "BLOB":
+            return lambda: None
+        if name in _POOLS:
+            return self._choice(_POOLS[name])
+        if name.endswith("district_code") or name in {"area_code", "belong_org_code"}:
+            suffix = ".0" if examples and examples[0].endswith(".0") else ""
+            pick = self._choice(_DISTRICTS)
+            return lambda: pick() + suffix
+        if column.role == "Temporal" or (examples and _DATE_TEXT.match(examples[0])):
+            return self._date(
+                name, with_time=kind == "TEXT" and column.role == "Temporal"
+            )
+        if column.role == "Identifier":
+            if kind == "INTEGER":
+                counter = itertools.count(rng.randrange(10_000, 100_000))
+                return lambda: next(counter)
+            if examples and _UUID_TEXT.match(examples[0]):
+                return self._uuid
+            width = len(examples[0]) if examples else 32
+            return lambda: f"{rng.getrandbits(width * 4):0{width}x}"
+        if column.role == "Metric":
+            if "year" in name:
+                return lambda: float(rng.randint(2006, 2025))
+            positive = [float(value) for value in examples if float(value) > 0]
+            median = statistics.median(positive) if positive else 100.0
+            cap = 1.0 if "percent" in name else float("inf")
+            return lambda: round(min(median * rng.lognormvariate(0, 1.2), cap), 4)
+        if name in _COMPANY_COLUMNS:
+            return lambda: self._company(None)
+        if name == "title":
+            return self._bid_title
+        if examples and len({len(value) for value in examples}) == 1:
+            if all(_CODE_TEXT.match(value) for value in examples):
+                alphabet = (
+                    string.digits
+                    if all(value.isdigit() for value in examples)
+                    else string.digits + "ABCDEFGHJKLMNPQRTUWXY"
+                )
+                width = len(examples[0])
+                return lambda: "".join(rng.choices(alphabet, k=width))
+        if examples:
+            values: list[Any] = examples
+            if kind != "TEXT":
+                values = [float(value) for value in examples]
+            return lambda: rng.choice(values)
+        return lambda: None
+
+    def _choice(self, pool: list[tuple[Any, float]]) -> Callable[[], Any]:
+        values = [value for value, _ in pool]
+        cumulative = list(itertools.accumulate(weight for _, weight in pool))
+        choices = self.rng.choices
+        return lambda: choices(values, cum_weights=cumulative)[0]
+
+    def _date(self, name: str, *, with_time: bool) -> Callable[[], str]:
+        rng = self.rng
+        first, last = _YEARS.get(name, (2014, 2025))
+        start = date(first, 1, 1).toordinal()
+        span = date(last, 12, 31).toordinal() - start
+
+        def make() -> str:
+            day = date.fromordinal(start + int(rng.triangular(0, span, span * 0.8)))
+            if not with_time:
+                return day.isoformat()
+            seconds = rng.randrange(86400) if "time" in name else 0
+            hours, rest = divmod(seconds, 3600)
+            return f"{day.isoformat()} {hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+
+        return make
+
+    def _uuid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _company(self, district_code: str | None) -> str:
+        rng = self.rng
+        city = _CITIES.get(str(district_code or "")[:4]) or rng.choice(
+            list(_CITIES.values())
+        )
+        brand = "".join(rng.sample(_NAME_SYLLABLES, 2))
+        return f"{city}{brand}{rng.choice(_NAME_TRADES)}有限公司"
+
+    def _bid_title(self) -> str:
+        rng = self.rng
+        city = rng.choice(list(_CITIES.values()))
+        return (
+            f"{city}{rng.choice(_BID_BUYERS)}{rng.randint(2015, 2025)}年"
+            f"{rng.choice(_BID_ITEMS)}{rng.choice(_BID_NOTICES)}"
+        )
+
+
+def generate_znjz(
+    path: str | Path = DEFAULT_SYNTHETIC_PATH,
+    *,
+    scale: float = 1.0,
+    seed: int = 42,
+    catalog: SchemaCatalog | None = None,
+) -> dict[str, int]:
+    """Write a synthetic znjz database to ``path`` and return rows per table.
+
+    Tables, columns, row counts, null rates and example values come from the
+    schema catalog (``schema/znjz_text2sql_schema.md``); ``scale`` shrinks or
+    grows every table (1.0 is the real ~17.5k enterprises and ~590k bid rows).
+    The same ``seed`` always produces the same data. Indexed columns follow
+    the catalog's ``Key`` column and the compatibility views are created too.
+    """
+    catalog = catalog or get_database_profile("znjz").catalog()
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    partial = target.with_name(target.name + ".partial")
+    partial.unlink(missing_ok=True)
+    synthesizer = _Synthesizer(catalog, scale=scale, seed=seed)
+    counts: dict[str, int] = {}
+    conn = sqlite3.connect(partial)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for plan in synthesizer.plans:
+            section = plan.section
+            definitions = [
+                f"`{column.name}` {sqlite_type(column)}"
+                + (" PRIMARY KEY" if column.fields.get("Key") == "PRI" else "")
+                for column in section.columns
+            ]
+            conn.execute(f"CREATE TABLE `{section.name}` ({', '.join(definitions)})")
+            placeholders = ", ".join("?" for _ in section.columns)
+            cursor = conn.executemany(
+                f"INSERT INTO `{section.name}` VALUES ({placeholders})",
+                synthesizer.rows(plan),
+            )
+            counts[section.name] = cursor.rowcount
+            for column in section.columns:
+                if column.fields.get("Key") in {"UNI", "MUL"}:
+                    conn.execute(
+                        f"CREATE INDEX `idx_{section.name}_{column.name}` "
+                        f"ON `{section.name}` (`{column.name}`)"
+                    )
+        for view in catalog.views.values():
+            conn.execute(view_sql(view, catalog))
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(partial, target)
+    return counts
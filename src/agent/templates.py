@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable
+
+# Topic words used to tell the known question shapes apart. A question that
+# also touches a topic its template does not cover goes to the LLM instead.
+TOPICS: dict[str, tuple[str, ...]] = {
+    "status": ("经营状态", "存续", "注销", "吊销", "在业"),
+    "industry": ("行业", "产业"),
+    "finance": ("融资",),
+    "bid": ("招投标", "招标", "投标", "中标"),
+    "invest": ("对外投资", "被投", "投资主体", "投资企业", "股东"),
+    "qualification": ("资质", "商标", "标签", "荣誉", "认证"),
+    "region": ("地区", "区域", "省", "城市", "区县", "area", "district"),
+    "capital": ("注册资本", "注册资金"),
+    "founded": ("成立", "注册时间"),
+    "ratio": ("占比", "比例", "同比", "环比", "增长率", "平均", "中位"),
+}
+
+_TOP_N = re.compile(r"(?:top\s*|前\s*)(\d+|[一二两三四五六七八九十]+)", re.IGNORECASE)
+_YEAR_RANGE = re.compile(
+    r"((?:19|20)\d{2})\s*年?\s*(?:至|到|-|~|—|－)\s*((?:19|20)\d{2})\s*年?"
+)
+_YEAR = re.compile(r"((?:19|20)\d{2})\s*年")
+_RECENT_YEARS = re.compile(r"(?:近|最近|过去)\s*(\d+|[一二两三四五六七八九十]+)\s*年")
+_QUOTED = re.compile(r"[“\"'「『《]([^”\"'」』》]+)[”\"'」』》]")
+_COMPANY = re.compile(r"([0-9A-Za-z\u3400-\u9fff（）()·]{2,40}?(?:有限公司|公司|集团))")
+_SAFE_KEYWORD = re.compile(r"^[0-9A-Za-z\u3400-\u9fff（）()·\-]{1,40}$")
+_LEADING_VERBS = (
+    "请",
+    "帮我",
+    "查看",
+    "查询",
+    "看看",
+    "分析",
+    "介绍",
+    "展示",
+    "给出",
+    "统计",
+)
+# Function words that carry no query content of their own.
+_COMMON_WORDS = _LEADING_VERBS + (
+    "企业",
+    "公司",
+    "的",
+    "和",
+    "及",
+    "与",
+    "各",
+    "个",
+    "家",
+    "每",
+    "按",
+    "数量",
+    "多少",
+    "情况",
+    "一下",
+    "哪些",
+)
+_PARAM_PATTERNS = (_TOP_N, _YEAR_RANGE, _RECENT_YEARS, _YEAR)
+_CONTENT_CHAR = re.compile(r"[0-9A-Za-z\u3400-\u9fff]")
+_CN_DIGITS = {
+    "一": 1,
+    "二": 2,
+    "两": 2,
+    "三": 3,
+    "四": 4,
+    "五": 5,
+    "六": 6,
+    "七": 7,
+    "八": 8,
+    "九": 9,
+}
+
+
+def parse_count(text: str) -> int | None:
+    """Parse ``12``, ``十``, ``二十``, ``十五`` and similar counts below 100."""
+    if text.isdigit():
+        return int(text)
+    if "十" not in text:
+        return _CN_DIGITS.get(text) if len(text) == 1 else None
+    tens, _, ones = text.partition("十")
+    try:
+        value = (_CN_DIGITS[tens] if tens else 1) * 10
+        return value + (_CN_DIGITS[ones] if ones else 0)
+    except KeyError:
+        return None
+
+
+@dataclass
+class QuestionParams:
+    top_n: int | None = None
+    years: tuple[int, int] | None = None
+    keyword: str | None = None
+    # Set when the question contains a parameter we could not use safely.
+    unparsed: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "top_n": self.top_n,
+            "years": list(self.years) if self.years else None,
+            "keyword": self.keyword,
+        }
+
+
+def extract_params(question: str, *, today: date | None = None) -> QuestionParams:
+    """Pull Top N, a year range and a quoted or company-name keyword."""
+    params = QuestionParams()
+    if match := _TOP_N.search(question):
+        params.top_n = parse_count(match.group(1))
+        if not params.top_n:
+            params.unparsed.append(match.group(0))
+
+    if match := _YEAR_RANGE.search(question):
+        start, end = sorted((int(match.group(1)), int(match.group(2))))
+        params.years = (start, end)
+    elif match := _RECENT_YEARS.search(question):
+        count = parse_count(match.group(1))
+        if count:
+            current = (today or date.today()).year
+            params.years = (current - count + 1, current)
+        else:
+            params.unparsed.append(match.group(0))
+    elif years := _YEAR.findall(question):
+        values = sorted({int(year) for year in years})
+        params.years = (values[0], values[-1])
+
+    keyword = None
+    if match := _QUOTED.search(question):
+        keyword = match.group(1).strip()
+    elif match := _COMPANY.search(question):
+        keyword = _company_name(match.group(1))
+    if keyword:
+        if _SAFE_KEYWORD.match(keyword):
+            params.keyword = keyword
+        else:
+            params.unparsed.append(keyword)
+    return params
+
+
+def _company_name(text: str) -> str:
+    name = text.rsplit("的", 1)[-1]
+    stripped = True
+    while stripped:
+        stripped = False
+        for verb in _LEADING_VERBS:
+            if name.startswith(verb) and len(name) > len(verb) + 2:
+                name = name[len(verb) :]
+                stripped = True
+    return name
+
+
+def _year_filter(column: str, years: tuple[int, int] | None) -> str:
+    if years is None:
+        return ""
+    start, end = years
+    return f"`{column}` >= '{start}-01-01' AND `{column}` < '{end + 1}-01-01'"
+
+
+def _where(*conditions: str) -> str:
+    kept = [condition for condition in conditions if condition]
+    return f" WHERE {' AND '.join(kept)}" if kept else ""
+
+
+def _status_sql(params: QuestionParams) -> str:
+    return (
+        "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` "
+        f"GROUP BY `status` ORDER BY cnt DESC LIMIT {params.top_n or 100}"
+    )
+
+
+def _industry_top_sql(params: QuestionParams) -> str:
+    return (
+        "SELECT `industry_code`, COUNT(*) AS enterprise_count FROM `企业行业代码` "
+        "WHERE `industry_code` IS NOT NULL GROUP BY `industry_code` "
+        f"ORDER BY enterprise_count DESC LIMIT {params.top_n or 20}"
+    )
+
+
+def _finance_round_sql(params: QuestionParams) -> str:
+    where = _where(_year_filter("round_date", params.years))
+    return (
+        "SELECT `round`, COUNT(DISTINCT `eid`) AS enterprise_count, "
+        f"SUM(`amount`) AS total_amount FROM `融资数据`{where} "
+        f"GROUP BY `round` ORDER BY enterprise_count DESC LIMIT {params.top_n or 100}"
+    )
+
+
+def _bid_year_sql(params: QuestionParams) -> str:
+    where = _where(
+        "`publish_time` IS NOT NULL",
+        _year_filter("publish_time", params.years),
+        f"`title` LIKE '%{params.keyword}%'" if params.keyword else "",
+    )
+    return (
+        "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count "
+        f"FROM `招投标`{where} GROUP BY YEAR(`publish_time`) "
+        f"ORDER BY year DESC LIMIT {params.top_n or 100}"
+    )
+
+
+def _company_detail_sql(params: QuestionParams) -> str:
+    # Correlated counts keep one row per company instead of joining the
+    # one-to-many fact views together.
+    where = f" WHERE b.`name` LIKE '%{params.keyword}%'" if params.keyword else ""
+    return (
+        "SELECT b.`eid`, b.`name`, b.`status`, b.`start_date`, "
+        "b.`regist_capi_new`, b.`district_code`, "
+        "(SELECT GROUP_CONCAT(DISTINCT i.`industry_code`) FROM `企业行业代码` i "
+        "WHERE i.`eid` = b.`eid`) AS industry_codes, "
+        "(SELECT COUNT(*) FROM `融资数据` f WHERE f.`eid` = b.`eid`) AS finance_count, "
+        "(SELECT SUM(f.`amount`) FROM `融资数据` f WHERE f.`eid` = b.`eid`) "
+        "AS finance_amount, "
+        "(SELECT COUNT(*) FROM `投资数据` v WHERE v.`eid` = b.`eid`) AS invest_count, "
+        "(SELECT COUNT(*) FROM `招投标` t WHERE t.`eid` = b.`eid`) AS bid_count "
+        f"FROM `企业基本信息` b{where} LIMIT 1"
+    )
+
+
+@dataclass(frozen=True)
+class QuestionTemplate:
+    name: str
+    # Each group needs at least one of its words in the question.
+    required: tuple[tuple[str, ...], ...]
+    # Wording that confirms the question asks for this shape of result.
+    shape: tuple[str, ...]
+    # Topics the template answers; any other topic in the question lowers
+    # confidence below the fast-path threshold.
+    topics: frozenset[str]
+    build: Callable[[QuestionParams], str]
+    uses: frozenset[str] = frozenset({"top_n"})
+    scenarios: frozenset[str] = frozenset()
+    # Other wording the SQL already answers, e.g. the measures it returns.
+    vocabulary: tuple[str, ...] = ()
+    # Filter values the SQL cannot apply (it always returns every group).
+    filters: tuple[str, ...] = ()
+
+    def uncovered(self, question: str) -> str:
+        """Content left in ``question`` once parameters and the template's own
+        words are gone."""
+        for pattern in _PARAM_PATTERNS:
+            question = pattern.sub(" ", question)
+        words = set(self.vocabulary + self.shape + _COMMON_WORDS)
+        words.update(word for group in self.required for word in group)
+        for topic in self.topics:
+            words.update(TOPICS[topic])
+        for word in sorted(words, key=len, reverse=True):
+            question = question.replace(word.lower(), " ")
+        return "".join(_CONTENT_CHAR.findall(question))
+
+
+@dataclass
+class TemplateMatch:
+    template: str
+    confidence: float
+    sql: str
+    params: dict[str, Any]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "template": self.template,
+            "confidence": self.confidence,
+            "params": self.params,
+        }
+
+
+ZNJZ_TEMPLATES = (
+    QuestionTemplate(
+        name="经营状态",
+        required=(("经营状态", "存续", "注销", "吊销"),),
+        shape=("分布", "统计", "数量", "多少", "占", "各", "按", "构成"),
+        topics=frozenset({"status"}),
+        build=_status_sql,
+        filters=("存续", "注销", "吊销", "在业"),
+    ),
+    QuestionTemplate(
+        name="行业 Top",
+        required=(("行业", "产业"),),
+        shape=("top", "前", "最多", "排名", "排行", "主导", "分布", "集中"),
+        topics=frozenset({"industry"}),
+        build=_industry_top_sql,
+    ),
+    QuestionTemplate(
+        name="融资轮次",
+        required=(("融资",), ("轮次", "轮")),
+        shape=("分布", "统计", "数量", "多少", "各", "按", "金额", "构成"),
+        topics=frozenset({"finance"}),
+        build=_finance_round_sql,
+        uses=frozenset({"top_n", "years"}),
+    ),
+    QuestionTemplate(
+        name="招投标年度",
+        required=(
+            ("招投标", "招标", "投标", "中标"),
+            ("年度", "每年", "年份", "按年", "逐年", "趋势", "年"),
+        ),
+        shape=("趋势", "年度", "每年", "按年", "逐年", "数量", "统计", "变化", "多少"),
+        topics=frozenset({"bid"}),
+        build=_bid_year_sql,
+        uses=frozenset({"top_n", "years", "keyword"}),
+        vocabulary=("按年份",),
+    ),
+    QuestionTemplate(
+        name="企业详情",
+        required=(("企业详情", "详情", "基本信息", "画像", "概况"),),
+        shape=("一家", "单个", "某家", "企业详情", "基本信息", "公司", "集团"),
+        topics=frozenset(
+            {
+                "status",
+                "industry",
+                "finance",
+                "bid",
+                "invest",
+                "capital",
+                "founded",
+                "region",
+            }
+        ),
+        build=_company_detail_sql,
+        uses=frozenset({"keyword"}),
+        vocabulary=("投资", "信息", "一家", "某家"),
+        scenarios=frozenset({"due_diligence"}),
+    ),
+)
+
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+
+class TemplateMatcher:
+    """Map known question shapes to parameterized SQL without an LLM call.
+
+    Only matches at or above ``min_confidence`` are returned; anything else
+    falls through to LLM generation.
+    """
+
+    def __init__(
+        self,
+        templates: tuple[QuestionTemplate, ...] = ZNJZ_TEMPLATES,
+        *,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        today: Callable[[], date] = date.today,
+    ) -> None:
+        self.templates = templates
+        self.min_confidence = min_confidence
+        self._today = today
+
+    def match(
+        self, question: str, scenario: str = "data_insight"
+    ) -> TemplateMatch | None:
+        best = self.best(question, scenario)
+        if best is None or best.confidence < self.min_confidence:
+            return None
+        return best
+
+    def best(
+        self, question: str, scenario: str = "data_insight"
+    ) -> TemplateMatch | None:
+        """Highest scoring template regardless of the confidence threshold."""
+        params = extract_params(question, today=self._today())
+        lowered = question.lower()
+        if params.keyword:
+            # A name like “智慧城市” should not read as a region question.
+            lowered = lowered.replace(params.keyword.lower(), " ")
+        topics = {
+            topic
+            for topic, words in TOPICS.items()
+            if any(word in lowered for word in words)
+        }
+        scored = []
+        for template in self.templates:
+            confidence = self._score(template, lowered, scenario, topics, params)
+            if confidence > 0:
+                scored.append((confidence, template))
+        if not scored:
+            return None
+        scored.sort(key=lambda item: -item[0])
+        confidence, template = scored[0]
+        if len(scored) > 1 and scored[1][0] == confidence:
+            # Two shapes fit equally well; let the LLM decide.
+            confidence = min(confidence, 0.5)
+        return TemplateMatch(
+            template=template.name,
+            confidence=round(confidence, 2),
+            sql=template.build(params),
+            params={
+                key: value
+                for key, value in params.to_dict().items()
+                if key in template.uses and value is not None
+            },
+        )
+
+    @staticmethod
+    def _score(
+        template: QuestionTemplate,
+        question: str,
+        scenario: str,
+        topics: set[str],
+        params: QuestionParams,
+    ) -> float:
+        if not all(
+            any(word in question for word in group) for group in template.required
+        ):
+            return 0.0
+        confidence = 0.6
+        if any(word in question for word in template.shape):
+            confidence += 0.3
+        if scenario in template.scenarios:
+            confidence += 0.1
+        if topics - template.topics:
+            confidence -= 0.3
+        if params.unparsed:
+            confidence -= 0.3
+        # Parameters the template cannot express would be silently dropped.
+        if params.years and "years" not in template.uses:
+            confidence -= 0.3
+        if params.keyword and "keyword" not in template.uses:
+            confidence -= 0.3
+        # Filters or measures the template does not know about, such as
+        # “人工智能产业” or “中标金额”, would be silently dropped as well.
+        if template.uncovered(question) or any(
+            word in question for word in template.filters
+        ):
+            confidence -= 0.3
+        return max(min(confidence, 1.0), 0.0)
+
+
+def template_matcher_for(profile_name: str, **kwargs: Any) -> TemplateMatcher | None:
+    if profile_name != "znjz":
+        return None
+    return TemplateMatcher(ZNJZ_TEMPLATES, **kwargs)
@@ -0,0 +1,120 @@
+"""Agent API 的快速 JSON 响应。
+
+``AgentQueryResponse(**result.to_dict())`` 会让 Pydantic 逐行校验 ``rows``，
+再经过 FastAPI 的 ``jsonable_encoder`` 逐值转换，Decimal / datetime 还要走
+慢速的 ``default`` 分支。结果行数一多，序列化时间和响应体积都明显上升。
+
+本模块提供一条旁路：
+
+1. **orjson 序列化**：直接输出 UTF-8 bytes，原生处理 datetime/date，
+   Decimal 转 float；未安装 orjson 时退回标准库 json
+2. **字段裁剪**：``fields=rows,analysis`` 只返回需要的字段（n8n 常见用法），
+   ``success`` / ``error`` 总是保留，便于调用方判断失败
+3. **压缩**：按 ``Accept-Encoding`` 选择 brotli（需安装 brotli）或 gzip，
+   小于阈值的响应不压缩
+"""
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Mapping, Optional, Set
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+
+try:  # 可选依赖：orjson 比标准库快一个数量级
+    import orjson
+except ImportError:  # pragma: no cover - 取决于部署环境
+    orjson = None
+
+try:  # 可选依赖：brotli 压缩率高于 gzip
+    import brotli
+except ImportError:  # pragma: no cover - 取决于部署环境
+    brotli = None
+
+# 小响应压缩收益小于 CPU 开销。
+MIN_COMPRESS_BYTES = 1024
+# 字段裁剪时总是保留，调用方据此判断成功与否。
+ALWAYS_INCLUDED_FIELDS = {"success", "error"}
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", "replace")
+    if hasattr(value, "tolist"):  # array.array / numpy 数组
+        return value.tolist()
+    if isinstance(value, Iterable):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """序列化为 UTF-8 JSON bytes（中文不转义）。"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, default=_default,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Set[str]]:
+    """解析 ``fields=rows,analysis``；为空返回 None（不裁剪），未知字段返回 400。"""
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"未知字段：{', '.join(sorted(unknown))}")
+    return requested | ALWAYS_INCLUDED_FIELDS
+
+
+def select_fields(payload: Mapping[str, Any],
+                  fields: Optional[Set[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return dict(payload)
+    return {key: value for key, value in payload.items() if key in fields}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按 Accept-Encoding 选择 br / gzip；q=0 视为不接受。"""
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in {"q=0", "q=0.0"}:
+            continue
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=5)
+    return body
+
+
+def fast_json_response(data: Any, *, accept_encoding: Optional[str] = None,
+                       status_code: int = 200,
+                       min_compress_bytes: int = MIN_COMPRESS_BYTES) -> Response:
+    """序列化并按需压缩，返回跳过 Pydantic 校验的 JSON 响应。"""
+    body = dumps(data)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = choose_encoding(accept_encoding) if len(body) >= min_compress_bytes else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code,
+                    media_type="application/json", headers=headers)
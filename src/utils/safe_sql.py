@@ -34,6 +34,10 @@ class SafeSQLReport:
     warnings: List[str] = field(default_factory=list)
     referenced_tables: List[str] = field(default_factory=list)
     modifications: List[str] = field(default_factory=list)
+    # EXPLAIN 代价摘要（见 sql_cost.py）；未做代价检查时为 None
+    cost: Optional[dict] = None
+    # 因代价超限被拒绝、但允许交给 repair 节点改写
+    repairable: bool = False
 
     def to_dict(self) -> dict:
         return {
@@ -44,6 +48,8 @@ class SafeSQLReport:
             "warnings": list(self.warnings),
             "referenced_tables": list(self.referenced_tables),
             "modifications": list(self.modifications),
+            "cost": self.cost,
+            "repairable": bool(self.repairable),
         }
 
 
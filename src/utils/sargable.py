@@ -0,0 +1,186 @@
+"""把 LLM 生成 SQL 中“函数包住索引列”的条件改写为等价的范围条件。
+
+LLM 经常写出 ``YEAR(publish_time) = 2024``、``DATE_FORMAT(start_date, '%Y-%m')
+= '2024-03'``、``DATE(round_date) = '2024-05-01'`` 这类条件：列被函数包住后
+MySQL 无法使用 `start_date`/`publish_time` 上的索引，只能全表扫描再逐行计算。
+
+本模块在 ``SafeSQLEnforcer.check`` 之后改写这些条件：
+
+1. 只改写 schema 中类型为 DATE/DATETIME/TIMESTAMP 的列 —— 字符串列上的
+   ``YEAR()``/``DATE_FORMAT()`` 依赖 MySQL 的隐式解析，范围比较不再等价；
+2. 只改写能精确落在日历边界上的字面量（整年、整月、整天），例如
+   ``YEAR(c) = 2024`` → ``(c >= '2024-01-01' AND c < '2025-01-01')``；
+3. 改写结果加括号，NULL 语义与原条件一致（两边对 NULL 都得到 NULL）。
+
+``LIKE '%kw%'`` 这类前导通配符无法改写为范围，只记录警告。每次改写都写入
+``SafeSQLReport.modifications``。
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from .safe_sql import SafeSQLReport
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+_COLUMN = r"(?:`[^`]+`|[A-Za-z_]\w*)(?:\.(?:`[^`]+`|[A-Za-z_]\w*))?"
+_OPERATOR = r"<=|>=|=|<|>"
+_VALUE = r"\d{4}|\x00\d+\x00"
+# 比较值之后不能紧跟算术运算，否则 ``YEAR(c) = 2024 + 1`` 会被截断改写。
+_END = r"(?!\d)(?!\s*[-+*/%.(])"
+
+_YEAR = re.compile(
+    rf"\bYEAR\s*\(\s*(?P<column>{_COLUMN})\s*\)\s*"
+    rf"(?:(?P<op>{_OPERATOR})\s*(?P<value>{_VALUE})"
+    rf"|BETWEEN\s+(?P<low>{_VALUE})\s+AND\s+(?P<high>{_VALUE})){_END}",
+    re.IGNORECASE,
+)
+_DATE_FORMAT = re.compile(
+    rf"\bDATE_FORMAT\s*\(\s*(?P<column>{_COLUMN})\s*,\s*(?P<format>\x00\d+\x00)\s*\)\s*"
+    rf"(?:(?P<op>{_OPERATOR})\s*(?P<value>\x00\d+\x00)"
+    rf"|BETWEEN\s+(?P<low>\x00\d+\x00)\s+AND\s+(?P<high>\x00\d+\x00)){_END}",
+    re.IGNORECASE,
+)
+_DATE = re.compile(
+    rf"\bDATE\s*\(\s*(?P<column>{_COLUMN})\s*\)\s*"
+    rf"(?:(?P<op>{_OPERATOR})\s*(?P<value>\x00\d+\x00)"
+    rf"|BETWEEN\s+(?P<low>\x00\d+\x00)\s+AND\s+(?P<high>\x00\d+\x00)){_END}",
+    re.IGNORECASE,
+)
+_LEADING_WILDCARD = re.compile(
+    rf"(?P<column>{_COLUMN})\s+(?:NOT\s+)?LIKE\s+(?P<value>\x00\d+\x00)",
+    re.IGNORECASE,
+)
+
+# DATE_FORMAT 格式 -> (字面量正则, 粒度)。都是定宽、按时间单调的格式。
+_FORMATS = {
+    "%Y": (r"(\d{4})", "year"),
+    "%Y-%m": (r"(\d{4})-(\d{2})", "month"),
+    "%Y%m": (r"(\d{4})(\d{2})", "month"),
+    "%Y-%m-%d": (r"(\d{4})-(\d{2})-(\d{2})", "day"),
+    "%Y%m%d": (r"(\d{4})(\d{2})(\d{2})", "day"),
+}
+
+
+def _period(text: str, pattern: str, unit: str) -> Optional[Tuple[date, date]]:
+    """字面量对应的 [起点, 下一个起点)；不是合法日历值时返回 None。"""
+    match = re.fullmatch(pattern, text)
+    if match is None:
+        return None
+    parts = [int(part) for part in match.groups()] + [1] * (3 - len(match.groups()))
+    try:
+        start = date(*parts)
+        if unit == "year":
+            end = start.replace(year=start.year + 1)
+        elif unit == "month":
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            end = start + timedelta(days=1)
+    except (ValueError, OverflowError):
+        return None                       # 含 9999 年：下一个起点超出 date 范围
+    if start.year < 1000:
+        return None
+    return start, end
+
+
+def _range(column: str, op: str, period: Tuple[date, date]) -> str:
+    start, end = (f"'{day.isoformat()}'" for day in period)
+    if op == "=":
+        return f"({column} >= {start} AND {column} < {end})"
+    if op == ">=":
+        return f"{column} >= {start}"
+    if op == ">":
+        return f"{column} >= {end}"
+    if op == "<":
+        return f"{column} < {start}"
+    return f"{column} < {end}"
+
+
+class SargableRewriter:
+    """``SafeSQLEnforcer.check`` 之后的可选改写步骤。
+
+    ``temporal_columns`` 是类型为 DATE/DATETIME/TIMESTAMP 的列名（不区分表，
+    同名列在任何表中不是日期类型就不应出现在这里）。
+    """
+
+    def __init__(self, temporal_columns: Iterable[str]):
+        self.temporal_columns = {name.lower() for name in temporal_columns}
+
+    def rewrite(self, report: SafeSQLReport) -> SafeSQLReport:
+        """原地改写 ``report.safe_sql``，记录 modifications 和 warnings。"""
+        if not report.is_safe or not report.safe_sql:
+            return report
+        sql, modifications, warnings = self.rewrite_sql(report.safe_sql)
+        report.safe_sql = sql
+        report.modifications.extend(modifications)
+        report.warnings.extend(warnings)
+        return report
+
+    def rewrite_sql(self, sql: str) -> Tuple[str, List[str], List[str]]:
+        literals: List[str] = []
+
+        def mask(match: re.Match) -> str:
+            literals.append(match.group(0))
+            return f"\x00{len(literals) - 1}\x00"
+
+        def unmask(text: str) -> str:
+            return _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], text)
+
+        def literal(token: str) -> Optional[str]:
+            """占位符对应的字符串内容；数字原样返回。"""
+            found = _PLACEHOLDER.fullmatch(token)
+            if found is None:
+                return token
+            text = literals[int(found.group(1))]
+            return None if "\\" in text or "''" in text else text[1:-1]
+
+        modifications: List[str] = []
+        masked = _LITERAL.sub(mask, sql)
+
+        def replace(match: re.Match, pattern: str, unit: str) -> str:
+            column = match.group("column")
+            before = match.string[:match.start()].rstrip()
+            # ``x + YEAR(c) = 2024`` 中比较的是整个算术表达式，不能只改写右半部分。
+            if (column.split(".")[-1].strip("`").lower() not in self.temporal_columns
+                    or before.endswith(("+", "-", "*", "/", "%"))):
+                return match.group(0)
+            if match.group("op"):
+                value = literal(match.group("value"))
+                period = _period(value, pattern, unit) if value is not None else None
+                if period is None:
+                    return match.group(0)
+                rewritten = _range(column, match.group("op"), period)
+            else:
+                low, high = literal(match.group("low")), literal(match.group("high"))
+                first = _period(low, pattern, unit) if low is not None else None
+                last = _period(high, pattern, unit) if high is not None else None
+                if first is None or last is None:
+                    return match.group(0)
+                rewritten = (f"({column} >= '{first[0].isoformat()}' "
+                             f"AND {column} < '{last[1].isoformat()}')")
+            modifications.append(
+                f"{unmask(match.group(0))} 改写为可用索引的范围条件 {rewritten}"
+            )
+            return rewritten
+
+        masked = _YEAR.sub(lambda m: replace(m, r"(\d{4})", "year"), masked)
+
+        def date_format(match: re.Match) -> str:
+            fmt = literal(match.group("format"))
+            if fmt not in _FORMATS:
+                return match.group(0)
+            return replace(match, *_FORMATS[fmt])
+
+        masked = _DATE_FORMAT.sub(date_format, masked)
+        masked = _DATE.sub(lambda m: replace(m, *_FORMATS["%Y-%m-%d"]), masked)
+
+        warnings = []
+        for match in _LEADING_WILDCARD.finditer(masked):
+            value = literal(match.group("value"))
+            if value and value[0] in "%_":
+                warnings.append(
+                    f"{match.group('column')} LIKE '{value}' 以通配符开头，无法使用索引"
+                )
+        return unmask(masked), modifications, warnings
@@ -0,0 +1,209 @@
+"""按 schema 字段目录校验 SQL 中的字段引用。
+
+LLM 常写出 ``industry_name``、``company_name``、``city`` 这类 schema 中不存在的
+字段。以前要等 MySQL 返回 ``Unknown column`` 才进入 ``repair_sql``：一次数据库
+往返 + 一次带完整 schema 的 LLM 调用。本模块在 ``SafeSQLEnforcer.check`` 之后、
+执行之前解析字段引用：
+
+1. 每个字段引用都对照查询中出现的白名单表/视图的字段目录；``b.col`` 按别名对应
+   的表校验，其余（子查询、CTE、SELECT 别名）只要在查询内有定义即放过；
+2. 未知字段若在别名表中（如 ``company_name`` → ``name``、``finance_round`` →
+   ``round``），且替换后的字段唯一落在一张表上，就确定性地改写并记入
+   ``modifications``；别名表只收含义不变的改名，``city`` → ``district_code``
+   这类名称换代码会改变查询含义，只作为提示写进错误；
+3. 改写不了时拒绝并标记 ``repairable``，由 ``repair_sql`` 带着错误交给 LLM。
+
+宁可漏判也不误判：不认识的限定符、sqlparse 识别不了的关键字都放过，留给 MySQL。
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+import sqlparse
+from sqlparse.tokens import (Comment, DML, Keyword, Literal, Name, Punctuation,
+                             Whitespace)
+
+from .safe_sql import SafeSQLReport
+
+# 这些关键字后面紧跟的名字不是字段：字符集、排序规则
+_NOT_COLUMN_AFTER = {"USING", "COLLATE", "CHARACTER SET", "CHARSET"}
+
+
+def _unquote(value: str) -> str:
+    return value.strip("`").lower()
+
+
+def _quote(name: str) -> str:
+    return f"`{name}`"
+
+
+class ColumnValidator:
+    """``SafeSQLEnforcer.check`` 之后的字段校验 + 确定性修正。
+
+    ``columns``：表/视图名 -> 字段名列表；``aliases``：常见错误字段名 -> 按优先级
+    排列的正确字段名，例如 ``{"company_name": ("name", "ename")}``，会被直接改写；
+    ``hints``：没有同义字段的错误字段名 -> 错误信息中建议的字段，不改写。
+    """
+
+    def __init__(self, columns: Mapping[str, Iterable[str]], *,
+                 aliases: Optional[Mapping[str, Sequence[str]]] = None,
+                 hints: Optional[Mapping[str, Sequence[str]]] = None):
+        self.columns: Dict[str, Set[str]] = {
+            table.lower(): {name.lower() for name in names}
+            for table, names in columns.items()
+        }
+        self.aliases: Dict[str, Tuple[str, ...]] = {
+            name.lower(): tuple(targets) for name, targets in (aliases or {}).items()
+        }
+        self.hints: Dict[str, Tuple[str, ...]] = {
+            name.lower(): tuple(targets) for name, targets in (hints or {}).items()
+        }
+
+    def check(self, report: SafeSQLReport) -> SafeSQLReport:
+        """原地更新 report：改写可修正的字段，其余未知字段记错误并标记可修复。"""
+        if not report.is_safe or not report.safe_sql:
+            return report
+        sql, modifications, errors = self.resolve(report.safe_sql)
+        report.modifications.extend(modifications)
+        if errors:
+            report.errors.extend(errors)
+            report.safe_sql = None
+            report.is_safe = False
+            report.repairable = True
+        else:
+            report.safe_sql = sql
+        return report
+
+    def resolve(self, sql: str) -> Tuple[str, List[str], List[str]]:
+        """返回 ``(改写后的 SQL, modifications, errors)``。"""
+        tokens = [tok for tok in sqlparse.parse(sql)[0].flatten()]
+        significant = [i for i, tok in enumerate(tokens)
+                       if tok.ttype not in Whitespace
+                       and tok.ttype not in Comment]
+
+        def at(pos: int):
+            if 0 <= pos < len(significant):
+                return tokens[significant[pos]]
+            return None
+
+        def is_name(tok) -> bool:
+            return tok is not None and tok.ttype is Name
+
+        def is_punct(tok, value: str) -> bool:
+            return tok is not None and tok.ttype is Punctuation and tok.value == value
+
+        def is_keyword(tok, *values: str) -> bool:
+            return (tok is not None and tok.ttype in Keyword
+                    and tok.normalized in values)
+
+        # 每个 token 所在的 SELECT 块：括号内以 SELECT 开头时是新块（子查询、
+        # CTE），函数参数和 IN 列表仍属于外层块。
+        blocks: List[int] = []
+        stack = [0]
+        for pos in range(len(significant)):
+            tok = at(pos)
+            if is_punct(tok, "("):
+                inner = at(pos + 1)
+                is_select = inner is not None and inner.ttype in DML
+                stack.append(len(blocks) + 1 if is_select else stack[-1])
+            blocks.append(stack[-1])
+            if is_punct(tok, ")") and len(stack) > 1:
+                stack.pop()
+
+        # 第一遍：收集查询里的表、表别名和各种定义出来的名字
+        tables: List[str] = []            # 出现的白名单表（按出现顺序）
+        block_tables: Dict[int, List[str]] = {}
+        qualifiers: Dict[str, str] = {}   # 别名/表名 -> 白名单表
+        defined: Set[str] = set()         # SELECT 别名、表别名、CTE 名
+        references: List[int] = []        # 待校验的字段引用位置
+        for pos in range(len(significant)):
+            tok = at(pos)
+            prev, after = at(pos - 1), at(pos + 1)
+            if tok.ttype in Literal.String:
+                # AS '企业数量' / AS "cnt"：MySQL 允许用字符串写别名，ORDER BY、
+                # GROUP BY、HAVING 里再用反引号或裸名引用
+                if is_keyword(prev, "AS") or is_name(prev) or is_punct(prev, ")") \
+                        or is_keyword(prev, "END"):
+                    defined.add(tok.value.strip("'\"`").lower())
+                continue
+            if not is_name(tok):
+                continue
+            name = _unquote(tok.value)
+            if is_punct(after, "(") or is_punct(after, "."):
+                continue                  # 函数名或限定符
+            if is_punct(prev, "."):
+                references.append(pos)
+                continue
+            if name in self.columns:
+                if name not in tables:
+                    tables.append(name)
+                block_tables.setdefault(blocks[pos], []).append(name)
+            if is_keyword(after, "AS") and is_punct(at(pos + 2), "("):
+                defined.add(name)         # WITH name AS (...)
+                continue
+            base = at(pos - 2) if is_keyword(prev, "AS") else prev
+            if is_keyword(prev, "AS") or is_name(prev) or (
+                    prev is not None and (prev.ttype in Literal
+                                          or is_punct(prev, ")")
+                                          or is_keyword(prev, "END"))):
+                defined.add(name)         # 显式或隐式别名
+                if is_name(base) and _unquote(base.value) in self.columns:
+                    qualifiers[name] = _unquote(base.value)
+                continue
+            if is_keyword(prev, *_NOT_COLUMN_AFTER):
+                continue
+            references.append(pos)
+        for table in tables:
+            qualifiers.setdefault(table, table)
+
+        known = set(defined) | set(tables)
+        for table in tables:
+            known |= self.columns[table]
+
+        modifications: List[str] = []
+        errors: List[str] = []
+        for pos in references:
+            tok = at(pos)
+            name = _unquote(tok.value)
+            if is_punct(at(pos - 1), "."):
+                qualifier = at(pos - 2)
+                if (not is_name(qualifier) or is_punct(at(pos - 3), ".")
+                        or _unquote(qualifier.value) not in qualifiers):
+                    continue              # 子查询、CTE 或库名限定：交给 MySQL
+                scope = [qualifiers[_unquote(qualifier.value)]]
+                ref = f"{qualifier.value}.{tok.value}"
+                if name in self.columns[scope[0]]:
+                    continue
+            else:
+                # 未加反引号的全大写单词多半是 sqlparse 不认识的 MySQL 关键字；
+                # schema 字段都是小写。
+                if name in known or (not tok.value.startswith("`")
+                                     and tok.value.isupper()):
+                    continue
+                # 只在字段所在 SELECT 块自己的 FROM/JOIN 中修正，避免把子查询里
+                # 的字段改成外层表的同名字段。
+                scope, ref = block_tables.get(blocks[pos], []), tok.value
+            target = self._fix(name, scope)
+            if target is not None:
+                tok.value = _quote(target)
+                message = f"字段 {ref} 不存在，自动改为 {_quote(target)}"
+                if message not in modifications:
+                    modifications.append(message)
+                continue
+            hint = self.aliases.get(name) or self.hints.get(name)
+            where = "、".join(_quote(table) for table in scope or tables)
+            message = (f"Unknown column '{ref}'：{where or '查询引用的表'} 中没有该字段"
+                       + (f"，应使用 {'/'.join(map(_quote, hint))}" if hint else ""))
+            if message not in errors:
+                errors.append(message)
+        return "".join(tok.value for tok in tokens), modifications, errors
+
+    def _fix(self, name: str, scope: Sequence[str]) -> Optional[str]:
+        """别名表中第一个恰好属于 scope 内一张表的字段。"""
+        for target in self.aliases.get(name, ()):
+            owners = [table for table in scope if target.lower() in self.columns[table]]
+            if len(owners) == 1:
+                return target
+            if owners:
+                return None               # 多表都有：不加限定会歧义
+        return None
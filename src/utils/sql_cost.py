@@ -0,0 +1,253 @@
+"""基于 ``EXPLAIN FORMAT=JSON`` 的 SQL 代价守卫。
+
+``SafeSQLEnforcer`` 只看语句类型、黑名单、白名单和 LIMIT。但带 LIMIT 1000 的
+查询依然可能全表扫描 `招投标信息`（59 万行），或者在 LIMIT 生效之前先把
+几张一对多事实表做成笛卡尔积。这些查询合法但会拖垮共享 MySQL。
+
+本模块在执行前对安全 SQL 跑一次 ``EXPLAIN FORMAT=JSON``，读出：
+
+1. **query_cost**：优化器估算的总代价
+2. **rows_examined**：按嵌套循环累乘估算的扫描行数
+3. **全表扫描**：单表无索引全扫（``ALL``）超过行数上限，例如整张 `招投标信息`；
+   连接里第二张及之后的表用 ``ALL``/``index`` 全扫
+4. **filesort / temporary**：在大中间结果上排序或建临时表
+
+超过阈值时按配置 reject 或交给 repair 节点改写，估算代价写入
+``SafeSQLReport.cost``。EXPLAIN 自身失败（例如字段不存在）时不拦截，
+交给执行阶段报错并走正常修复流程。
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from .safe_sql import SafeSQLReport
+
+# EXPLAIN 中表示整表 / 整索引扫描的访问类型。
+FULL_SCAN_ACCESS_TYPES = {"ALL", "index"}
+
+
+@dataclass
+class CostThresholds:
+    """代价阈值。``action`` 为 ``reject``（直接拒绝）或 ``repair``（交给 LLM 改写）。"""
+    max_query_cost: float = 10_000_000.0
+    max_rows_examined: int = 5_000_000
+    # 单表 ALL 全扫的行数上限：znjz 只有 `招投标信息`（约 59 万行）会超过，其余表都在 3 万行左右
+    max_full_scan_rows: int = 100_000
+    max_join_scan_rows: int = 100_000
+    max_sort_rows: int = 1_000_000
+    action: str = "repair"
+
+    @classmethod
+    def from_mapping(cls, source: Optional[Mapping[str, Any]] = None) -> "CostThresholds":
+        data = source or os.environ
+        defaults = cls()
+        action = str(data.get("SQL_COST_ACTION") or defaults.action).lower()
+        if action not in {"reject", "repair"}:
+            raise ValueError(f"Unsupported SQL_COST_ACTION: {action}")
+        return cls(
+            max_query_cost=float(data.get("SQL_COST_MAX_QUERY_COST") or defaults.max_query_cost),
+            max_rows_examined=int(data.get("SQL_COST_MAX_ROWS_EXAMINED") or defaults.max_rows_examined),
+            max_full_scan_rows=int(data.get("SQL_COST_MAX_FULL_SCAN_ROWS") or defaults.max_full_scan_rows),
+            max_join_scan_rows=int(data.get("SQL_COST_MAX_JOIN_SCAN_ROWS") or defaults.max_join_scan_rows),
+            max_sort_rows=int(data.get("SQL_COST_MAX_SORT_ROWS") or defaults.max_sort_rows),
+            action=action,
+        )
+
+
+@dataclass
+class TableAccess:
+    table: str
+    access_type: str
+    rows_examined_per_scan: float
+    rows_produced_per_join: float
+    loops: float
+
+    @property
+    def rows_examined(self) -> float:
+        return self.rows_examined_per_scan * self.loops
+
+
+@dataclass
+class PlanCost:
+    """从 EXPLAIN JSON 抽出的代价摘要。"""
+    query_cost: float = 0.0
+    rows_examined: float = 0.0
+    result_rows: float = 0.0
+    using_filesort: bool = False
+    using_temporary: bool = False
+    tables: List[TableAccess] = field(default_factory=list)
+
+    @property
+    def join_scans(self) -> List[TableAccess]:
+        """连接中（非驱动表）做全扫的表。"""
+        return [t for t in self.tables
+                if t.loops > 1 and t.access_type in FULL_SCAN_ACCESS_TYPES]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "query_cost": round(self.query_cost, 2),
+            "rows_examined": int(self.rows_examined),
+            "result_rows": int(self.result_rows),
+            "using_filesort": self.using_filesort,
+            "using_temporary": self.using_temporary,
+            "tables": [
+                {
+                    "table": t.table,
+                    "access_type": t.access_type,
+                    "rows_examined_per_scan": int(t.rows_examined_per_scan),
+                    "loops": int(t.loops),
+                }
+                for t in self.tables
+            ],
+        }
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def parse_explain_json(plan: Any) -> PlanCost:
+    """解析 ``EXPLAIN FORMAT=JSON`` 输出（dict 或 JSON 字符串）。
+
+    ``nested_loop`` 中每张表被扫描的次数是前一张表的 ``rows_produced_per_join``，
+    所以总扫描行数按循环累乘；子查询、派生表和 UNION 分支递归合并。
+    """
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    cost = PlanCost()
+    block = plan.get("query_block", plan) if isinstance(plan, dict) else {}
+    cost.query_cost = _number(block.get("cost_info", {}).get("query_cost"))
+    _walk(block, cost, loops=1.0)
+    return cost
+
+
+def _walk(node: Any, cost: PlanCost, loops: float) -> float:
+    """遍历计划节点，返回该节点产出的行数（用作后续表的循环次数）。"""
+    if isinstance(node, list):
+        produced = loops
+        for child in node:
+            produced = _walk(child, cost, produced)
+        return produced
+    if not isinstance(node, dict):
+        return loops
+
+    if node.get("using_filesort"):
+        cost.using_filesort = True
+    if node.get("using_temporary_table"):
+        cost.using_temporary = True
+
+    produced = loops
+    if "table" in node and isinstance(node["table"], dict):
+        produced = _walk_table(node["table"], cost, loops)
+    if "nested_loop" in node:
+        produced = _walk(node["nested_loop"], cost, loops)
+    for key in ("ordering_operation", "grouping_operation", "duplicates_removal",
+                "windowing", "query_block"):
+        if key in node:
+            produced = _walk(node[key], cost, produced)
+    if "union_result" in node:
+        specs = node["union_result"].get("query_specifications", [])
+        for spec in specs:
+            _walk(spec.get("query_block", spec), cost, 1.0)
+    for key in ("select_list_subqueries", "attached_subqueries",
+                "optimized_away_subqueries", "having_subqueries",
+                "order_by_subqueries", "group_by_subqueries"):
+        for sub in node.get(key, []):
+            # 相关子查询对外层每行执行一次。
+            times = produced if sub.get("dependent") else 1.0
+            _walk(sub.get("query_block", sub), cost, times)
+    return produced
+
+
+def _walk_table(table: Dict[str, Any], cost: PlanCost, loops: float) -> float:
+    per_scan = _number(table.get("rows_examined_per_scan"))
+    produced = _number(table.get("rows_produced_per_join")) or per_scan * loops
+    if table.get("using_temporary_table"):
+        cost.using_temporary = True
+    if "materialized_from_subquery" in table:
+        materialized = table["materialized_from_subquery"]
+        _walk(materialized.get("query_block", materialized), cost, 1.0)
+    access = TableAccess(
+        table=str(table.get("table_name", "")),
+        access_type=str(table.get("access_type", "")),
+        rows_examined_per_scan=per_scan,
+        rows_produced_per_join=produced,
+        loops=loops,
+    )
+    cost.tables.append(access)
+    cost.rows_examined += access.rows_examined
+    cost.result_rows = max(cost.result_rows, produced)
+    return produced
+
+
+def cost_violations(cost: PlanCost, thresholds: CostThresholds) -> List[str]:
+    """返回超过阈值的项目（中文说明，会写入 report.errors 并作为修复提示）。"""
+    problems: List[str] = []
+    if cost.query_cost > thresholds.max_query_cost:
+        problems.append(
+            f"估算代价 {cost.query_cost:.0f} 超过上限 {thresholds.max_query_cost:.0f}"
+        )
+    if cost.rows_examined > thresholds.max_rows_examined:
+        problems.append(
+            f"估算扫描 {int(cost.rows_examined)} 行，超过上限 {thresholds.max_rows_examined}"
+        )
+    for scan in cost.tables:
+        if scan.access_type == "ALL" and (
+                scan.rows_examined_per_scan > thresholds.max_full_scan_rows):
+            problems.append(
+                f"`{scan.table}` 无索引全表扫描约 {int(scan.rows_examined_per_scan)} 行，"
+                f"超过上限 {thresholds.max_full_scan_rows}，"
+                "请用可走索引的条件（如日期范围、eid）缩小范围"
+            )
+    for scan in cost.join_scans:
+        if scan.rows_examined > thresholds.max_join_scan_rows:
+            problems.append(
+                f"连接中 `{scan.table}` 无索引全扫（{scan.access_type}，每次 "
+                f"{int(scan.rows_examined_per_scan)} 行 × {int(scan.loops)} 次），"
+                "请先在子查询中按 eid 聚合再 JOIN"
+            )
+    if (cost.using_filesort or cost.using_temporary) and (
+            cost.result_rows > thresholds.max_sort_rows):
+        kinds = "/".join(k for k, used in (("filesort", cost.using_filesort),
+                                          ("临时表", cost.using_temporary)) if used)
+        problems.append(
+            f"在约 {int(cost.result_rows)} 行中间结果上使用 {kinds}，"
+            f"超过上限 {thresholds.max_sort_rows}"
+        )
+    return problems
+
+
+class ExplainCostGuard:
+    """执行前的 EXPLAIN 代价检查。
+
+    ``explain`` 接收安全 SQL，返回 ``EXPLAIN FORMAT=JSON`` 的结果（dict 或
+    JSON 字符串），通常是 ``PooledMySQLExecutor.explain``。
+    """
+
+    def __init__(self, explain: Callable[[str], Any], *,
+                 thresholds: Optional[CostThresholds] = None):
+        self.explain = explain
+        self.thresholds = thresholds or CostThresholds()
+
+    def check(self, report: SafeSQLReport) -> SafeSQLReport:
+        """原地更新 report：写入 ``cost``，超限时拒绝并按配置标记可修复。"""
+        if not report.is_safe or not report.safe_sql:
+            return report
+        try:
+            cost = parse_explain_json(self.explain(report.safe_sql))
+        except Exception as exc:
+            report.warnings.append(f"EXPLAIN 代价检查跳过：{exc}")
+            return report
+        report.cost = cost.to_dict()
+        problems = cost_violations(cost, self.thresholds)
+        if problems:
+            report.errors.extend(problems)
+            report.is_safe = False
+            report.repairable = self.thresholds.action == "repair"
+        return report
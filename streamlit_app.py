@@ -90,11 +90,10 @@ def require_password() -> bool:
     return False
 
 
-def render_chart(chart: dict[str, Any] | None, rows: list[dict[str, Any]]) -> None:
-    if not chart or not rows:
+def render_chart(chart: dict[str, Any] | None, df: pd.DataFrame) -> None:
+    if not chart or df.empty:
         return
 
-    df = pd.DataFrame(rows)
     x_col = chart.get("x")
     y_col = chart.get("y")
     if x_col not in df.columns or y_col not in df.columns:
@@ -159,11 +158,12 @@ def main() -> None:
     left.metric("返回行数", result.row_count)
     right.metric("工作流", runtime.workflow_backend)
 
+    df = result.table.to_pandas() if result.table is not None else pd.DataFrame(result.rows)
     tab_report, tab_data, tab_sql, tab_trace = st.tabs(["报告", "数据", "SQL", "Trace"])
 
     with tab_report:
         st.markdown(result.analysis or "无分析内容")
-        render_chart(result.chart, result.rows)
+        render_chart(result.chart, df)
         st.download_button(
             "下载 Markdown",
             data=result.report,
@@ -172,7 +172,7 @@ def main() -> None:
         )
 
     with tab_data:
-        st.dataframe(pd.DataFrame(result.rows), use_container_width=True, hide_index=True)
+        st.dataframe(df, use_container_width=True, hide_index=True)
 
     with tab_sql:
         st.code(result.safe_sql or result.sql or "", language="sql")
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import api_server
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.result_store import ResultStore
+from src.agent.runtime import AgentResult, AgentRuntime
+
+STATUS_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class FakeLLM:
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        prompt = messages[-1]["content"]
+        if "只返回一条MySQL SELECT语句" in prompt:
+            if "炸掉" in prompt:
+                raise RuntimeError("provider exploded")
+            return STATUS_SQL
+        return "### 核心发现\n\n存续企业占多数。"
+
+
+class SlowExecutor:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, sql):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        }
+
+
+def _runtime(executor):
+    return AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=executor,
+        metrics=MetricsRegistry(),
+    )
+
+
+def test_abatch_bounds_concurrency_and_isolates_failures():
+    executor = SlowExecutor()
+    runtime = _runtime(executor)
+    original = runtime.aquery
+
+    async def aquery(question, **kwargs):
+        if question == "坏问题":
+            raise ValueError("boom")
+        return await original(question, **kwargs)
+
+    runtime.aquery = aquery
+    items = [(f"统计企业经营状态分布 {i}", "data_insight") for i in range(6)]
+    items.insert(2, ("坏问题", "data_insight"))
+
+    async def collect():
+        return [pair async for pair in runtime.abatch(items, concurrency=2)]
+
+    results = dict(asyncio.run(collect()))
+
+    assert sorted(results) == list(range(7))
+    assert executor.peak == 2
+    assert results[2].success is False
+    assert results[2].error == "ValueError: boom"
+    assert all(results[i].success for i in results if i != 2)
+
+
+def test_sync_batch_runs_items_in_parallel():
+    executor = SlowExecutor(delay=0.1)
+    runtime = _runtime(executor)
+    items = [(f"按行业统计企业数量 {i}", "industry") for i in range(4)]
+
+    results = dict(runtime.batch(items, concurrency=4))
+
+    assert [results[i].question for i in range(4)] == [q for q, _ in items]
+    assert executor.peak == 4
+
+
+def test_batch_endpoint_streams_ndjson_with_per_item_errors(monkeypatch):
+    runtime = _runtime(SlowExecutor(delay=0))
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: runtime)
+    monkeypatch.setattr(api_server, "_result_store", ResultStore())
+    client = TestClient(api_server.app)
+
+    response = client.post(
+        "/api/agent/batch",
+        json={
+            "items": [
+                {"question": "统计企业经营状态分布"},
+                {"question": "把数据库炸掉", "scenario": "industry"},
+            ],
+            "concurrency": 2,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_index = {line["index"]: line for line in lines[:-1]}
+    assert by_index[0]["success"] is True
+    assert by_index[0]["rows"] == [{"status": "存续", "cnt": 3}]
+    assert isinstance(
+        api_server._result_store.get(by_index[0]["result_id"]), AgentResult
+    )
+    assert by_index[1]["success"] is False
+    assert by_index[1]["scenario"] == "industry"
+    assert lines[-1]["done"] is True
+    assert (lines[-1]["succeeded"], lines[-1]["failed"]) == (1, 1)
+
+    assert client.post("/api/agent/batch", json={"items": []}).status_code == 422
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import api_server
+from src.agent.cache import (
+    MemoryAnswerCache,
+    SQLiteAnswerCache,
+    TieredAnswerCache,
+    answer_cache_key,
+    normalize_question,
+)
+from src.agent.factory import answer_cache_from_mapping
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentResult, AgentRuntime
+
+STATUS_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        self.calls += 1
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return STATUS_SQL
+        return "### 核心发现\n\n存续企业占多数。"
+
+
+class CountingExecutor:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, sql):
+        self.calls += 1
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _result(question: str = "q") -> AgentResult:
+    return AgentResult(question=question, scenario="data_insight", success=True)
+
+
+def _runtime(cache=None, metrics=None):
+    llm = CountingLLM()
+    executor = CountingExecutor()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=llm,
+        sql_executor=executor,
+        answer_cache=cache if cache is not None else MemoryAnswerCache(),
+        metrics=metrics or MetricsRegistry(),
+    )
+    return runtime, llm, executor
+
+
+def test_normalize_question_folds_width_case_punctuation_and_spacing():
+    assert normalize_question("统计 企业经营状态分布？") == normalize_question(
+        "统计企业经营状态分布"
+    )
+    assert normalize_question("Top１０ 行业") == normalize_question("top10行业")
+    assert answer_cache_key("统计企业！", "data_insight", "znjz") == (
+        "znjz|data_insight|统计企业"
+    )
+
+
+def test_normalize_question_keeps_punctuation_inside_numbers():
+    keys = {
+        answer_cache_key(question, "data_insight", "znjz")
+        for question in (
+            "增长5.5%的企业",
+            "增长55的企业",
+            "增长5.5的企业",
+            "增长5 5%的企业",
+        )
+    }
+
+    assert len(keys) == 4
+    assert (
+        normalize_question("２０２０－２０２２年，增长５．５％？")
+        == "2020-2022年增长5.5%"
+    )
+    assert normalize_question("2020-2022") != normalize_question("2020 2022")
+
+
+def test_memory_cache_evicts_least_recently_used_and_expired_entries():
+    clock = FakeClock()
+    cache = MemoryAnswerCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", _result("a"))
+    cache.set("b", _result("b"))
+    assert cache.get("a").question == "a"
+
+    cache.set("c", _result("c"))
+    assert cache.get("b") is None
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_sqlite_tier_survives_new_instance_and_backfills_memory(tmp_path):
+    path = tmp_path / "answers.sqlite3"
+    SQLiteAnswerCache(path).set("k", _result("persisted"))
+
+    memory = MemoryAnswerCache()
+    tiered = TieredAnswerCache(memory, SQLiteAnswerCache(path))
+
+    assert tiered.get("k").question == "persisted"
+    assert memory.get("k").question == "persisted"
+    assert tiered.invalidate("k") is True
+    assert tiered.get("k") is None
+
+
+def test_runtime_answer_cache_hit_skips_llm_and_sql():
+    metrics = MetricsRegistry()
+    runtime, llm, executor = _runtime(metrics=metrics)
+
+    first = runtime.query("统计企业经营状态分布")
+    llm_calls, sql_calls = llm.calls, executor.calls
+    second = runtime.query("统计 企业经营状态分布？")
+
+    assert first.trace[0] == {"node": "answer_cache", "status": "miss"}
+    assert second.trace == [
+        {"node": "answer_cache", "status": "hit", "profile": "znjz"}
+    ]
+    assert second.rows == first.rows
+    assert (llm.calls, executor.calls) == (llm_calls, sql_calls)
+    assert metrics.counter("agent_cache_requests_total", cache="answer", result="hit")
+    assert metrics.counter("agent_cache_requests_total", cache="answer", result="miss")
+
+
+def test_runtime_aquery_shares_answer_cache_and_invalidation():
+    runtime, llm, _ = _runtime()
+    runtime.query("统计企业经营状态分布")
+
+    hit = asyncio.run(runtime.aquery("统计企业经营状态分布"))
+    assert hit.trace[0]["status"] == "hit"
+
+    assert runtime.invalidate_answer("统计企业经营状态分布") is True
+    calls = llm.calls
+    fresh = runtime.query("统计企业经营状态分布")
+    assert fresh.trace[0]["status"] == "miss"
+    assert llm.calls > calls
+
+
+def test_runtime_does_not_cache_failed_results():
+    runtime, _, executor = _runtime()
+    runtime.sql_executor = lambda sql: (_ for _ in ()).throw(RuntimeError("down"))
+
+    assert runtime.query("统计企业经营状态分布").success is False
+    runtime.sql_executor = executor
+    assert runtime.query("统计企业经营状态分布").trace[0]["status"] == "miss"
+
+
+def test_answer_cache_from_mapping_builds_tiers(tmp_path):
+    assert answer_cache_from_mapping({"ANSWER_CACHE_ENABLED": "false"}) is None
+
+    memory = answer_cache_from_mapping(
+        {"ANSWER_CACHE_MAX_ENTRIES": "8", "ANSWER_CACHE_TTL_SECONDS": "30"}
+    )
+    assert isinstance(memory, MemoryAnswerCache)
+    assert memory.max_entries == 8
+
+    tiered = answer_cache_from_mapping(
+        {"ANSWER_CACHE_SQLITE_PATH": str(tmp_path / "answers.sqlite3")}
+    )
+    assert [tier["tier"] for tier in tiered.stats()["tiers"]] == ["memory", "sqlite"]
+
+
+def test_agent_cache_endpoint_invalidates_runtime_cache(monkeypatch):
+    runtime, _, _ = _runtime()
+    runtime.query("统计企业经营状态分布")
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: runtime)
+
+    client = TestClient(api_server.app)
+    response = client.delete(
+        "/api/agent/cache", params={"question": "统计企业经营状态分布"}
+    )
+    assert response.json() == {"status": "ok", "scope": "question", "removed": True}
+
+    response = client.delete("/api/agent/cache")
+    assert response.json() == {"status": "ok", "scope": "all"}
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import pickle
+from array import array
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+from src.agent.columnar import QueryResult
+from src.agent.runtime import AgentResult
+
+ROWS = [
+    {
+        "name": "甲公司",
+        "cnt": 3,
+        "amount": Decimal("12.50"),
+        "day": date(2024, 5, 1),
+        "note": None,
+    },
+    {
+        "name": "乙公司",
+        "cnt": 5,
+        "amount": Decimal("7"),
+        "day": date(2024, 5, 2),
+        "note": "x",
+    },
+]
+COLUMNS = ["name", "cnt", "amount", "day", "note"]
+
+
+def test_from_rows_stores_typed_columns_and_normalizes_once():
+    table = QueryResult.from_rows(COLUMNS, ROWS)
+
+    assert table.dtypes == ["object", "int", "float", "object", "object"]
+    assert isinstance(table.column("cnt"), array)
+    assert table.column("amount").tolist() == [12.5, 7.0]
+    assert table.column("day") == ["2024-05-01", "2024-05-02"]
+    assert table.numeric_columns() == ["cnt", "amount"]
+
+    from_tuples = QueryResult.from_rows(
+        ["ts", "n"], [(datetime(2024, 1, 1, 8), 1), (datetime(2024, 1, 2), None)]
+    )
+    assert from_tuples.dtypes == ["object", "object"]
+    assert from_tuples.row(0) == {"ts": "2024-01-01T08:00:00", "n": 1}
+
+
+def test_rows_view_behaves_like_list_of_dicts():
+    rows = QueryResult.from_rows(COLUMNS, ROWS).rows
+
+    assert len(rows) == 2
+    assert rows[-1]["name"] == "乙公司"
+    assert rows[:1] == [
+        {"name": "甲公司", "cnt": 3, "amount": 12.5, "day": "2024-05-01", "note": None}
+    ]
+    assert [row["cnt"] for row in rows] == [3, 5]
+    assert QueryResult.from_rows(COLUMNS, rows) is rows.table
+    with pytest.raises(IndexError):
+        rows[2]
+
+    restored = pickle.loads(pickle.dumps(rows))
+    assert restored == list(rows)
+
+
+def test_to_pandas_wraps_numeric_buffers_without_copy():
+    pd = pytest.importorskip("pandas")
+    np = pytest.importorskip("numpy")
+    table = QueryResult.from_rows(COLUMNS, ROWS)
+
+    frame = table.to_pandas()
+
+    assert list(frame.columns) == COLUMNS
+    assert frame["cnt"].dtype == np.int64
+    assert np.shares_memory(frame["cnt"].to_numpy(), np.frombuffer(table.column("cnt")))
+    assert frame.loc[1, "note"] == "x"
+    assert isinstance(frame, pd.DataFrame)
+
+
+def test_to_arrow_builds_typed_table():
+    pytest.importorskip("pyarrow")
+    arrow = QueryResult.from_rows(COLUMNS, ROWS).to_arrow()
+
+    assert arrow.column_names == COLUMNS
+    assert str(arrow.schema.field("cnt").type) == "int64"
+    assert arrow.column("amount").to_pylist() == [12.5, 7.0]
+
+
+def test_agent_result_columnar_payload_and_api_format(monkeypatch):
+    table = QueryResult.from_rows(COLUMNS, ROWS)
+    result = AgentResult(
+        question="q",
+        scenario="data_insight",
+        success=True,
+        columns=COLUMNS,
+        rows=table.rows,
+        row_count=2,
+        table=table,
+    )
+
+    assert result.to_dict()["rows"][0]["amount"] == 12.5
+    payload = result.to_dict(columnar=True)
+    assert payload["rows"] == []
+    assert payload["table"]["data"][1] == [3, 5]
+
+    class FakeRuntime:
+        async def aquery(self, question, *, scenario="data_insight", deadline=None):
+            return result
+
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: FakeRuntime())
+    client = TestClient(api_server.app)
+
+    columnar = client.post(
+        "/api/agent/query", json={"question": "q", "result_format": "columns"}
+    ).json()
+    assert columnar["rows"] == []
+    assert columnar["table"]["columns"] == COLUMNS
+    assert columnar["table"]["dtypes"][1] == "int"
+
+    rows = client.post("/api/agent/query", json={"question": "q"}).json()
+    assert rows["rows"][1]["day"] == "2024-05-02"
+    assert rows["table"] is None
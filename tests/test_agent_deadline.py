@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pymysql
+import pytest
+
+from src.agent.cache import MemoryAnswerCache
+from src.agent.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    current_deadline,
+    use_deadline,
+)
+from src.agent.executors import PooledMySQLExecutor, with_max_execution_time
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+
+GOOD_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        content = messages[-1]["content"]
+        self.prompts.append(content)
+        if "只返回一条MySQL SELECT语句" in content or "只返回修复后的SQL" in content:
+            return GOOD_SQL
+        return "ok"
+
+
+class SlowCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = [("status",), ("cnt",)]
+        self.pending = [("存续", 3)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+        self.conn.read_timeouts.append(self.conn._read_timeout)
+        if sql.startswith("KILL QUERY"):
+            return
+        if self.conn.fail_with is not None:
+            raise pymysql.err.OperationalError(*self.conn.fail_with)
+
+    def fetchall(self):
+        return [("存续", 3)]
+
+    def fetchmany(self, size):
+        rows, self.pending = self.pending, []
+        return rows[:size]
+
+
+class FakeConnection:
+    fail_with = None
+
+    def __init__(self, connector, thread_id):
+        self.connector = connector
+        self._thread_id = thread_id
+        self._read_timeout = None
+        self.executed = []
+        self.read_timeouts = []
+        self.closed = False
+
+    def thread_id(self):
+        return self._thread_id
+
+    def cursor(self, cursor_class=None):
+        return SlowCursor(self)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    def __init__(self, fail_with=None):
+        self.connections = []
+        self.fail_with = fail_with
+
+    def __call__(self, **params):
+        conn = FakeConnection(self, thread_id=len(self.connections) + 41)
+        if not self.connections:
+            conn.fail_with = self.fail_with
+        self.connections.append(conn)
+        return conn
+
+
+def test_with_max_execution_time_only_hints_plain_select():
+    assert (
+        with_max_execution_time("SELECT 1 LIMIT 1000", 2500)
+        == "SELECT /*+ MAX_EXECUTION_TIME(2500) */ 1 LIMIT 1000"
+    )
+    assert with_max_execution_time("  select a FROM t", 0).startswith(
+        "  select /*+ MAX_EXECUTION_TIME(1) */ a"
+    )
+    cte = "WITH x AS (SELECT 1) SELECT * FROM x"
+    assert with_max_execution_time(cte, 100) == cte
+    hinted = "SELECT /*+ MAX_EXECUTION_TIME(50) */ 1"
+    assert with_max_execution_time(hinted, 100) == hinted
+
+
+def test_deadline_budget_cancel_and_context():
+    clock = FakeClock()
+    deadline = Deadline(2, clock=clock)
+    clock.now = 0.5
+    assert deadline.remaining_ms() == 1500
+    deadline.check("execute_sql")
+
+    calls = []
+    deadline.on_cancel(lambda: calls.append("kill"))
+    unregister = deadline.on_cancel(lambda: calls.append("never"))
+    unregister()
+    deadline.on_cancel(lambda: 1 / 0)
+    deadline.cancel()
+
+    assert calls == ["kill"]
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded, match="cancelled"):
+        deadline.check("execute_sql")
+
+    unbounded = Deadline()
+    assert not unbounded.bounded and not unbounded.expired()
+    with use_deadline(unbounded):
+        assert current_deadline() is unbounded
+    assert current_deadline() is None
+
+
+def test_pooled_executor_hints_sql_and_restores_read_timeout():
+    connector = FakeConnector()
+    executor = PooledMySQLExecutor({}, connect_factory=connector)
+
+    with use_deadline(Deadline(10)):
+        result = executor("SELECT `status` FROM t")
+
+    conn = connector.connections[0]
+    assert result["row_count"] == 1
+    assert conn.executed[0].startswith("SELECT /*+ MAX_EXECUTION_TIME(")
+    assert 10 < conn.read_timeouts[0] <= 11
+    assert conn._read_timeout is None
+
+    executor("SELECT 1")
+    assert conn.executed[-1] == "SELECT 1"
+
+
+def test_pooled_executor_kills_timed_out_query_and_discards_connection():
+    connector = FakeConnector(fail_with=(3024, "maximum statement execution time"))
+    executor = PooledMySQLExecutor({}, connect_factory=connector)
+
+    with use_deadline(Deadline(10)):
+        with pytest.raises(DeadlineExceeded):
+            executor("SELECT 1")
+
+    victim, killer = connector.connections
+    assert killer.executed == [f"KILL QUERY {victim.thread_id()}"]
+    assert killer.closed and victim.closed
+    assert executor.stats()["killed"] == 1
+    assert executor.stats()["discarded"] == 1
+
+
+def test_runtime_stops_retrying_after_deadline():
+    llm = FakeLLM()
+
+    def executor(sql):
+        raise DeadlineExceeded("execute_sql: deadline of 3s exceeded")
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"), llm=llm, sql_executor=executor
+    )
+
+    result = runtime.query("统计企业经营状态分布", deadline=3)
+
+    assert result.success is False
+    assert result.error.startswith("查询超时")
+    assert not any(step["node"] == "repair_sql" for step in result.trace)
+    failed = [step for step in result.trace if step.get("status") == "error"]
+    assert failed[0]["timeout"] is True
+    assert all("remaining_ms" in step for step in result.trace)
+
+
+def test_analyze_degrades_when_budget_is_short():
+    llm = FakeLLM()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=llm,
+        sql_executor=lambda sql: {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        },
+        deadline_seconds=30,
+        analyze_min_seconds=60,
+    )
+
+    result = runtime.query("统计企业经营状态分布")
+
+    analyze = next(step for step in result.trace if step["node"] == "analyze")
+    assert result.success is True
+    assert analyze["status"] == "degraded"
+    assert analyze["reason"] == "deadline"
+    assert "剩余时间不足" in result.analysis
+    assert not any("数据解读" in prompt for prompt in llm.prompts)
+
+
+def test_cancelling_aquery_cancels_running_sql():
+    started = threading.Event()
+    killed = threading.Event()
+
+    def executor(sql):
+        current_deadline().on_cancel(killed.set)
+        started.set()
+        killed.wait(5)
+        raise pymysql.err.OperationalError(1317, "Query execution was interrupted")
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"), llm=FakeLLM(), sql_executor=executor
+    )
+
+    async def run():
+        task = asyncio.create_task(runtime.aquery("统计企业经营状态分布"))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert killed.is_set()
+
+
+def test_degraded_or_truncated_answers_are_not_cached():
+    llm = FakeLLM()
+    rows = {"columns": ["status", "cnt"], "rows": [{"status": "存续", "cnt": 3}]}
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=llm,
+        sql_executor=lambda sql: dict(rows),
+        answer_cache=MemoryAnswerCache(),
+        deadline_seconds=120,
+        analyze_min_seconds=60,
+    )
+
+    degraded = runtime.query("统计企业经营状态分布", deadline=30)
+    full = runtime.query("统计企业经营状态分布")
+    cached = runtime.query("统计企业经营状态分布")
+
+    assert degraded.success and full.success
+    assert any(step.get("status") == "degraded" for step in degraded.trace)
+    assert full.trace[0] == {"node": "answer_cache", "status": "miss"}
+    assert all(step.get("status") != "degraded" for step in full.trace)
+    assert cached.trace[0]["status"] == "hit"
+
+    rows["truncated"] = {"max_rows": 1}
+    truncated = runtime.query("按经营状态统计企业")
+    assert truncated.truncated
+    assert runtime.query("按经营状态统计企业").trace[0]["status"] == "miss"
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import pymysql.cursors
+import pytest
+
+from src.agent.executors import (
+    FetchSettings,
+    MySQLConnectionPool,
+    PooledMySQLExecutor,
+    PoolSettings,
+    PoolTimeoutError,
+    fetch_rows,
+)
+from src.agent.factory import build_agent_runtime
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = [("status",), ("cnt",)]
+        self.pending = [("存续", 3)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.executed.append(sql)
+
+    def fetchall(self):
+        return [("存续", 3)]
+
+    def fetchmany(self, size):
+        rows, self.pending = self.pending, []
+        return rows[:size]
+
+
+class FakeConnection:
+    def __init__(self, **params):
+        self.params = params
+        self.executed = []
+        self.closed = False
+        self.ping_ok = True
+
+    def thread_id(self):
+        return id(self) % 100000
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self)
+
+    def ping(self, reconnect=False):
+        if not self.ping_ok:
+            raise ConnectionError("gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnector:
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self, **params):
+        conn = FakeConnection(**params)
+        self.connections.append(conn)
+        return conn
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_pooled_executor_reuses_connection_across_queries():
+    connector = FakeConnector()
+    executor = PooledMySQLExecutor(
+        {"host": "db", "user": "znjz", "password": None},
+        connect_factory=connector,
+    )
+
+    first = executor("SELECT 1")
+    second = executor("SELECT 2")
+
+    table = first.pop("table")
+    assert first == {
+        "columns": ["status", "cnt"],
+        "rows": [{"status": "存续", "cnt": 3}],
+        "row_count": 1,
+        "bytes": 7,
+    }
+    assert table.dtypes == ["object", "int"]
+    assert second["row_count"] == 1
+    assert len(connector.connections) == 1
+    assert connector.connections[0].params == {
+        "host": "db",
+        "user": "znjz",
+        "charset": "utf8mb4",
+        "autocommit": True,
+    }
+    stats = executor.stats()
+    assert stats["created"] == 1
+    assert stats["reused"] == 1
+    assert stats["idle"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_reused_connection_sees_rows_committed_in_between():
+    class Server:
+        rows = [("存续", 3)]
+
+    class SnapshotCursor(FakeCursor):
+        def execute(self, sql):
+            conn = self.conn
+            if conn.snapshot is None:
+                conn.snapshot = list(Server.rows)
+            self.pending = list(conn.snapshot)
+            if conn.params.get("autocommit"):
+                conn.snapshot = None
+
+    class SnapshotConnection(FakeConnection):
+        """InnoDB REPEATABLE READ: a transaction reads its first snapshot."""
+
+        snapshot = None
+
+        def cursor(self, cursor_class=None):
+            return SnapshotCursor(self)
+
+    executor = PooledMySQLExecutor(
+        {}, connect_factory=SnapshotConnection, fetch=FetchSettings(streaming=False)
+    )
+
+    assert executor("SELECT 1")["row_count"] == 1
+    Server.rows = Server.rows + [("注销", 1)]  # committed by another connection
+
+    assert executor("SELECT 1")["row_count"] == 2
+    assert executor.stats()["reused"] == 1
+
+
+def test_pool_replaces_connection_that_fails_ping():
+    connector = FakeConnector()
+    pool = MySQLConnectionPool({}, connect_factory=connector)
+
+    with pool.connection() as conn:
+        stale = conn
+    stale.ping_ok = False
+
+    with pool.connection() as conn:
+        assert conn is not stale
+
+    assert stale.closed is True
+    assert pool.stats()["ping_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_pool_evicts_idle_and_expired_connections():
+    connector = FakeConnector()
+    clock = FakeClock()
+    pool = MySQLConnectionPool(
+        {},
+        settings=PoolSettings(max_idle_seconds=10, max_lifetime_seconds=100),
+        connect_factory=connector,
+        clock=clock,
+    )
+
+    with pool.connection():
+        pass
+    clock.now = 11
+    with pool.connection():
+        pass
+    assert pool.stats()["evicted_idle"] == 1
+
+    clock.now = 200
+    with pool.connection():
+        pass
+    assert pool.stats()["evicted_lifetime"] == 1
+    assert len(connector.connections) == 3
+    assert all(conn.closed for conn in connector.connections[:2])
+
+
+def test_pool_is_bounded_and_times_out_on_checkout():
+    pool = MySQLConnectionPool(
+        {},
+        settings=PoolSettings(max_size=1, checkout_timeout=0.05),
+        connect_factory=FakeConnector(),
+    )
+
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+
+    assert pool.stats()["size"] == 1
+    assert pool.stats()["waits"] >= 1
+
+
+def test_pool_settings_from_mapping():
+    settings = PoolSettings.from_mapping(
+        {
+            "DB_POOL_MAX_SIZE": "4",
+            "DB_POOL_MAX_IDLE_SECONDS": "30",
+            "DB_POOL_MAX_LIFETIME_SECONDS": "600",
+        }
+    )
+
+    assert settings.max_size == 4
+    assert settings.max_idle_seconds == 30
+    assert settings.max_lifetime_seconds == 600
+
+
+def test_execute_sql_trace_includes_pool_stats():
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+            return "ok"
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=PooledMySQLExecutor({}, connect_factory=FakeConnector()),
+    )
+
+    result = runtime.query("统计企业经营状态分布")
+
+    execute_steps = [step for step in result.trace if step["node"] == "execute_sql"]
+    assert execute_steps[-1]["pool"]["created"] == 1
+
+
+def test_build_agent_runtime_wires_pooled_executor_by_default():
+    runtime = build_agent_runtime(
+        {"VOLCENGINE_ARK_API_KEY": "test-key", "DB_POOL_MAX_SIZE": "3"},
+        llm=object(),
+    )
+
+    assert isinstance(runtime.sql_executor.executor, PooledMySQLExecutor)
+    assert runtime.sql_executor.stats()["max_size"] == 3
+
+
+class ListCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.batches = []
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        self.batches.append(len(batch))
+        return batch
+
+
+def test_fetch_rows_stops_at_row_budget_and_reports_truncation():
+    cursor = ListCursor([(i, "x") for i in range(10)])
+
+    rows, size, truncated = fetch_rows(cursor, FetchSettings(max_rows=4, batch_size=3))
+
+    assert rows == [(i, "x") for i in range(4)]
+    assert size == 8
+    assert truncated == {"reason": "rows", "max_rows": 4}
+    assert cursor.batches == [3, 3]
+
+
+def test_fetch_rows_stops_at_byte_budget():
+    title = "智慧城市建设项目" * 10  # 240 UTF-8 bytes
+    cursor = ListCursor([(title,)] * 5)
+
+    rows, size, truncated = fetch_rows(cursor, FetchSettings(max_bytes=500))
+
+    assert len(rows) == 2
+    assert size == 480
+    assert truncated == {"reason": "bytes", "max_bytes": 500}
+    assert fetch_rows(ListCursor([(1,)]), FetchSettings()) == (
+        [(1,)],
+        1,
+        None,
+    )
+
+
+def test_pooled_executor_streams_with_unbuffered_cursor():
+    class RecordingConnection(FakeConnection):
+        cursor_classes = []
+
+        def cursor(self, cursor_class=None):
+            self.cursor_classes.append(cursor_class)
+            return FakeCursor(self)
+
+    executor = PooledMySQLExecutor({}, connect_factory=RecordingConnection)
+    executor("SELECT 1")
+    PooledMySQLExecutor(
+        {}, connect_factory=RecordingConnection, fetch=FetchSettings(streaming=False)
+    )("SELECT 1")
+
+    assert RecordingConnection.cursor_classes == [pymysql.cursors.SSCursor, None]
+    assert (
+        FetchSettings.from_mapping({"SQL_FETCH_STREAMING": "false"}).streaming is False
+    )
+
+
+def test_runtime_packs_rows_once_and_records_truncation():
+    rows = [{"status": "存续", "cnt": 3}]
+
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+            return "ok"
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=lambda sql: {
+            "columns": ["status", "cnt"],
+            "rows": rows,
+            "row_count": 1,
+            "truncated": {"reason": "bytes", "max_bytes": 10},
+        },
+    )
+
+    result = runtime.query("统计企业经营状态分布")
+
+    assert result.rows == rows
+    assert result.table.column("cnt").tolist() == [3]
+    assert result.to_dict()["truncated"]["reason"] == "bytes"
+    execute = next(step for step in result.trace if step["node"] == "execute_sql")
+    assert execute["truncated"] == {"reason": "bytes", "max_bytes": 10}
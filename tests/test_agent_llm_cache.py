@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from src.agent.factory import completion_cache_from_mapping
+from src.agent.llm import (
+    DeepSeekProvider,
+    LLMSettings,
+    VolcengineArkProvider,
+    take_completion_info,
+)
+from src.agent.llm_cache import (
+    DiskCompletionCache,
+    MemoryCompletionCache,
+    completion_cache_key,
+)
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+
+MESSAGES = [{"role": "user", "content": "只返回一条MySQL SELECT语句"}]
+
+
+class FakeCompletions:
+    def __init__(self, text="SELECT 1"):
+        self.text = text
+        self.calls = 0
+
+    def _response(self):
+        self.calls += 1
+        message = SimpleNamespace(content=f" {self.text} ")
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=8)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def create(self, **kwargs):
+        return self._response()
+
+
+class FakeAsyncCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        return self._response()
+
+
+def _client_factory(completions):
+    return lambda **kwargs: SimpleNamespace(
+        chat=SimpleNamespace(completions=completions)
+    )
+
+
+def _provider(cls=VolcengineArkProvider, cache=None, completions=None, **factories):
+    settings = LLMSettings.from_mapping(
+        {
+            "LLM_PROVIDER": "deepseek" if cls is DeepSeekProvider else "volcengine_ark",
+            "VOLCENGINE_ARK_API_KEY": "test-key",
+            "DEEPSEEK_API_KEY": "test-key",
+        }
+    )
+    return cls(
+        settings=settings,
+        client_factory=_client_factory(completions or FakeCompletions()),
+        completion_cache=cache if cache is not None else MemoryCompletionCache(),
+        **factories,
+    )
+
+
+def test_completion_cache_key_covers_model_messages_temperature_and_max_tokens():
+    base = {"model": "glm-5.2", "messages": MESSAGES, "temperature": 0.1}
+    key = completion_cache_key({**base, "max_tokens": 1500})
+
+    assert key == completion_cache_key({**base, "max_tokens": 1500, "stream": False})
+    assert key != completion_cache_key({**base, "max_tokens": 100})
+    assert key != completion_cache_key({**base, "temperature": 0.2, "max_tokens": 1500})
+    assert key != completion_cache_key({**base, "model": "x", "max_tokens": 1500})
+
+
+def test_provider_serves_repeat_prompt_from_cache_with_saved_usage():
+    for cls in (VolcengineArkProvider, DeepSeekProvider):
+        completions = FakeCompletions()
+        provider = _provider(cls, completions=completions)
+
+        assert provider.complete(MESSAGES, temperature=0.1) == "SELECT 1"
+        assert take_completion_info()["cache"] == "miss"
+        assert provider.complete(MESSAGES, temperature=0.1) == "SELECT 1"
+        info = take_completion_info()
+
+        assert completions.calls == 1
+        assert info["cache"] == "hit"
+        assert info["saved_tokens"] == 128
+        assert info["saved_latency_ms"] >= 0
+
+
+def test_bypass_flag_skips_lookup_and_store():
+    completions = FakeCompletions()
+    cache = MemoryCompletionCache()
+    provider = _provider(cache=cache, completions=completions)
+
+    provider.complete(MESSAGES, bypass_cache=True)
+    assert take_completion_info()["cache"] == "bypass"
+    provider.complete(MESSAGES)
+
+    assert completions.calls == 2
+    assert cache.stats()["entries"] == 1
+
+
+def test_async_and_sync_calls_share_cache():
+    sync_completions = FakeCompletions()
+    async_completions = FakeAsyncCompletions()
+    provider = _provider(
+        completions=sync_completions,
+        async_client_factory=_client_factory(async_completions),
+    )
+
+    provider.complete(MESSAGES)
+    assert asyncio.run(provider.acomplete(MESSAGES)) == "SELECT 1"
+    assert async_completions.calls == 0
+
+
+def test_disk_cache_survives_restart_and_evicts_by_size(tmp_path):
+    now = [0.0]
+    path = tmp_path / "llm.sqlite3"
+    cache = DiskCompletionCache(path, max_entries=2, clock=lambda: now[0])
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.set(key, {"text": key})
+
+    reopened = DiskCompletionCache(path, max_entries=2, clock=lambda: now[0])
+    assert reopened.get("a") is None
+    assert reopened.get("c") == {"text": "c"}
+
+    now[0] += 7 * 86400 + 10
+    assert reopened.get("c") is None
+
+
+def test_memory_cache_expires_entries():
+    now = [0.0]
+    cache = MemoryCompletionCache(ttl_seconds=5, clock=lambda: now[0])
+    cache.set("k", {"text": "SELECT 1"})
+    now[0] = 6
+
+    assert cache.get("k") is None
+
+
+def test_runtime_trace_reports_llm_cache_hits_and_metrics():
+    completions = FakeCompletions(
+        "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+    )
+    metrics = MetricsRegistry()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=_provider(completions=completions),
+        sql_executor=lambda sql: {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 1}],
+            "row_count": 1,
+        },
+        metrics=metrics,
+    )
+
+    runtime.query("统计企业经营状态分布")
+    second = runtime.query("统计企业经营状态分布")
+
+    generate = next(step for step in second.trace if step["node"] == "generate_sql")
+    assert generate["llm"]["cache"] == "hit"
+    assert generate["llm"]["saved_tokens"] == 128
+    assert metrics.counter("agent_cache_requests_total", cache="llm", result="hit") == 2
+    assert metrics.counter("agent_llm_saved_tokens_total") == 256
+
+
+def test_completion_cache_is_opt_in(tmp_path):
+    assert completion_cache_from_mapping({}) is None
+    assert isinstance(
+        completion_cache_from_mapping({"LLM_CACHE_ENABLED": "true"}),
+        MemoryCompletionCache,
+    )
+    disk = completion_cache_from_mapping(
+        {
+            "LLM_CACHE_ENABLED": "1",
+            "LLM_CACHE_BACKEND": "disk",
+            "LLM_CACHE_PATH": str(tmp_path / "llm.sqlite3"),
+        }
+    )
+    assert disk.stats()["backend"] == "disk"
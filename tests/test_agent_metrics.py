@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.agent.llm import LLMSettings, VolcengineArkProvider, take_completion_info
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime, AgentTrace
+
+
+class StepClock:
+    def __init__(self, step):
+        self.now = 100.0
+        self.step = step
+
+    def __call__(self):
+        value = self.now
+        self.now += self.step
+        return value
+
+
+def test_trace_stamps_monotonic_span_for_each_node():
+    trace = AgentTrace(clock=StepClock(0.25))
+    trace.append({"node": "classify_intent"})
+    trace.append({"node": "generate_sql"})
+
+    assert trace[0]["started_at"] == 100.0
+    assert trace[0]["ended_at"] == 100.25
+    assert trace[1]["started_at"] == 100.25
+    assert trace[1]["duration_ms"] == 250.0
+
+
+def test_observe_trace_builds_histograms_token_and_retry_counters():
+    metrics = MetricsRegistry()
+    trace = AgentTrace(clock=StepClock(0.2))
+    trace.append(
+        {
+            "node": "generate_sql",
+            "status": "ok",
+            "llm": {"prompt_tokens": 900, "completion_tokens": 40},
+        }
+    )
+    trace.append({"node": "execute_sql", "status": "error", "error": "x"})
+    trace.append({"node": "repair_sql", "status": "ok"})
+    trace.append({"node": "execute_sql", "status": "ok", "row_count": 3, "bytes": 96})
+
+    metrics.observe_trace(trace)
+
+    assert (
+        metrics.histogram("agent_node_duration_seconds", node="execute_sql")["count"]
+        == 2
+    )
+    assert metrics.histogram("agent_query_duration_seconds")["sum"] == pytest.approx(
+        0.8
+    )
+    assert (
+        metrics.counter("agent_llm_tokens_total", node="generate_sql", type="prompt")
+        == 900
+    )
+    assert metrics.counter("agent_retries_total", node="repair_sql") == 1
+    assert metrics.counter("agent_sql_errors_total") == 1
+    assert metrics.counter("agent_sql_bytes_total") == 96
+
+
+def test_render_prometheus_text_format():
+    metrics = MetricsRegistry(buckets=(0.1, 1))
+    metrics.inc("agent_cache_requests_total", cache="sql", result="hit")
+    metrics.observe("agent_node_duration_seconds", 0.5, node="analyze")
+    metrics.observe("agent_node_duration_seconds", 2, node="analyze")
+
+    text = metrics.render_prometheus()
+
+    assert "# TYPE agent_cache_requests_total counter" in text
+    assert 'agent_cache_requests_total{cache="sql",result="hit"} 1' in text
+    assert "# TYPE agent_node_duration_seconds histogram" in text
+    assert 'agent_node_duration_seconds_bucket{node="analyze",le="0.1"} 0' in text
+    assert 'agent_node_duration_seconds_bucket{node="analyze",le="1"} 1' in text
+    assert 'agent_node_duration_seconds_bucket{node="analyze",le="+Inf"} 2' in text
+    assert 'agent_node_duration_seconds_sum{node="analyze"} 2.5' in text
+    assert 'agent_node_duration_seconds_count{node="analyze"} 2' in text
+
+
+def test_runtime_trace_records_rows_bytes_and_timings():
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+            return "ok"
+
+    metrics = MetricsRegistry()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=lambda sql: {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 12}],
+            "row_count": 1,
+        },
+        metrics=metrics,
+    )
+
+    result = runtime.query("统计企业经营状态分布")
+
+    execute = next(step for step in result.trace if step["node"] == "execute_sql")
+    assert execute["bytes"] == 8
+    assert all(step["ended_at"] >= step["started_at"] for step in result.trace)
+    assert metrics.histogram("agent_query_duration_seconds")["count"] == 1
+    assert metrics.counter("agent_sql_rows_total") == 1
+
+
+def test_streamed_completion_reports_usage():
+    class FakeStream:
+        def __init__(self, chunks):
+            self.chunks = chunks
+
+        def __aiter__(self):
+            return self._iterate()
+
+        async def _iterate(self):
+            for chunk in self.chunks:
+                yield chunk
+
+    def delta(text):
+        return SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None
+        )
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            assert kwargs["stream_options"] == {"include_usage": True}
+            usage = SimpleNamespace(prompt_tokens=300, completion_tokens=2)
+            return FakeStream(
+                [delta("存续"), delta("为主"), SimpleNamespace(choices=[], usage=usage)]
+            )
+
+    provider = VolcengineArkProvider(
+        settings=LLMSettings.from_mapping({"VOLCENGINE_ARK_API_KEY": "test-key"}),
+        async_client_factory=lambda **kwargs: SimpleNamespace(
+            chat=SimpleNamespace(completions=FakeCompletions())
+        ),
+    )
+
+    async def collect():
+        tokens = [token async for token in provider.astream([])]
+        return tokens, take_completion_info()
+
+    tokens, info = asyncio.run(collect())
+    assert tokens == ["存续", "为主"]
+    assert info["prompt_tokens"] == 300
+    assert info["completion_tokens"] == 2
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+from src.agent.factory import build_agent_runtime
+from src.agent.metrics import MetricsRegistry
+from src.agent.mirror import (
+    AnalyticMirror,
+    MirrorRoutingExecutor,
+    export_mirror,
+    sqlite_source,
+    to_duckdb,
+)
+from src.agent.profiles import get_database_profile
+from src.agent.sqlite_executor import SQLiteExecutor
+from src.agent.synthetic import generate_znjz
+
+YEARLY_SQL = (
+    "SELECT YEAR(`publish_time`) AS y, COUNT(*) FROM `招投标` "
+    "GROUP BY YEAR(`publish_time`) ORDER BY y"
+)
+
+
+class FakeLLM:
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return YEARLY_SQL
+        return "### 核心发现\n\n招投标逐年增长。"
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    root = tmp_path_factory.mktemp("mirror")
+    database = root / "znjz.sqlite3"
+    generate_znjz(database, scale=0.01, seed=7)
+    mirror = root / "znjz.duckdb"
+    counts = export_mirror(
+        sqlite_source(database),
+        mirror,
+        get_database_profile("znjz").catalog(),
+        batch_size=1000,
+        clock=Clock(1_000.0),
+    )
+    return database, mirror, counts
+
+
+def test_export_copies_tables_views_and_mysql_labels(files):
+    database, path, counts = files
+    mirror = AnalyticMirror(path, clock=Clock(1_060.0))
+    sqlite = SQLiteExecutor(database)
+
+    result = mirror(YEARLY_SQL)
+
+    assert counts["招投标信息"] > 5000
+    assert mirror.age_seconds() == 60.0
+    assert result["columns"] == ["y", "COUNT(*)"]
+    assert result["rows"] == sqlite(YEARLY_SQL)["rows"]
+    assert (
+        to_duckdb("SELECT `name` FROM t WHERE `name` LIKE '%`科技`%' LIMIT 10, 5")
+        == 'SELECT "name" FROM t WHERE "name" ILIKE \'%`科技`%\' LIMIT 5 OFFSET 10'
+    )
+
+
+def test_mirror_sorts_nulls_like_mysql(files):
+    database, path, _ = files
+    mirror = AnalyticMirror(path, clock=Clock(1_060.0))
+    sqlite = SQLiteExecutor(database)
+
+    for sql in (
+        "SELECT `area_code`, COUNT(*) AS n FROM `招投标` "
+        "GROUP BY `area_code` ORDER BY `area_code` LIMIT 3",
+        "SELECT `area_code`, COUNT(*) AS n FROM `招投标` "
+        "GROUP BY `area_code` ORDER BY `area_code` DESC LIMIT 3",
+    ):
+        assert mirror(sql)["rows"] == sqlite(sql)["rows"]
+    assert mirror("SELECT `amount` FROM `融资数据` ORDER BY `amount` LIMIT 1")[
+        "rows"
+    ] == [{"amount": None}]
+
+
+def test_router_keeps_unsafe_or_stale_queries_on_mysql(files):
+    database, path, _ = files
+    clock = Clock(1_060.0)
+    router = MirrorRoutingExecutor(
+        SQLiteExecutor(database), AnalyticMirror(path, clock=clock), max_age_seconds=300
+    )
+
+    def reason(sql):
+        return router.route(sql)["reason"]
+
+    assert reason(YEARLY_SQL) == "fresh"
+    assert reason("SELECT `name` FROM `企业基本信息` LIMIT 5") == "not_aggregate"
+    assert (
+        reason("SELECT COUNT(*) FROM `企业基本信息` WHERE `status` = 'Active'")
+        == "dialect"
+    )
+    assert (
+        reason(
+            "SELECT DATE_FORMAT(`publish_time`, '%Y'), COUNT(*) FROM `招投标` GROUP BY 1"
+        )
+        == "dialect"
+    )
+    assert reason("SELECT COUNT(*) FROM `招投标` WHERE `nope` > 1") == "dialect"
+    # MySQL CONCAT returns NULL for a NULL argument; DuckDB skips it.
+    assert (
+        reason(
+            "SELECT CONCAT(`district_code`, `status`) r, COUNT(*) "
+            "FROM `企业基本信息` GROUP BY r"
+        )
+        == "dialect"
+    )
+    clock.now = 2_000.0
+    stale = router(YEARLY_SQL)
+    assert stale["mirror"] == {
+        "route": "mysql",
+        "reason": "stale",
+        "age_seconds": 1000.0,
+    }
+    assert router.mirror_stats()["mysql"] == 1
+    assert router.bypasses_database(YEARLY_SQL) is None
+    clock.now = 1_060.0
+    assert router.bypasses_database(YEARLY_SQL) == "mirror"
+    assert router.stats()["backend"] == "sqlite"
+
+
+def test_router_falls_back_to_mysql_when_the_mirror_fails(files, tmp_path):
+    database, path, _ = files
+
+    class BrokenMirror(AnalyticMirror):
+        def __call__(self, sql):
+            raise RuntimeError("disk gone")
+
+    router = MirrorRoutingExecutor(
+        SQLiteExecutor(database), BrokenMirror(path, clock=Clock(1_060.0))
+    )
+
+    result = router(YEARLY_SQL)
+
+    assert result["mirror"]["reason"] == "error"
+    assert "disk gone" in result["mirror"]["detail"]
+    assert result["row_count"] > 1
+    assert router.mirror_stats()["fallbacks"] == 1
+    missing = MirrorRoutingExecutor(
+        SQLiteExecutor(database), AnalyticMirror(tmp_path / "none.duckdb")
+    )
+    assert missing.route(YEARLY_SQL) == {"route": "mysql", "reason": "missing"}
+
+
+def test_factory_wires_the_mirror_into_trace_and_metrics(files):
+    database, path, _ = files
+    runtime = build_agent_runtime(
+        {
+            "SQL_BACKEND": "sqlite",
+            "SQL_SQLITE_PATH": str(database),
+            "ANALYTIC_MIRROR_ENABLED": "true",
+            "ANALYTIC_MIRROR_PATH": str(path),
+            "ANALYTIC_MIRROR_MAX_AGE_SECONDS": "1e12",
+        },
+        llm=FakeLLM(),
+    )
+    metrics = MetricsRegistry()
+
+    result = runtime.query("统计每年的招投标数量")
+    metrics.observe_trace(result.trace)
+
+    assert isinstance(runtime.sql_executor, MirrorRoutingExecutor)
+    assert result.success and result.row_count > 1
+    execute = [step for step in result.trace if step["node"] == "execute_sql"][-1]
+    assert execute["mirror"]["route"] == "mirror"
+    assert (
+        metrics.counter("agent_mirror_routes_total", route="mirror", reason="fresh")
+        == 1
+    )
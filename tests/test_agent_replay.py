@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from src.agent.factory import build_agent_runtime, replay_provider_from_mapping
+from src.agent.llm import set_completion_info, take_completion_info
+from src.agent.replay import Cassette, CassetteMiss, ReplayProvider, parse_latency
+
+STATUS_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class LiveLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        self.calls += 1
+        set_completion_info(
+            {"prompt_tokens": 120, "completion_tokens": 30, "latency_ms": 850.0}
+        )
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return STATUS_SQL
+        return f"回答{self.calls}"
+
+
+class CountingExecutor:
+    def __call__(self, sql):
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        }
+
+
+def ask(provider, text, **kwargs):
+    return provider.complete([{"role": "user", "content": text}], **kwargs)
+
+
+def test_auto_mode_records_then_replays_with_usage(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    live = LiveLLM()
+    recorder = ReplayProvider(path, mode="auto", live=live, latency=None)
+
+    assert ask(recorder, "问题一", temperature=0.2) == "回答1"
+    assert ask(recorder, "问题一", temperature=0.2) == "回答1"
+    assert take_completion_info()["replay"] == "hit"
+    assert ask(recorder, "问题一", temperature=0.1) == "回答2"  # different key
+    assert live.calls == 2
+    assert recorder.stats()["recorded"] == 2
+
+    record = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert record["prompt_tokens"] == 120 and record["latency_ms"] == 850.0
+
+    replay = ReplayProvider(path, latency=None)
+    assert ask(replay, "问题一", temperature=0.2) == "回答1"
+    assert take_completion_info() == {
+        "replay": "hit",
+        "prompt_tokens": 120,
+        "completion_tokens": 30,
+        "latency_ms": 850.0,
+    }
+    with pytest.raises(CassetteMiss):
+        ask(replay, "没录过的问题")
+    assert (
+        asyncio.run(
+            replay.acomplete([{"role": "user", "content": "问题一"}], temperature=0.1)
+        )
+        == "回答2"
+    )
+
+
+def test_latency_models(tmp_path):
+    cassette = Cassette(tmp_path / "c.jsonl")
+    for index, latency in enumerate([100.0, 200.0, 300.0]):
+        cassette.add({"key": str(index), "text": "x", "latency_ms": latency})
+    record = cassette.get("1")
+
+    assert ReplayProvider(cassette, latency=None)._delay(record) == 0.0
+    assert ReplayProvider(cassette, latency=0.05)._delay(record) == 0.05
+    assert ReplayProvider(cassette, latency_scale=0.5)._delay(record) == 0.1
+    sampled = ReplayProvider(cassette, latency="sampled", seed=7)._delay(record)
+    assert sampled in {0.1, 0.2, 0.3}
+    assert ReplayProvider(cassette, latency="sampled", seed=7)._delay(record) == sampled
+    assert parse_latency("none") is None
+    assert parse_latency("0.2") == 0.2
+    with pytest.raises(ValueError):
+        ReplayProvider(cassette, mode="record")
+
+
+def test_runtime_replays_offline_without_api_key(tmp_path, monkeypatch):
+    path = tmp_path / "cassette.jsonl"
+    live = LiveLLM()
+    source = {
+        "LLM_REPLAY_CASSETTE": str(path),
+        "LLM_REPLAY_MODE": "auto",
+        "LLM_REPLAY_LATENCY": "none",
+        "ANSWER_CACHE_ENABLED": "false",
+        "TEMPLATE_FAST_PATH_ENABLED": "false",
+    }
+    recorded = build_agent_runtime(
+        {**source, "VOLCENGINE_ARK_API_KEY": "k"}, sql_executor=CountingExecutor()
+    )
+    recorded.llm.live = live
+    first = recorded.query("统计企业经营状态分布")
+    assert first.success and live.calls == 2
+
+    monkeypatch.delenv("VOLCENGINE_ARK_API_KEY", raising=False)
+    offline = build_agent_runtime(
+        {**source, "LLM_REPLAY_MODE": "replay"}, sql_executor=CountingExecutor()
+    )
+    again = offline.query("统计企业经营状态分布")
+
+    assert offline.llm.live is None
+    assert again.sql == first.sql
+    assert again.analysis == first.analysis
+    generate = next(e for e in again.trace if e["node"] == "generate_sql")
+    assert generate["llm"]["replay"] == "hit"
+    assert generate["llm"]["prompt_tokens"] == 120
+    assert replay_provider_from_mapping({"LLM_REPLAY_CASSETTE": ""}) is None
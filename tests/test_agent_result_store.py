@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import os
+
+from fastapi.testclient import TestClient
+
+import api_server
+from src.agent.columnar import QueryResult
+from src.agent.factory import result_store_from_mapping
+from src.agent.result_store import ResultStore
+from src.agent.runtime import AgentResult
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_result(question="统计企业经营状态分布", rows=3):
+    table = QueryResult.from_rows(
+        ["status", "cnt"], [(f"状态{i}", i) for i in range(rows)]
+    )
+    return AgentResult(
+        question=question,
+        scenario="data_insight",
+        success=True,
+        sql="SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`",
+        safe_sql="SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status` LIMIT 1000",
+        columns=["status", "cnt"],
+        rows=table.rows,
+        row_count=rows,
+        table=table,
+    )
+
+
+def test_store_keeps_recent_results_in_memory_and_expires_them():
+    clock = FakeClock()
+    store = ResultStore(max_entries=2, ttl_seconds=60, clock=clock)
+    first = store.put(make_result("a"))
+    second = store.put(make_result("b"))
+
+    assert store.get(first).question == "a"
+    store.put(make_result("c"))  # evicts the least recently used: second
+    assert store.get(second) is None
+    assert store.get("../../etc/passwd") is None
+
+    clock.now += 61
+    assert store.get(first) is None
+    assert store.stats()["expired"] == 1
+
+
+def test_store_spills_evicted_results_to_disk(tmp_path):
+    clock = FakeClock()
+    store = ResultStore(
+        max_entries=1,
+        ttl_seconds=60,
+        spill_dir=tmp_path,
+        max_disk_entries=1,
+        clock=clock,
+    )
+    first = store.put(make_result("a"))
+    clock.now += 1
+    second = store.put(make_result("b"))
+
+    spilled = store.get(first)
+    assert spilled.question == "a"
+    assert spilled.rows[2] == {"status": "状态2", "cnt": 2}
+    assert os.path.getmtime(tmp_path / f"{first}.pkl") == clock.now - 1
+
+    # Another worker sharing the directory can read the spilled entry.
+    other = ResultStore(spill_dir=tmp_path, ttl_seconds=60, clock=clock)
+    assert other.get(first).question == "a"
+
+    clock.now += 1
+    store.put(make_result("c"))  # spills second; disk keeps only one entry
+    assert store.get(first) is None
+    assert store.get(second).question == "b"
+    assert store.stats()["disk_entries"] == 1
+
+    clock.now += 61
+    assert store.get(second) is None
+    assert not (tmp_path / f"{second}.pkl").exists()
+
+
+def test_result_store_from_mapping(tmp_path):
+    store = result_store_from_mapping(
+        {"RESULT_STORE_MAX_ENTRIES": "5", "RESULT_STORE_SPILL_DIR": str(tmp_path)}
+    )
+
+    assert store.max_entries == 5
+    assert store.spill_dir == tmp_path
+
+
+def test_query_returns_result_id_for_paging_and_reports(monkeypatch, tmp_path):
+    calls = []
+
+    class FakeRuntime:
+        async def aquery(self, question, *, scenario="data_insight", deadline=None):
+            calls.append(question)
+            return make_result(question, rows=5)
+
+    async def no_requery(request, query_request):
+        raise AssertionError("report must reuse the stored result")
+
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: FakeRuntime())
+    monkeypatch.setattr(api_server, "_result_store", ResultStore())
+    monkeypatch.setattr(api_server, "query", no_requery)
+    client = TestClient(api_server.app)
+
+    result_id = client.post("/api/agent/query", json={"question": "q"}).json()[
+        "result_id"
+    ]
+
+    page = client.get(f"/api/agent/results/{result_id}?offset=3&limit=10").json()
+    assert page["row_count"] == 5
+    assert page["rows"] == [
+        {"status": "状态3", "cnt": 3},
+        {"status": "状态4", "cnt": 4},
+    ]
+
+    report = client.post(
+        "/api/report", json={"result_id": result_id, "include_chart": False}
+    )
+    assert report.status_code == 200
+    assert "共查询到 5 条记录" in report.json()["content"]
+    assert "LIMIT 1000" in report.json()["content"]
+    assert calls == ["q"]
+
+    missing = client.get(f"/api/agent/results/{'0' * 32}")
+    assert missing.status_code == 404
+    assert client.post("/api/report", json={"result_id": "0" * 32}).status_code == 404
+    assert client.post("/api/report", json={}).status_code == 400
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import pytest
+
+from src.agent.factory import build_agent_runtime
+from src.agent.metrics import MetricsRegistry
+from src.agent.mirror import sqlite_source
+from src.agent.rollups import (
+    ZNJZ_ROLLUPS,
+    RollupRoutingExecutor,
+    RollupStore,
+    build_rollups,
+    plan_rollup,
+)
+from src.agent.sqlite_executor import SQLiteExecutor
+from src.agent.synthetic import generate_znjz
+
+BID_YEAR_SQL = (
+    "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count FROM `招投标` "
+    "WHERE `publish_time` IS NOT NULL AND `publish_time` >= '2018-01-01' "
+    "AND `publish_time` < '2024-01-01' GROUP BY YEAR(`publish_time`) "
+    "ORDER BY year DESC LIMIT 100"
+)
+
+
+class FakeLLM:
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return BID_YEAR_SQL
+        return "### 核心发现\n\n招投标逐年增长。"
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    root = tmp_path_factory.mktemp("rollups")
+    database = root / "znjz.sqlite3"
+    generate_znjz(database, scale=0.01, seed=7)
+    store = root / "rollups.sqlite3"
+    counts = build_rollups(sqlite_source(database), store, clock=Clock(1_000.0))
+    return database, store, counts
+
+
+def rows(result):
+    return sorted(str(tuple(row.values())) for row in result["rows"])
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        BID_YEAR_SQL,
+        "select t.status, count(1) from 企业基本信息 as t "
+        "where t.start_date >= '2015-01-01' and status in ('存续', '在业') "
+        "group by 1 order by 2 desc",
+        "SELECT `round`, COUNT(DISTINCT `eid`) AS enterprise_count, "
+        "SUM(`amount`) AS total_amount FROM `融资数据` GROUP BY `round`",
+        "SELECT YEAR(`start_date`) AS y, COUNT(DISTINCT `eid`) AS n "
+        "FROM `企业基本信息` WHERE `district_code` LIKE '44%' GROUP BY y",
+        "SELECT COUNT(*) FROM `企业基本信息` WHERE `district_code` = 'nowhere'",
+    ],
+)
+def test_covered_sql_matches_the_base_tables(files, sql):
+    database, store, _ = files
+
+    plan = plan_rollup(sql, ZNJZ_ROLLUPS)
+    base = SQLiteExecutor(database)(sql)
+    rollup = RollupStore(store)(plan.sql)
+
+    assert rollup["columns"] == base["columns"]
+    assert rows(rollup) == rows(base)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT YEAR(`publish_time`), COUNT(*) FROM `招投标` "
+        "WHERE `title` LIKE '%科技%' GROUP BY YEAR(`publish_time`)",
+        "SELECT COUNT(DISTINCT `eid`) FROM `招投标`",
+        "SELECT `status`, COUNT(*) AS n FROM `企业基本信息` GROUP BY `status` "
+        "HAVING n > 3",
+        "SELECT `status`, COUNT(*) FROM `企业基本信息` "
+        "WHERE `start_date` > '2015-01-01' GROUP BY `status`",
+        "SELECT YEAR(`start_date`) AS `start_date`, COUNT(*) "
+        "FROM `企业基本信息` GROUP BY `start_date`",
+        "SELECT b.`status`, COUNT(*) FROM `企业基本信息` b "
+        "JOIN `融资数据` f ON f.`eid` = b.`eid` GROUP BY b.`status`",
+    ],
+)
+def test_uncovered_sql_stays_on_the_base_tables(sql):
+    assert plan_rollup(sql, ZNJZ_ROLLUPS) is None
+
+
+def test_router_checks_freshness_and_falls_back(files, tmp_path):
+    database, store, counts = files
+    clock = Clock(1_060.0)
+    router = RollupRoutingExecutor(
+        SQLiteExecutor(database),
+        RollupStore(store, clock=clock),
+        max_age_seconds=300,
+    )
+
+    covered = router(BID_YEAR_SQL)
+    clock.now = 2_000.0
+    stale = router(BID_YEAR_SQL)
+
+    assert counts["rollup_bid_year"] > 0
+    assert covered["rollup"] == {
+        "route": "rollup",
+        "reason": "covered",
+        "rollup": "rollup_bid_year",
+        "age_seconds": 60.0,
+    }
+    assert stale["rollup"]["reason"] == "stale"
+    assert rows(stale) == rows(covered)
+    assert router.rollup_stats()["rollup"] == 1
+    assert router.bypasses_database(BID_YEAR_SQL) is None
+    clock.now = 1_060.0
+    assert router.bypasses_database(BID_YEAR_SQL) == "rollup"
+    missing = RollupRoutingExecutor(
+        SQLiteExecutor(database), RollupStore(tmp_path / "none.sqlite3")
+    )
+    assert missing(BID_YEAR_SQL)["rollup"]["reason"] == "missing"
+
+
+def test_decimal_sums_stay_exact(tmp_path):
+    # rollup_finance_round rows as MySQL returns them: SUM(DECIMAL) is Decimal.
+    built = [
+        ("A轮", 2, 2, Decimal("0.10")),
+        ("B轮", 1, 1, Decimal("0.20")),
+        ("C轮", 1, 1, Decimal("0.40")),
+        ("D轮", 1, 1, None),
+    ]
+
+    class Source:
+        def cursor(self):
+            return self
+
+        def execute(self, sql):
+            pass
+
+        def fetchall(self):
+            return built
+
+        def close(self):
+            pass
+
+    finance = tuple(r for r in ZNJZ_ROLLUPS if r.name == "rollup_finance_round")
+    store = tmp_path / "rollups.sqlite3"
+    build_rollups(Source, store, finance, clock=Clock(1_000.0))
+    router = RollupRoutingExecutor(
+        lambda sql: pytest.fail(f"reached the base tables: {sql}"),
+        RollupStore(store, clock=Clock(1_060.0)),
+        finance,
+    )
+
+    total = router("SELECT SUM(`amount`) AS total FROM `融资数据`")
+    by_round = router(
+        "SELECT `round`, SUM(`amount`) AS s FROM `融资数据` GROUP BY `round` "
+        "ORDER BY s DESC"
+    )
+
+    # Summing the same values as floats gives 0.7000000000000001.
+    assert total["rows"] == [{"total": float(Decimal("0.70"))}]
+    assert total["table"].column("total").tolist() == [0.7]
+    assert [row["s"] for row in by_round["rows"]] == [0.4, 0.2, 0.1, None]
+
+
+def test_factory_wires_rollups_into_trace_and_metrics(files):
+    database, store, _ = files
+    runtime = build_agent_runtime(
+        {
+            "SQL_BACKEND": "sqlite",
+            "SQL_SQLITE_PATH": str(database),
+            "ROLLUP_ENABLED": "true",
+            "ROLLUP_PATH": str(store),
+            "ROLLUP_MAX_AGE_SECONDS": "1e12",
+        },
+        llm=FakeLLM(),
+    )
+    metrics = MetricsRegistry()
+
+    result = runtime.query("统计2018到2023年每年的招投标数量")
+    metrics.observe_trace(result.trace)
+
+    assert isinstance(runtime.sql_executor, RollupRoutingExecutor)
+    assert result.success and result.row_count > 1
+    execute = [step for step in result.trace if step["node"] == "execute_sql"][-1]
+    assert execute["rollup"]["route"] == "rollup"
+    assert (
+        metrics.counter("agent_rollup_routes_total", route="rollup", reason="covered")
+        == 1
+    )
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 
 import pytest
@@ -311,3 +312,174 @@ def test_agent_result_serializes_public_api_contract():
     assert payload["rows"] == [{"cnt": 1}]
     assert payload["analysis"] == "ok"
     assert payload["trace"][-1]["node"] == "reflect_quality"
+
+
+def test_agent_runtime_aquery_matches_sync_node_sequence():
+    def fake_executor(sql: str):
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 17477}],
+            "row_count": 1,
+        }
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(
+            "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+        ),
+        sql_executor=fake_executor,
+    )
+
+    sync_result = runtime.query("统计企业经营状态分布")
+    async_result = asyncio.run(runtime.aquery("统计企业经营状态分布"))
+    linear_result = asyncio.run(runtime._aquery_linear("统计企业经营状态分布"))
+
+    for result in (async_result, linear_result):
+        assert result.success is True
+        assert result.safe_sql == sync_result.safe_sql
+        assert result.rows == sync_result.rows
+        assert [step["node"] for step in result.trace] == [
+            step["node"] for step in sync_result.trace
+        ]
+
+
+def test_agent_runtime_aquery_prefers_native_async_llm_and_executor():
+    calls = []
+
+    class AsyncLLM(FakeLLM):
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            raise AssertionError("sync complete must not be used by aquery")
+
+        async def acomplete(self, messages, *, temperature=0.1, max_tokens=1500):
+            calls.append("llm")
+            return FakeLLM.complete(
+                self, messages, temperature=temperature, max_tokens=max_tokens
+            )
+
+    class AsyncExecutor:
+        def __call__(self, sql):
+            raise AssertionError("sync executor must not be used by aquery")
+
+        async def aexecute(self, sql):
+            calls.append("sql")
+            return {"columns": ["cnt"], "rows": [{"cnt": 1}], "row_count": 1}
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=AsyncLLM("SELECT COUNT(*) AS cnt FROM `企业基本信息`"),
+        sql_executor=AsyncExecutor(),
+    )
+
+    result = asyncio.run(runtime.aquery("统计企业数量"))
+
+    assert result.success is True
+    assert calls == ["llm", "sql", "llm"]
+
+
+def test_agent_runtime_aquery_repairs_sql_after_execution_error():
+    attempts = []
+
+    class RepairingLLM(FakeLLM):
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回修复后的SQL" in messages[-1]["content"]:
+                return "SELECT `industry_code`, COUNT(*) AS cnt FROM `企业行业代码` GROUP BY `industry_code`"
+            return super().complete(
+                messages, temperature=temperature, max_tokens=max_tokens
+            )
+
+    def fake_executor(sql: str):
+        attempts.append(sql)
+        if len(attempts) == 1:
+            raise RuntimeError("Unknown column 'industry_name'")
+        return {"columns": ["industry_code", "cnt"], "rows": [], "row_count": 0}
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=RepairingLLM(
+            "SELECT `industry_name`, COUNT(*) AS cnt FROM `企业行业代码` GROUP BY `industry_name`"
+        ),
+        sql_executor=fake_executor,
+    )
+
+    result = asyncio.run(runtime.aquery("统计行业分布", scenario="industry"))
+
+    assert result.success is True
+    assert len(attempts) == 2
+    assert any(step["node"] == "repair_sql" for step in result.trace)
+
+
+def test_openai_compatible_provider_acomplete_uses_async_client():
+    class FakeAsyncCompletions:
+        def __init__(self):
+            self.kwargs = None
+
+        async def create(self, **kwargs):
+            self.kwargs = kwargs
+            message = type("Message", (), {"content": " SELECT 1 "})()
+            choice = type("Choice", (), {"message": message})()
+            return type("Response", (), {"choices": [choice]})()
+
+    completions = FakeAsyncCompletions()
+
+    def async_client_factory(**kwargs):
+        chat = type("Chat", (), {"completions": completions})()
+        return type("Client", (), {"chat": chat})()
+
+    provider = VolcengineArkProvider(
+        settings=LLMSettings.from_mapping({"VOLCENGINE_ARK_API_KEY": "test-key"}),
+        client_factory=lambda **kwargs: kwargs,
+        async_client_factory=async_client_factory,
+    )
+
+    text = asyncio.run(
+        provider.acomplete([{"role": "user", "content": "hi"}], max_tokens=10)
+    )
+
+    assert text == "SELECT 1"
+    assert completions.kwargs["max_tokens"] == 10
+    assert completions.kwargs["temperature"] == 0.1
+
+
+def test_agent_runtime_astream_emits_sql_rows_and_analysis_tokens():
+    class StreamingLLM(FakeLLM):
+        async def astream(self, messages, *, temperature=0.1, max_tokens=1500):
+            for token in ("当前返回结果", "显示：", "存续为主。"):
+                yield token
+
+    def fake_executor(sql: str):
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 17477}],
+            "row_count": 1,
+        }
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=StreamingLLM(
+            "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+        ),
+        sql_executor=fake_executor,
+    )
+
+    async def collect():
+        return [event async for event in runtime.astream("统计企业经营状态分布")]
+
+    events = asyncio.run(collect())
+    kinds = [event["event"] for event in events]
+
+    validate = next(
+        e
+        for e in events
+        if e["event"] == "node" and e["data"]["node"] == "validate_sql"
+    )
+    assert validate["data"]["safe_sql"].endswith("LIMIT 1000")
+    assert kinds.index("rows") < kinds.index("token")
+    assert [e["data"]["text"] for e in events if e["event"] == "token"] == [
+        "当前返回结果",
+        "显示：",
+        "存续为主。",
+    ]
+    assert kinds[-1] == "result"
+    assert events[-1]["data"]["analysis"] == "当前返回结果显示：存续为主。"
+    node_events = [e["data"]["node"] for e in events if e["event"] == "node"]
+    assert node_events == [step["node"] for step in events[-1]["data"]["trace"]]
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import os
+
+import api_server
+from src.agent.profiles import DatabaseProfile, get_database_profile
+from src.agent.schema_catalog import load_catalog
+from src.agent.schema_index import schema_index_for
+
+MARKDOWN = """# demo
+
+## 2. 查询规则
+
+1. 只能 SELECT。
+
+## 4. 基础表
+
+### 4.1 `orders`
+
+- 描述：订单表。
+
+| Column | MySQL Type | Role | Description |
+|---|---|---|---|
+| `eid` | `varchar(64)` | Identifier | 企业标识 |
+| `amount` | `double` | Metric | 订单金额 |
+
+## 5. 兼容视图
+
+### `订单`
+
+- 描述：兼容视图：仅保留有效订单。
+
+| Column | MySQL Type | Role | Description |
+|---|---|---|---|
+| `eid` | `varchar(64)` | Identifier | 企业标识 |
+
+## 6. 常见分析 SQL 模板
+
+### 订单金额合计
+
+```sql
+SELECT SUM(`amount`) FROM `orders`;
+```
+"""
+
+
+def _write(path, text, mtime_ns):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_catalog_exposes_tables_views_columns_rules_and_templates():
+    catalog = get_database_profile("znjz").catalog()
+
+    assert list(catalog.tables)[:6] == list(get_database_profile("znjz").base_tables)
+    assert set(catalog.views) == set(get_database_profile("znjz").compatibility_views)
+    assert "round" in catalog.columns("融资数据")
+    assert "cbid_id" in catalog.views["招投标"].description
+    assert catalog.rules[0].title.endswith("Text2SQL 必须遵守的查询规则")
+    template = next(t for t in catalog.templates if t.title == "融资轮次分布")
+    assert template.sql.startswith("SELECT `round`")
+
+
+def test_catalog_is_cached_until_file_changes(tmp_path):
+    path = tmp_path / "schema.md"
+    _write(path, MARKDOWN, 1_000_000_000)
+
+    first = load_catalog(path)
+    assert load_catalog(path) is first
+    assert first.columns("orders") == ["eid", "amount"]
+    assert first.views["订单"].is_view
+
+    _write(path, MARKDOWN.replace("| `amount` |", "| `total` |"), 2_000_000_000)
+    reloaded = load_catalog(path)
+
+    assert reloaded is not first
+    assert reloaded.columns("orders") == ["eid", "total"]
+
+
+def test_schema_index_rebuilds_after_hot_reload(tmp_path):
+    path = tmp_path / "schema.md"
+    _write(path, MARKDOWN, 1_000_000_000)
+    profile = DatabaseProfile(
+        name="demo",
+        scenario_key="demo",
+        schema_path=path,
+        allowed_tables=("orders", "订单"),
+        compatibility_views=("订单",),
+        sql_guidance="",
+    )
+
+    index = schema_index_for(profile)
+    assert schema_index_for(profile) is index
+    assert "`amount`" in index.retrieve("订单金额").text
+
+    _write(path, MARKDOWN.replace("`amount`", "`total`"), 2_000_000_000)
+
+    reloaded = schema_index_for(profile)
+    assert reloaded is not index
+    assert "`total`" in reloaded.retrieve("订单金额").text
+
+
+def test_legacy_api_loaders_share_catalog(tmp_path, monkeypatch):
+    examples = tmp_path / "examples.md"
+    _write(
+        examples,
+        "# 示例\n\n## 场景1：数据洞察\n\n### 示例1\nSELECT 1\n\n## 场景2：地区产业分析\n\nSELECT 2\n",
+        1_000_000_000,
+    )
+    monkeypatch.setattr(api_server, "EXAMPLES_FILE", examples)
+
+    text = api_server.load_sql_examples("data_insight")
+
+    assert text.startswith("场景1：数据洞察")
+    assert "SELECT 1" in text and "SELECT 2" not in text
+    assert api_server.load_schema_for_scenario("data_insight") == (
+        load_catalog(api_server.SCHEMA_FILES["scenario_1_3"]).text
+    )
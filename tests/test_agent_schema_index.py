@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+from src.agent.schema_catalog import SchemaCatalog
+from src.agent.schema_index import (
+    SchemaIndex,
+    estimate_tokens,
+    schema_index_for,
+    tokenize,
+)
+
+
+def test_tokenize_splits_identifiers_and_cjk_bigrams():
+    terms = tokenize("招投标 publish_time")
+
+    assert "招投" in terms and "投标" in terms
+    assert {"publish_time", "publish", "time"} <= set(terms)
+
+
+def test_index_parses_tables_views_templates_and_rules():
+    index = schema_index_for(get_database_profile("znjz"))
+
+    names = [table.name for table in index.tables]
+    assert names[:6] == list(get_database_profile("znjz").base_tables)
+    assert {"招投标", "融资数据"} <= set(names)
+    assert any("规则" in chunk.heading for chunk in index.pinned)
+    assert any("招投标年度趋势" in chunk.heading for chunk in index.templates)
+    assert schema_index_for(get_database_profile("znjz")) is index
+
+
+def test_retrieve_picks_relevant_tables_within_budget():
+    index = schema_index_for(get_database_profile("znjz"))
+
+    selection = index.retrieve("招投标年度趋势", token_budget=3000)
+
+    assert selection.tables[0] == "招投标"
+    assert "招投标信息" in selection.tables
+    assert "企业融资信息" not in selection.tables
+    assert "`publish_time`" in selection.text
+    assert "`project_bid_money`" in selection.text
+    assert "Text2SQL 必须遵守的查询规则" in selection.text
+    assert selection.tokens <= 3000
+    assert selection.tokens < estimate_tokens(
+        get_database_profile("znjz").load_schema()
+    )
+
+
+def test_retrieve_reaches_tables_past_the_old_truncation_point():
+    selection = schema_index_for(get_database_profile("znjz")).retrieve(
+        "资质标签年份分布"
+    )
+
+    assert "商标资质信息" in selection.tables
+    assert "`ct_year`" in selection.text
+
+
+def test_retrieve_falls_back_to_first_table_without_matches():
+    index = SchemaIndex(
+        SchemaCatalog.from_markdown(
+            "## 4. 表\n\n### `a`\n\n- 描述：主表\n\n| Column | Description |\n"
+            "|---|---|\n| `eid` | 主键 |\n| `x` | 数值 |\n"
+        )
+    )
+
+    selection = index.retrieve("完全无关的问题")
+
+    assert selection.tables == ["a"]
+    assert "`eid`" in selection.text
+
+
+def test_runtime_prompt_uses_retrieved_schema():
+    prompts = []
+
+    class RecordingLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            prompts.append(messages[-1]["content"])
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return "SELECT YEAR(`publish_time`) AS y, COUNT(*) AS c FROM `招投标` GROUP BY y"
+            return "ok"
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=RecordingLLM(),
+        sql_executor=lambda sql: {"columns": [], "rows": [], "row_count": 0},
+        schema_token_budget=2500,
+    )
+
+    result = runtime.query("招投标年度趋势")
+
+    retrieve = next(step for step in result.trace if step["node"] == "retrieve_schema")
+    assert retrieve["tables"][0] == "招投标"
+    assert retrieve["schema_tokens"] <= 2500
+    assert "`publish_time`" in prompts[0]
+    assert "## 4.1 `企业基本信息`" not in prompts[0]
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from src.agent.factory import build_agent_runtime
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+from src.agent.singleflight import SingleFlight
+
+STATUS_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        self.calls += 1
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return STATUS_SQL
+        return "### 核心发现\n\n存续企业占多数。"
+
+
+class GatedExecutor:
+    """Blocks until released so concurrent queries overlap."""
+
+    def __init__(self):
+        self.calls = 0
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, sql):
+        self.calls += 1
+        self.entered.set()
+        assert self.release.wait(5)
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        }
+
+
+def _runtime():
+    llm = CountingLLM()
+    executor = GatedExecutor()
+    metrics = MetricsRegistry()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=llm,
+        sql_executor=executor,
+        metrics=metrics,
+        single_flight=SingleFlight(),
+    )
+    return runtime, llm, executor, metrics
+
+
+def test_single_flight_shares_value_and_errors_between_threads():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        for _ in range(3)
+    ]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["coalesced"] < 3:
+        pass
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(results) == [("value", False)] + [("value", True)] * 3
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 3}
+
+    def boom():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+
+
+def test_async_waiter_takes_over_when_leader_is_cancelled():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return len(runs)
+
+        leader = asyncio.create_task(flight.ado("k", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.ado("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        value, shared = await waiter
+        return leader, value, shared, flight.stats()
+
+    leader, value, shared, stats = asyncio.run(scenario())
+
+    assert leader.cancelled()
+    assert (value, shared) == (2, False)
+    assert stats == {"in_flight": 0, "leaders": 2, "coalesced": 0}
+
+
+def test_runtime_coalesces_concurrent_identical_questions():
+    runtime, llm, executor, metrics = _runtime()
+
+    async def scenario():
+        tasks = [
+            asyncio.create_task(runtime.aquery(question))
+            for question in ["统计企业经营状态分布", "统计 企业经营状态分布？"] * 2
+        ]
+        await asyncio.to_thread(executor.entered.wait, 5)
+        await asyncio.sleep(0.01)
+        executor.release.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+
+    assert executor.calls == 1
+    assert llm.calls == 2  # one generate_sql, one analyze
+    assert all(result.success and result.row_count == 1 for result in results)
+    coalesced = [r for r in results if r.trace[0]["node"] == "single_flight"]
+    assert len(coalesced) == 3
+    assert coalesced[0].trace == [
+        {"node": "single_flight", "status": "coalesced", "profile": "znjz"}
+    ]
+    assert metrics.counter("agent_coalesced_requests_total") == 3
+    assert runtime.single_flight.stats()["in_flight"] == 0
+
+
+def test_runtime_sync_query_coalesces_across_threads():
+    runtime, llm, executor, metrics = _runtime()
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(runtime.query("统计企业经营状态分布"))
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    executor.entered.wait(5)
+    while runtime.single_flight.stats()["coalesced"] < 2:
+        pass
+    executor.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert executor.calls == 1
+    assert len(results) == 3
+    assert metrics.counter("agent_coalesced_requests_total") == 2
+
+
+def test_factory_toggles_single_flight():
+    enabled = build_agent_runtime({}, llm=CountingLLM(), sql_executor=GatedExecutor())
+    disabled = build_agent_runtime(
+        {"AGENT_SINGLE_FLIGHT_ENABLED": "false"},
+        llm=CountingLLM(),
+        sql_executor=GatedExecutor(),
+    )
+
+    assert isinstance(enabled.single_flight, SingleFlight)
+    assert disabled.single_flight is None
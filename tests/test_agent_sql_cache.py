@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+import time
+
+import pymysql
+import pytest
+
+from src.agent.executors import MySQLConnectionPool
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+from src.agent.sql_cache import (
+    CachingSQLExecutor,
+    MySQLDataVersionProbe,
+    SQLCacheSettings,
+    canonical_sql,
+)
+
+
+class CountingExecutor:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, sql):
+        self.calls.append(sql)
+        return {
+            "columns": ["status", "cnt"],
+            "rows": [{"status": "存续", "cnt": 3}],
+            "row_count": 1,
+        }
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SequenceProbe:
+    def __init__(self, *versions):
+        self.versions = list(versions)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        version = self.versions[min(self.calls, len(self.versions)) - 1]
+        if isinstance(version, Exception):
+            raise version
+        return version
+
+
+def test_canonical_sql_ignores_spacing_case_comments_and_quoting():
+    a = canonical_sql(
+        "select `status`, count(*) as cnt from `企业基本信息` "
+        "where name like '%A  b%' -- 注释\n group by status limit 5;"
+    )
+    b = canonical_sql(
+        "SELECT status,COUNT( * ) AS `cnt`\nFROM 企业基本信息 "
+        "WHERE `name` LIKE '%A  b%' GROUP  BY `status` LIMIT 5"
+    )
+
+    assert a == b
+    assert "'%A  b%'" in a
+    assert canonical_sql("SELECT `x` FROM t WHERE a = 'X'") != canonical_sql(
+        "SELECT `x` FROM t WHERE a = 'x'"
+    )
+
+
+def test_cache_hits_equivalent_sql_and_expires_after_ttl():
+    inner = CountingExecutor()
+    clock = FakeClock()
+    executor = CachingSQLExecutor(
+        inner, settings=SQLCacheSettings(ttl_seconds=60), clock=clock
+    )
+
+    assert executor("SELECT `status` FROM `企业基本信息` LIMIT 5")["cache"] == "miss"
+    hit = executor("select status from 企业基本信息 limit 5")
+    assert hit["cache"] == "hit"
+    assert hit["rows"] == [{"status": "存续", "cnt": 3}]
+    assert len(inner.calls) == 1
+
+    clock.now = 61
+    assert executor("SELECT `status` FROM `企业基本信息` LIMIT 5")["cache"] == "miss"
+    assert len(inner.calls) == 2
+
+
+def test_data_version_change_invalidates_and_probe_is_throttled():
+    inner = CountingExecutor()
+    clock = FakeClock()
+    probe = SequenceProbe("v1", "v1", "v2")
+    executor = CachingSQLExecutor(
+        inner,
+        version_probe=probe,
+        settings=SQLCacheSettings(probe_interval_seconds=30),
+        clock=clock,
+    )
+
+    executor("SELECT 1")
+    executor("SELECT 1")
+    assert probe.calls == 1
+
+    clock.now = 31
+    assert executor("SELECT 1")["cache"] == "hit"
+    clock.now = 62
+    assert executor("SELECT 1")["cache"] == "miss"
+    assert executor.cache_stats()["invalidations"] == 1
+    assert len(inner.calls) == 2
+
+
+def test_probe_failure_bypasses_cache():
+    inner = CountingExecutor()
+    executor = CachingSQLExecutor(
+        inner, version_probe=SequenceProbe(RuntimeError("lost connection"))
+    )
+
+    assert executor("SELECT 1")["cache"] == "bypass"
+    assert executor("SELECT 1")["cache"] == "bypass"
+    assert len(inner.calls) == 2
+    assert executor.cache_stats()["probe_errors"] == 2
+
+
+def test_concurrent_misses_share_one_probe():
+    inner = CountingExecutor()
+    release = threading.Event()
+
+    class SlowProbe(SequenceProbe):
+        def __call__(self):
+            release.wait(5)
+            return super().__call__()
+
+    probe = SlowProbe("v1")
+    executor = CachingSQLExecutor(inner, version_probe=probe)
+
+    threads = [
+        threading.Thread(target=executor, args=(f"SELECT {i}",)) for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert probe.calls == 1
+    assert len(inner.calls) == 8
+
+
+@pytest.mark.parametrize("mysql57", [False, True])
+def test_information_schema_probe_queries_base_tables(mysql57):
+    executed = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            if mysql57 and sql.startswith("SET"):
+                raise pymysql.err.InternalError(1193, "Unknown system variable")
+            executed.append((sql, params))
+
+        def fetchall(self):
+            return [("招投标信息", "2026-01-01", "2026-02-01", 576000)]
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+
+        def ping(self, reconnect=False):
+            pass
+
+        def close(self):
+            pass
+
+    profile = get_database_profile("znjz")
+    probe = MySQLDataVersionProbe(
+        MySQLConnectionPool({}, connect_factory=lambda **_: Connection()),
+        profile.base_tables,
+    )
+
+    assert probe() == (("招投标信息", "2026-01-01", "2026-02-01", "576000"),)
+    probe()
+    # MySQL 8 would otherwise answer from its day-long statistics cache.
+    if mysql57:
+        assert len(executed) == 2
+    else:
+        assert [sql for sql, _ in executed[::2]] == [
+            "SET SESSION information_schema_stats_expiry = 0"
+        ] * 2
+        executed = executed[1::2]
+    sql, params = executed[0]
+    assert "information_schema.TABLES" in sql
+    assert params == profile.base_tables
+    assert len(profile.base_tables) == 6
+    assert "招投标" not in profile.base_tables
+
+
+def test_runtime_records_sql_cache_status_in_trace_and_metrics():
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+            return "ok"
+
+    metrics = MetricsRegistry()
+    inner = CountingExecutor()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=CachingSQLExecutor(inner),
+        metrics=metrics,
+    )
+
+    runtime.query("统计企业经营状态分布")
+    second = runtime.query("按经营状态统计企业数量")
+
+    execute_steps = [step for step in second.trace if step["node"] == "execute_sql"]
+    assert execute_steps[-1]["cache"] == "hit"
+    assert "pool" not in execute_steps[-1]
+    assert len(inner.calls) == 1
+    assert metrics.counter("agent_cache_requests_total", cache="sql", result="hit") == 1
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from src.agent import backends
+from src.agent.backends import build_sql_executor, register_backend
+from src.agent.deadline import Deadline, DeadlineExceeded, use_deadline
+from src.agent.factory import build_agent_runtime
+from src.agent.sqlite_executor import SQLiteExecutor, to_sqlite
+from src.agent.synthetic import generate_znjz
+
+STATUS_SQL = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+
+class FakeLLM:
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return STATUS_SQL
+        return "### 核心发现\n\n存续企业占多数。"
+
+
+@pytest.fixture(scope="module")
+def database(tmp_path_factory):
+    path = tmp_path_factory.mktemp("synthetic") / "znjz.sqlite3"
+    counts = generate_znjz(path, scale=0.01, seed=7)
+    return path, counts
+
+
+def test_generator_builds_tables_and_compat_views_at_scale(database, tmp_path):
+    path, counts = database
+    executor = SQLiteExecutor(path)
+
+    def count(table):
+        return executor(f"SELECT COUNT(*) AS n FROM `{table}`")["rows"][0]["n"]
+
+    assert counts["企业基本信息"] == counts["企业基本信息_行业代码"] == 176
+    assert counts["招投标信息"] > 5000
+    assert count("企业行业代码") == 176
+    # Views keep only event rows: 1% of 576,690 bids and 267 financing rounds.
+    assert count("招投标") == 5767
+    assert count("融资数据") == 3
+    orphans = executor(
+        "SELECT COUNT(*) AS n FROM `招投标` t "
+        "LEFT JOIN `企业基本信息` b ON t.`eid` = b.`eid` WHERE b.`eid` IS NULL"
+    )
+    assert orphans["rows"][0]["n"] == 0
+
+    again = generate_znjz(tmp_path / "again.sqlite3", scale=0.01, seed=7)
+    first = SQLiteExecutor(tmp_path / "again.sqlite3")(
+        "SELECT `eid` FROM `企业基本信息` LIMIT 1"
+    )
+    assert again == counts
+    assert first["rows"] == executor("SELECT `eid` FROM `企业基本信息` LIMIT 1")["rows"]
+
+
+def test_sqlite_executor_speaks_enough_mysql_and_is_read_only(database):
+    executor = SQLiteExecutor(database[0])
+
+    result = executor(
+        "SELECT YEAR(`start_date`) AS y, DATE_FORMAT(`start_date`, '%Y-%m') AS ym, "
+        "DATE_SUB(`start_date`, INTERVAL 1 YEAR) AS before, "
+        "IF(`regist_capi_new` >= 1000, '大', '小') AS size "
+        "FROM `企业基本信息` WHERE `start_date` IS NOT NULL LIMIT 1"
+    )
+    row = result["rows"][0]
+
+    assert row["ym"].startswith(str(row["y"]))
+    assert row["before"].startswith(str(row["y"] - 1))
+    assert row["size"] in {"大", "小", None}
+    assert to_sqlite("DATE_ADD(d, INTERVAL 3 month)") == "DATE_ADD(d, 3, 'MONTH')"
+    with pytest.raises(sqlite3.OperationalError):
+        executor("DELETE FROM `企业基本信息`")
+
+
+def test_sqlite_executor_enforces_the_request_deadline(database):
+    executor = SQLiteExecutor(database[0])
+    endless = (
+        "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+        "SELECT COUNT(*) FROM c"
+    )
+
+    with use_deadline(Deadline(0.05)):
+        with pytest.raises(DeadlineExceeded):
+            executor(endless)
+
+    assert executor("SELECT 1 AS ok")["rows"] == [{"ok": 1}]
+
+
+def test_factory_selects_backend_from_settings(database, monkeypatch):
+    runtime = build_agent_runtime(
+        {"SQL_BACKEND": "sqlite", "SQL_SQLITE_PATH": str(database[0])},
+        llm=FakeLLM(),
+    )
+
+    result = runtime.query("统计企业经营状态分布")
+
+    assert isinstance(runtime.sql_executor, SQLiteExecutor)
+    assert runtime.cost_guard is None
+    assert result.success and result.row_count > 1
+    execute = [step for step in result.trace if step["node"] == "execute_sql"][-1]
+    assert execute["pool"]["backend"] == "sqlite"
+
+    monkeypatch.setattr(backends, "_BACKENDS", dict(backends._BACKENDS))
+    register_backend("memory", lambda db_config, source: db_config["executor"])
+    assert build_sql_executor({"backend": "memory", "executor": len}) is len
+    with pytest.raises(ValueError, match="Unsupported SQL backend"):
+        build_sql_executor({"backend": "oracle"})
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date
+
+import pytest
+
+from src.agent.factory import build_agent_runtime, template_matcher_from_mapping
+from src.agent.metrics import MetricsRegistry
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+from src.agent.templates import TemplateMatcher, extract_params, parse_count
+from src.utils.safe_sql import enforce_safe_sql
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        self.prompts.append(messages[-1]["content"])
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return "SELECT COUNT(DISTINCT `eid`) AS cnt FROM `企业基本信息`"
+        return "分析完成"
+
+    async def acomplete(self, messages, *, temperature=0.1, max_tokens=1500):
+        return self.complete(messages, temperature=temperature, max_tokens=max_tokens)
+
+
+def _executor(sql):
+    return {
+        "columns": ["status", "cnt"],
+        "rows": [{"status": "存续", "cnt": 2}],
+        "row_count": 1,
+    }
+
+
+def _matcher():
+    return TemplateMatcher(today=lambda: date(2026, 5, 1))
+
+
+def test_extract_params_reads_top_n_years_and_keywords():
+    assert parse_count("二十") == 20
+    assert parse_count("十五") == 15
+    assert extract_params("行业 Top 15").top_n == 15
+    assert extract_params("前十个行业").top_n == 10
+    assert extract_params("2023年到2021年").years == (2021, 2023)
+    assert extract_params("近三年", today=date(2026, 5, 1)).years == (2024, 2026)
+    assert extract_params("“智慧城市”项目").keyword == "智慧城市"
+    assert (
+        extract_params("查看华为技术有限公司的企业详情").keyword == "华为技术有限公司"
+    )
+    assert extract_params("“100%达标”项目").unparsed
+
+
+def test_known_question_shapes_produce_safe_parameterized_sql():
+    matcher = _matcher()
+    profile = get_database_profile("znjz")
+    cases = {
+        "统计企业经营状态分布": ("经营状态", "GROUP BY `status`"),
+        "企业数量最多的前十个行业": ("行业 Top", "LIMIT 10"),
+        "2020年至2023年各融资轮次分布": (
+            "融资轮次",
+            "`round_date` >= '2020-01-01' AND `round_date` < '2024-01-01'",
+        ),
+        "近三年“智慧城市”招投标年度趋势": (
+            "招投标年度",
+            "`title` LIKE '%智慧城市%'",
+        ),
+    }
+    for question, (template, fragment) in cases.items():
+        match = matcher.match(question)
+        assert match is not None, question
+        assert match.template == template
+        assert fragment in match.sql
+        assert enforce_safe_sql(
+            match.sql, allowed_tables=profile.allowed_tables
+        ).is_safe
+
+    detail = matcher.match("给出一家企业的详情", "due_diligence")
+    assert detail.template == "企业详情"
+    assert detail.sql.endswith("LIMIT 1")
+
+
+def test_ambiguous_or_uncovered_questions_fall_back_to_llm():
+    matcher = _matcher()
+
+    assert matcher.match("各地区企业经营状态分布") is None
+    assert matcher.best("各地区企业经营状态分布").confidence < 0.8
+    assert matcher.match("按行业统计融资轮次") is None
+    assert matcher.match("注册资本 Top 10 企业") is None
+    assert matcher.match("统计企业数量") is None
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        # Subject filter, measure and status filter the templates cannot express.
+        "人工智能产业前十",
+        "招投标中标金额按年统计",
+        "统计注销企业数量",
+    ],
+)
+def test_questions_with_unconsumed_content_fall_back_to_llm(question):
+    matcher = _matcher()
+
+    assert matcher.match(question) is None
+    assert matcher.best(question).confidence < 0.8
+
+
+def test_runtime_skips_llm_on_template_hit_and_counts_hit_rate():
+    llm = RecordingLLM()
+    metrics = MetricsRegistry()
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=llm,
+        sql_executor=_executor,
+        metrics=metrics,
+        templates=_matcher(),
+    )
+
+    hit = runtime.query("统计企业经营状态分布")
+    miss = asyncio.run(runtime.aquery("统计企业数量"))
+
+    assert hit.success and miss.success
+    generate = next(step for step in hit.trace if step["node"] == "generate_sql")
+    assert generate["source"] == "template"
+    assert generate["template"] == "经营状态"
+    assert "llm" not in generate
+    assert hit.sql.startswith("SELECT `status`, COUNT(*) AS cnt")
+    assert sum("只返回一条MySQL SELECT语句" in prompt for prompt in llm.prompts) == 1
+    assert metrics.counter("agent_template_requests_total", result="hit") == 1
+    assert metrics.counter("agent_template_requests_total", result="miss") == 1
+
+
+def test_factory_enables_templates_unless_disabled():
+    runtime = build_agent_runtime(
+        {"VOLCENGINE_ARK_API_KEY": "test-key"}, sql_executor=_executor
+    )
+
+    assert isinstance(runtime.templates, TemplateMatcher)
+    assert (
+        template_matcher_from_mapping(
+            "znjz", {"TEMPLATE_MIN_CONFIDENCE": "0.95"}
+        ).min_confidence
+        == 0.95
+    )
+    assert (
+        template_matcher_from_mapping("znjz", {"TEMPLATE_FAST_PATH_ENABLED": "false"})
+        is None
+    )
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import json
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
 from fastapi.testclient import TestClient
 
 import api_server
+from src.agent.metrics import MetricsRegistry
 from src.agent.runtime import AgentResult
+from src.utils.fast_json import dumps
 
 
 class FakeRuntime:
@@ -26,6 +33,19 @@ class FakeRuntime:
             trace=[{"node": "reflect_quality", "status": "ok"}],
         )
 
+    async def aquery(
+        self, question: str, *, scenario: str = "data_insight", deadline=None
+    ) -> AgentResult:
+        return self.query(question, scenario=scenario)
+
+    async def astream(
+        self, question: str, *, scenario: str = "data_insight", deadline=None
+    ):
+        result = self.query(question, scenario=scenario)
+        yield {"event": "node", "data": {"node": "validate_sql", "status": "ok"}}
+        yield {"event": "token", "data": {"node": "analyze", "text": "当前"}}
+        yield {"event": "result", "data": result.to_dict()}
+
 
 def test_agent_query_endpoint_returns_runtime_payload(monkeypatch):
     monkeypatch.delenv("APP_PASSWORD", raising=False)
@@ -58,3 +78,47 @@ def test_agent_query_endpoint_rejects_wrong_password(monkeypatch):
 
     assert response.status_code == 401
     assert response.json()["detail"] == "访问口令错误"
+
+
+def test_agent_query_stream_endpoint_emits_server_sent_events(monkeypatch):
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: FakeRuntime())
+
+    client = TestClient(api_server.app)
+    response = client.post(
+        "/api/agent/query/stream",
+        json={"question": "统计企业经营状态分布", "scenario": "data_insight"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        line.removeprefix("event: ")
+        for line in response.text.splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events == ["node", "token", "result", "done"]
+    assert '"safe_sql"' in response.text
+
+
+def test_sse_frames_use_the_fast_json_encoder():
+    data = {"amount": Decimal("1.50"), "at": datetime(2024, 1, 2, 3, 4), "ids": (1, 2)}
+
+    frame = api_server.format_sse("rows", data)
+
+    assert frame == b"event: rows\ndata: " + dumps(data) + b"\n\n"
+    payload = json.loads(frame.decode("utf-8").split("data: ", 1)[1])
+    assert payload == {"amount": 1.5, "at": "2024-01-02T03:04:00", "ids": [1, 2]}
+
+
+def test_metrics_endpoint_exposes_prometheus_text(monkeypatch):
+    registry = MetricsRegistry()
+    registry.observe("agent_node_duration_seconds", 0.2, node="generate_sql")
+    monkeypatch.setattr(api_server, "_agent_runtime", SimpleNamespace(metrics=registry))
+
+    client = TestClient(api_server.app)
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'agent_node_duration_seconds_count{node="generate_sql"} 1' in response.text
@@ -0,0 +1,117 @@
+"""fast_json.py 测试 —— Agent API 快速 JSON 响应。"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import api_server
+from src.agent.runtime import AgentResult
+from src.utils.fast_json import (
+    choose_encoding,
+    dumps,
+    fast_json_response,
+    parse_fields,
+    select_fields,
+)
+
+
+def test_dumps_handles_decimal_dates_and_chinese():
+    body = dumps(
+        {
+            "amount": Decimal("12.50"),
+            "day": date(2024, 5, 1),
+            "at": datetime(2024, 5, 1, 8, 30),
+            "name": "智能制造",
+        }
+    )
+
+    assert "智能制造".encode("utf-8") in body
+    assert json.loads(body) == {
+        "amount": 12.5,
+        "day": "2024-05-01",
+        "at": "2024-05-01T08:30:00",
+        "name": "智能制造",
+    }
+
+
+def test_parse_and_select_fields():
+    allowed = {"rows", "analysis", "trace", "success", "error"}
+    selected = parse_fields("rows, analysis", allowed)
+
+    assert selected == {"rows", "analysis", "success", "error"}
+    assert select_fields({"rows": [], "trace": [], "success": True}, selected) == {
+        "rows": [],
+        "success": True,
+    }
+    assert parse_fields(None, allowed) is None
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("rows,password", allowed)
+    assert exc.value.status_code == 400
+
+
+def test_choose_encoding_and_compression_threshold():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding(None) is None
+
+    small = fast_json_response({"a": 1}, accept_encoding="gzip")
+    assert "content-encoding" not in small.headers
+
+    large = fast_json_response({"rows": ["招投标"] * 500}, accept_encoding="gzip")
+    assert large.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(large.body))["rows"][0] == "招投标"
+
+
+def test_brotli_preferred_when_available():
+    brotli = pytest.importorskip("brotli")
+    response = fast_json_response({"rows": ["x"] * 2000}, accept_encoding="gzip, br")
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(response.body))["rows"][0] == "x"
+
+
+def test_agent_query_endpoint_fields_and_gzip(monkeypatch):
+    result = AgentResult(
+        question="q",
+        scenario="data_insight",
+        success=True,
+        columns=["title", "amount"],
+        rows=[{"title": "智慧城市项目" * 20, "amount": Decimal("1.5")}] * 20,
+        row_count=20,
+        analysis="当前返回结果显示……",
+        trace=[{"node": "reflect_quality", "status": "ok"}],
+    )
+
+    class FakeRuntime:
+        async def aquery(self, question, *, scenario="data_insight", deadline=None):
+            return result
+
+    monkeypatch.delenv("APP_PASSWORD", raising=False)
+    monkeypatch.setattr(api_server, "get_agent_runtime", lambda: FakeRuntime())
+    client = TestClient(api_server.app)
+
+    response = client.post(
+        "/api/agent/query?fields=rows,analysis",
+        json={"question": "q"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    payload = response.json()
+    assert set(payload) == {"rows", "analysis", "success", "error"}
+    assert payload["rows"][0]["amount"] == 1.5
+
+    bad = client.post("/api/agent/query?fields=secrets", json={"question": "q"})
+    assert bad.status_code == 400
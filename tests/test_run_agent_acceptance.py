@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+
+from scripts.run_agent_acceptance import (
+    StandInExecutor,
+    compare_to_baseline,
+    main,
+    percentile,
+    select_columns,
+)
+
+
+def test_percentile_interpolates_like_numpy():
+    values = [10.0, 20.0, 30.0, 40.0]
+
+    assert percentile(values, 50) == 25.0
+    assert percentile(values, 95) == 38.5
+    assert percentile([], 99) == 0.0
+
+
+def test_stand_in_executor_shapes_rows_from_select_list():
+    sql = (
+        "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count FROM `招投标` "
+        "GROUP BY YEAR(`publish_time`) LIMIT 100"
+    )
+
+    assert select_columns(sql) == ["year", "bid_count"]
+    result = StandInExecutor(rows=3)(sql)
+    assert result["row_count"] == 3
+    assert result["rows"][2] == {"year": "year_2", "bid_count": 30}
+
+
+def test_offline_benchmark_writes_baseline_and_detects_regressions(tmp_path):
+    first = tmp_path / "first"
+    args = ["--offline", "--llm-latency", "0", "--sql-latency", "0", "--limit", "3"]
+
+    assert (
+        main([*args, "--workers", "2", "--repeats", "2", "--output-dir", str(first)])
+        == 0
+    )
+
+    summary = json.loads((first / "benchmark.json").read_text(encoding="utf-8"))
+    assert summary["summary"]["queries"] == 6
+    assert summary["summary"]["success_rate"] == 1.0
+    assert summary["config"]["workers"] == 2
+    assert {"p50", "p95", "p99"} <= set(summary["latency_ms"]["total"])
+    assert "execute_sql" in summary["latency_ms"]["nodes"]
+    assert summary["tokens"]["per_query"] > 0
+    assert summary["cache"]["answer"]["hit"] >= 1
+    assert "| 01_经营状态 |" in (first / "index.md").read_text(encoding="utf-8")
+
+    # A baseline that was much faster, cheaper and always succeeded.
+    fast = json.loads(json.dumps(summary))
+    for stats in [fast["latency_ms"]["total"], *fast["latency_ms"]["nodes"].values()]:
+        for key in ("p50", "p95", "p99"):
+            stats[key] = 0.001
+    fast["tokens"]["per_query"] = 1
+    regressions = compare_to_baseline(summary, fast, threshold=0.2, min_delta_ms=0)
+    assert any(item.startswith("tokens per query") for item in regressions)
+    assert any(item.startswith("total p50") for item in regressions)
+    assert compare_to_baseline(summary, summary) == []
+
+    baseline = tmp_path / "fast.json"
+    baseline.write_text(json.dumps(fast), encoding="utf-8")
+    second = tmp_path / "second"
+    code = main([*args, "--output-dir", str(second), "--baseline", str(baseline)])
+    assert code == 1
+    assert "回归" in (second / "index.md").read_text(encoding="utf-8")
@@ -0,0 +1,151 @@
+"""sargable.py 测试 —— 函数包住日期列的条件改写为范围条件。"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.factory import build_agent_runtime
+from src.agent.sqlite_executor import SQLiteExecutor
+from src.agent.synthetic import generate_znjz
+from src.utils.safe_sql import enforce_safe_sql
+from src.utils.sargable import SargableRewriter
+
+REWRITER = SargableRewriter(["publish_time", "start_date", "round_date"])
+
+
+def rewrite(sql: str) -> str:
+    return REWRITER.rewrite_sql(sql)[0]
+
+
+# --- 改写 -----------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        (
+            "SELECT 1 FROM t WHERE YEAR(publish_time) = 2024",
+            "SELECT 1 FROM t WHERE (publish_time >= '2024-01-01' "
+            "AND publish_time < '2025-01-01')",
+        ),
+        (
+            "SELECT 1 FROM t WHERE year(`b`.`start_date`) BETWEEN 2015 AND 2017",
+            "SELECT 1 FROM t WHERE (`b`.`start_date` >= '2015-01-01' "
+            "AND `b`.`start_date` < '2018-01-01')",
+        ),
+        (
+            "SELECT 1 FROM t WHERE YEAR(start_date) > 2020 AND YEAR(start_date) <= 2022",
+            "SELECT 1 FROM t WHERE start_date >= '2021-01-01' "
+            "AND start_date < '2023-01-01'",
+        ),
+        (
+            "SELECT 1 FROM t WHERE DATE_FORMAT(publish_time, '%Y-%m') = '2024-02'",
+            "SELECT 1 FROM t WHERE (publish_time >= '2024-02-01' "
+            "AND publish_time < '2024-03-01')",
+        ),
+        (
+            "SELECT 1 FROM t WHERE DATE_FORMAT(publish_time, '%Y%m%d') < '20241231'",
+            "SELECT 1 FROM t WHERE publish_time < '2024-12-31'",
+        ),
+        (
+            "SELECT 1 FROM t WHERE DATE(round_date) = '2024-12-31'",
+            "SELECT 1 FROM t WHERE (round_date >= '2024-12-31' "
+            "AND round_date < '2025-01-01')",
+        ),
+    ],
+)
+def test_date_functions_become_ranges(sql, expected):
+    assert rewrite(sql) == expected
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        # 非日期列：字符串上的 YEAR() 依赖隐式解析
+        "SELECT 1 FROM t WHERE YEAR(title) = 2024",
+        # 比较值是表达式 / 函数在表达式内部
+        "SELECT 1 FROM t WHERE YEAR(start_date) = 2024 - 1",
+        "SELECT 1 FROM t WHERE 1 + YEAR(start_date) = 2024",
+        # 不是合法日历值或不是定宽格式
+        "SELECT 1 FROM t WHERE DATE_FORMAT(start_date, '%Y-%m') = '2024-13'",
+        "SELECT 1 FROM t WHERE DATE_FORMAT(start_date, '%c') = '3'",
+        "SELECT 1 FROM t WHERE DATE(start_date) = CURDATE()",
+        # 字符串字面量中的文本不改写
+        "SELECT 1 FROM t WHERE title = 'YEAR(start_date) = 2024'",
+    ],
+)
+def test_unsafe_or_non_temporal_predicates_are_left_alone(sql):
+    assert REWRITER.rewrite_sql(sql) == (sql, [], [])
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 1 FROM t WHERE DATE(start_date) = '9999-12-31'",
+        "SELECT 1 FROM t WHERE YEAR(start_date) = 9999",
+        "SELECT 1 FROM t WHERE DATE_FORMAT(start_date, '%Y-%m') = '9999-12'",
+        "SELECT 1 FROM t WHERE YEAR(start_date) BETWEEN 2020 AND 9999",
+    ],
+)
+def test_periods_ending_past_year_9999_are_left_alone(sql):
+    assert REWRITER.rewrite_sql(sql) == (sql, [], [])
+
+
+def test_report_records_modifications_and_like_warning():
+    report = enforce_safe_sql(
+        "SELECT name FROM companies WHERE YEAR(start_date) = 2020 "
+        "AND name LIKE '%科技%'",
+        allowed_tables=["companies"],
+    )
+
+    REWRITER.rewrite(report)
+
+    assert "(start_date >= '2020-01-01' AND start_date < '2021-01-01')" in (
+        report.safe_sql
+    )
+    assert "LIMIT" in report.safe_sql
+    assert report.modifications[-1] == (
+        "YEAR(start_date) = 2020 改写为可用索引的范围条件 "
+        "(start_date >= '2020-01-01' AND start_date < '2021-01-01')"
+    )
+    assert report.warnings == ["name LIKE '%科技%' 以通配符开头，无法使用索引"]
+
+
+# --- 运行时集成 -----------------------------------------------------------
+
+
+class FakeLLM:
+    sql = (
+        "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` "
+        "WHERE YEAR(`start_date`) BETWEEN 2015 AND 2017 GROUP BY `status`"
+    )
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+            return self.sql
+        return "### 核心发现\n\n存续企业最多。"
+
+
+def test_runtime_executes_the_rewritten_sql_with_the_same_rows(tmp_path):
+    database = tmp_path / "znjz.sqlite3"
+    generate_znjz(database, scale=0.01, seed=7)
+    settings = {"SQL_BACKEND": "sqlite", "SQL_SQLITE_PATH": str(database)}
+    runtime = build_agent_runtime(settings, llm=FakeLLM())
+    disabled = build_agent_runtime(
+        {**settings, "SQL_SARGABLE_REWRITE_ENABLED": "false"}, llm=FakeLLM()
+    )
+
+    result = runtime.query("2015到2017年成立的企业经营状态分布")
+
+    validate = [step for step in result.trace if step["node"] == "validate_sql"][-1]
+    assert result.success
+    assert "`start_date` >= '2015-01-01'" in result.safe_sql
+    assert any("改写为可用索引的范围条件" in item for item in validate["modifications"])
+    assert disabled.sargable is None
+    expected = SQLiteExecutor(database)(FakeLLM.sql)["rows"]
+    assert sorted(map(repr, result.rows)) == sorted(map(repr, expected))
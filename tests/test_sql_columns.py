@@ -0,0 +1,218 @@
+"""sql_columns.py 测试 —— 字段引用校验与确定性别名修正。"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.factory import build_agent_runtime, column_validator_from_mapping
+from src.agent.profiles import get_database_profile
+from src.agent.synthetic import generate_znjz
+from src.utils.safe_sql import enforce_safe_sql
+
+VALIDATOR = column_validator_from_mapping(get_database_profile("znjz"))
+
+
+def resolve(sql: str):
+    return VALIDATOR.resolve(sql)
+
+
+# --- 确定性修正 -----------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "sql, expected",
+    [
+        (
+            "SELECT company_name, COUNT(*) cnt FROM `企业基本信息` "
+            "GROUP BY company_name ORDER BY cnt DESC",
+            "SELECT `name`, COUNT(*) cnt FROM `企业基本信息` "
+            "GROUP BY `name` ORDER BY cnt DESC",
+        ),
+        (
+            "SELECT company_name, amount FROM `融资数据`",
+            "SELECT `ename`, amount FROM `融资数据`",
+        ),
+        (
+            "SELECT f.finance_round, COUNT(*) FROM `融资数据` AS f "
+            "GROUP BY f.finance_round",
+            "SELECT f.`round`, COUNT(*) FROM `融资数据` AS f GROUP BY f.`round`",
+        ),
+        (
+            "SELECT b.company_name, t.title FROM `企业基本信息` b "
+            "JOIN `招投标` t ON t.eid = b.eid",
+            "SELECT b.`name`, t.title FROM `企业基本信息` b "
+            "JOIN `招投标` t ON t.eid = b.eid",
+        ),
+        (
+            "SELECT `name` FROM `企业基本信息` WHERE eid IN "
+            "(SELECT eid FROM `融资数据` WHERE company_name LIKE '%科技%')",
+            "SELECT `name` FROM `企业基本信息` WHERE eid IN "
+            "(SELECT eid FROM `融资数据` WHERE `ename` LIKE '%科技%')",
+        ),
+    ],
+)
+def test_known_aliases_are_fixed_per_table(sql, expected):
+    fixed, modifications, errors = resolve(sql)
+
+    assert fixed == expected
+    assert modifications and not errors
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "WITH x AS (SELECT eid, COUNT(*) n FROM `融资数据` GROUP BY eid) "
+        "SELECT b.`name`, f.n FROM `企业基本信息` AS b LEFT JOIN x f ON f.eid = b.eid "
+        "ORDER BY f.n DESC",
+        "SELECT b.name, t.cnt FROM `企业基本信息` b JOIN (SELECT eid, COUNT(*) AS cnt "
+        "FROM `招投标` GROUP BY eid) t ON t.eid = b.eid ORDER BY t.cnt DESC",
+        "SELECT YEAR(`publish_time`) AS year, COUNT(*) AS bid_count FROM `招投标` "
+        "WHERE `publish_time` >= CURRENT_DATE - INTERVAL 5 YEAR GROUP BY year",
+        "SELECT CONVERT(name USING utf8mb4), CASE WHEN status = '存续' THEN 1 END flag, "
+        "ROW_NUMBER() OVER (PARTITION BY district_code ORDER BY regist_capi_new DESC) "
+        "rn FROM `企业基本信息` ORDER BY flag",
+        "SELECT `district`, COUNT(*) FROM `标签数据` GROUP BY `district`",
+    ],
+)
+def test_valid_sql_is_left_alone(sql):
+    assert resolve(sql) == (sql, [], [])
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT `status`, COUNT(*) AS '企业数量' FROM `企业基本信息` "
+        "GROUP BY `status` ORDER BY `企业数量` DESC",
+        'SELECT `status`, COUNT(*) AS "企业数量" FROM `企业基本信息` '
+        "GROUP BY `status` ORDER BY 企业数量 DESC",
+        "SELECT `status`, COUNT(*) AS `企业数量` FROM `企业基本信息` "
+        "GROUP BY `status` ORDER BY `企业数量` DESC",
+        "SELECT YEAR(`start_date`) AS '成立年份', COUNT(*) FROM `企业基本信息` "
+        "GROUP BY `成立年份`",
+        'SELECT YEAR(`start_date`) "year_no", COUNT(*) FROM `企业基本信息` '
+        "GROUP BY year_no",
+        "SELECT `status`, COUNT(*) 'cnt' FROM `企业基本信息` "
+        "GROUP BY `status` HAVING cnt > 1",
+        'SELECT `status`, COUNT(*) AS "cnt" FROM `企业基本信息` '
+        "GROUP BY `status` HAVING `cnt` > 1",
+    ],
+)
+def test_quoted_select_aliases_are_defined(sql):
+    assert resolve(sql) == (sql, [], [])
+
+
+def test_string_values_are_not_aliases():
+    sql = (
+        "SELECT `status` FROM `企业基本信息` WHERE `status` IN ('存续', '注销') "
+        "ORDER BY 存续"
+    )
+
+    assert resolve(sql)[2] == ["Unknown column '存续'：`企业基本信息` 中没有该字段"]
+
+
+@pytest.mark.parametrize(
+    "sql, error",
+    [
+        (
+            "SELECT COUNT(*) FROM `企业基本信息` WHERE city = '深圳市'",
+            "Unknown column 'city'：`企业基本信息` 中没有该字段，"
+            "应使用 `district_code`/`area_code`",
+        ),
+        (
+            "SELECT i.industry_name, COUNT(*) FROM `企业行业代码` i "
+            "GROUP BY i.industry_name",
+            "Unknown column 'i.industry_name'：`企业行业代码` 中没有该字段，"
+            "应使用 `industry_code`",
+        ),
+    ],
+)
+def test_name_columns_are_not_rewritten_to_code_columns(sql, error):
+    assert resolve(sql) == (sql, [], [error])
+
+
+def test_unfixable_column_is_rejected_for_repair():
+    report = enforce_safe_sql(
+        "SELECT company_name, industry_code FROM `企业基本信息` b "
+        "JOIN `企业行业代码` i ON i.eid = b.eid WHERE b.foo = 1",
+        allowed_tables=get_database_profile("znjz").allowed_tables,
+    )
+
+    VALIDATOR.check(report)
+
+    assert not report.is_safe and report.repairable
+    assert report.safe_sql is None
+    assert report.errors == [
+        "Unknown column 'company_name'：`企业基本信息`、`企业行业代码` 中没有该字段，"
+        "应使用 `name`/`ename`",
+        "Unknown column 'b.foo'：`企业基本信息` 中没有该字段",
+    ]
+
+
+# --- 运行时集成 -----------------------------------------------------------
+
+
+class FakeLLM:
+    def __init__(self, sql, repaired):
+        self.sql = sql
+        self.repaired = repaired
+        self.repairs = 0
+
+    def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+        prompt = messages[-1]["content"]
+        if "只返回修复后的SQL" in prompt:
+            self.repairs += 1
+            return self.repaired
+        if "只返回一条MySQL SELECT语句" in prompt:
+            return self.sql
+        return "### 核心发现\n\nA轮最多。"
+
+
+@pytest.fixture(scope="module")
+def settings(tmp_path_factory):
+    database = tmp_path_factory.mktemp("columns") / "znjz.sqlite3"
+    generate_znjz(database, scale=0.01, seed=7)
+    return {
+        "SQL_BACKEND": "sqlite",
+        "SQL_SQLITE_PATH": str(database),
+        "TEMPLATE_FAST_PATH_ENABLED": "false",
+    }
+
+
+def test_runtime_fixes_aliases_without_repair_round_trip(settings):
+    llm = FakeLLM(
+        "SELECT finance_round, COUNT(DISTINCT company_name) AS n FROM `融资数据` "
+        "GROUP BY finance_round",
+        repaired="SELECT 1",
+    )
+    runtime = build_agent_runtime(settings, llm=llm)
+
+    result = runtime.query("各融资轮次有多少家企业")
+
+    nodes = [step["node"] for step in result.trace]
+    assert result.success and result.row_count > 1
+    assert llm.repairs == 0 and "repair_sql" not in nodes
+    assert result.columns == ["round", "n"]
+    assert "COUNT(DISTINCT `ename`)" in result.safe_sql
+
+
+def test_runtime_sends_unknown_columns_to_repair_before_executing(settings):
+    llm = FakeLLM(
+        "SELECT `status`, COUNT(*) FROM `企业基本信息` GROUP BY registered_city",
+        repaired="SELECT `status`, COUNT(*) FROM `企业基本信息` GROUP BY `status`",
+    )
+    runtime = build_agent_runtime(settings, llm=llm)
+
+    result = runtime.query("经营状态分布")
+
+    nodes = [step["node"] for step in result.trace]
+    assert result.success and llm.repairs == 1
+    assert nodes.count("execute_sql") == 1
+    assert nodes.index("repair_sql") < nodes.index("execute_sql")
+    rejected = [step for step in result.trace if step["node"] == "validate_sql"][0]
+    assert rejected["repairable"] is True
+    assert "Unknown column 'registered_city'" in rejected["errors"][0]
@@ -0,0 +1,277 @@
+"""sql_cost.py 测试 —— EXPLAIN 代价守卫。"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agent.profiles import get_database_profile
+from src.agent.runtime import AgentRuntime
+from src.agent.sql_cache import CachingSQLExecutor
+from src.utils.safe_sql import enforce_safe_sql
+from src.utils.sql_cost import (
+    CostThresholds,
+    ExplainCostGuard,
+    cost_violations,
+    parse_explain_json,
+)
+
+# 两张事实表无索引直接 JOIN：招投标信息全扫 59 万行，再对每行全扫融资表。
+CARTESIAN_PLAN = {
+    "query_block": {
+        "select_id": 1,
+        "cost_info": {"query_cost": "3512345678.20"},
+        "ordering_operation": {
+            "using_filesort": True,
+            "grouping_operation": {
+                "using_temporary_table": True,
+                "nested_loop": [
+                    {
+                        "table": {
+                            "table_name": "t",
+                            "access_type": "ALL",
+                            "rows_examined_per_scan": 590000,
+                            "rows_produced_per_join": 590000,
+                        }
+                    },
+                    {
+                        "table": {
+                            "table_name": "f",
+                            "access_type": "ALL",
+                            "rows_examined_per_scan": 6000,
+                            "rows_produced_per_join": 3540000000,
+                        }
+                    },
+                ],
+            },
+        },
+    }
+}
+
+INDEXED_PLAN = {
+    "query_block": {
+        "cost_info": {"query_cost": "120.50"},
+        "nested_loop": [
+            {
+                "table": {
+                    "table_name": "b",
+                    "access_type": "range",
+                    "rows_examined_per_scan": 40,
+                    "rows_produced_per_join": 40,
+                }
+            },
+            {
+                "table": {
+                    "table_name": "f",
+                    "access_type": "ref",
+                    "rows_examined_per_scan": 2,
+                    "rows_produced_per_join": 80,
+                }
+            },
+        ],
+    }
+}
+
+
+def test_parse_explain_multiplies_nested_loop_scans():
+    cost = parse_explain_json(json.dumps(CARTESIAN_PLAN))
+
+    assert cost.query_cost == 3512345678.2
+    assert cost.rows_examined == 590000 + 6000 * 590000
+    assert cost.using_filesort and cost.using_temporary
+    assert [scan.table for scan in cost.join_scans] == ["f"]
+    assert cost.to_dict()["tables"][1]["loops"] == 590000
+
+
+def test_parse_explain_counts_dependent_subqueries_per_outer_row():
+    plan = {
+        "query_block": {
+            "cost_info": {"query_cost": "10"},
+            "table": {
+                "table_name": "b",
+                "access_type": "ALL",
+                "rows_examined_per_scan": 100,
+                "rows_produced_per_join": 100,
+            },
+            "select_list_subqueries": [
+                {
+                    "dependent": True,
+                    "query_block": {
+                        "table": {
+                            "table_name": "f",
+                            "access_type": "ref",
+                            "rows_examined_per_scan": 3,
+                        }
+                    },
+                }
+            ],
+        }
+    }
+
+    assert parse_explain_json(plan).rows_examined == 100 + 3 * 100
+
+
+def test_violations_report_each_threshold():
+    problems = cost_violations(parse_explain_json(CARTESIAN_PLAN), CostThresholds())
+
+    assert len(problems) == 5
+    assert any("`f` 无索引全扫" in problem for problem in problems)
+    assert cost_violations(parse_explain_json(INDEXED_PLAN), CostThresholds()) == []
+
+
+def test_full_scan_of_the_bid_table_is_flagged():
+    # SELECT `title` FROM `招投标信息` WHERE `title` LIKE '%智慧%' LIMIT 1000
+    plan = {
+        "query_block": {
+            "cost_info": {"query_cost": "60123.45"},
+            "table": {
+                "table_name": "招投标信息",
+                "access_type": "ALL",
+                "rows_examined_per_scan": 590523,
+                "rows_produced_per_join": 65613,
+            },
+        }
+    }
+    small = {
+        "query_block": {
+            "cost_info": {"query_cost": "1800.20"},
+            "table": {
+                "table_name": "企业基本信息",
+                "access_type": "ALL",
+                "rows_examined_per_scan": 17576,
+                "rows_produced_per_join": 17576,
+            },
+        }
+    }
+
+    assert cost_violations(parse_explain_json(plan), CostThresholds()) == [
+        "`招投标信息` 无索引全表扫描约 590523 行，超过上限 100000，"
+        "请用可走索引的条件（如日期范围、eid）缩小范围"
+    ]
+    assert cost_violations(parse_explain_json(small), CostThresholds()) == []
+
+
+def test_guard_writes_cost_and_rejects_or_marks_repairable():
+    sql = "SELECT t.`title` FROM `招投标信息` t JOIN `企业融资信息` f ON 1 = 1"
+    explained = []
+
+    def explain(safe_sql):
+        explained.append(safe_sql)
+        return CARTESIAN_PLAN
+
+    report = ExplainCostGuard(
+        explain, thresholds=CostThresholds(action="reject")
+    ).check(enforce_safe_sql(sql))
+    assert explained == [sql + " LIMIT 1000"]
+    assert report.is_safe is False
+    assert report.repairable is False
+    assert report.to_dict()["cost"]["rows_examined"] > 3_000_000_000
+
+    repairable = ExplainCostGuard(explain).check(enforce_safe_sql(sql))
+    assert repairable.repairable is True
+
+    ok = ExplainCostGuard(lambda _: INDEXED_PLAN).check(enforce_safe_sql(sql))
+    assert ok.is_safe is True
+    assert ok.cost["query_cost"] == 120.5
+
+
+def test_guard_skips_when_explain_fails():
+    def explain(sql):
+        raise RuntimeError("Unknown column 'x'")
+
+    report = ExplainCostGuard(explain).check(enforce_safe_sql("SELECT x FROM t"))
+
+    assert report.is_safe is True
+    assert report.cost is None
+    assert "EXPLAIN" in report.warnings[0]
+
+
+def test_thresholds_from_mapping():
+    thresholds = CostThresholds.from_mapping(
+        {"SQL_COST_MAX_ROWS_EXAMINED": "1000", "SQL_COST_ACTION": "reject"}
+    )
+
+    assert thresholds.max_rows_examined == 1000
+    assert thresholds.action == "reject"
+    assert thresholds.max_sort_rows == CostThresholds().max_sort_rows
+    assert (
+        CostThresholds.from_mapping(
+            {"SQL_COST_MAX_FULL_SCAN_ROWS": "1000000"}
+        ).max_full_scan_rows
+        == 1_000_000
+    )
+
+
+def test_runtime_sends_costly_plan_to_repair_before_executing():
+    bad_sql = "SELECT t.`title` FROM `招投标信息` t JOIN `企业融资信息` f ON 1 = 1"
+    good_sql = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            content = messages[-1]["content"]
+            if "执行计划代价超限" in content and "无索引全扫" in content:
+                return good_sql
+            if "只返回一条MySQL SELECT语句" in content:
+                return bad_sql
+            return "ok"
+
+    executed = []
+
+    def executor(sql):
+        executed.append(sql)
+        return {"columns": ["status", "cnt"], "rows": [{"status": "存续", "cnt": 1}]}
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=executor,
+        cost_guard=ExplainCostGuard(
+            lambda sql: CARTESIAN_PLAN if "JOIN" in sql else INDEXED_PLAN
+        ),
+    )
+
+    result = runtime.query("统计招投标和融资")
+
+    assert result.success is True
+    assert executed == [good_sql + " LIMIT 1000"]
+    validate = [step for step in result.trace if step["node"] == "validate_sql"]
+    assert validate[0]["status"] == "rejected"
+    assert validate[0]["repairable"] is True
+    assert validate[1]["cost"]["query_cost"] == 120.5
+    assert result.safety["cost"]["query_cost"] == 120.5
+
+
+def test_runtime_skips_explain_when_the_result_cache_answers():
+    sql = "SELECT `status`, COUNT(*) AS cnt FROM `企业基本信息` GROUP BY `status`"
+
+    class FakeLLM:
+        def complete(self, messages, *, temperature=0.1, max_tokens=1500):
+            if "只返回一条MySQL SELECT语句" in messages[-1]["content"]:
+                return sql
+            return "ok"
+
+    explained = []
+
+    def explain(sql):
+        explained.append(sql)
+        return INDEXED_PLAN
+
+    runtime = AgentRuntime(
+        profile=get_database_profile("znjz"),
+        llm=FakeLLM(),
+        sql_executor=CachingSQLExecutor(
+            lambda sql: {"columns": ["status"], "rows": [{"status": "存续"}]}
+        ),
+        cost_guard=ExplainCostGuard(explain),
+    )
+
+    first = runtime.query("统计经营状态")
+    second = runtime.query("统计经营状态")
+
+    assert first.success and second.success
+    assert explained == [sql + " LIMIT 1000"]
+    assert first.safety["cost"]["query_cost"] == 120.5
+    assert second.safety["cost"] == {"skipped": "cache"}